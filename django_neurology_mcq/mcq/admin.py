@@ -1,10 +1,21 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import MCQ, Bookmark, Flashcard, Note, UserProfile, HiddenMCQ, QuestionReport
+from .models import MCQ, Bookmark, Flashcard, FlashcardReview, Note, UserProfile, HiddenMCQ, QuestionReport
+from .admin_performance import (
+    BulkMetadataForm,
+    CachedAllValuesFieldListFilter,
+    EstimatedCountPaginator,
+    invalidate_filter_choices,
+)
 from django import forms
+from django.contrib.admin import helpers
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.db.models import Count, Exists, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.core.cache import cache
+from django.template.response import TemplateResponse
+from django.urls import path
 from ckeditor.widgets import CKEditorWidget
 import json
 
@@ -499,21 +510,33 @@ class HasReportsFilter(admin.SimpleListFilter):
         )
     
     def queryset(self, request, queryset):
+        # EXISTS subqueries avoid the join + DISTINCT over every MCQ column
+        reports = QuestionReport.objects.filter(question=OuterRef('pk'))
         if self.value() == 'yes':
-            return queryset.filter(reports__status='pending').distinct()
+            return queryset.filter(Exists(reports.filter(status='pending')))
         if self.value() == 'no':
-            return queryset.exclude(reports__isnull=False)
+            return queryset.exclude(Exists(reports))
         if self.value() == 'any':
-            return queryset.filter(reports__isnull=False).distinct()
+            return queryset.filter(Exists(reports))
 
 @admin.register(MCQ)
 class MCQAdmin(admin.ModelAdmin):
     form = MCQAdminForm
     list_display = ('question_number', 'subspecialty', 'exam_type', 'exam_year', 'correct_answer', 'has_image', 'get_report_count')
-    list_filter = ('subspecialty', 'exam_type', 'exam_year', HasImageFilter, HasReportsFilter)
+    list_filter = (
+        ('subspecialty', CachedAllValuesFieldListFilter),
+        ('exam_type', CachedAllValuesFieldListFilter),
+        ('exam_year', CachedAllValuesFieldListFilter),
+        HasImageFilter,
+        HasReportsFilter,
+    )
+    # Each field has a trigram index on PostgreSQL (MCQ.Meta.indexes)
     search_fields = ('question_text', 'question_number', 'source_file')
     ordering = ('subspecialty', 'exam_year', 'question_number')
     inlines = [QuestionReportInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['bulk_edit_metadata']
     
     class Media:
         css = {
@@ -557,7 +580,9 @@ class MCQAdmin(admin.ModelAdmin):
     
     def get_report_count(self, obj):
         """Display the number of reports for this MCQ"""
-        count = obj.reports.filter(status='pending').count()
+        count = getattr(obj, 'pending_report_count', None)
+        if count is None:
+            count = obj.reports.filter(status='pending').count()
         if count > 0:
             return f"{count} pending"
         return "0"
@@ -572,9 +597,20 @@ class MCQAdmin(admin.ModelAdmin):
     has_image.admin_order_field = 'image_url'
 
     def get_queryset(self, request):
-        """Annotate queryset with report count for sorting"""
+        """Annotate queryset with report count for display and sorting"""
         qs = super().get_queryset(request)
-        return qs.annotate(pending_report_count=Count('reports', filter=Q(reports__status='pending')))
+        # A correlated subquery keeps the page query free of GROUP BY, so LIMIT
+        # applies before the counts are computed.
+        pending = (
+            QuestionReport.objects.filter(question=OuterRef('pk'), status='pending')
+            .order_by()
+            .values('question')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return qs.annotate(
+            pending_report_count=Coalesce(Subquery(pending, output_field=IntegerField()), 0)
+        )
     
     def save_model(self, request, obj, form, change):
         # Set options from the processed form data
@@ -582,6 +618,86 @@ class MCQAdmin(admin.ModelAdmin):
             obj.options = form.cleaned_data['options']
         super().save_model(request, obj, form, change)
 
+    @admin.action(description="Edit metadata of selected MCQs")
+    def bulk_edit_metadata(self, request, queryset):
+        """Set subspecialty / exam type / difficulty on every selected MCQ with one UPDATE."""
+        form = BulkMetadataForm(
+            request.POST if 'apply' in request.POST else None,
+            subspecialties=MCQAdminForm.SUBSPECIALTIES,
+        )
+        select_across = request.POST.get('select_across') == '1'
+        if form.is_bound and form.is_valid():
+            changes = form.changes()
+            if not changes:
+                self.message_user(request, "No metadata fields were filled in; nothing changed.", level='warning')
+                return None
+            # The imported name no longer describes a type chosen here
+            extra = {'exam_type_original': None} if 'exam_type' in changes else {}
+            updated = queryset.order_by().update(**changes, **extra)
+            # update() skips post_save receivers, so refresh what they would have
+            from .services.adaptive_selector import bump_candidate_version
+
+            bump_candidate_version()
+            invalidate_filter_choices()
+            fields = ', '.join(f"{name}={value!r}" for name, value in changes.items())
+            self.message_user(request, f"Updated {updated} MCQs: {fields}")
+            return None
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Edit metadata of selected MCQs',
+            'form': form,
+            'selected_ids': [] if select_across else list(queryset.values_list('pk', flat=True)),
+            'selected_count': queryset.count(),
+            'preview': queryset.order_by('pk').values('question_number', 'subspecialty', 'exam_type', 'difficulty_level')[:20],
+            'select_across': int(select_across),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/mcq/mcq/bulk_edit_metadata.html', context)
+
+    def get_urls(self):
+        custom = [
+            path(
+                'near-duplicates/',
+                self.admin_site.admin_view(self.near_duplicates_view),
+                name='mcq_mcq_near_duplicates',
+            ),
+        ]
+        return custom + super().get_urls()
+
+    def near_duplicates_view(self, request):
+        """Report of near-duplicate clusters from the stored MinHash signatures."""
+        from .services.near_duplicates import default_threshold, find_duplicate_clusters
+
+        try:
+            threshold = float(request.GET.get('threshold') or default_threshold())
+        except ValueError:
+            threshold = default_threshold()
+        threshold = min(1.0, max(0.3, threshold))
+        cross_exam = request.GET.get('cross_exam') == '1'
+
+        cache_key = f"admin:near_duplicates:{threshold:.2f}:{int(cross_exam)}"
+        clusters = None if request.GET.get('refresh') else cache.get(cache_key)
+        if clusters is None:
+            clusters = [
+                cluster.as_dict()
+                for cluster in find_duplicate_clusters(threshold=threshold, cross_exam_only=cross_exam)
+            ]
+            cache.set(cache_key, clusters, timeout=600)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Near-duplicate MCQs',
+            'clusters': clusters[:200],
+            'cluster_count': len(clusters),
+            'redundant_count': sum(cluster['size'] - 1 for cluster in clusters),
+            'threshold': threshold,
+            'cross_exam': cross_exam,
+        }
+        return TemplateResponse(request, 'admin/mcq/mcq/near_duplicates.html', context)
+
 @admin.register(Bookmark)
 class BookmarkAdmin(admin.ModelAdmin):
     list_display = ('user', 'mcq', 'created_at')
@@ -591,11 +707,23 @@ class BookmarkAdmin(admin.ModelAdmin):
 
 @admin.register(Flashcard)
 class FlashcardAdmin(admin.ModelAdmin):
-    list_display = ('user', 'mcq', 'interval', 'next_review', 'last_reviewed')
+    list_display = ('user', 'mcq', 'interval', 'next_review', 'last_reviewed', 'repetitions', 'lapses')
     list_filter = ('user', 'next_review', 'last_reviewed')
     search_fields = ('user__username', 'mcq__question_text')
     ordering = ('next_review',)
 
+@admin.register(FlashcardReview)
+class FlashcardReviewAdmin(admin.ModelAdmin):
+    list_display = ('user', 'flashcard', 'rating', 'algorithm', 'previous_interval', 'interval', 'reviewed_at')
+    list_filter = ('algorithm', 'rating', 'reviewed_at')
+    search_fields = ('user__username',)
+    ordering = ('-reviewed_at',)
+    list_select_related = ('user', 'flashcard__user', 'flashcard__mcq')
+
+    def has_change_permission(self, request, obj=None):
+        # Reviews are an append-only log
+        return False
+
 @admin.register(Note)
 class NoteAdmin(admin.ModelAdmin):
     list_display = ('user', 'mcq', 'created_at', 'updated_at')
@@ -612,8 +740,8 @@ class HiddenMCQAdmin(admin.ModelAdmin):
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'expiration_date', 'is_active_override', 'is_expired', 'is_active', 'created_by')
-    list_filter = ('is_active_override', 'expiration_date')
+    list_display = ('user', 'expiration_date', 'is_active_override', 'is_expired', 'is_active', 'created_by', 'flashcard_scheduler')
+    list_filter = ('is_active_override', 'expiration_date', 'flashcard_scheduler')
     search_fields = ('user__username', 'user__email')
     readonly_fields = ('is_expired', 'is_active')
     actions = ['extend_30_days', 'extend_90_days', 'extend_365_days', 'deactivate_profiles', 'activate_profiles']
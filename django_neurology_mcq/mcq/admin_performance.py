@@ -0,0 +1,120 @@
+"""
+Performance helpers for the MCQ admin changelist.
+
+Content editors keep the MCQ changelist open all day, so each page load
+should cost a fixed, small number of queries:
+
+* list filter choices (distinct subspecialties, exam types, years) come from
+  the cache and are dropped when an MCQ is saved or bulk-edited
+* the paginator uses PostgreSQL's planner estimate instead of ``COUNT(*)``
+  for unfiltered listings of very large tables
+* metadata edits across many rows run as one ``UPDATE``
+"""
+
+import logging
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .exam_utils import CANONICAL_EXAM_TYPES
+
+logger = logging.getLogger(__name__)
+
+FILTER_CHOICES_KEY = "admin:mcq:filter_choices:{field}"
+CACHED_FILTER_FIELDS = ('subspecialty', 'exam_type', 'exam_year')
+
+
+def invalidate_filter_choices():
+    """Forget cached changelist filter choices (call after MCQ metadata changes)."""
+    try:
+        cache.delete_many([FILTER_CHOICES_KEY.format(field=field) for field in CACHED_FILTER_FIELDS])
+    except Exception as exc:
+        logger.warning("Could not clear MCQ admin filter choices: %s", exc)
+
+
+class CachedAllValuesFieldListFilter(admin.AllValuesFieldListFilter):
+    """
+    ``AllValuesFieldListFilter`` whose distinct values are cached.
+
+    The stock filter runs ``SELECT DISTINCT`` over the admin queryset on every
+    page load (including its report-count annotation). Values here come from
+    the plain table and are kept for ``ADMIN_FILTER_CHOICES_TIMEOUT`` seconds or
+    until :func:`invalidate_filter_choices` runs.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        key = FILTER_CHOICES_KEY.format(field=field_path)
+        try:
+            choices = cache.get(key)
+        except Exception as exc:
+            logger.warning("Could not read MCQ admin filter choices: %s", exc)
+            choices = None
+        if choices is None:
+            choices = list(
+                model._default_manager.order_by(field.name).values_list(field.name, flat=True).distinct()
+            )
+            try:
+                cache.set(key, choices, getattr(settings, 'ADMIN_FILTER_CHOICES_TIMEOUT', 3600))
+            except Exception as exc:
+                logger.warning("Could not cache MCQ admin filter choices: %s", exc)
+        self.lookup_choices = choices
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that trusts the planner's row estimate for unfiltered listings.
+
+    On PostgreSQL, ``pg_class.reltuples`` is read instead of counting every row
+    once the estimate passes ``ADMIN_ESTIMATED_COUNT_THRESHOLD``. Filtered or
+    searched listings, small tables and other databases still get an exact
+    count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where:
+            estimate = self._estimated_rows(queryset)
+            if estimate is not None and estimate >= getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 50000):
+                return estimate
+        return super().count
+
+    @staticmethod
+    def _estimated_rows(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 (or 0) for tables that were never analysed
+        return int(row[0]) if row and row[0] and row[0] > 0 else None
+
+
+class BulkMetadataForm(forms.Form):
+    """Intermediate form for the "edit metadata" changelist action; blank fields are left unchanged."""
+
+    subspecialty = forms.ChoiceField(required=False)
+    exam_type = forms.ChoiceField(
+        required=False,
+        choices=[('', '— unchanged —')] + [(name, name) for name in CANONICAL_EXAM_TYPES],
+    )
+    difficulty_level = forms.CharField(required=False, max_length=50)
+
+    def __init__(self, *args, subspecialties=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['subspecialty'].choices = [('', '— unchanged —')] + list(subspecialties)
+
+    def changes(self):
+        """Field values to write, skipping the blank (unchanged) ones."""
+        return {name: value.strip() for name, value in self.cleaned_data.items() if value and value.strip()}
@@ -0,0 +1,141 @@
+"""
+Server-sent event endpoints for AI actions.
+
+Each view streams the completion of an existing AI function through
+:mod:`mcq.services.ai_stream` and persists the final result the same way
+its non-streaming counterpart does. Requests are POSTs (form or JSON body)
+so they carry the CSRF token; the browser reads the response with fetch.
+"""
+
+import json
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_POST
+
+from .models import MCQ
+from .services import ai_pal_cache
+from .services.ai_stream import final_event, sse_response, stream_events
+
+AI_UNAVAILABLE = (
+    "<div class='alert alert-warning'><h4><i class='bi bi-exclamation-triangle'></i> AI Features Unavailable</h4>"
+    "<p>AI-Pal requires OpenAI API access, which is not currently configured.</p>"
+    "<p>Please contact the administrator to set up the OpenAI API key.</p></div>"
+)
+
+
+def _ai_available():
+    from .openai_integration import api_key, client
+
+    return bool(api_key and client)
+
+
+@login_required
+@require_POST
+def ask_gpt_stream(request, mcq_id):
+    """Stream an AI-Pal answer; equivalent earlier questions are answered from the cache."""
+    question = request.POST.get('question', '').strip()
+    if not question:
+        return JsonResponse({'error': 'Question is required'}, status=400)
+    mcq = get_object_or_404(MCQ, id=mcq_id)
+
+    if request.POST.get('regenerate') not in ('1', 'true'):
+        hit = ai_pal_cache.lookup(mcq, question)
+        if hit is not None:
+            return sse_response(final_event(hit.as_result()))
+    if not _ai_available():
+        return sse_response(final_event({'answer': AI_UNAVAILABLE, 'cached': False}))
+
+    return sse_response(stream_events(
+        ai_pal_cache.answer_question,
+        mcq,
+        question,
+        regenerate=True,
+        on_complete=lambda answer: answer.as_result(),
+    ))
+
+
+@login_required
+@require_POST
+def reasoning_coach_stream(request, mcq_id):
+    """Stream step-by-step clinical reasoning feedback for a learner's answer."""
+    from .openai_integration import clinical_reasoning_coach
+
+    selected_answer = request.POST.get('selected_answer', '').strip().upper()
+    user_reasoning = request.POST.get('user_reasoning', '').strip()
+    if not selected_answer or not user_reasoning:
+        return JsonResponse({'error': 'selected_answer and user_reasoning are required'}, status=400)
+    mcq = get_object_or_404(MCQ, id=mcq_id)
+    is_correct = selected_answer == (mcq.correct_answer or '').strip().upper()
+
+    return sse_response(stream_events(
+        clinical_reasoning_coach,
+        mcq,
+        selected_answer,
+        user_reasoning,
+        is_correct,
+        on_complete=lambda html: {'html': html, 'is_correct': is_correct},
+    ))
+
+
+@login_required
+@require_POST
+def explanation_stream(request, mcq_id):
+    """Stream a generated explanation and save it to the MCQ once complete."""
+    from .openai_integration import generate_explanation
+
+    mcq = get_object_or_404(MCQ, id=mcq_id)
+    reason = request.POST.get('reason', '')
+
+    def save(raw):
+        from .views import _process_explanation
+
+        current = MCQ.objects.get(pk=mcq_id)
+        current.explanation = _process_explanation(raw, current)
+        current.save()
+        return {'mcq_id': mcq_id, 'html': current.explanation}
+
+    return sse_response(stream_events(generate_explanation, mcq, reason, on_complete=save))
+
+
+@staff_member_required
+@require_POST
+def ai_edit_explanation_stream(request, mcq_id):
+    """Stream the AI explanation editor; the result is returned for review, not saved."""
+    from .openai_integration import ai_edit_explanation_text
+
+    mcq = get_object_or_404(MCQ, id=mcq_id)
+    try:
+        data = json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+    if not _ai_available():
+        return JsonResponse(
+            {'success': False, 'error': 'OpenAI API is not configured. Please set the OPENAI_API_KEY environment variable.'},
+            status=503,
+        )
+    section_name = data.get('section_name', '').strip() or 'unified_explanation'
+
+    def result(content):
+        content = (content or '').strip()
+        if not content:
+            raise ValueError('AI returned empty content for this explanation.')
+        return {
+            'success': True,
+            'enhanced_content': content,
+            'section_name': section_name,
+            'message': 'AI has enhanced the explanation. Review and save when ready.',
+        }
+
+    return sse_response(stream_events(
+        ai_edit_explanation_text,
+        mcq,
+        current_content=data.get('current_content', '').strip(),
+        custom_instructions=data.get('custom_instructions', '').strip(),
+        mode=data.get('mode', 'enhance'),
+        on_complete=result,
+        # The editor completion is a {"explanation": "..."} JSON object
+        json_field='explanation',
+    ))
@@ -8,11 +8,15 @@ class McqConfig(AppConfig):
     
     def ready(self):
         """
-        Automatically load fixtures when the app is ready,
+        Connect the Celery task instrumentation signals, then
+        automatically load fixtures when the app is ready,
         but only if we're not running a management command.
         This prevents fixtures from loading twice when using manage.py.
         """
         import sys
+        from .services import instrumentation
+        instrumentation.connect_task_signals()
+
         if 'runserver' in sys.argv or 'gunicorn' in sys.argv[0]:
             # Only auto-load fixtures if AUTO_LOAD_FIXTURES is enabled
             # This can be disabled by setting AUTO_LOAD_FIXTURES=False in .env
@@ -0,0 +1,10 @@
+"""
+Repeatable performance benchmarks for the hot paths.
+
+``python manage.py benchmark`` fills the database with a synthetic bank
+(:mod:`.synthetic`), runs timed scenarios (:mod:`.scenarios`) through the full
+middleware stack with the Django test client, and reports latency percentiles,
+query counts and cache/LLM usage as JSON (:mod:`.runner`) so that runs can be
+compared. LLM-backed paths use :class:`.fake_llm.FakeLLMClient`, so no network
+calls are made and the timings measure our own code.
+"""
@@ -0,0 +1,95 @@
+"""
+Offline stand-in for the OpenAI client used by benchmark scenarios.
+
+It answers ``chat.completions.create`` and ``responses.create`` with canned
+JSON shaped after the prompt (case generation, demographic extraction,
+semantic validation), after an optional fixed delay that stands in for model
+latency. Responses carry ``usage`` so the instrumentation token counts work.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+_MCQ_IN_PROMPT = re.compile(r"ORIGINAL MCQ \(ID: (\d+)\):\s*Question: (.*?)\n", re.DOTALL)
+
+
+def _prompt_text(messages) -> str:
+    parts: List[str] = []
+    for message in messages or []:
+        content = message.get("content", "") if isinstance(message, dict) else ""
+        if isinstance(content, list):
+            content = " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+def canned_reply(prompt: str) -> str:
+    """The JSON (or text) reply for a prompt, picked by what the prompt asks for."""
+    if '"representative_age"' in prompt:
+        return json.dumps({"age_descriptor": "45", "gender": "male", "representative_age": "45"})
+    if '"score"' in prompt and "alignment" in prompt.lower():
+        return json.dumps({"score": 88, "issues": [], "explanation": "Same concept and decision point."})
+    match = _MCQ_IN_PROMPT.search(prompt)
+    if match:
+        mcq_id, question = int(match.group(1)), match.group(2).strip()
+        return json.dumps({
+            "source_mcq_id": mcq_id,
+            "clinical_presentation": {
+                "chief_complaint": question.split(".")[0][:120],
+                "history_present_illness": question,
+                "past_medical_history": ["Hypertension"],
+                "medications": ["Amlodipine"],
+                "physical_examination": question,
+                "vital_signs": {"bp": "138/84", "hr": "78", "temp": "98.4"},
+            },
+            "question_prompt": "What is the most likely diagnosis?",
+            "core_concept_type": "Diagnosis",
+            "learning_objectives": ["Localise the lesion", "Form a differential", "Choose the next step"],
+        })
+    return "This is a benchmark response from the offline LLM client."
+
+
+def _response(text: str, prompt: str) -> Any:
+    usage = SimpleNamespace(
+        prompt_tokens=len(prompt) // 4,
+        completion_tokens=len(text) // 4,
+        input_tokens=len(prompt) // 4,
+        output_tokens=len(text) // 4,
+    )
+    message = SimpleNamespace(role="assistant", content=text)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=message, finish_reason="stop")],
+        output_text=text,
+        output=[],
+        usage=usage,
+    )
+
+
+class FakeLLMClient:
+    """Duck-typed OpenAI client; ``calls`` records the model of every request."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls: List[str] = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat_create))
+        self.responses = SimpleNamespace(create=self._responses_create)
+
+    def _reply(self, model: str, prompt: str) -> Any:
+        with self._lock:
+            self.calls.append(str(model))
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return _response(canned_reply(prompt), prompt)
+
+    def _chat_create(self, model: str = "", messages=None, **kwargs: Dict[str, Any]) -> Any:
+        return self._reply(model, _prompt_text(messages))
+
+    def _responses_create(self, model: str = "", input=None, **kwargs: Dict[str, Any]) -> Any:
+        return self._reply(model, _prompt_text(input) if isinstance(input, list) else str(input or ""))
@@ -0,0 +1,173 @@
+"""
+Run scenarios and report percentiles as JSON.
+
+Each iteration runs inside ``instrumentation.measure`` so the report carries
+query counts, database time, cache hit ratio and LLM calls next to the
+latency percentiles. :func:`compare` diffs two reports for run-to-run checks.
+"""
+
+from __future__ import annotations
+
+import math
+import platform
+import subprocess
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import django
+from django.db import connection
+from django.utils import timezone
+
+from ..services import instrumentation
+from .scenarios import BenchmarkContext, Scenario
+
+KIND_BENCHMARK = "benchmark"
+# Metrics compared by compare(): (section, key)
+COMPARED = (("latency_ms", "p50"), ("latency_ms", "p95"), ("queries", "mean"))
+
+
+def percentile(values: Sequence[float], fraction: float) -> Optional[float]:
+    """Linear-interpolated percentile of ``values`` (``fraction`` in 0..1)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower, upper = math.floor(position), math.ceil(position)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _distribution(values: Sequence[float], digits: int = 2) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"min": None, "mean": None, "p50": None, "p90": None, "p95": None, "p99": None, "max": None}
+    summary = {
+        "min": min(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 0.50),
+        "p90": percentile(values, 0.90),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values),
+    }
+    return {key: round(value, digits) for key, value in summary.items()}
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    description: str
+    durations_ms: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+    db_time_ms: List[float] = field(default_factory=list)
+    cache_hits: int = 0
+    cache_misses: int = 0
+    llm_calls: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def add(self, measurement: instrumentation.Measurement) -> None:
+        self.durations_ms.append(measurement.duration_ms)
+        self.queries.append(measurement.db_queries)
+        self.db_time_ms.append(measurement.db_time_ms)
+        self.cache_hits += measurement.cache_hits
+        self.cache_misses += measurement.cache_misses
+        self.llm_calls += len(measurement.llm_calls)
+
+    def as_dict(self) -> Dict[str, Any]:
+        iterations = len(self.durations_ms)
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "description": self.description,
+            "iterations": iterations,
+            "errors": len(self.errors),
+            "error_samples": self.errors[:3],
+            "latency_ms": _distribution(self.durations_ms),
+            "queries": _distribution(self.queries),
+            "db_time_ms": _distribution(self.db_time_ms),
+            "cache_hit_ratio": round(self.cache_hits / lookups, 3) if lookups else None,
+            "llm_calls_per_iteration": round(self.llm_calls / iterations, 2) if iterations else None,
+        }
+
+
+def run_scenario(scenario: Scenario, ctx: BenchmarkContext, iterations: int, warmup: int = 1) -> ScenarioResult:
+    result = ScenarioResult(name=scenario.name, description=scenario.description)
+    for index in range(warmup + iterations):
+        try:
+            prepared = scenario.prepare(ctx) if scenario.prepare else None
+            with instrumentation.measure(KIND_BENCHMARK, scenario.name) as measurement:
+                scenario.run(ctx, prepared)
+        except Exception as exc:
+            if index >= warmup:
+                result.errors.append(f"{type(exc).__name__}: {exc}"[:300])
+            continue
+        if index >= warmup:
+            result.add(measurement)
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmarks(
+    scenarios: Sequence[Scenario],
+    ctx: BenchmarkContext,
+    iterations: int,
+    warmup: int = 1,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Run ``scenarios`` in order and return the JSON-serialisable report."""
+    report = progress or (lambda message: None)
+    results = {}
+    for scenario in scenarios:
+        result = run_scenario(scenario, ctx, iterations, warmup)
+        results[scenario.name] = result.as_dict()
+        latency = results[scenario.name]["latency_ms"]
+        report(
+            f"{scenario.name}: p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+            f"{results[scenario.name]['queries']['mean']} queries, {len(result.errors)} errors"
+        )
+    return {
+        "meta": {
+            "started_at": timezone.now().isoformat(),
+            "commit": _git_commit(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "iterations": iterations,
+            "warmup": warmup,
+            "llm_latency_ms": ctx.llm.latency_ms,
+            "bank": {
+                "mcqs": len(ctx.bank.mcq_ids),
+                "users": len(ctx.bank.users),
+                "created": ctx.bank.created,
+            },
+        },
+        "scenarios": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-scenario change of p50/p95 latency and mean queries against ``baseline``."""
+    changes: Dict[str, Any] = {}
+    for name, stats in current.get("scenarios", {}).items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        entry = {}
+        for section, key in COMPARED:
+            old, new = (before.get(section) or {}).get(key), (stats.get(section) or {}).get(key)
+            if old is None or new is None:
+                continue
+            entry[f"{section}.{key}"] = {
+                "baseline": old,
+                "current": new,
+                "change_pct": round((new - old) / old * 100, 1) if old else None,
+            }
+        changes[name] = entry
+    return changes
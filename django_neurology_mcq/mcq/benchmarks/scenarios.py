@@ -0,0 +1,206 @@
+"""
+Timed benchmark scenarios.
+
+A scenario is one user-visible operation. ``run`` is timed (and its queries,
+cache lookups and LLM calls counted); the optional ``prepare`` runs untimed
+before every iteration and its return value is passed to ``run``. Requests go
+through the Django test client, so the whole middleware stack is included.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from django.urls import reverse
+
+from ..views import SUBSPECIALTY_MAPPING
+from .fake_llm import FakeLLMClient
+from .synthetic import BENCH_SOURCE, DIAGNOSES, SYMPTOMS, Bank
+
+
+class ScenarioError(Exception):
+    """An iteration returned an unexpected response."""
+
+
+class BenchmarkContext:
+    """State shared by the scenarios of one run: the bank, logged-in clients and the fake LLM."""
+
+    def __init__(self, bank: Bank, seed: int = 0, llm_latency_ms: float = 0.0):
+        self.bank = bank
+        self.rng = random.Random(seed)
+        self.llm = FakeLLMClient(latency_ms=llm_latency_ms)
+        self.counter = 0
+        self._clients: Dict[int, Client] = {}
+
+    def client_for(self, user: User) -> Client:
+        client = self._clients.get(user.pk)
+        if client is None:
+            client = Client()
+            client.force_login(user)
+            self._clients[user.pk] = client
+        return client
+
+    def learner(self) -> Client:
+        return self.client_for(self.rng.choice(self.bank.users))
+
+    def admin(self) -> Client:
+        return self.client_for(self.bank.superuser)
+
+    def mcq_id(self) -> int:
+        return self.rng.choice(self.bank.mcq_ids)
+
+    def subspecialty(self) -> str:
+        """A display name, as used in URLs."""
+        return self.rng.choice(sorted(SUBSPECIALTY_MAPPING))
+
+    def next_number(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+def _check(response, expected=(200,)):
+    if response.status_code not in expected:
+        raise ScenarioError(f"HTTP {response.status_code} from {response.request.get('PATH_INFO')}")
+    # Stream bodies are consumed so their cost is part of the timing
+    if getattr(response, "streaming", False):
+        b"".join(response.streaming_content)
+    return response
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    run: Callable[[BenchmarkContext, Any], Any]
+    prepare: Optional[Callable[[BenchmarkContext], Any]] = None
+
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(name: str, description: str, prepare: Optional[Callable[[BenchmarkContext], Any]] = None):
+    def register(run):
+        SCENARIOS[name] = Scenario(name=name, description=description, run=run, prepare=prepare)
+        return run
+    return register
+
+
+def get_scenarios(names: Optional[List[str]] = None) -> List[Scenario]:
+    if not names:
+        return list(SCENARIOS.values())
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(unknown)}")
+    return [SCENARIOS[name] for name in names]
+
+
+# ----------------------------------------------------------------------
+# Learner pages
+# ----------------------------------------------------------------------
+@scenario("view_mcq", "Open an MCQ detail page")
+def view_mcq(ctx: BenchmarkContext, prepared=None):
+    _check(ctx.learner().get(reverse("view_mcq", args=[ctx.mcq_id()])))
+
+
+@scenario("dashboard", "Load the learner dashboard")
+def dashboard(ctx: BenchmarkContext, prepared=None):
+    _check(ctx.learner().get(reverse("dashboard")))
+
+
+@scenario("search", "Two-word search across the bank")
+def search(ctx: BenchmarkContext, prepared=None):
+    query = f"{ctx.rng.choice(SYMPTOMS).split()[-1]} {ctx.rng.choice(DIAGNOSES).split()[0]}"
+    _check(ctx.learner().get(reverse("search"), {"query": query}))
+
+
+@scenario("subspecialty_view", "List one subspecialty")
+def subspecialty_view(ctx: BenchmarkContext, prepared=None):
+    _check(ctx.learner().get(reverse("subspecialty", args=[ctx.subspecialty()])))
+
+
+def _exam_form(ctx: BenchmarkContext) -> Dict[str, Any]:
+    return {
+        "exam_type": "mixed",
+        "mcq_count_option": "limited",
+        "mcq_count": 50,
+        "time_limit": 60,
+        "display_options": "all",
+        "subspecialties": ctx.rng.sample(sorted(set(SUBSPECIALTY_MAPPING.values())), 3),
+    }
+
+
+@scenario("mock_exam_create", "Configure and start a 50-question mock exam")
+def mock_exam_create(ctx: BenchmarkContext, prepared=None):
+    _check(ctx.learner().post(reverse("dashboard"), _exam_form(ctx)))
+
+
+def _start_exam(ctx: BenchmarkContext):
+    client = ctx.learner()
+    _check(client.post(reverse("dashboard"), _exam_form(ctx)))
+    mcq_ids = client.session["mock_exam"]["mcq_ids"]
+    answers = {f"answer-{mcq_id}": ctx.rng.choice("ABCDE") for mcq_id in mcq_ids}
+    return client, answers
+
+
+@scenario("submit_exam", "Score a 50-question mock exam", prepare=_start_exam)
+def submit_exam(ctx: BenchmarkContext, prepared):
+    client, answers = prepared
+    _check(client.post(reverse("submit_exam"), answers))
+
+
+# ----------------------------------------------------------------------
+# Staff imports and exports
+# ----------------------------------------------------------------------
+def _import_file(ctx: BenchmarkContext, count: int = 50) -> SimpleUploadedFile:
+    batch = ctx.next_number()
+    rows = []
+    for index in range(count):
+        options = dict(zip("ABCDE", ctx.rng.sample(DIAGNOSES, 5)))
+        rows.append({
+            "question_number": f"BENCH-I{batch:04d}{index:03d}",
+            "question_text": (
+                f"Import {batch}-{index}: a patient has {ctx.rng.choice(SYMPTOMS)} "
+                f"and {ctx.rng.choice(SYMPTOMS)}. What is the diagnosis?"
+            ),
+            "options": options,
+            "correct_answer": "A",
+            "subspecialty": ctx.rng.choice(ctx.bank.subspecialties),
+            "source_file": BENCH_SOURCE,
+            "exam_type": "Board-level",
+            "exam_year": 2024,
+        })
+    return SimpleUploadedFile("mcqs.json", json.dumps(rows).encode("utf-8"), content_type="application/json")
+
+
+@scenario("import_json", "Import a 50-MCQ JSON file with the near-duplicate guard", prepare=_import_file)
+def import_json(ctx: BenchmarkContext, upload):
+    _check(ctx.admin().post(reverse("import_mcqs_form"), {"json_file": upload}), expected=(302,))
+
+
+@scenario("export_subspecialty", "Export one subspecialty as CSV")
+def export_subspecialty(ctx: BenchmarkContext, prepared=None):
+    _check(ctx.admin().get(reverse("export_subspecialty_mcqs", args=[ctx.subspecialty()])))
+
+
+# ----------------------------------------------------------------------
+# Case conversion
+# ----------------------------------------------------------------------
+def _conversion_target(ctx: BenchmarkContext):
+    from ..mcq_case_converter import CacheManager, MCQCaseConverter
+    from ..models import MCQ
+
+    mcq = MCQ.objects.get(pk=ctx.mcq_id())
+    CacheManager.clear_cache(mcq.pk)
+    return MCQCaseConverter(client=ctx.llm), mcq
+
+
+@scenario("case_conversion", "Convert an MCQ to a case with the offline LLM client", prepare=_conversion_target)
+def case_conversion(ctx: BenchmarkContext, prepared):
+    converter, mcq = prepared
+    converter.convert_mcq_to_case(mcq)
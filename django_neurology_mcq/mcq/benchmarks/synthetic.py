@@ -0,0 +1,191 @@
+"""
+Synthetic question bank and users for benchmarks.
+
+Everything created here is tagged (``source_file`` for MCQs, a username prefix
+for users) so a bank can be reused across runs and purged afterwards without
+touching real data. Rows are written with ``bulk_create`` in batches; model
+``save()`` hooks (signatures, embeddings) are deliberately skipped.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import MCQ, Bookmark, Flashcard, HiddenMCQ, IncorrectAnswer, UserProfile
+from ..views import SUBSPECIALTY_MAPPING
+
+BENCH_SOURCE = "benchmark:synthetic"
+QUESTION_PREFIX = "BENCH-"
+USERNAME_PREFIX = "bench_user_"
+SUPERUSER_NAME = "bench_admin"
+EXAM_TYPES = ("Advanced", "Board-level", "Basic level")
+EXAM_YEARS = tuple(range(2015, 2025))
+OPTION_LETTERS = ("A", "B", "C", "D", "E")
+
+AGES = ("7-year-old", "16-year-old", "28-year-old", "45-year-old", "62-year-old", "78-year-old")
+PATIENTS = ("man", "woman", "boy", "girl")
+ONSETS = ("sudden", "subacute", "progressive", "episodic", "fluctuating")
+SYMPTOMS = (
+    "right arm weakness", "double vision", "gait ataxia", "facial numbness", "word-finding difficulty",
+    "resting tremor", "morning headache", "generalized convulsions", "distal paresthesias",
+    "ptosis worse in the evening", "visual loss in one eye", "excessive daytime sleepiness",
+)
+DURATIONS = ("one hour", "three days", "two weeks", "six months", "several years")
+SIGNS = (
+    "brisk reflexes and an extensor plantar response", "a relative afferent pupillary defect",
+    "fatigable ptosis", "cogwheel rigidity", "absent ankle reflexes", "papilledema",
+    "a left homonymous hemianopia", "dysmetria on finger-nose testing",
+)
+DIAGNOSES = (
+    "Ischemic stroke", "Multiple sclerosis", "Myasthenia gravis", "Parkinson disease",
+    "Guillain-Barre syndrome", "Glioblastoma", "Idiopathic intracranial hypertension",
+    "Focal epilepsy", "Narcolepsy type 1", "Optic neuritis", "Migraine with aura",
+    "Amyotrophic lateral sclerosis", "Cerebellar infarction", "Subdural hematoma",
+)
+
+
+@dataclass
+class BankSpec:
+    mcqs: int = 50000
+    users: int = 20
+    bookmarks_per_user: int = 200
+    flashcards_per_user: int = 200
+    hidden_per_user: int = 50
+    incorrect_per_user: int = 300
+    seed: int = 1234
+    batch_size: int = 2000
+
+
+@dataclass
+class Bank:
+    users: List[User]
+    superuser: User
+    subspecialties: List[str]
+    mcq_ids: List[int]
+    created: Dict[str, int] = field(default_factory=dict)
+
+
+def synthetic_mcqs():
+    return MCQ.objects.filter(source_file=BENCH_SOURCE)
+
+
+def _stem(rng: random.Random) -> str:
+    return (
+        f"A {rng.choice(AGES)} {rng.choice(PATIENTS)} presents with {rng.choice(ONSETS)} "
+        f"{rng.choice(SYMPTOMS)} and {rng.choice(SYMPTOMS)} over {rng.choice(DURATIONS)}. "
+        f"Examination shows {rng.choice(SIGNS)}. What is the most likely diagnosis?"
+    )
+
+
+def _mcq(rng: random.Random, number: int, subspecialty: str) -> MCQ:
+    choices = rng.sample(DIAGNOSES, len(OPTION_LETTERS))
+    options = dict(zip(OPTION_LETTERS, choices))
+    correct = rng.choice(OPTION_LETTERS)
+    explanation_sections = {
+        "option_analysis": " ".join(f"{letter}: {text} is {'correct' if letter == correct else 'less likely'}."
+                                    for letter, text in options.items()),
+        "conceptual_foundation": f"{options[correct]} typically presents with {rng.choice(SYMPTOMS)}.",
+        "clinical_context": f"Look for {rng.choice(SIGNS)}.",
+    }
+    return MCQ(
+        question_number=f"{QUESTION_PREFIX}{number:06d}",
+        question_text=_stem(rng),
+        options=options,
+        correct_answer=correct,
+        correct_answer_text=options[correct],
+        subspecialty=subspecialty,
+        source_file=BENCH_SOURCE,
+        exam_type=rng.choice(EXAM_TYPES),
+        exam_year=rng.choice(EXAM_YEARS),
+        explanation_sections=explanation_sections,
+    )
+
+
+def _bulk(model, rows, batch_size: int) -> int:
+    model.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    return len(rows)
+
+
+def generate_bank(spec: BankSpec, progress: Optional[Callable[[str], None]] = None) -> Bank:
+    """Create ``spec.mcqs`` MCQs across the subspecialties plus users with history."""
+    rng = random.Random(spec.seed)
+    report = progress or (lambda message: None)
+    subspecialties = sorted(set(SUBSPECIALTY_MAPPING.values()))
+    created: Dict[str, int] = {}
+
+    start = synthetic_mcqs().count()
+    for offset in range(start, spec.mcqs, spec.batch_size):
+        rows = [
+            _mcq(rng, number, subspecialties[number % len(subspecialties)])
+            for number in range(offset, min(offset + spec.batch_size, spec.mcqs))
+        ]
+        created["mcqs"] = created.get("mcqs", 0) + _bulk(MCQ, rows, spec.batch_size)
+        report(f"MCQs: {offset + len(rows)}/{spec.mcqs}")
+
+    superuser, _ = User.objects.get_or_create(
+        username=SUPERUSER_NAME, defaults={"is_staff": True, "is_superuser": True}
+    )
+    users, new_users = [], []
+    for index in range(spec.users):
+        user, is_new = User.objects.get_or_create(username=f"{USERNAME_PREFIX}{index:04d}")
+        users.append(user)
+        if is_new:
+            new_users.append(user)
+    UserProfile.objects.bulk_create(
+        [UserProfile(user=user, expiration_date=timezone.now() + timedelta(days=365)) for user in users],
+        ignore_conflicts=True,
+    )
+
+    mcq_ids = list(synthetic_mcqs().values_list("id", flat=True))
+    now = timezone.now()
+
+    def pick(count):
+        # Sampling without replacement keeps each user's (user, mcq) pairs unique
+        return rng.sample(mcq_ids, min(count, len(mcq_ids)))
+
+    with transaction.atomic():
+        # Only new users get history, so reusing a bank does not pile up rows
+        for user in new_users:
+            created["bookmarks"] = created.get("bookmarks", 0) + _bulk(
+                Bookmark, [Bookmark(user=user, mcq_id=i) for i in pick(spec.bookmarks_per_user)], spec.batch_size
+            )
+            created["flashcards"] = created.get("flashcards", 0) + _bulk(
+                Flashcard,
+                [
+                    Flashcard(user=user, mcq_id=i, next_review=now + timedelta(days=rng.randint(-10, 30)))
+                    for i in pick(spec.flashcards_per_user)
+                ],
+                spec.batch_size,
+            )
+            created["hidden"] = created.get("hidden", 0) + _bulk(
+                HiddenMCQ, [HiddenMCQ(user=user, mcq_id=i) for i in pick(spec.hidden_per_user)], spec.batch_size
+            )
+            created["incorrect_answers"] = created.get("incorrect_answers", 0) + _bulk(
+                IncorrectAnswer,
+                [
+                    IncorrectAnswer(user=user, mcq_id=i, selected_answer=rng.choice(OPTION_LETTERS),
+                                    resolved=rng.random() < 0.3)
+                    for i in pick(spec.incorrect_per_user)
+                ],
+                spec.batch_size,
+            )
+    report(f"Users: {len(users)} with bookmarks, flashcards, hidden MCQs and incorrect answers")
+
+    return Bank(users=users, superuser=superuser, subspecialties=subspecialties, mcq_ids=mcq_ids, created=created)
+
+
+def purge_bank() -> Dict[str, int]:
+    """Delete every synthetic MCQ and benchmark user (history rows cascade)."""
+    users = User.objects.filter(username__startswith=USERNAME_PREFIX) | User.objects.filter(username=SUPERUSER_NAME)
+    deleted = {"users": users.count()}
+    users.delete()
+    _, by_model = synthetic_mcqs().delete()
+    deleted["mcqs"] = by_model.get(MCQ._meta.label, 0)
+    return deleted
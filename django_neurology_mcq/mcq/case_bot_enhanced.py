@@ -1,17 +1,17 @@
 import json
 import logging
-import os
-import tempfile
 from typing import Any, Dict
 
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.http import JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 
-from .openai_integration import client
+from .services.async_io import run_blocking
 from .services.case_learning_service import case_conversation_service
+from .services.transcription_service import TranscriptionError, transcription_service
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +32,12 @@ def _json_request(request) -> Dict[str, Any]:
 
 @csrf_exempt
 @login_required
-def neurology_bot_enhanced(request):
-    """Single endpoint that powers the enhanced case-based learning UI."""
+async def neurology_bot_enhanced(request):
+    """Single endpoint that powers the enhanced case-based learning UI.
+
+    Case turns wait on the model, so the conversation service runs on the
+    I/O thread pool and the event loop keeps serving other learners.
+    """
 
     if request.method != "POST":
         return JsonResponse({"error": "Method not allowed"}, status=405)
@@ -47,16 +51,19 @@ def neurology_bot_enhanced(request):
     session_id = payload.get("session_id")
     message = (payload.get("message") or "").strip()
     custom_request = (payload.get("custom_request") or "").strip() or None
+    user = await request.auser()
 
     try:
         if action == "skip_case" and session_id:
-            result = case_conversation_service.skip_case(
-                user=request.user,
+            result = await run_blocking(
+                case_conversation_service.skip_case,
+                user=user,
                 session_id=session_id,
             )
         elif session_id and message:
-            result = case_conversation_service.process_user_message(
-                user=request.user,
+            result = await run_blocking(
+                case_conversation_service.process_user_message,
+                user=user,
                 session_id=session_id,
                 message=message,
             )
@@ -68,8 +75,9 @@ def neurology_bot_enhanced(request):
                 if isinstance(payload.get("mcq_case_data"), dict)
                 else None
             )
-            result = case_conversation_service.start_new_case(
-                user=request.user,
+            result = await run_blocking(
+                case_conversation_service.start_new_case,
+                user=user,
                 specialty=specialty,
                 difficulty=difficulty,
                 custom_request=custom_request,
@@ -92,10 +100,17 @@ def neurology_bot_enhanced(request):
 
 @csrf_exempt
 @login_required
-def transcribe_audio_enhanced(request):
-    """Handle audio transcription for case-based learning."""
+async def transcribe_audio_enhanced(request):
+    """Handle audio transcription for case-based learning.
+
+    Whole recordings are transcribed inline. When the client sends
+    ``stream_id``/``sequence`` the upload is treated as one segment of a longer
+    answer and the running transcript is returned alongside the segment text.
+    ``async=1`` queues the work on Celery and returns a job id to poll.
+    Inline transcriptions run on the I/O thread pool.
+    """
 
-    if client is None:
+    if not transcription_service.is_available():
         return JsonResponse(
             {"error": "OpenAI transcription is not configured."}, status=500
         )
@@ -107,46 +122,60 @@ def transcribe_audio_enhanced(request):
     if not audio_file:
         return JsonResponse({"error": "No audio file provided"}, status=400)
 
-    if audio_file.size > 25 * 1024 * 1024:
+    if audio_file.size > transcription_service.max_upload_bytes:
         return JsonResponse({"error": "Audio file too large (max 25MB)"}, status=400)
 
     mime_type = request.POST.get("mimeType", audio_file.content_type or "audio/webm")
-    extension = ".webm"
-    if "ogg" in mime_type:
-        extension = ".ogg"
-    elif "mp4" in mime_type or "m4a" in mime_type:
-        extension = ".m4a"
-    elif "wav" in mime_type:
-        extension = ".wav"
-    elif "mp3" in mime_type:
-        extension = ".mp3"
-
-    with tempfile.NamedTemporaryFile(mode="wb", suffix=extension, delete=False) as temp:
-        for chunk in audio_file.chunks():
-            temp.write(chunk)
-        temp_path = temp.name
+    stream_id = (request.POST.get("stream_id") or "").strip() or None
+    final = request.POST.get("final", "").lower() in {"1", "true", "yes"}
+    try:
+        sequence = int(request.POST.get("sequence", 0))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "Invalid segment sequence"}, status=400)
 
     try:
-        result_text = ""
-        with open(temp_path, "rb") as handle:
-            transcription = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=handle,
-                response_format="text",
-                language="en",
+        user = await request.auser()
+        if request.POST.get("async", "").lower() in {"1", "true", "yes"}:
+            job_id = await run_blocking(
+                transcription_service.enqueue,
+                user.id,
+                audio_file,
+                mime_type,
+                stream_id=stream_id,
+                sequence=sequence,
+                final=final,
+            )
+            return JsonResponse(
+                {
+                    "job_id": job_id,
+                    "status": "queued",
+                    "status_url": reverse("transcription_job_status", args=[job_id]),
+                },
+                status=202,
+            )
+
+        if stream_id:
+            segment = await run_blocking(
+                transcription_service.transcribe_segment,
+                user.id, stream_id, sequence, audio_file, mime_type, final=final,
             )
-        if isinstance(transcription, str):
-            result_text = transcription.strip()
-        elif transcription:
-            result_text = getattr(transcription, "text", "") or ""
-            result_text = result_text.strip()
-        text = result_text
-        return JsonResponse({"text": text})
+            return JsonResponse(segment.as_dict())
+
+        result = await run_blocking(transcription_service.transcribe_upload, audio_file, mime_type)
+        return JsonResponse({"text": result.text})
+    except TranscriptionError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
     except Exception as exc:  # pragma: no cover
         logger.exception("Transcription failed")
         return JsonResponse({"error": str(exc)}, status=500)
-    finally:
-        try:
-            os.unlink(temp_path)
-        except OSError:
-            pass
+
+
+@login_required
+async def transcription_job_status(request, job_id):
+    """Return the state of a background transcription job owned by the user."""
+
+    user = await request.auser()
+    data = await transcription_service.ajob_status(str(job_id), user.id)
+    if not data:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    return JsonResponse(data)
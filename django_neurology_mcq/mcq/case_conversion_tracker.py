@@ -3,13 +3,19 @@ MCQ-to-Case Conversion Comprehensive Tracking System
 Tracks every step from button click to case display to diagnose session mismatches
 """
 
-import json
 import logging
 import time
 from datetime import datetime
-from django.core.cache import cache
 from django.utils import timezone
 
+from .services.trace_store import (
+    STATUS_ERROR,
+    STATUS_INCOMPLETE,
+    STATUS_MISMATCH,
+    STATUS_SUCCESS,
+    get_trace_store,
+)
+
 logger = logging.getLogger(__name__)
 
 class CaseConversionTracker:
@@ -18,8 +24,16 @@ class CaseConversionTracker:
     Logs every step to help diagnose why wrong cases are displayed
     """
     
-    def __init__(self):
+    def __init__(self, store=None):
         self.tracking_version = "v1.0_comprehensive_tracking"
+        self._store = store
+    
+    @property
+    def store(self):
+        """
+        Trace store; resolved per call unless one was injected, so cache settings changes apply
+        """
+        return self._store or get_trace_store()
     
     def start_conversion_tracking(self, mcq_id, user_id, request_source="button_click"):
         """
@@ -35,24 +49,13 @@ class CaseConversionTracker:
         """
         tracking_id = f"track_{mcq_id}_{user_id}_{int(time.time())}"
         
-        track_data = {
-            'tracking_id': tracking_id,
-            'mcq_id': mcq_id,
-            'user_id': user_id,
-            'request_source': request_source,
-            'start_time': timezone.now().isoformat(),
-            'steps': []
-        }
-        
-        self._log_step(track_data, "TRACKING_START", {
+        self._create_trace(tracking_id, mcq_id, user_id, request_source)
+        self._append_step(tracking_id, "TRACKING_START", {
             'message': f'Started tracking MCQ {mcq_id} conversion for user {user_id}',
             'source': request_source,
             'timestamp': timezone.now().isoformat()
         })
         
-        # Store in cache for 2 hours
-        cache.set(f"conversion_tracking_{tracking_id}", track_data, 7200)
-        
         logger.info(f"🔍 TRACKING START: {tracking_id} - MCQ {mcq_id} for user {user_id}")
         
         return tracking_id
@@ -61,48 +64,34 @@ class CaseConversionTracker:
         """
         Log creation of MCQCaseConversionSession
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
-        self._log_step(track_data, "SESSION_CREATION", {
+        if not self._append_step(tracking_id, "SESSION_CREATION", {
             'conversion_session_id': session_id,
             'session_fingerprint': session_fingerprint,
             'mcq_content_hash': mcq_content_hash,
             'message': f'Created conversion session {session_id}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.info(f"🔍 SESSION_CREATION: {tracking_id} - Session {session_id} created")
     
     def log_background_task_start(self, tracking_id, task_id, mcq_id, user_id):
         """
         Log background task initiation
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
-        self._log_step(track_data, "BACKGROUND_TASK_START", {
+        if not self._append_step(tracking_id, "BACKGROUND_TASK_START", {
             'task_id': task_id,
             'mcq_id': mcq_id,
             'user_id': user_id,
             'message': f'Background task {task_id} started for MCQ {mcq_id}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.info(f"🔍 BACKGROUND_TASK_START: {tracking_id} - Task {task_id}")
     
     def log_case_generation(self, tracking_id, case_data, api_call_details=None):
         """
         Log case generation with API details
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
         # Extract key case data for logging (avoid storing full case to save space)
         case_summary = {
             'source_mcq_id': case_data.get('source_mcq_id'),
@@ -112,79 +101,71 @@ class CaseConversionTracker:
             'has_integrity_metadata': '_integrity_metadata' in case_data
         }
         
-        self._log_step(track_data, "CASE_GENERATION", {
+        if not self._append_step(tracking_id, "CASE_GENERATION", {
             'case_summary': case_summary,
             'api_call_details': api_call_details,
             'message': f'Case generated for MCQ {case_data.get("source_mcq_id")}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.info(f"🔍 CASE_GENERATION: {tracking_id} - Generated for MCQ {case_data.get('source_mcq_id')}")
     
     def log_validation_result(self, tracking_id, validation_result, validator_type="case_validator"):
         """
         Log case validation results
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
-        self._log_step(track_data, "CASE_VALIDATION", {
+        if not self._append_step(tracking_id, "CASE_VALIDATION", {
             'validator_type': validator_type,
             'validation_result': validation_result,
             'message': f'Case validation: {validation_result.get("valid", False)} - {validation_result.get("reason", "No reason")}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.info(f"🔍 CASE_VALIDATION: {tracking_id} - Valid: {validation_result.get('valid')}")
     
+    def log_stage_timings(self, tracking_id, stages, total_ms):
+        """
+        Log per-stage wall-clock timings of a conversion
+        """
+        if not self._append_step(tracking_id, "STAGE_TIMINGS", {
+            'stages': stages,
+            'message': f'Conversion stages took {total_ms}ms',
+            'timestamp': timezone.now().isoformat()
+        }):
+            return
+        logger.info(f"🔍 STAGE_TIMINGS: {tracking_id} - {total_ms}ms")
+    
     def log_database_storage(self, tracking_id, session_id, storage_checksum):
         """
         Log database storage of case data
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
-        self._log_step(track_data, "DATABASE_STORAGE", {
+        if not self._append_step(tracking_id, "DATABASE_STORAGE", {
             'conversion_session_id': session_id,
             'storage_checksum': storage_checksum,
             'message': f'Case data stored in session {session_id}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.info(f"🔍 DATABASE_STORAGE: {tracking_id} - Stored in session {session_id}")
     
     def log_django_session_transfer(self, tracking_id, django_session_key, transfer_checksum, case_data_summary):
         """
         Log transfer to Django session
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
-        self._log_step(track_data, "DJANGO_SESSION_TRANSFER", {
+        if not self._append_step(tracking_id, "DJANGO_SESSION_TRANSFER", {
             'django_session_key': django_session_key,
             'transfer_checksum': transfer_checksum,
             'case_data_summary': case_data_summary,
             'message': f'Case data transferred to Django session: {django_session_key}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.info(f"🔍 DJANGO_SESSION_TRANSFER: {tracking_id} - Key: {django_session_key}")
     
     def log_frontend_response(self, tracking_id, response_data):
         """
         Log response sent to frontend
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
         # Clean response data for logging
         clean_response = {
             'success': response_data.get('success'),
@@ -195,30 +176,21 @@ class CaseConversionTracker:
             'has_case_data': 'case_data' in response_data
         }
         
-        self._log_step(track_data, "FRONTEND_RESPONSE", {
+        if not self._append_step(tracking_id, "FRONTEND_RESPONSE", {
             'response_data': clean_response,
             'message': f'Response sent to frontend: {clean_response["status"]}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.info(f"🔍 FRONTEND_RESPONSE: {tracking_id} - Status: {clean_response['status']}")
     
     def log_case_bot_request(self, tracking_id, session_id, mcq_case_data_received, user_id):
         """
         Log when case bot receives request with MCQ case data
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
+        if not self._trace_exists(tracking_id):
             # Create new tracking if not found (case bot might be called independently)
-            track_data = {
-                'tracking_id': tracking_id,
-                'mcq_id': 'unknown',
-                'user_id': user_id,
-                'request_source': 'case_bot_direct',
-                'start_time': timezone.now().isoformat(),
-                'steps': []
-            }
+            self._create_trace(tracking_id, 'unknown', user_id, 'case_bot_direct')
             
         case_data_summary = None
         if mcq_case_data_received and isinstance(mcq_case_data_received, dict):
@@ -230,7 +202,7 @@ class CaseConversionTracker:
                 'has_patient_demographics': bool(mcq_case_data_received.get('patient_demographics'))
             }
             
-        self._log_step(track_data, "CASE_BOT_REQUEST", {
+        self._append_step(tracking_id, "CASE_BOT_REQUEST", {
             'session_id': session_id,
             'mcq_case_data_received': bool(mcq_case_data_received),
             'case_data_summary': case_data_summary,
@@ -238,64 +210,47 @@ class CaseConversionTracker:
             'message': f'Case bot received request with session_id: {session_id}',
             'timestamp': timezone.now().isoformat()
         })
-        
-        self._save_tracking_data(tracking_id, track_data)
         logger.info(f"🔍 CASE_BOT_REQUEST: {tracking_id} - Session: {session_id}, MCQ data: {bool(mcq_case_data_received)}")
     
     def log_django_session_retrieval(self, tracking_id, session_id, session_found, session_data_summary):
         """
         Log Django session retrieval in case bot
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
-        self._log_step(track_data, "DJANGO_SESSION_RETRIEVAL", {
+        if not self._append_step(tracking_id, "DJANGO_SESSION_RETRIEVAL", {
             'session_id': session_id,
             'session_found': session_found,
             'session_data_summary': session_data_summary,
             'message': f'Django session retrieval: {session_id} - Found: {session_found}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.info(f"🔍 DJANGO_SESSION_RETRIEVAL: {tracking_id} - Found: {session_found}")
     
     def log_case_bot_response(self, tracking_id, bot_response_preview, is_mcq_case, actual_mcq_id):
         """
         Log case bot response generation
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
-        self._log_step(track_data, "CASE_BOT_RESPONSE", {
+        if not self._append_step(tracking_id, "CASE_BOT_RESPONSE", {
             'bot_response_preview': bot_response_preview[:200] + '...' if len(bot_response_preview) > 200 else bot_response_preview,
             'is_mcq_case': is_mcq_case,
             'actual_mcq_id': actual_mcq_id,
             'message': f'Case bot generated response for MCQ case: {is_mcq_case}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.info(f"🔍 CASE_BOT_RESPONSE: {tracking_id} - MCQ case: {is_mcq_case}, MCQ ID: {actual_mcq_id}")
     
     def log_error(self, tracking_id, error_step, error_message, error_details=None):
         """
         Log any errors during conversion
         """
-        track_data = self._get_tracking_data(tracking_id)
-        if not track_data:
-            return
-            
-        self._log_step(track_data, f"ERROR_{error_step}", {
+        if not self._append_step(tracking_id, f"ERROR_{error_step}", {
             'error_message': error_message,
             'error_details': error_details,
             'message': f'Error in {error_step}: {error_message}',
             'timestamp': timezone.now().isoformat()
-        })
-        
-        self._save_tracking_data(tracking_id, track_data)
+        }):
+            return
         logger.error(f"🔍 ERROR_{error_step}: {tracking_id} - {error_message}")
     
     def get_tracking_report(self, tracking_id):
@@ -374,28 +329,97 @@ class CaseConversionTracker:
         
         return issues
     
-    def _log_step(self, track_data, step_type, step_data):
+    def _create_trace(self, tracking_id, mcq_id, user_id, request_source):
+        """
+        Create the trace record and register it in the start/mcq/user/status indexes
+        """
+        try:
+            self.store.create(tracking_id, {
+                'mcq_id': mcq_id,
+                'user_id': user_id,
+                'request_source': request_source,
+                'start_time': timezone.now().isoformat(),
+            }, time.time())
+        except Exception as exc:
+            logger.warning(f"Could not create conversion trace {tracking_id}: {exc}")
+    
+    def _trace_exists(self, tracking_id):
+        try:
+            return self.store.exists(tracking_id)
+        except Exception as exc:
+            logger.warning(f"Could not read conversion trace {tracking_id}: {exc}")
+            return False
+    
+    def _append_step(self, tracking_id, step_type, step_data):
         """
-        Add a step to the tracking data
+        Append a step to the trace without rewriting earlier steps
+        
+        Returns False when the trace does not exist (expired or never started).
+        Status indexes are updated as the deciding steps arrive, so searches by
+        status never have to load and analyse every trace.
         """
         step = {
             'step_type': step_type,
             'timestamp': timezone.now().isoformat(),
             'data': step_data
         }
-        track_data['steps'].append(step)
+        try:
+            if not self.store.append_step(tracking_id, step):
+                return False
+            
+            if step_type.startswith('ERROR_'):
+                self.store.update_status(tracking_id, add=[STATUS_ERROR], remove=[STATUS_INCOMPLETE])
+            elif step_type == 'CASE_BOT_RESPONSE':
+                self.store.update_status(tracking_id, add=[STATUS_SUCCESS], remove=[STATUS_INCOMPLETE])
+            
+            observed_mcq_id = self._observed_mcq_id(step_data)
+            if observed_mcq_id is not None and self.store.observe_mcq(tracking_id, observed_mcq_id) > 1:
+                self.store.update_status(tracking_id, add=[STATUS_MISMATCH])
+        except Exception as exc:
+            logger.warning(f"Could not append {step_type} to conversion trace {tracking_id}: {exc}")
+            return False
+        return True
     
-    def _get_tracking_data(self, tracking_id):
+    @staticmethod
+    def _observed_mcq_id(step_data):
         """
-        Get tracking data from cache
+        MCQ id reported by a step, matching the ids compared in _analyze_potential_issues
         """
-        return cache.get(f"conversion_tracking_{tracking_id}")
+        if 'source_mcq_id' in (step_data.get('case_summary') or {}):
+            return step_data['case_summary']['source_mcq_id']
+        if 'actual_mcq_id' in step_data:
+            return step_data['actual_mcq_id']
+        return None
     
-    def _save_tracking_data(self, tracking_id, track_data):
+    def _get_tracking_data(self, tracking_id):
+        """
+        Get tracking data (metadata plus all steps) from the trace store
         """
-        Save tracking data to cache
+        try:
+            return self.store.get(tracking_id)
+        except Exception as exc:
+            logger.warning(f"Could not read conversion trace {tracking_id}: {exc}")
+            return None
+    
+    def find_tracking_data(self, mcq_id=None, user_id=None, status=None, since=None, limit=100):
         """
-        cache.set(f"conversion_tracking_{tracking_id}", track_data, 7200)
+        Load traces matching the filters, newest first, using the store indexes
+        
+        Args:
+            mcq_id: Only traces for this MCQ
+            user_id: Only traces for this user
+            status: One of incomplete, success, error or mismatch
+            since: Only traces started at or after this datetime
+            limit: Maximum number of traces returned
+        """
+        trace_ids = self.store.query(
+            mcq_id=mcq_id,
+            user_id=user_id,
+            status=status,
+            since=since.timestamp() if since is not None else None,
+            limit=limit,
+        )
+        return self.store.get_many(trace_ids)
 
 
 # Global tracker instance
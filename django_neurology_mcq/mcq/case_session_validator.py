@@ -21,6 +21,8 @@ import os
 # Environment-aware configuration
 MIN_CONFIDENCE_THRESHOLD = 40 if os.environ.get('DYNO') else 70
 VALIDATION_CACHE_TIMEOUT = 1800 if os.environ.get('DYNO') else 3600  # Shorter cache on Heroku
+# Accept the converter's model validation instead of a second API round trip
+REUSE_GENERATION_VALIDATION = os.environ.get('CASE_VALIDATION_REUSE_GENERATION', 'true').lower() == 'true'
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +57,11 @@ class CaseSessionValidator:
                 logger.info(f"Trusting existing validation for MCQ {mcq.id} on Heroku")
                 return existing_validation
         
+        # Cases already checked by the model during generation only need the cheap checks
+        reused = self._reuse_generation_validation(mcq, case_data)
+        if reused:
+            return reused
+        
         # Create validation fingerprint
         validation_key = self._create_validation_key(mcq, case_data)
         
@@ -260,6 +267,36 @@ Output ONLY valid JSON matching the required schema."""
             logger.error(f"API validation error for MCQ {mcq.id}: {e}")
             return self._fallback_validation(mcq, case_data)
     
+    def _reuse_generation_validation(self, mcq, case_data):
+        """
+        Result for cases whose generation-time model validation passed, or None
+        
+        The converter's semantic check already compares the case with its MCQ;
+        when it passed with enough confidence, the local integrity checks decide.
+        """
+        if not REUSE_GENERATION_VALIDATION or not isinstance(case_data, dict):
+            return None
+        
+        generation = case_data.get('professional_validation') or {}
+        score = generation.get('semantic_score') or 0
+        if not generation.get('passed') or generation.get('semantic_method') != 'ai_validation':
+            return None
+        if score < MIN_CONFIDENCE_THRESHOLD:
+            return None
+        
+        local_checks = self._fallback_validation(mcq, case_data)
+        if not local_checks['valid']:
+            return local_checks
+        
+        logger.info(f"Reusing generation-time validation for MCQ {mcq.id} (score {score})")
+        return {
+            'valid': True,
+            'reason': 'Generation-time model validation passed; local integrity checks passed',
+            'score': score,
+            'validation_method': 'generation_reuse',
+            'timestamp': timezone.now().isoformat()
+        }
+    
     def _fallback_validation(self, mcq, case_data):
         """
         Fallback validation when API is unavailable
@@ -33,6 +33,22 @@ class CognitiveErrorType(Enum):
     INCOMPLETE_UNDERSTANDING = "incomplete_understanding"
     WRONG_ASSOCIATION = "wrong_association"
 
+# Keywords that flag each cognitive error when found in the lowercased reasoning,
+# and whether the error is only flagged for incorrect answers
+ANCHORING_KEYWORDS = ('first', 'initially', 'immediately thought', 'obvious', 'clearly')
+CONFIRMATION_KEYWORDS = ('confirms', 'supports my', 'proves', 'obviously')
+AVAILABILITY_KEYWORDS = ('remember', 'seen before', 'common', 'usually', 'most cases')
+CLOSURE_KEYWORDS = ('enough', 'sufficient', 'done', 'complete picture')
+OVERCONFIDENCE_KEYWORDS = ('definitely', 'certainly', 'no doubt', 'absolutely', 'sure')
+
+COGNITIVE_ERROR_RULES = (
+    (CognitiveErrorType.ANCHORING_BIAS, ANCHORING_KEYWORDS, True),
+    (CognitiveErrorType.CONFIRMATION_BIAS, CONFIRMATION_KEYWORDS, False),
+    (CognitiveErrorType.AVAILABILITY_HEURISTIC, AVAILABILITY_KEYWORDS, False),
+    (CognitiveErrorType.PREMATURE_CLOSURE, CLOSURE_KEYWORDS, True),
+    (CognitiveErrorType.OVERCONFIDENCE_BIAS, OVERCONFIDENCE_KEYWORDS, True),
+)
+
 @dataclass
 class CognitiveAnalysis:
     """Results of cognitive analysis"""
@@ -153,30 +169,12 @@ class CognitiveAnalyzer:
         errors = []
         reasoning_lower = reasoning.lower()
         
-        # Anchoring bias - fixation on initial information
-        anchoring_keywords = ['first', 'initially', 'immediately thought', 'obvious', 'clearly']
-        if any(keyword in reasoning_lower for keyword in anchoring_keywords) and not is_correct:
-            errors.append(CognitiveErrorType.ANCHORING_BIAS)
-        
-        # Confirmation bias - seeking confirming evidence
-        confirmation_keywords = ['confirms', 'supports my', 'proves', 'obviously']
-        if any(keyword in reasoning_lower for keyword in confirmation_keywords):
-            errors.append(CognitiveErrorType.CONFIRMATION_BIAS)
-        
-        # Availability heuristic - recent/memorable cases
-        availability_keywords = ['remember', 'seen before', 'common', 'usually', 'most cases']
-        if any(keyword in reasoning_lower for keyword in availability_keywords):
-            errors.append(CognitiveErrorType.AVAILABILITY_HEURISTIC)
-        
-        # Premature closure - stopping search too early
-        closure_keywords = ['enough', 'sufficient', 'done', 'complete picture']
-        if any(keyword in reasoning_lower for keyword in closure_keywords) and not is_correct:
-            errors.append(CognitiveErrorType.PREMATURE_CLOSURE)
-        
-        # Overconfidence - excessive certainty
-        confidence_keywords = ['definitely', 'certainly', 'no doubt', 'absolutely', 'sure']
-        if any(keyword in reasoning_lower for keyword in confidence_keywords) and not is_correct:
-            errors.append(CognitiveErrorType.OVERCONFIDENCE_BIAS)
+        # Anchoring, confirmation, availability, premature closure and overconfidence
+        for error, keywords, incorrect_only in COGNITIVE_ERROR_RULES:
+            if incorrect_only and is_correct:
+                continue
+            if any(keyword in reasoning_lower for keyword in keywords):
+                errors.append(error)
         
         return errors
     
@@ -1845,7 +1843,11 @@ class ReasoningGuideGenerator:
             List of GuideStep objects for progressive disclosure
         """
         analysis = self.cognitive_analyzer.analyze_reasoning(mcq, user_answer, user_reasoning, is_correct)
-        
+        return self.steps_for_analysis(analysis, mcq, user_answer, user_reasoning, is_correct)
+    
+    def steps_for_analysis(self, analysis: CognitiveAnalysis, mcq, user_answer: str, user_reasoning: str,
+                           is_correct: bool) -> List[GuideStep]:
+        """Build the guidance steps for an existing analysis"""
         steps = []
         
         # Step 1: Acknowledge and summarize
@@ -0,0 +1,122 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the primary (``default``). Reads go to the optional
+``replica`` alias (configured from ``DATABASE_REPLICA_URL``) only while a
+view marked with ``@allows_replica_reads`` handles a GET or HEAD request;
+the listing, search, dashboard and high-yield pages are marked. Code outside
+a request can opt in with the ``replica_reads()`` context manager.
+Everything else, including Celery tasks and management commands, reads from
+the primary.
+
+Read-your-writes: once a request writes, the rest of it reads from the
+primary, and ``ReplicaReadMiddleware`` sets a short-lived cookie so the
+same client keeps reading from the primary for
+``DATABASE_REPLICA_STICKY_SECONDS`` after any POST or write, which covers
+the replica's lag.
+
+Only the apps in ``DATABASE_REPLICA_APPS`` are read from the replica, so
+sessions and users are never served stale.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+
+
+@dataclass
+class ReadState:
+    """Routing state of the current request (or ``replica_reads`` block)."""
+
+    replica: bool = False
+    wrote: bool = False
+
+
+_state: ContextVar[Optional[ReadState]] = ContextVar('db_read_state', default=None)
+
+
+def replica_configured() -> bool:
+    return REPLICA in settings.DATABASES
+
+
+def current_state() -> Optional[ReadState]:
+    return _state.get()
+
+
+@contextmanager
+def request_scope():
+    """Fresh routing state for one request; reads use the primary until enabled."""
+    state = ReadState()
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Serve reads in this block from the replica (until something writes)."""
+    state = ReadState(replica=replica_configured())
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def allows_replica_reads(view_func):
+    """Mark a read-only view whose GET requests may be served from the replica."""
+    view_func.replica_reads = True
+    return view_func
+
+
+def _replica_app(model) -> bool:
+    return model._meta.app_label in getattr(settings, 'DATABASE_REPLICA_APPS', ['mcq'])
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.replica and not state.wrote and _replica_app(model):
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica mirrors the primary, so objects from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+# ----------------------------------------------------------------------
+# Pooled connections
+# ----------------------------------------------------------------------
+def release_pooled_connections() -> None:
+    """
+    Return this thread's pooled connections while it waits on something slow.
+
+    Model calls take tens of seconds; holding a pooled connection across one
+    starves other requests and tasks. Connections inside a transaction are
+    kept, and persistent (unpooled) connections are left alone, since closing
+    them would only add reconnects.
+    """
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        if 'pool' not in connection.settings_dict.get('OPTIONS', {}):
+            continue
+        connection.close()
@@ -0,0 +1,95 @@
+"""
+Helpers for MCQ exam metadata.
+
+``MCQ.exam_type`` holds one of the canonical names in
+``MCQ.EXAM_TYPE_CHOICES``; the legacy names ('Promotion', 'Part I',
+'Part II', 'ABPN Board' and their spellings) are folded in by
+:func:`canonical_exam_type` on save and by migration 0029, so filters compare
+a single value instead of OR-ing the aliases at query time. Whatever was
+given before folding is kept in ``MCQ.exam_type_original``, so names with no
+canonical equivalent (stored as 'Other') are not lost. ``MCQ.exam_year`` is an
+integer; :func:`parse_exam_year` turns the strings found in imports into one.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Optional, Tuple
+
+BASIC_LEVEL = "Basic level"
+ADVANCED = "Advanced"
+BOARD_LEVEL = "Board-level"
+OTHER = "Other"
+CANONICAL_EXAM_TYPES = (BASIC_LEVEL, ADVANCED, BOARD_LEVEL, OTHER)
+
+# Lower-cased, whitespace-collapsed spellings -> canonical name
+EXAM_TYPE_ALIASES = {
+    "basic level": BASIC_LEVEL,
+    "basic": BASIC_LEVEL,
+    "promotion": BASIC_LEVEL,
+    "advanced": ADVANCED,
+    "part i": ADVANCED,
+    "part 1": ADVANCED,
+    "parti": ADVANCED,
+    "part one": ADVANCED,
+    "board-level": BOARD_LEVEL,
+    "board level": BOARD_LEVEL,
+    "board": BOARD_LEVEL,
+    "boards": BOARD_LEVEL,
+    "board exam": BOARD_LEVEL,
+    "abpn": BOARD_LEVEL,
+    "abpn board": BOARD_LEVEL,
+    "abpn boards": BOARD_LEVEL,
+    "part ii": BOARD_LEVEL,
+    "part 2": BOARD_LEVEL,
+    "partii": BOARD_LEVEL,
+    "part two": BOARD_LEVEL,
+    "other": OTHER,
+}
+
+_YEAR = re.compile(r"(19|20)\d{2}")
+
+
+def _alias_key(value: Any) -> str:
+    return " ".join(str(value).split()).lower() if value is not None else ""
+
+
+def canonical_exam_type(value: Any) -> Optional[str]:
+    """
+    The canonical exam type for ``value``; None for blank values.
+    Unrecognised names map to 'Other'.
+    """
+    key = _alias_key(value)
+    if not key:
+        return None
+    return EXAM_TYPE_ALIASES.get(key, OTHER)
+
+
+def is_known_exam_type(value: Any) -> bool:
+    """Whether ``value`` is blank or a name with a canonical equivalent."""
+    key = _alias_key(value)
+    return not key or key in EXAM_TYPE_ALIASES
+
+
+def fold_exam_type(value: Any) -> Tuple[Optional[str], Optional[str]]:
+    """
+    ``(canonical, original)`` for ``value``; ``original`` is the value as
+    given, or None when it already was the canonical name (or blank).
+    """
+    canonical = canonical_exam_type(value)
+    if canonical is None or value == canonical:
+        return canonical, None
+    return canonical, str(value).strip()
+
+
+def parse_exam_year(value: Any) -> Optional[int]:
+    """
+    The four-digit year in ``value`` (e.g. 2022 from ``"2022"`` or
+    ``"2022-2023"``), or None when there is none.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if 1900 <= value <= 2099 else None
+    match = _YEAR.search(str(value))
+    return int(match.group(0)) if match else None
@@ -389,7 +389,7 @@ class MCQFullEditForm(forms.ModelForm):
             'correct_answer': forms.Select(attrs={'class': 'form-control'}),
             'subspecialty': forms.TextInput(attrs={'class': 'form-control'}),
             'exam_type': forms.Select(attrs={'class': 'form-control'}),
-            'exam_year': forms.TextInput(attrs={'class': 'form-control'}),
+            'exam_year': forms.NumberInput(attrs={'class': 'form-control', 'min': 1900, 'max': 2099}),
             'explanation': forms.Textarea(attrs={'rows': 6, 'class': 'form-control'}),
             'image_url': forms.URLInput(attrs={'class': 'form-control'})
         }
@@ -7,21 +7,28 @@ Purpose
 
 How it works
 - Scans the MCQ's explanation text and structured explanation_sections for quoted sentences.
+- Adds exact sentences retrieved from the local guideline index
+  (mcq.services.guideline_index, BM25 over the documents in GUIDELINE_SOURCE_DIRS)
+  for the question stem and options, with their source and heading.
 - Returns a plain multi-line string of exact quotes only; no fabrication.
 - If no quotes are discoverable, returns an empty string, prompting the UI to state
   “No direct guideline quotation available.”
 
 Notes
-- This module intentionally avoids condition-specific mappings. If you later wire a
-  full guideline RAG index, plug its outputs here.
+- This module intentionally avoids condition-specific mappings. Each process builds the
+  index on first use (or run `python manage.py build_guideline_index`); until it is
+  built only MCQ quotes are returned.
 """
 
 from __future__ import annotations
 
 import json
+import logging
 from typing import Dict, List, Any
 import re
 
+logger = logging.getLogger(__name__)
+
 
 QUOTE_RE = re.compile(r'“(.{10,300}?)”|"(.{10,300}?)"')
 
@@ -61,7 +68,7 @@ def build_guideline_context(
     explanation_sections: Any = None,
     explanation_text: str | None = None,
 ) -> str:
-    """Return a plain text block of exact quotes discovered in existing MCQ content.
+    """Return a plain text block of exact quotes from existing MCQ content and the guideline index.
 
     The returned string is injected into the model prompt under GuidelineContext.
     If empty, the model is instructed to state no direct quotation is available.
@@ -77,9 +84,31 @@ def build_guideline_context(
     # Keep the context small
     quotes = [q for q in quotes if 10 <= len(q) <= 300][:4]
 
-    if not quotes:
-        return ""
-
     # Render as lines; do not fabricate sources
-    # Each line is "Quote" (source if present in original text)
-    return "\n".join([f'"{q}"' for q in quotes])
+    lines = [f'"{q}"' for q in quotes]
+
+    # 3) Sentences from the local guideline index, with their source
+    lines.extend(guideline_index_quotes(question_text, options_texts, limit=max(0, 4 - len(lines))))
+
+    return "\n".join(lines)
+
+
+def guideline_index_quotes(question_text: str, options_texts: List[str], limit: int | None = None) -> List[str]:
+    """Rendered quotes from the local guideline index for a question and its options.
+
+    At most GUIDELINE_CONTEXT_QUOTES (and ``limit``, when given) are returned.
+    """
+    try:
+        from django.conf import settings
+        from .services.guideline_index import guideline_quotes
+
+        k = getattr(settings, "GUIDELINE_CONTEXT_QUOTES", 4)
+        if limit is not None:
+            k = min(k, limit)
+        if k <= 0:
+            return []
+        query = " ".join([question_text or ""] + [str(text) for text in options_texts or []])
+        return [quote.render() for quote in guideline_quotes(query, k=k)]
+    except Exception as exc:
+        logger.warning("Guideline index lookup failed: %s", exc)
+        return []
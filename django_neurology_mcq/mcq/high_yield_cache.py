@@ -0,0 +1,229 @@
+"""
+Caching and content hygiene for High-yield Reviews.
+
+High-yield pages are read constantly and only change when an admin edits a
+specialty, topic or section image, so the rendered HTML is cached and keyed by
+versions that move on every save:
+
+* Each specialty has a *generation* stamp in the cache. Saving the specialty,
+  any of its topics or any section image bumps it, which retires the cached
+  sidebar navigation and overview fragment.
+* Each topic fragment is keyed by the topic's ``updated_at``. Image edits touch
+  the parent topic so its fragment key changes as well.
+
+Rich text is sanitized and lightly minified once at save time rather than on
+every render.
+"""
+
+import logging
+import re
+import time
+
+import nh3
+from django.core.cache import cache
+from django.db.models import Count, Prefetch
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = 60 * 60 * 24
+GENERATION_TIMEOUT = None  # keep generation stamps until they are bumped
+
+# (field name, heading) in display order; mirrors TopicSectionImage.SECTION_CHOICES
+TOPIC_SECTIONS = [
+    ('introduction_classification', 'Introduction and Classification'),
+    ('pathology_pathophysiology', 'Pathology and Pathophysiology'),
+    ('epidemiology', 'Epidemiology'),
+    ('clinical_presentation', 'Clinical Presentation and Physical Examination'),
+    ('paraclinical_testing', 'Para Clinical Testing'),
+    ('diagnostic_criteria', 'Diagnostic Criteria'),
+    ('differential_diagnosis', 'Differential Diagnosis'),
+    ('management_guidelines', 'Management Guidelines'),
+    ('prognosis', 'Prognosis'),
+    ('common_pitfalls', 'Common Pitfalls'),
+    ('latest_guidelines', 'Latest Guidelines and Evidence'),
+]
+
+SPECIALTY_RICH_FIELDS = ['introduction', 'historical_overview', 'important_concepts', 'related_anatomy']
+
+# What the CKEditor toolbar produces; everything else is dropped
+RICH_TEXT_TAGS = {
+    'p', 'br', 'hr', 'div', 'span', 'blockquote', 'pre', 'code',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'strong', 'b', 'em', 'i', 'u', 's', 'strike', 'sub', 'sup', 'small', 'mark', 'abbr',
+    'ul', 'ol', 'li', 'dl', 'dt', 'dd',
+    'table', 'caption', 'colgroup', 'col', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td',
+    'a', 'img', 'figure', 'figcaption',
+}
+RICH_TEXT_ATTRIBUTES = {
+    '*': {'class', 'style', 'title', 'dir', 'lang'},
+    'a': {'href', 'target', 'name'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'ol': {'start', 'type'},
+    'table': {'border', 'cellpadding', 'cellspacing', 'summary'},
+    'col': {'span', 'width'},
+    'th': {'colspan', 'rowspan', 'scope'},
+    'td': {'colspan', 'rowspan'},
+}
+RICH_TEXT_STYLES = {
+    'color', 'background-color', 'text-align', 'text-decoration', 'font-weight', 'font-style',
+    'font-size', 'vertical-align', 'width', 'height', 'margin-left', 'padding-left',
+    'border', 'border-collapse', 'float', 'list-style-type',
+}
+RICH_TEXT_URL_SCHEMES = {'http', 'https', 'mailto'}
+_BLOCK_TAG = r'(?:p|div|ul|ol|li|table|thead|tbody|tfoot|tr|td|th|h[1-6]|blockquote|figure|figcaption|br|hr)'
+_BLOCK_GAP_RE = re.compile(r'(</?' + _BLOCK_TAG + r'\b[^>]*>)\s+(?=<)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'[ \t\r\f\v]*\n[\s]*|[ \t\r\f\v]{2,}')
+_EMPTY_PARAGRAPH_RE = re.compile(r'<p>(?:\s|&nbsp;|&#160;)*</p>', re.IGNORECASE)
+
+
+def clean_rich_text(html):
+    """Sanitize editor HTML and collapse redundant whitespace.
+
+    The HTML is parsed and rebuilt by ``nh3`` keeping only the allowlisted
+    tags, attributes, inline styles and URL schemes, so scripts, event
+    handlers, ``javascript:`` URLs (however encoded), SVG and HTML comments
+    (including Word conditional comments) are dropped. Empty paragraphs are
+    removed, and whitespace is only collapsed outside ``<pre>`` content, so
+    preformatted blocks are left untouched.
+    """
+    if not html:
+        return html
+
+    cleaned = nh3.clean(
+        html,
+        tags=RICH_TEXT_TAGS,
+        attributes=RICH_TEXT_ATTRIBUTES,
+        filter_style_properties=RICH_TEXT_STYLES,
+        url_schemes=RICH_TEXT_URL_SCHEMES,
+    )
+    cleaned = _EMPTY_PARAGRAPH_RE.sub('', cleaned)
+
+    if '<pre' not in cleaned.lower():
+        cleaned = _WHITESPACE_RE.sub(
+            lambda match: '\n' if '\n' in match.group(0) else ' ',
+            cleaned,
+        )
+        cleaned = _BLOCK_GAP_RE.sub(r'\1', cleaned)
+
+    return cleaned.strip()
+
+
+# ---------------------------------------------------------------------------
+# Version stamps
+# ---------------------------------------------------------------------------
+
+def _generation_key(specialty_id):
+    return f'hy:gen:{specialty_id}'
+
+
+def specialty_generation(specialty_id):
+    """Return the current cache generation for a specialty.
+
+    A missing stamp (eviction, cold cache) is replaced with a fresh one, which
+    can never collide with keys written under an earlier stamp.
+    """
+    key = _generation_key(specialty_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = time.time_ns()
+        cache.add(key, generation, timeout=GENERATION_TIMEOUT)
+        generation = cache.get(key, generation)
+    return generation
+
+
+def bump_specialty_generation(specialty_id):
+    if not specialty_id:
+        return
+    try:
+        cache.set(_generation_key(specialty_id), time.time_ns(), timeout=GENERATION_TIMEOUT)
+    except Exception as exc:
+        # An admin save must not fail because the cache is unreachable
+        logger.warning("Could not bump high-yield cache generation for %s: %s", specialty_id, exc)
+
+
+def touch_topic(topic_id):
+    """Move a topic's version forward without re-running its ``save()``."""
+    from .high_yield_models import HighYieldTopic
+
+    HighYieldTopic.objects.filter(pk=topic_id).update(updated_at=timezone.now())
+    specialty_id = (
+        HighYieldTopic.objects.filter(pk=topic_id).values_list('specialty_id', flat=True).first()
+    )
+    bump_specialty_generation(specialty_id)
+
+
+def _version(value):
+    return int(value.timestamp() * 1_000_000) if value else 0
+
+
+# ---------------------------------------------------------------------------
+# Cached fragments
+# ---------------------------------------------------------------------------
+
+def get_specialty_home_list():
+    """Specialty cards for the landing page with topic counts in one query."""
+    from .high_yield_models import HighYieldSpecialty
+
+    return (
+        HighYieldSpecialty.objects.annotate(topic_total=Count('topics'))
+        .only('id', 'name', 'slug', 'introduction')
+        .order_by('name')
+    )
+
+
+def get_topic_nav(specialty):
+    """Return the ordered sidebar entries (id, title, slug, version) for a specialty."""
+    from .high_yield_models import HighYieldTopic
+
+    key = f'hy:nav:{specialty.pk}:{specialty_generation(specialty.pk)}'
+    nav = cache.get(key)
+    if nav is None:
+        nav = [
+            {'id': row['id'], 'title': row['title'], 'slug': row['slug'], 'version': _version(row['updated_at'])}
+            for row in HighYieldTopic.objects.filter(specialty_id=specialty.pk)
+            .order_by('order', 'title')
+            .values('id', 'title', 'slug', 'updated_at')
+        ]
+        cache.set(key, nav, timeout=CACHE_TIMEOUT)
+    return nav
+
+
+def render_specialty_overview(specialty):
+    """Rendered overview sections for a specialty page without a selected topic."""
+    from .high_yield_models import HighYieldSpecialty
+
+    key = f'hy:overview:{specialty.pk}:{specialty_generation(specialty.pk)}'
+    html = cache.get(key)
+    if html is None:
+        full = HighYieldSpecialty.objects.get(pk=specialty.pk)
+        html = render_to_string('mcq/high_yield/_specialty_overview.html', {'specialty': full})
+        cache.set(key, html, timeout=CACHE_TIMEOUT)
+    return html
+
+
+def render_topic_sections(topic_entry):
+    """Rendered body for a topic; ``topic_entry`` is an item from :func:`get_topic_nav`."""
+    from .high_yield_models import HighYieldTopic, TopicSectionImage
+
+    key = f'hy:topic:{topic_entry["id"]}:{topic_entry["version"]}'
+    html = cache.get(key)
+    if html is None:
+        topic = (
+            HighYieldTopic.objects.prefetch_related(
+                Prefetch('section_images', queryset=TopicSectionImage.objects.order_by('section', 'order'))
+            ).get(pk=topic_entry['id'])
+        )
+        images_by_section = {}
+        for image in topic.section_images.all():
+            images_by_section.setdefault(image.section, []).append(image)
+
+        sections = [
+            {'heading': heading, 'body': getattr(topic, field), 'images': images_by_section.get(field, [])}
+            for field, heading in TOPIC_SECTIONS
+            if getattr(topic, field)
+        ]
+        html = render_to_string('mcq/high_yield/_topic_sections.html', {'topic': topic, 'sections': sections})
+        cache.set(key, html, timeout=CACHE_TIMEOUT)
+    return html
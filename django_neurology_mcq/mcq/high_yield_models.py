@@ -82,8 +82,14 @@ class HighYieldSpecialty(models.Model):
         # Convert Google Drive URLs to direct links
         self.introduction_image = convert_google_drive_url(self.introduction_image)
         self.anatomy_image = convert_google_drive_url(self.anatomy_image)
-        
+
+        # Sanitize/minify editor HTML once here instead of on every render
+        from .high_yield_cache import SPECIALTY_RICH_FIELDS, clean_rich_text, bump_specialty_generation
+        for field in SPECIALTY_RICH_FIELDS:
+            setattr(self, field, clean_rich_text(getattr(self, field)))
+
         super().save(*args, **kwargs)
+        bump_specialty_generation(self.pk)
     
     def __str__(self):
         return self.name
@@ -177,7 +183,21 @@ class HighYieldTopic(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+
+        from .high_yield_cache import TOPIC_SECTIONS, clean_rich_text, bump_specialty_generation
+        for field, _heading in TOPIC_SECTIONS:
+            setattr(self, field, clean_rich_text(getattr(self, field)))
+
         super().save(*args, **kwargs)
+        bump_specialty_generation(self.specialty_id)
+
+    def delete(self, *args, **kwargs):
+        from .high_yield_cache import bump_specialty_generation
+
+        specialty_id = self.specialty_id
+        result = super().delete(*args, **kwargs)
+        bump_specialty_generation(specialty_id)
+        return result
     
     def __str__(self):
         return f"{self.specialty.name} - {self.title}"
@@ -235,6 +255,18 @@ class TopicSectionImage(models.Model):
         # Convert Google Drive URL to direct link
         self.image_url = convert_google_drive_url(self.image_url)
         super().save(*args, **kwargs)
+
+        # Images are part of the topic's rendered page; move its version on
+        from .high_yield_cache import touch_topic
+        touch_topic(self.topic_id)
+
+    def delete(self, *args, **kwargs):
+        from .high_yield_cache import touch_topic
+
+        topic_id = self.topic_id
+        result = super().delete(*args, **kwargs)
+        touch_topic(topic_id)
+        return result
     
     def __str__(self):
         return f"{self.topic.title} - {self.get_section_display()} - Image {self.order}"
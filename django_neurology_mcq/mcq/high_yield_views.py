@@ -1,21 +1,29 @@
 """
 Views for High-yield Reviews functionality.
+
+Page bodies are served from version-keyed fragments in
+:mod:`mcq.high_yield_cache`; a warm request costs one specialty lookup plus
+two cache reads.
 """
 
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Prefetch
-from .high_yield_models import (
-    HighYieldSpecialty,
-    HighYieldTopic,
-    TopicSectionImage
+from django.http import Http404
+from .db_router import allows_replica_reads
+from .high_yield_models import HighYieldSpecialty
+from .high_yield_cache import (
+    get_specialty_home_list,
+    get_topic_nav,
+    render_specialty_overview,
+    render_topic_sections,
 )
 
 
 @login_required
+@allows_replica_reads
 def high_yield_home(request):
     """Display all specialties for high-yield reviews"""
-    specialties = HighYieldSpecialty.objects.all().order_by('name')
+    specialties = get_specialty_home_list()
     
     context = {
         'specialties': specialties,
@@ -24,92 +32,57 @@ def high_yield_home(request):
     return render(request, 'mcq/high_yield/home.html', context)
 
 
+def _specialty_page(request, specialty, topics, selected_topic):
+    context = {
+        'specialty': specialty,
+        'topics': topics,
+        'selected_topic': selected_topic,
+        'topic_html': render_topic_sections(selected_topic) if selected_topic else '',
+        'overview_html': '' if selected_topic else render_specialty_overview(specialty),
+        'page_title': (
+            f'{selected_topic["title"]} - {specialty.name}'
+            if selected_topic else f'{specialty.name} - High-Yield Review'
+        ),
+    }
+    return render(request, 'mcq/high_yield/specialty.html', context)
+
+
+def _get_specialty(specialty_slug):
+    # Only the header fields are needed; section bodies come from the cache
+    return get_object_or_404(
+        HighYieldSpecialty.objects.only('id', 'name', 'slug', 'updated_at'),
+        slug=specialty_slug,
+    )
+
+
+def _find_topic(topics, topic_slug):
+    for topic in topics:
+        if topic['slug'] == topic_slug:
+            return topic
+    raise Http404("High-yield topic not found")
+
+
 @login_required
+@allows_replica_reads
 def high_yield_specialty(request, specialty_slug):
     """Display a specialty with its topics"""
-    specialty = get_object_or_404(HighYieldSpecialty, slug=specialty_slug)
-    
-    # Get all topics for this specialty, ordered by their display order
-    topics = specialty.topics.all().order_by('order', 'title')
-    
+    specialty = _get_specialty(specialty_slug)
+    topics = get_topic_nav(specialty)
+
     # Get the selected topic (first one by default)
     selected_topic_slug = request.GET.get('topic')
-    
     if selected_topic_slug:
-        selected_topic = get_object_or_404(
-            HighYieldTopic, 
-            specialty=specialty, 
-            slug=selected_topic_slug
-        )
-    else:
-        # Default to the first topic if available
-        selected_topic = topics.first()
-    
-    # If we have a selected topic, prefetch its images organized by section
-    if selected_topic:
-        section_images = {}
-        for image in selected_topic.section_images.all().order_by('section', 'order'):
-            section = image.section
-            if section not in section_images:
-                section_images[section] = []
-            section_images[section].append(image)
+        selected_topic = _find_topic(topics, selected_topic_slug)
     else:
-        section_images = {}
-    
-    context = {
-        'specialty': specialty,
-        'topics': topics,
-        'selected_topic': selected_topic,
-        'section_images': section_images,
-        'page_title': f'{specialty.name} - High-Yield Review'
-    }
-    
-    return render(request, 'mcq/high_yield/specialty.html', context)
+        selected_topic = topics[0] if topics else None
+
+    return _specialty_page(request, specialty, topics, selected_topic)
 
 
 @login_required
+@allows_replica_reads
 def high_yield_topic(request, specialty_slug, topic_slug):
     """Display a specific topic with all its content"""
-    specialty = get_object_or_404(HighYieldSpecialty, slug=specialty_slug)
-    topic = get_object_or_404(
-        HighYieldTopic, 
-        specialty=specialty, 
-        slug=topic_slug
-    )
-    
-    # Get all topics for the sidebar
-    topics = specialty.topics.all().order_by('order', 'title')
-    
-    # Get images organized by section
-    section_images = {}
-    for image in topic.section_images.all().order_by('section', 'order'):
-        section = image.section
-        if section not in section_images:
-            section_images[section] = []
-        section_images[section].append(image)
-    
-    # Define sections with their display names
-    sections = [
-        ('introduction_classification', 'Introduction and Classification'),
-        ('pathology_pathophysiology', 'Pathology and Pathophysiology'),
-        ('epidemiology', 'Epidemiology'),
-        ('clinical_presentation', 'Clinical Presentation'),
-        ('paraclinical_testing', 'Para Clinical Testing'),
-        ('diagnostic_criteria', 'Diagnostic Criteria'),
-        ('differential_diagnosis', 'Differential Diagnosis'),
-        ('management_guidelines', 'Management Guidelines'),
-        ('prognosis', 'Prognosis'),
-        ('common_pitfalls', 'Common Pitfalls'),
-        ('latest_guidelines', 'Latest Guidelines and Evidence'),
-    ]
-    
-    context = {
-        'specialty': specialty,
-        'topic': topic,
-        'topics': topics,
-        'section_images': section_images,
-        'sections': sections,
-        'page_title': f'{topic.title} - {specialty.name}'
-    }
-    
-    return render(request, 'mcq/high_yield/topic.html', context)
\ No newline at end of file
+    specialty = _get_specialty(specialty_slug)
+    topics = get_topic_nav(specialty)
+    return _specialty_page(request, specialty, topics, _find_topic(topics, topic_slug))
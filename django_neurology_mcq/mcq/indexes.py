@@ -0,0 +1,59 @@
+"""
+Trigram indexes for ``icontains`` searches.
+
+Admin and site search use ``icontains`` (``UPPER(col) LIKE UPPER('%term%')``
+on PostgreSQL). A pg_trgm GIN index on ``UPPER(col)`` answers those lookups
+without scanning the table, and unlike a btree it accepts long text.
+
+The indexes are declared in ``Meta.indexes`` with :func:`trigram_index` and
+added with :class:`AddTrigramIndexConcurrently` so building them does not
+lock writes; :class:`TrigramExtension` installs pg_trgm first. All of them do
+nothing on other databases: local SQLite keeps the sequential scan.
+"""
+
+from django.contrib.postgres import operations as postgres_operations
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db.models.functions import Upper
+
+
+def _is_postgresql(schema_editor) -> bool:
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+class TrigramIndex(GinIndex):
+    """A GIN index that is only created on PostgreSQL."""
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if not _is_postgresql(schema_editor):
+            return ''
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if not _is_postgresql(schema_editor):
+            return ''
+        return super().remove_sql(model, schema_editor, **kwargs)
+
+
+def trigram_index(field_name: str, name: str) -> TrigramIndex:
+    """Trigram index on ``UPPER(field_name)``, matching ``icontains`` lookups."""
+    return TrigramIndex(OpClass(Upper(field_name), name='gin_trgm_ops'), name=name)
+
+
+class AddTrigramIndexConcurrently(AddIndexConcurrently):
+    """``CREATE INDEX CONCURRENTLY`` on PostgreSQL; state-only elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if _is_postgresql(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if _is_postgresql(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class TrigramExtension(postgres_operations.TrigramExtension):
+    """``CREATE EXTENSION IF NOT EXISTS pg_trgm``; left installed when migrating backwards."""
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        pass
@@ -0,0 +1,89 @@
+"""
+Management command to benchmark the hot paths against a synthetic bank.
+
+Examples:
+    python manage.py benchmark --force --output bench.json
+    python manage.py benchmark --force --scenarios view_mcq,search --mcqs 5000 --baseline bench.json
+"""
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mcq.benchmarks.runner import compare, run_benchmarks
+from mcq.benchmarks.scenarios import BenchmarkContext, get_scenarios
+from mcq.benchmarks.synthetic import BankSpec, generate_bank, purge_bank
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic MCQ bank, run timed scenarios and print latency/query statistics as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default='', help='Comma-separated scenario names (default: all)')
+        parser.add_argument('--list', action='store_true', help='List scenarios and exit')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed iterations per scenario (default: 20)')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed iterations per scenario (default: 2)')
+        parser.add_argument('--mcqs', type=int, default=50000, help='Synthetic MCQs (default: 50000)')
+        parser.add_argument('--users', type=int, default=20, help='Synthetic users with history (default: 20)')
+        parser.add_argument('--seed', type=int, default=1234, help='Random seed for data and scenarios')
+        parser.add_argument(
+            '--llm-latency-ms',
+            type=float,
+            default=0.0,
+            help='Delay added to every fake LLM call, to model provider latency',
+        )
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+        parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+        parser.add_argument('--keep-data', action='store_true', help='Keep the synthetic bank for the next run')
+        parser.add_argument('--purge', action='store_true', help='Only delete synthetic data left by earlier runs')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Required when DEBUG is off: the command writes synthetic rows to the configured database',
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for scenario in get_scenarios():
+                self.stdout.write(f"{scenario.name:22} {scenario.description}")
+            return
+
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('DEBUG is off; pass --force to write synthetic data to this database')
+
+        if options['purge']:
+            self.stderr.write(f"Deleted: {purge_bank()}")
+            return
+
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        try:
+            scenarios = get_scenarios(names)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+
+        # Progress goes to stderr so stdout carries only the report
+        progress = self.stderr.write
+        spec = BankSpec(mcqs=options['mcqs'], users=options['users'], seed=options['seed'])
+        bank = generate_bank(spec, progress=progress)
+        try:
+            ctx = BenchmarkContext(bank, seed=options['seed'], llm_latency_ms=options['llm_latency_ms'])
+            report = run_benchmarks(scenarios, ctx, options['iterations'], options['warmup'], progress=progress)
+        finally:
+            if not options['keep_data']:
+                progress(f"Deleted synthetic data: {purge_bank()}")
+
+        if baseline is not None:
+            report['comparison'] = compare(baseline, report)
+
+        payload = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(payload + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(payload)
@@ -0,0 +1,65 @@
+"""
+Management command to compute MCQ embeddings and write new builds of the local vector indexes.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from mcq.services.embeddings import (
+    KIND_QUESTION,
+    KIND_SECTION,
+    _index_path,
+    build_index,
+    get_embedder,
+    index_is_current,
+    rebuild_embeddings,
+)
+
+
+class Command(BaseCommand):
+    help = 'Compute MCQ and explanation-section embeddings and write the memory-mapped search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Embed only MCQs without a vector from the current embedder',
+        )
+        parser.add_argument(
+            '--index-only',
+            action='store_true',
+            help='Skip embedding; just rebuild the index files from stored vectors',
+        )
+        parser.add_argument(
+            '--if-changed',
+            action='store_true',
+            help='Only rebuild indexes whose stored vectors changed since their current build',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='MCQs embedded per batch (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        embedder = get_embedder()
+        self.stdout.write(f"Embedder: {embedder.key}")
+
+        if not options['index_only']:
+            started = time.monotonic()
+            written = rebuild_embeddings(batch_size=options['batch_size'], only_missing=options['missing'])
+            self.stdout.write(f"Embedded {written} texts in {time.monotonic() - started:.1f}s")
+
+        for kind in (KIND_QUESTION, KIND_SECTION):
+            if options['if_changed'] and index_is_current(kind, embedder):
+                self.stdout.write(f"{kind} index: unchanged")
+                continue
+            started = time.monotonic()
+            index = build_index(kind, embedder)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{kind} index: {len(index)} vectors -> {_index_path(kind, embedder) / index.build_id} "
+                    f"({time.monotonic() - started:.2f}s)"
+                )
+            )
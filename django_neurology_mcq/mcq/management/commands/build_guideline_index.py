@@ -0,0 +1,63 @@
+"""
+Management command to build the local BM25 guideline index used to ground AI prompts.
+
+Examples:
+    python manage.py build_guideline_index
+    python manage.py build_guideline_index /srv/guidelines/aan /srv/guidelines/ean --query "fingolimod breakthrough"
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mcq.services.guideline_index import (
+    DEFAULT_B,
+    DEFAULT_CHUNK_WORDS,
+    DEFAULT_K1,
+    GuidelineIndexError,
+    build_index,
+    index_dir,
+    source_dirs,
+)
+
+
+class Command(BaseCommand):
+    help = 'Chunk guideline documents (.txt, .md, .pdf, curated quote .json) and write the memory-mapped BM25 index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Files or directories to index (default: GUIDELINE_SOURCE_DIRS)')
+        parser.add_argument(
+            '--chunk-words',
+            type=int,
+            default=DEFAULT_CHUNK_WORDS,
+            help=f'Approximate words per chunk (default: {DEFAULT_CHUNK_WORDS})',
+        )
+        parser.add_argument('--k1', type=float, default=DEFAULT_K1, help=f'BM25 k1 (default: {DEFAULT_K1})')
+        parser.add_argument('--b', type=float, default=DEFAULT_B, help=f'BM25 b (default: {DEFAULT_B})')
+        parser.add_argument('--query', help='Run this query against the new index and print the top quotes')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or source_dirs()
+        self.stdout.write(f"Indexing: {', '.join(str(path) for path in paths)}")
+        started = time.monotonic()
+        try:
+            index = build_index(
+                paths,
+                max_words=options['chunk_words'],
+                k1=options['k1'],
+                b=options['b'],
+                progress=self.stdout.write,
+            )
+        except GuidelineIndexError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index)} chunks, {len(index.lexicon)} terms from {len(index.sources)} sources "
+            f"in {time.monotonic() - started:.1f}s -> {index_dir() / index.build_id}"
+        ))
+
+        if options['query']:
+            started = time.perf_counter()
+            quotes = index.quotes(options['query'], k=5)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stdout.write(f"\n{len(quotes)} quotes in {elapsed_ms:.2f} ms:")
+            for quote in quotes:
+                self.stdout.write(f"  [{quote.score}] {quote.render()}")
@@ -0,0 +1,99 @@
+"""
+Management command to print the database plans of the main MCQ filter queries.
+
+Use it to check that the composite indexes on MCQ (subspecialty, exam_type,
+exam_year) are picked up after data or schema changes.
+
+Examples:
+    python manage.py explain_mcq_queries
+    python manage.py explain_mcq_queries --subspecialty Epilepsy --exam-type "Part I" --analyze
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from mcq.models import MCQ
+from mcq.services import MCQService
+from mcq.views import apply_exam_filters, get_filtered_mcqs
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN plans for the subspecialty, mock exam and search MCQ queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subspecialty', help='Subspecialty to filter on (default: the largest one)')
+        parser.add_argument('--exam-type', default='Advanced', help='Exam type; legacy names are accepted (default: Advanced)')
+        parser.add_argument('--start-year', default='2018', help='Start of the year range (default: 2018)')
+        parser.add_argument('--end-year', default='2024', help='End of the year range (default: 2024)')
+        parser.add_argument('--username', help="Exclude this user's hidden MCQs, as the views do")
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run the queries (EXPLAIN ANALYZE, BUFFERS) on PostgreSQL; ignored elsewhere',
+        )
+
+    def handle(self, *args, **options):
+        subspecialty = options['subspecialty'] or self._largest_subspecialty()
+        if not subspecialty:
+            raise CommandError('No MCQs found; pass --subspecialty or load data first')
+
+        hidden = []
+        if options['username']:
+            try:
+                hidden = MCQService.get_hidden_mcq_ids(User.objects.get(username=options['username']))
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user: {options['username']}")
+
+        exam_type, start, end = options['exam_type'], options['start_year'], options['end_year']
+        subspecialties = list(
+            MCQ.objects.values_list('subspecialty', flat=True).distinct().order_by('subspecialty')[:3]
+        )
+        queries = [
+            (
+                f'Subspecialty page: {subspecialty}, {exam_type}, {start}-{end}',
+                get_filtered_mcqs(subspecialty, exam_type, start, end, hidden),
+            ),
+            (
+                f'Subspecialty page, all types: {subspecialty}, {start}-{end}',
+                get_filtered_mcqs(subspecialty, 'All Types', start, end, hidden),
+            ),
+            (
+                f'Subspecialty total: {subspecialty}',
+                MCQ.objects.filter(subspecialty=subspecialty).exclude(id__in=hidden).values('id'),
+            ),
+            (
+                f'Mock exam: {", ".join(subspecialties)}, {exam_type}, {start}-{end}',
+                apply_exam_filters(
+                    MCQ.objects.filter(subspecialty__in=subspecialties).exclude(id__in=hidden), exam_type, start, end
+                ),
+            ),
+            (
+                f'Mock exam, all subspecialties: {exam_type}, {start}-{end}',
+                apply_exam_filters(MCQ.objects.exclude(id__in=hidden), exam_type, start, end),
+            ),
+            (
+                'Search candidates: newest 1000',
+                MCQ.objects.exclude(id__in=hidden).order_by('-id')[:1000],
+            ),
+        ]
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        self.stdout.write(f"Database: {connection.vendor}; {len(hidden)} hidden MCQs excluded\n")
+        for title, queryset in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
+
+    def _largest_subspecialty(self):
+        row = (
+            MCQ.objects.values('subspecialty')
+            .annotate(total=Count('id'))
+            .order_by('-total')
+            .first()
+        )
+        return row['subspecialty'] if row else None
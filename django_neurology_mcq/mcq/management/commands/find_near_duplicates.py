@@ -0,0 +1,109 @@
+"""
+Management command to cluster near-duplicate MCQs using MinHash/LSH signatures.
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from mcq.services.near_duplicates import default_threshold, find_duplicate_clusters, rebuild_signatures
+
+
+class Command(BaseCommand):
+    help = 'Find clusters of near-duplicate MCQs (reworded questions across exam types/years)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=None,
+            help='Minimum estimated Jaccard similarity (default: NEAR_DUPLICATE_THRESHOLD or 0.7)',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every signature before clustering',
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Compute signatures only for MCQs that do not have one yet',
+        )
+        parser.add_argument(
+            '--cross-exam',
+            action='store_true',
+            help='Only report clusters that span more than one exam type or year',
+        )
+        parser.add_argument(
+            '--semantic',
+            action='store_true',
+            help='Cluster by embedding cosine similarity instead of MinHash (threshold default 0.9)',
+        )
+        parser.add_argument(
+            '--subspecialty',
+            help='Restrict the scan to one subspecialty',
+        )
+        parser.add_argument(
+            '--json',
+            dest='json_output',
+            help='Write the clusters to this JSON file',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Number of clusters to print (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        if options['semantic']:
+            threshold = options['threshold'] if options['threshold'] is not None else 0.9
+        else:
+            threshold = options['threshold'] if options['threshold'] is not None else default_threshold()
+
+        if (options['rebuild'] or options['missing']) and not options['semantic']:
+            started = time.monotonic()
+            written = rebuild_signatures(only_missing=options['missing'] and not options['rebuild'])
+            self.stdout.write(f"Computed {written} signatures in {time.monotonic() - started:.1f}s")
+
+        started = time.monotonic()
+        if options['semantic']:
+            from mcq.services.embeddings import KIND_QUESTION, build_index, index_is_current, semantic_duplicate_clusters
+
+            if not index_is_current(KIND_QUESTION):
+                build_index(KIND_QUESTION)
+            clusters = semantic_duplicate_clusters(threshold=threshold, cross_exam_only=options['cross_exam'])
+        else:
+            clusters = find_duplicate_clusters(
+                threshold=threshold,
+                cross_exam_only=options['cross_exam'],
+                subspecialty=options.get('subspecialty'),
+            )
+        elapsed = time.monotonic() - started
+        duplicates = sum(len(cluster.members) - 1 for cluster in clusters)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Found {len(clusters)} clusters ({duplicates} redundant MCQs) at threshold {threshold:.2f} "
+                f"in {elapsed:.2f}s"
+            )
+        )
+
+        for number, cluster in enumerate(clusters[:options['limit']], start=1):
+            span = ' [cross-exam]' if cluster.spans_exams else ''
+            self.stdout.write(
+                f"\nCluster {number}: {len(cluster.members)} MCQs, similarity {cluster.max_similarity:.2f}{span}"
+            )
+            for member in cluster.members:
+                self.stdout.write(
+                    f"  #{member['id']} {member['question_number'] or ''} "
+                    f"({member['exam_type']} {member['exam_year']}) {member['question_text'][:90]}"
+                )
+
+        if options['json_output']:
+            with open(options['json_output'], 'w', encoding='utf-8') as handle:
+                json.dump(
+                    {'threshold': threshold, 'clusters': [cluster.as_dict() for cluster in clusters]},
+                    handle,
+                    indent=2,
+                )
+            self.stdout.write(f"\nWrote {len(clusters)} clusters to {options['json_output']}")
@@ -0,0 +1,68 @@
+"""
+Management command to provision the MCQ bank from fixtures or a snapshot.
+
+Streams the input and inserts in batches (see mcq.services.fixture_loader),
+so a full bank loads in seconds with bounded memory, and can be re-run safely.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from mcq.models import MCQ
+from mcq.services import fixture_loader
+
+
+class Command(BaseCommand):
+    help = 'Load MCQs from fixture files/directories or a snapshot, and optionally write a snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='Fixture files or directories (default: the MCQ_SNAPSHOT_PATH snapshot, else fixtures/mcqs)',
+        )
+        parser.add_argument('--snapshot', help='Load from this snapshot (.jsonl.gz) instead of fixtures')
+        parser.add_argument('--write-snapshot', help='After loading, write the MCQ table to this snapshot file')
+        parser.add_argument('--batch-size', type=int, default=500, help='MCQs per insert batch (default: 500)')
+        parser.add_argument('--if-empty', action='store_true', help='Do nothing when MCQs already exist')
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and MCQ.objects.exists():
+            self.stdout.write(f"MCQs already loaded ({MCQ.objects.count()}); nothing to do")
+        else:
+            self._load(options)
+
+        if options['write_snapshot']:
+            count = fixture_loader.write_snapshot(options['write_snapshot'])
+            self.stdout.write(self.style.SUCCESS(f"Wrote {count} MCQs to {options['write_snapshot']}"))
+
+    def _load(self, options):
+        snapshot = options['snapshot']
+        paths = [path for arg in options['paths'] for path in fixture_loader.fixture_paths(arg)]
+        if not snapshot and not paths:
+            snapshot, paths = fixture_loader.default_sources()
+        if not snapshot and not paths:
+            raise CommandError('No fixtures or snapshot found to load')
+
+        batch_size = options['batch_size']
+        if snapshot:
+            self.stdout.write(f"Loading snapshot {snapshot}")
+            stats = fixture_loader.load_snapshot(snapshot, batch_size=batch_size, progress=self._progress)
+        else:
+            self.stdout.write(f"Loading {len(paths)} fixture file(s)")
+            stats = fixture_loader.load_fixtures(
+                paths,
+                batch_size=batch_size,
+                progress=lambda path, current: self._progress(current, path),
+            )
+        self.stdout.write(self.style.SUCCESS(stats.summary()))
+        if stats.inserted:
+            self.stdout.write(
+                "Embeddings and near-duplicate signatures were not computed; run "
+                "`build_embeddings --missing` and `find_near_duplicates --missing`."
+            )
+
+    def _progress(self, stats, path=None):
+        where = f" [{path}]" if path else ''
+        self.stdout.write(
+            f"  {stats.seen} read, {stats.inserted} inserted, {stats.existing} existing, "
+            f"{stats.invalid} invalid ({stats.rate:.0f}/s){where}"
+        )
@@ -0,0 +1,73 @@
+"""
+Management command to apply the retention policies in mcq.services.retention.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from mcq.services.retention import RetentionEngine, get_policies, last_report
+
+
+class Command(BaseCommand):
+    help = 'Archive, compact or delete aged per-user history rows in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows each policy would touch',
+        )
+        parser.add_argument(
+            '--policy',
+            action='append',
+            dest='policies',
+            help='Run only this policy (repeatable); see --list',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Show the configured policies and the last run, then exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Rows per batch (default: RETENTION_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            policies = get_policies(options['policies'])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        if options['list']:
+            self._list(policies)
+            return
+
+        engine = RetentionEngine(batch_size=options['batch_size'])
+        results = engine.run(policies, dry_run=options['dry_run'])
+        verb = 'would' if options['dry_run'] else 'did'
+        for result in results:
+            if result.error:
+                self.stdout.write(self.style.ERROR(f"{result.policy}: failed ({result.error})"))
+                continue
+            line = (
+                f"{result.policy}: {result.matched} matched, {verb} {result.action} "
+                f"{result.matched if options['dry_run'] else result.affected} "
+                f"({result.batches} batches, {result.seconds:.2f}s)"
+            )
+            if not result.complete:
+                line += " - batch limit reached, continues next run"
+            self.stdout.write(self.style.SUCCESS(line) if result.affected or options['dry_run'] else line)
+
+    def _list(self, policies):
+        for policy in policies:
+            state = '' if policy.enabled else ' [disabled]'
+            filters = f" {policy.filters}" if policy.filters else ''
+            self.stdout.write(
+                f"{policy.name}{state}: {policy.action} {policy.model} where "
+                f"{policy.age_field} older than {policy.max_age_days:g} days{filters}"
+            )
+        report = last_report()
+        if report:
+            self.stdout.write(f"\nLast run finished {report['finished_at']}:")
+            for result in report['results']:
+                self.stdout.write(f"  {result['policy']}: {result['affected']} {result['action']}")
@@ -0,0 +1,25 @@
+"""
+Management command to rebuild MCQOption rows from MCQ.options.
+
+Saves through the ORM keep the rows in step; run this after fixture loads,
+bulk_create imports or raw SQL edits that bypass ``MCQ.save()``.
+"""
+from django.core.management.base import BaseCommand
+
+from mcq.models import MCQ, MCQOption
+from mcq.option_utils import rebuild_option_rows
+
+
+class Command(BaseCommand):
+    help = 'Canonicalise MCQ options and rebuild the MCQOption rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', default='', help='Comma-separated MCQ ids (default: all MCQs)')
+        parser.add_argument('--batch-size', type=int, default=500, help='MCQs per batch (default: 500)')
+
+    def handle(self, *args, **options):
+        ids = [int(value) for value in options['ids'].split(',') if value.strip()] or None
+        rewritten, written = rebuild_option_rows(MCQ, MCQOption, mcq_ids=ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} option rows; canonicalised options on {rewritten} MCQs"
+        ))
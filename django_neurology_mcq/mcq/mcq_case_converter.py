@@ -15,6 +15,10 @@ import logging
 import os
 import re
 import hashlib
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from typing import Dict, Optional, List, Tuple, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
@@ -42,6 +46,9 @@ API_TIMEOUT = 30 if os.environ.get('DYNO') else 60  # Shorter timeout on Heroku
 MIN_VALIDATION_SCORE = 40 if os.environ.get('DYNO') else 70
 MIN_SEMANTIC_SCORE = 30 if os.environ.get('DYNO') else 50
 
+# Pipeline - generation candidates requested concurrently per round (1 disables speculation)
+SPECULATIVE_CANDIDATES = max(1, int(os.environ.get('CASE_CONVERSION_CANDIDATES', 2)))
+
 
 def _run_chat_completion(api_client, logger, messages, **kwargs):
     """Execute a chat completion using GPT-5-mini with optional fallback."""
@@ -527,12 +534,17 @@ class CaseGenerator:
         Returns:
             CaseData instance
         """
+        return self.generate_from_prompt(mcq, self._create_generation_prompt(mcq, analysis), analysis)
+    
+    def build_prompt(self, mcq, analysis: Dict[str, Any]) -> str:
+        """Generation prompt for an MCQ; identical for every candidate of a conversion"""
+        return self._create_generation_prompt(mcq, analysis)
+    
+    def generate_from_prompt(self, mcq, prompt: str, analysis: Dict[str, Any]) -> CaseData:
+        """Generate one case candidate from a prepared prompt"""
         try:
             self.logger.info(f"Generating case for MCQ {mcq.id}")
             
-            # Create AI prompt
-            prompt = self._create_generation_prompt(mcq, analysis)
-            
             # Call OpenAI API
             response = self._call_openai_api(prompt)
             
@@ -925,13 +937,31 @@ class CaseValidator:
         self.client = openai_client
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
     
-    def validate_case(self, mcq, case_data: CaseData) -> ValidationResult:
+    def prepare(self, mcq) -> Dict[str, Any]:
+        """
+        MCQ-side extraction used by the preservation checks.
+        
+        Independent of the generated case, so the pipeline runs it while the
+        generation call is in flight and shares it between candidates.
+        """
+        try:
+            from .clinical_detail_extractor import ClinicalDetailExtractor
+            return {'critical_details': ClinicalDetailExtractor().extract_critical_details(mcq.question_text)}
+        except ImportError:
+            return {}
+    
+    def cheap_checks(self, mcq, case_data: CaseData, prepared: Optional[Dict[str, Any]] = None) -> Tuple[List[str], List[str]]:
+        """Structural and content issues; local checks only, no API calls"""
+        return self._validate_structure(case_data), self._validate_content(mcq, case_data, prepared)
+    
+    def validate_case(self, mcq, case_data: CaseData, prepared: Optional[Dict[str, Any]] = None) -> ValidationResult:
         """
         Comprehensive case validation
         
         Args:
             mcq: Original MCQ
             case_data: Generated case data
+            prepared: Optional result of prepare() for this MCQ
             
         Returns:
             ValidationResult instance
@@ -939,14 +969,16 @@ class CaseValidator:
         try:
             self.logger.info(f"Validating case for MCQ {mcq.id}")
             
-            # Structural validation
-            structural_issues = self._validate_structure(case_data)
+            # Structural and content validation
+            structural_issues, content_issues = self.cheap_checks(mcq, case_data, prepared)
             
-            # Content validation
-            content_issues = self._validate_content(mcq, case_data)
-            
-            # AI-based semantic validation (if available)
-            semantic_validation = self._validate_semantics(mcq, case_data)
+            # Candidates missing required fields fail regardless of the semantic
+            # score, so skip the API round trip for them
+            if any("Missing" in issue for issue in structural_issues):
+                semantic_validation = {'score': 0, 'issues': [], 'method': 'skipped_structural_failure'}
+            else:
+                # AI-based semantic validation (if available)
+                semantic_validation = self._validate_semantics(mcq, case_data)
             
             # Combine all validations
             semantic_issues = semantic_validation.get('issues', [])
@@ -980,6 +1012,7 @@ class CaseValidator:
                     'structural_score': 100 - len(structural_issues) * 10,
                     'content_score': 100 - len(content_issues) * 15,
                     'semantic_score': semantic_validation['score'],
+                    'semantic_method': semantic_validation.get('method'),
                     'validated_at': datetime.now().isoformat()
                 }
             )
@@ -1023,7 +1056,7 @@ class CaseValidator:
         
         return issues
     
-    def _validate_content(self, mcq, case_data: CaseData) -> List[str]:
+    def _validate_content(self, mcq, case_data: CaseData, prepared: Optional[Dict[str, Any]] = None) -> List[str]:
         """Validate content relevance and quality"""
         issues = []
         
@@ -1041,7 +1074,9 @@ class CaseValidator:
             issues.append("Contains placeholder or example text")
         
         # Clinical detail preservation validation
-        preservation_issues = self._validate_clinical_detail_preservation(mcq, case_data)
+        preservation_issues = self._validate_clinical_detail_preservation(
+            mcq, case_data, (prepared or {}).get('critical_details')
+        )
         issues.extend(preservation_issues)
         
         # Investigation preservation validation
@@ -1050,14 +1085,16 @@ class CaseValidator:
         
         return issues
     
-    def _validate_clinical_detail_preservation(self, mcq, case_data: CaseData) -> List[str]:
+    def _validate_clinical_detail_preservation(self, mcq, case_data: CaseData,
+                                               critical_details: Optional[Dict[str, Any]] = None) -> List[str]:
         """Validate that critical clinical details from MCQ are preserved in case"""
         issues = []
         
         try:
-            from .clinical_detail_extractor import ClinicalDetailExtractor
-            extractor = ClinicalDetailExtractor()
-            critical_details = extractor.extract_critical_details(mcq.question_text)
+            if critical_details is None:
+                from .clinical_detail_extractor import ClinicalDetailExtractor
+                extractor = ClinicalDetailExtractor()
+                critical_details = extractor.extract_critical_details(mcq.question_text)
             
             # Check if case presentation contains the critical details
             case_text = (
@@ -1366,6 +1403,43 @@ class CacheManager:
         cache.delete(cache_key)
 
 
+class StageTimer:
+    """Wall-clock timings of conversion stages; safe to use from pipeline threads"""
+    
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages: List[Dict[str, Any]] = []
+    
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._stages.append({
+                    'stage': name,
+                    'start_ms': round((started - self._origin) * 1000, 1),
+                    'duration_ms': round((finished - started) * 1000, 1),
+                    'thread': threading.current_thread().name,
+                })
+    
+    def timed(self, name: str, func, *args, **kwargs):
+        with self.stage(name):
+            return func(*args, **kwargs)
+    
+    def as_list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return sorted(self._stages, key=lambda entry: entry['start_ms'])
+    
+    def summary(self) -> str:
+        total = round((time.perf_counter() - self._origin) * 1000, 1)
+        parts = [f"{entry['stage']}={entry['duration_ms']}ms" for entry in self.as_list()]
+        return f"total={total}ms " + " ".join(parts)
+
+
 class MCQCaseConverter:
     """
     Main converter class that orchestrates the entire conversion process
@@ -1374,12 +1448,13 @@ class MCQCaseConverter:
     It provides a clean, robust API with comprehensive error handling and validation.
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[Any] = None):
         """Initialize converter with all required components"""
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
         
-        # Use shared OpenAI client from the integration layer
-        self.openai_client = openai_client
+        # Use shared OpenAI client from the integration layer unless one is given
+        # (benchmarks pass an offline client)
+        self.openai_client = client if client is not None else openai_client
         
         if not self.openai_client:
             self.logger.warning("OpenAI client not available - conversion will fail")
@@ -1438,93 +1513,105 @@ class MCQCaseConverter:
         
         log_debug("CACHE_MISS", "No cached conversion found")
         
-        # Attempt conversion with retries
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                log_debug(f"ATTEMPT_{attempt + 1}", f"Starting conversion attempt {attempt + 1}/{MAX_RETRY_ATTEMPTS}")
-                
-                # Step 1: Analyze MCQ
-                log_debug("ANALYSIS_START", "Analyzing MCQ content")
-                analysis = self.analyzer.analyze_mcq(mcq)
-                log_debug("ANALYSIS_COMPLETE", {
-                    'question_type': analysis['question_type'].value,
-                    'complexity': analysis['complexity'].value,
-                    'patient_info': f"{analysis['patient_info'].age}yo {analysis['patient_info'].gender}",
-                    'age_descriptor': analysis['age_descriptor'],
-                    'specialty_confidence': analysis['specialty_confidence']
-                })
-                
-                # Step 2: Generate case
-                log_debug("GENERATION_START", "Generating case via OpenAI")
-                case_data = self.generator.generate_case(mcq, analysis)
-                log_debug("GENERATION_COMPLETE", {
-                    'has_clinical_presentation': bool(case_data.clinical_presentation),
-                    'core_concept': case_data.core_concept_type,
-                    'learning_objectives_count': len(case_data.learning_objectives)
-                })
-                
-                # Step 3: Validate case
-                log_debug("VALIDATION_START", "Validating generated case")
-                validation_result = self.validator.validate_case(mcq, case_data)
-                log_debug("VALIDATION_COMPLETE", {
-                    'status': validation_result.status.value,
-                    'score': validation_result.score,
-                    'reason': validation_result.reason,
-                    'issues': validation_result.issues,
-                    'metadata': validation_result.metadata
-                })
-                
-                # Step 4: Check if validation passed
-                if validation_result.status == ValidationStatus.PASSED:
-                    # Convert to legacy format for compatibility
-                    log_debug("FORMAT_CONVERSION", "Converting to legacy format")
-                    legacy_format = self._convert_to_legacy_format(case_data, validation_result)
-                    
-                    # Cache successful conversion
-                    log_debug("CACHE_STORE", "Storing in cache")
-                    CacheManager.cache_conversion(mcq.id, legacy_format)
-                    
-                    log_debug("CONVERSION_SUCCESS", {
-                        'mcq_id': mcq.id,
-                        'validation_score': validation_result.score,
-                        'attempts': attempt + 1
-                    })
-                    
-                    if include_debug:
-                        legacy_format['_debug_log'] = debug_log
+        timer = StageTimer()
+        pool = ThreadPoolExecutor(max_workers=SPECULATIVE_CANDIDATES + 1, thread_name_prefix="case-convert")
+        try:
+            result = self._run_pipeline(mcq, pool, timer, log_debug)
+        except Exception as e:
+            error_msg = f"All conversion attempts failed for MCQ {mcq.id}: {str(e)}"
+            if include_debug:
+                error_msg += f"\n\nDebug Log:\n{json.dumps(debug_log, indent=2)}"
+            raise Exception(error_msg)
+        finally:
+            # Don't wait for losing candidates; their results are discarded
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.logger.info(f"Conversion stages for MCQ {mcq.id}: {timer.summary()}")
+        
+        log_debug("CACHE_STORE", "Storing in cache")
+        CacheManager.cache_conversion(mcq.id, result)
+        # Timings describe this run only, so they are not cached
+        result = dict(result, _stage_timings=timer.as_list())
+        
+        if include_debug:
+            result['_debug_log'] = debug_log
+        
+        return result
+    
+    def _run_pipeline(self, mcq, pool: ThreadPoolExecutor, timer: "StageTimer", log_debug) -> Dict[str, Any]:
+        """
+        Run the conversion stage graph and return the legacy-format case.
+        
+        analysis -> prompt -> N generation candidates (concurrent) -> validation
+                  validation_prep (concurrent with the above)
+        
+        Candidates are validated in the order they finish; the first one that
+        passes wins and the rest are abandoned. When a whole round fails a new
+        round is started, up to MAX_RETRY_ATTEMPTS generation calls in total.
+        """
+        prepared_future = pool.submit(timer.timed, "validation_prep", self.validator.prepare, mcq)
+        
+        with timer.stage("analysis"):
+            analysis = self.analyzer.analyze_mcq(mcq)
+        log_debug("ANALYSIS_COMPLETE", {
+            'question_type': analysis['question_type'].value,
+            'complexity': analysis['complexity'].value,
+            'patient_info': f"{analysis['patient_info'].age}yo {analysis['patient_info'].gender}",
+            'age_descriptor': analysis['age_descriptor'],
+            'specialty_confidence': analysis['specialty_confidence']
+        })
+        
+        with timer.stage("prompt"):
+            prompt = self.generator.build_prompt(mcq, analysis)
+        
+        launched = 0
+        last_failure = "no candidates generated"
+        while launched < MAX_RETRY_ATTEMPTS:
+            round_size = min(SPECULATIVE_CANDIDATES, MAX_RETRY_ATTEMPTS - launched)
+            pending = {}
+            for _ in range(round_size):
+                launched += 1
+                future = pool.submit(
+                    timer.timed, f"generation_{launched}", self.generator.generate_from_prompt, mcq, prompt, analysis
+                )
+                pending[future] = launched
+            log_debug("GENERATION_START", f"Requested {round_size} candidate(s), {launched}/{MAX_RETRY_ATTEMPTS} total")
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    candidate = pending.pop(future)
+                    try:
+                        case_data = future.result()
+                    except Exception as e:
+                        last_failure = str(e)
+                        log_debug(f"CANDIDATE_{candidate}_ERROR", {'error': str(e), 'error_type': type(e).__name__})
+                        continue
                     
-                    return legacy_format
-                else:
-                    log_debug("VALIDATION_FAILED", {
+                    with timer.stage(f"validation_{candidate}"):
+                        validation_result = self.validator.validate_case(mcq, case_data, prepared=prepared_future.result())
+                    log_debug("VALIDATION_COMPLETE", {
+                        'candidate': candidate,
+                        'status': validation_result.status.value,
+                        'score': validation_result.score,
                         'reason': validation_result.reason,
                         'issues': validation_result.issues,
-                        'will_retry': attempt < MAX_RETRY_ATTEMPTS - 1
+                        'metadata': validation_result.metadata
                     })
                     
-                    if attempt == MAX_RETRY_ATTEMPTS - 1:
-                        error_msg = f"Conversion failed validation: {validation_result.reason}"
-                        if include_debug:
-                            error_msg += f"\n\nDebug Log:\n{json.dumps(debug_log, indent=2)}"
-                        raise Exception(error_msg)
-                
-            except Exception as e:
-                log_debug(f"ATTEMPT_{attempt + 1}_ERROR", {
-                    'error': str(e),
-                    'error_type': type(e).__name__,
-                    'will_retry': attempt < MAX_RETRY_ATTEMPTS - 1
-                })
-                
-                if attempt == MAX_RETRY_ATTEMPTS - 1:
-                    error_msg = f"All conversion attempts failed for MCQ {mcq.id}: {str(e)}"
-                    if include_debug:
-                        error_msg += f"\n\nDebug Log:\n{json.dumps(debug_log, indent=2)}"
-                    raise Exception(error_msg)
-        
-        # This should never be reached due to the raise in the loop
-        error_msg = f"Unexpected error in conversion for MCQ {mcq.id}"
-        if include_debug:
-            error_msg += f"\n\nDebug Log:\n{json.dumps(debug_log, indent=2)}"
-        raise Exception(error_msg)
+                    if validation_result.status == ValidationStatus.PASSED:
+                        with timer.stage("format"):
+                            legacy_format = self._convert_to_legacy_format(case_data, validation_result)
+                        log_debug("CONVERSION_SUCCESS", {
+                            'mcq_id': mcq.id,
+                            'validation_score': validation_result.score,
+                            'attempts': launched,
+                            'winning_candidate': candidate
+                        })
+                        return legacy_format
+                    
+                    last_failure = f"Conversion failed validation: {validation_result.reason}"
+        
+        raise Exception(last_failure)
     
     def _convert_to_legacy_format(self, case_data: CaseData, validation_result: ValidationResult) -> Dict[str, Any]:
         """
@@ -1567,6 +1654,8 @@ class MCQCaseConverter:
                 'has_warnings': len(validation_result.issues) > 0 and validation_result.status == ValidationStatus.PASSED,
                 'warning_count': len([issue for issue in validation_result.issues if "Missing" not in issue]),
                 'critical_issues': [issue for issue in validation_result.issues if "Missing" in issue],
+                'semantic_score': validation_result.metadata.get('semantic_score'),
+                'semantic_method': validation_result.metadata.get('semantic_method'),
                 'validated_at': datetime.now().isoformat()
             },
             
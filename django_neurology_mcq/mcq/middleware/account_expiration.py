@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
@@ -11,11 +12,30 @@ class AccountExpirationMiddleware:
     If the account is expired, the user will be logged out and redirected to the login page.
     """
     
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
         
     def __call__(self, request):
-        # Process request before view is called
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self._check_account(request)
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        response = await sync_to_async(self._check_account)(request)
+        if response is not None:
+            return response
+        return await self.get_response(request)
+
+    def _check_account(self, request):
+        """Redirect expired or deactivated accounts to the login page; warn accounts about to expire."""
         # Check if user is authenticated and not a staff/superuser
         if request.user.is_authenticated and not request.user.is_staff and not request.user.is_superuser:
             try:
@@ -60,7 +80,4 @@ class AccountExpirationMiddleware:
                     user=request.user,
                     expiration_date=timezone.now() + timedelta(days=30)
                 )
-        
-        # Process the response
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+        return None
\ No newline at end of file
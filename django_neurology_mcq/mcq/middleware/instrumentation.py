@@ -0,0 +1,75 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from mcq.services import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentationMiddleware:
+    """
+    Measure each request (queries, cache, LLM calls) and add a Server-Timing header.
+
+    Place it right after WhiteNoise so static files are not measured and the
+    session and auth middleware queries are.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self._skip(request):
+            return self.get_response(request)
+
+        with instrumentation.measure(instrumentation.KIND_REQUEST, 'unresolved') as measurement:
+            response = self.get_response(request)
+            measurement.name = self._route_name(request)
+            measurement.error = response.status_code >= 500
+
+        if self._show_server_timing(request, getattr(request, 'user', None)):
+            response['Server-Timing'] = measurement.server_timing()
+        return response
+
+    async def __acall__(self, request):
+        if self._skip(request):
+            return await self.get_response(request)
+
+        with instrumentation.measure(instrumentation.KIND_REQUEST, 'unresolved') as measurement:
+            response = await self.get_response(request)
+            measurement.name = self._route_name(request)
+            measurement.error = response.status_code >= 500
+
+        user = await request.auser() if hasattr(request, 'auser') else None
+        if self._show_server_timing(request, user):
+            response['Server-Timing'] = measurement.server_timing()
+        return response
+
+    @staticmethod
+    def _skip(request):
+        return not instrumentation.enabled() or request.path_info.startswith(settings.STATIC_URL or '/static/')
+
+    @staticmethod
+    def _route_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            return match.view_name or match._func_path
+        # Unresolved paths (404s) are grouped so they cannot blow up the series count
+        return 'unresolved'
+
+    @staticmethod
+    def _show_server_timing(request, user):
+        mode = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', 'staff')
+        if mode == 'all':
+            return True
+        if mode == 'staff':
+            return bool(user is not None and getattr(user, 'is_staff', False))
+        return False
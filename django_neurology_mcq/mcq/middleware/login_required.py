@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.urls import reverse, resolve
 from django.conf import settings
@@ -11,11 +12,31 @@ class LoginRequiredMiddleware:
     Middleware to ensure all pages except login redirect to login page when user is not authenticated.
     """
     
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
         
     def __call__(self, request):
-        # Process request before view is called
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self._login_redirect(request, request.user.is_authenticated)
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        response = self._login_redirect(request, user.is_authenticated)
+        if response is not None:
+            return response
+        return await self.get_response(request)
+
+    def _login_redirect(self, request, is_authenticated):
+        """Redirect to the login page unless the user is authenticated or the path is exempt."""
         try:
             # List of URL names that are exempt from the login requirement
             exempt_urls = [
@@ -30,7 +51,7 @@ class LoginRequiredMiddleware:
             path = request.path_info
             
             # If user is not authenticated and path is not in exempt_urls, redirect to login
-            if not request.user.is_authenticated:
+            if not is_authenticated:
                 # Don't redirect for admin URLs or the login URL itself
                 if (
                     path.startswith('/admin/')
@@ -39,28 +60,27 @@ class LoginRequiredMiddleware:
                     or path.startswith('/healthz')
                     or path.startswith('/debug/clinical-reasoning/')  # allow token-protected debug APIs
                 ):
-                    return self.get_response(request)
+                    return None
                     
                 # Try to resolve the URL to check if it matches exempt URLs
                 try:
                     url_name = resolve(path).url_name
                     if url_name in exempt_urls:
-                        return self.get_response(request)
+                        return None
                 except Exception as e:
                     # If resolve fails, log it and default to checking path
                     logger.debug(f"Error resolving URL {path}: {str(e)}")
                     
                 # Check for static files
                 if path.startswith(settings.STATIC_URL):
-                    return self.get_response(request)
+                    return None
                     
                 # If not exempt, redirect to login
                 return redirect(settings.LOGIN_URL)
             
-            # Process the response for authenticated users
-            return self.get_response(request)
+            return None
             
         except Exception as e:
             # Log any errors but allow the request to proceed
             logger.error(f"Error in LoginRequiredMiddleware: {str(e)}")
-            return self.get_response(request)
+            return None
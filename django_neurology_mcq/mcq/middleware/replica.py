@@ -0,0 +1,74 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from mcq import db_router
+
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaReadMiddleware:
+    """
+    Route reads of ``@allows_replica_reads`` views to the replica, with read-your-writes.
+
+    Any unsafe request, or any request that wrote, sets a cookie that keeps
+    the client on the primary for ``DATABASE_REPLICA_STICKY_SECONDS``.
+    Does nothing when no replica is configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not db_router.replica_configured():
+            return self.get_response(request)
+
+        with db_router.request_scope() as state:
+            response = self.get_response(request)
+        return self._process_response(request, response, state)
+
+    async def __acall__(self, request):
+        if not db_router.replica_configured():
+            return await self.get_response(request)
+
+        # ORM calls made through sync_to_async see (and update) the same state
+        with db_router.request_scope() as state:
+            response = await self.get_response(request)
+        return self._process_response(request, response, state)
+
+    def _process_response(self, request, response, state):
+        if request.method not in SAFE_METHODS or state.wrote:
+            sticky_seconds = int(getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 15))
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(int(time.time()) + sticky_seconds),
+                max_age=sticky_seconds,
+                httponly=True,
+                samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = db_router.current_state()
+        if state is None or request.method not in ('GET', 'HEAD'):
+            return None
+        if getattr(view_func, 'replica_reads', False) and not self._sticky(request):
+            state.replica = True
+        return None
+
+    @staticmethod
+    def _sticky(request):
+        try:
+            return int(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
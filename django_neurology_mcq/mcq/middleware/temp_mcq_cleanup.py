@@ -1,4 +1,5 @@
 import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from mcq.models import MCQ
 
 logger = logging.getLogger(__name__)
@@ -6,10 +7,29 @@ logger = logging.getLogger(__name__)
 class TemporaryMCQCleanupMiddleware:
     """Middleware to ensure temporary MCQs are always cleaned up properly."""
     
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
         
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._delete_pending(request)
+        response = self.get_response(request)
+        self._delete_weakness_mcq(request)
+        return response
+
+    async def __acall__(self, request):
+        await sync_to_async(self._delete_pending)(request)
+        response = await self.get_response(request)
+        await sync_to_async(self._delete_weakness_mcq)(request)
+        return response
+
+    def _delete_pending(self, request):
         # Clean up pending deletions from previous requests
         if 'mcq_pending_deletion' in request.session:
             try:
@@ -19,10 +39,8 @@ class TemporaryMCQCleanupMiddleware:
                     logger.info(f"Cleaned up pending MCQ deletion: {mcq_id}")
             except Exception as e:
                 logger.error(f"Error cleaning up pending MCQ: {str(e)}")
-        
-        # Process the request
-        response = self.get_response(request)
-        
+
+    def _delete_weakness_mcq(self, request):
         # Clean up when navigating away from test_weakness
         if request.path != '/test_weakness/' and 'temp_weakness_mcq_id' in request.session:
             try:
@@ -31,6 +49,4 @@ class TemporaryMCQCleanupMiddleware:
                 if deleted[0] > 0:
                     logger.info(f"Cleaned up temporary weakness test MCQ: {mcq_id}")
             except Exception as e:
-                logger.error(f"Error cleaning up temporary MCQ: {str(e)}")
-        
-        return response
\ No newline at end of file
+                logger.error(f"Error cleaning up temporary MCQ: {str(e)}")
\ No newline at end of file
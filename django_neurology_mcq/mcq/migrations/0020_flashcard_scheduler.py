@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcq', '0019_merge_explanations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='difficulty',
+            field=models.FloatField(blank=True, help_text='FSRS difficulty between 1 and 10 (null until the first FSRS review)', null=True),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='lapses',
+            field=models.PositiveIntegerField(default=0, help_text='Number of reviews that were forgotten'),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='repetitions',
+            field=models.PositiveIntegerField(default=0, help_text='Number of completed reviews'),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='stability',
+            field=models.FloatField(blank=True, help_text='FSRS memory stability in days (null until the first FSRS review)', null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='flashcard_parameters',
+            field=models.JSONField(blank=True, default=dict, help_text='Scheduler tuning: desired_retention, maximum_interval and FSRS weights'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='flashcard_scheduler',
+            field=models.CharField(choices=[('sm2', 'SM-2'), ('fsrs', 'FSRS')], default='sm2', help_text="Spaced repetition algorithm used for this user's flashcards", max_length=10),
+        ),
+        migrations.CreateModel(
+            name='FlashcardReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveSmallIntegerField(help_text='Review rating: 1 Again, 2 Hard, 3 Good, 4 Easy')),
+                ('algorithm', models.CharField(help_text='Scheduler that produced the new interval', max_length=10)),
+                ('reviewed_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the review happened')),
+                ('elapsed_days', models.FloatField(default=0, help_text='Days since the previous review')),
+                ('previous_interval', models.IntegerField(help_text='Interval in days before this review')),
+                ('interval', models.IntegerField(help_text='Interval in days after this review')),
+                ('ease_factor', models.FloatField(help_text='SM-2 ease factor after this review')),
+                ('stability', models.FloatField(blank=True, help_text='FSRS stability after this review', null=True)),
+                ('difficulty', models.FloatField(blank=True, help_text='FSRS difficulty after this review', null=True)),
+                ('flashcard', models.ForeignKey(help_text='The reviewed flashcard', on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='mcq.flashcard')),
+                ('user', models.ForeignKey(help_text='User who reviewed the flashcard', on_delete=django.db.models.deletion.CASCADE, related_name='flashcard_reviews', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Flashcard Review',
+                'verbose_name_plural': 'Flashcard Reviews',
+                'ordering': ['-reviewed_at'],
+                'indexes': [models.Index(fields=['user', 'reviewed_at'], name='mcq_flashca_user_id_beadbb_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcq', '0020_flashcard_scheduler'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topics', models.JSONField(blank=True, default=list, help_text='Topic keys (sub:<subspecialty> / cat:<primary category>) in vector row order')),
+                ('vector', models.BinaryField(blank=True, default=bytes, help_text='float32 mastery rows aligned with topics')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the estimates were last updated')),
+                ('user', models.OneToOneField(help_text='User these estimates belong to', on_delete=django.db.models.deletion.CASCADE, related_name='mastery', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Mastery',
+                'verbose_name_plural': 'User Mastery',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcq', '0021_user_mastery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MCQSignature',
+            fields=[
+                ('mcq', models.OneToOneField(help_text='The MCQ this signature describes', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='mcq.mcq')),
+                ('text_hash', models.CharField(help_text='SHA-1 of the normalised text; the signature is only recomputed when it changes', max_length=40)),
+                ('minhash', models.BinaryField(help_text='128 uint32 MinHash values')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the signature was last computed')),
+            ],
+            options={
+                'verbose_name': 'MCQ Signature',
+                'verbose_name_plural': 'MCQ Signatures',
+            },
+        ),
+        migrations.CreateModel(
+            name='MCQSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True, help_text='Hash of one band of the MinHash signature (band number mixed in)')),
+                ('mcq', models.ForeignKey(help_text='The MCQ this bucket key belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='mcq.mcq')),
+            ],
+            options={
+                'verbose_name': 'MCQ Signature Band',
+                'verbose_name_plural': 'MCQ Signature Bands',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:25
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+import mcq.indexes
+
+
+class Migration(migrations.Migration):
+    # Admin search uses icontains (ILIKE '%term%'); trigram GIN indexes let
+    # PostgreSQL answer it without scanning every question. CREATE INDEX
+    # CONCURRENTLY cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('mcq', '0022_mcq_signatures'),
+    ]
+
+    operations = [
+        mcq.indexes.TrigramExtension(),
+        mcq.indexes.AddTrigramIndexConcurrently(
+            model_name='mcq',
+            index=mcq.indexes.TrigramIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('question_text'), name='gin_trgm_ops'), name='mcq_mcq_question_text_trgm'),
+        ),
+        mcq.indexes.AddTrigramIndexConcurrently(
+            model_name='mcq',
+            index=mcq.indexes.TrigramIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('question_number'), name='gin_trgm_ops'), name='mcq_mcq_question_number_trgm'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcq', '0023_mcq_question_text_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MCQEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(blank=True, default='', help_text='Explanation section key, or blank for the question itself', max_length=50)),
+                ('embedder', models.CharField(help_text='Key of the embedder (model and dimension) that produced the vector', max_length=100)),
+                ('text_hash', models.CharField(help_text='SHA-1 of the embedded text; the vector is only recomputed when it changes', max_length=40)),
+                ('vector', models.BinaryField(help_text='L2-normalised float32 vector')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the vector was last computed')),
+                ('mcq', models.ForeignKey(help_text='The MCQ this vector describes', on_delete=django.db.models.deletion.CASCADE, related_name='embeddings', to='mcq.mcq')),
+            ],
+            options={
+                'verbose_name': 'MCQ Embedding',
+                'verbose_name_plural': 'MCQ Embeddings',
+                'indexes': [models.Index(fields=['embedder', 'updated_at'], name='mcq_mcqembe_embedde_423359_idx')],
+                'constraints': [models.UniqueConstraint(fields=('mcq', 'section', 'embedder'), name='unique_mcq_embedding')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcq', '0024_mcq_embeddings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='persistentcaselearningsession',
+            name='conversation_summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='persistentcaselearningsession',
+            name='summarized_message_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def copy_json_messages(apps, schema_editor):
+    Session = apps.get_model('mcq', 'PersistentCaseLearningSession')
+    CaseMessage = apps.get_model('mcq', 'CaseMessage')
+    sessions = Session.objects.only('id', 'messages', 'message_count').iterator(chunk_size=BATCH_SIZE)
+    for session in sessions:
+        messages = [m for m in (session.messages or []) if isinstance(m, dict)]
+        # The JSON list held at most the last 50 messages; number them from the true total
+        total = max(session.message_count, len(messages))
+        first_seq = total - len(messages)
+        CaseMessage.objects.bulk_create(
+            [
+                CaseMessage(
+                    session_id=session.id,
+                    seq=first_seq + offset,
+                    role=str(message.get('role') or 'user')[:16],
+                    content=message.get('content') or '',
+                )
+                for offset, message in enumerate(messages)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        if total != session.message_count:
+            Session.objects.filter(pk=session.id).update(message_count=total)
+
+
+def restore_json_messages(apps, schema_editor):
+    Session = apps.get_model('mcq', 'PersistentCaseLearningSession')
+    CaseMessage = apps.get_model('mcq', 'CaseMessage')
+    for session in Session.objects.only('id').iterator(chunk_size=BATCH_SIZE):
+        recent = CaseMessage.objects.filter(session_id=session.id).order_by('-seq')[:50]
+        messages = [{'role': m.role, 'content': m.content} for m in reversed(list(recent))]
+        Session.objects.filter(pk=session.id).update(messages=messages)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcq', '0025_case_conversation_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField(help_text='Position of the message within the session, from 0')),
+                ('role', models.CharField(max_length=16)),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='case_messages', to='mcq.persistentcaselearningsession')),
+            ],
+            options={
+                'verbose_name': 'Case Message',
+                'verbose_name_plural': 'Case Messages',
+                'ordering': ['session', 'seq'],
+                'constraints': [models.UniqueConstraint(fields=('session', 'seq'), name='unique_case_message_seq')],
+            },
+        ),
+        migrations.RunPython(copy_json_messages, restore_json_messages),
+        migrations.RemoveField(
+            model_name='persistentcaselearningsession',
+            name='messages',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcq', '0026_case_messages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cognitivereasoningsession',
+            name='analysis_tier',
+            field=models.CharField(blank=True, choices=[('heuristic', 'Heuristic'), ('model', 'Model')], default='', help_text='Tier that produced the current guidance', max_length=20),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from mcq.option_utils import rebuild_option_rows
+
+
+def populate_option_rows(apps, schema_editor):
+    """Canonicalise stored options and create one MCQOption row per option."""
+    rebuild_option_rows(apps.get_model('mcq', 'MCQ'), apps.get_model('mcq', 'MCQOption'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcq', '0027_reasoning_analysis_tier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MCQOption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('letter', models.CharField(help_text="Option letter, e.g. 'A'", max_length=10)),
+                ('text', models.TextField(help_text='Option text')),
+                ('is_correct', models.BooleanField(default=False, help_text="Whether the MCQ's correct answer names this option")),
+                ('order', models.PositiveSmallIntegerField(default=0, help_text='Display position, starting at 0')),
+                ('mcq', models.ForeignKey(help_text='The MCQ this option belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='option_rows', to='mcq.mcq')),
+            ],
+            options={
+                'verbose_name': 'MCQ Option',
+                'verbose_name_plural': 'MCQ Options',
+                'ordering': ['mcq', 'order'],
+                'constraints': [models.UniqueConstraint(fields=('mcq', 'letter'), name='mcq_option_unique_letter')],
+            },
+        ),
+        migrations.RunPython(populate_option_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:07
+
+import logging
+
+from django.db import migrations, models
+
+from mcq.exam_utils import fold_exam_type, is_known_exam_type, parse_exam_year
+
+logger = logging.getLogger(__name__)
+
+
+def convert_exam_metadata(apps, schema_editor):
+    """
+    Copy exam_year strings into the integer column and fold legacy exam type
+    names into the canonical ones, keeping each replaced name in
+    exam_type_original. Both columns have few distinct values, so the rows are
+    updated one distinct value at a time.
+    """
+    MCQ = apps.get_model('mcq', 'MCQ')
+    years = MCQ.objects.exclude(exam_year__isnull=True).values_list('exam_year', flat=True).distinct()
+    for raw in list(years):
+        year = parse_exam_year(raw)
+        if year is not None:
+            MCQ.objects.filter(exam_year=raw).update(exam_year_int=year)
+
+    types = MCQ.objects.exclude(exam_type__isnull=True).values_list('exam_type', flat=True).distinct()
+    for raw in list(types):
+        canonical, original = fold_exam_type(raw)
+        if original is None:
+            continue
+        updated = MCQ.objects.filter(exam_type=raw).update(exam_type=canonical, exam_type_original=original)
+        if not is_known_exam_type(raw):
+            logger.warning("Exam type %r on %s MCQs has no canonical name; stored as %r", raw, updated, canonical)
+
+
+def restore_exam_metadata(apps, schema_editor):
+    MCQ = apps.get_model('mcq', 'MCQ')
+    years = MCQ.objects.exclude(exam_year_int__isnull=True).values_list('exam_year_int', flat=True).distinct()
+    for year in list(years):
+        MCQ.objects.filter(exam_year_int=year).update(exam_year=str(year))
+    originals = MCQ.objects.exclude(exam_type_original__isnull=True).values_list('exam_type_original', flat=True).distinct()
+    for original in list(originals):
+        MCQ.objects.filter(exam_type_original=original).update(exam_type=original)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcq', '0028_mcq_option_rows'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='mcq',
+            name='mcq_mcq_subspec_9a64f2_idx',
+        ),
+        # A direct CharField -> integer AlterField would fail on values such as
+        # "2022-2023", so the year goes through a temporary column
+        migrations.AddField(
+            model_name='mcq',
+            name='exam_year_int',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mcq',
+            name='exam_type_original',
+            field=models.CharField(blank=True, editable=False, help_text='Exam type as imported, when it was folded into a canonical name', max_length=100, null=True),
+        ),
+        migrations.RunPython(convert_exam_metadata, restore_exam_metadata),
+        migrations.RemoveField(
+            model_name='mcq',
+            name='exam_year',
+        ),
+        migrations.RenameField(
+            model_name='mcq',
+            old_name='exam_year_int',
+            new_name='exam_year',
+        ),
+        migrations.AlterField(
+            model_name='mcq',
+            name='exam_year',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Year the question appeared in an exam', null=True),
+        ),
+        migrations.AlterField(
+            model_name='mcq',
+            name='exam_type',
+            field=models.CharField(blank=True, choices=[('Basic level', 'Basic level'), ('Advanced', 'Advanced'), ('Board-level', 'Board-level'), ('Other', 'Other')], help_text='Type of exam this question appeared in (legacy names are folded in on save)', max_length=50, null=True),
+        ),
+        # The composite indexes below lead with subspecialty
+        migrations.AlterField(
+            model_name='mcq',
+            name='subspecialty',
+            field=models.CharField(help_text='Neurological subspecialty this question belongs to', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='mcq',
+            index=models.Index(fields=['subspecialty', 'exam_type', 'exam_year'], name='mcq_subspec_type_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mcq',
+            index=models.Index(fields=['subspecialty', 'exam_year'], name='mcq_subspec_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mcq',
+            index=models.Index(fields=['exam_type', 'exam_year'], name='mcq_type_year_idx'),
+        ),
+    ]
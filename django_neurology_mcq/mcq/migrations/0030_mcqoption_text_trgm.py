@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:30
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+import mcq.indexes
+
+
+def drop_legacy_option_index(apps, schema_editor):
+    # Databases migrated before 0028 stopped creating the index by hand have
+    # it under the same name; rebuild it from Meta.indexes instead.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS mcq_mcqoption_text_trgm')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('mcq', '0029_typed_exam_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_legacy_option_index, migrations.RunPython.noop),
+        mcq.indexes.AddTrigramIndexConcurrently(
+            model_name='mcqoption',
+            index=mcq.indexes.TrigramIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('text'), name='gin_trgm_ops'), name='mcq_mcqoption_text_trgm'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:40
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+import mcq.indexes
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('mcq', '0030_mcqoption_text_trgm'),
+    ]
+
+    operations = [
+        mcq.indexes.AddTrigramIndexConcurrently(
+            model_name='mcq',
+            index=mcq.indexes.TrigramIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('source_file'), name='gin_trgm_ops'), name='mcq_mcq_source_file_trgm'),
+        ),
+    ]
@@ -6,15 +6,23 @@ Optimized models for better performance and maintainability.
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 import json
+import logging
 from django.utils import timezone
 from datetime import timedelta, datetime
 
+from .exam_utils import fold_exam_type, parse_exam_year
+from .indexes import trigram_index
+from .option_utils import canonical_options, is_canonical, option_rows, parse_options
+from .services.spaced_repetition import ALGORITHM_CHOICES, SM2
+
 # Import High-yield Review models
 from .high_yield_models import HighYieldSpecialty, HighYieldTopic, TopicSectionImage
 
+logger = logging.getLogger(__name__)
+
 class MCQ(models.Model):
     """
     Multiple-choice question model.
@@ -69,7 +77,6 @@ class MCQ(models.Model):
     # Classification and metadata (with indexes for faster queries)
     subspecialty = models.CharField(
         max_length=100,
-        db_index=True,
         help_text=_("Neurological subspecialty this question belongs to")
     )
     source_file = models.CharField(
@@ -82,14 +89,19 @@ class MCQ(models.Model):
         max_length=50, 
         blank=True, 
         null=True,
-        db_index=True,
-        help_text=_("Type of exam this question appeared in")
+        choices=EXAM_TYPE_CHOICES,
+        help_text=_("Type of exam this question appeared in (legacy names are folded in on save)")
     )
-    exam_year = models.CharField(
-        max_length=10,
+    exam_type_original = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text=_("Exam type as imported, when it was folded into a canonical name")
+    )
+    exam_year = models.PositiveSmallIntegerField(
         blank=True, 
         null=True,
-        db_index=True,
         help_text=_("Year the question appeared in an exam")
     )
     
@@ -192,7 +204,29 @@ class MCQ(models.Model):
             except Exception:
                 pass
         return ""
-    
+
+    def content_version(self) -> str:
+        """
+        Short fingerprint of the learner-visible content of this MCQ.
+
+        Changes whenever the stem, options, answer or explanation change, so it
+        can be embedded in cache keys for results derived from that content.
+        """
+        import hashlib
+
+        payload = json.dumps(
+            [
+                self.question_text,
+                self.get_options_dict(),
+                self.correct_answer,
+                self.correct_answer_text,
+                self.get_unified_explanation_text(),
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
     def save(self, *args, **kwargs):
         # Automatically convert Google Drive URLs to direct image format
         if self.image_url:
@@ -219,12 +253,43 @@ class MCQ(models.Model):
                     # Store as preview URL for iframe embedding
                     self.image_url = f'https://drive.google.com/file/d/{file_id}/preview'
         
+        # Store options in the canonical letter -> text form (rows are synced on post_save)
+        self.options = canonical_options(self.options)
+        self.exam_type, original_exam_type = fold_exam_type(self.exam_type)
+        if original_exam_type is not None:
+            self.exam_type_original = original_exam_type
+        self.exam_year = parse_exam_year(self.exam_year)
+
         super().save(*args, **kwargs)
+        self._remember_loaded_values()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    # Fields the adaptive selector's candidate matrix is built from
+    CANDIDATE_FIELDS = ('subspecialty', 'primary_category', 'source_file')
+
+    def _remember_loaded_values(self):
+        # Lets post_save receivers tell whether a save changed these fields
+        self._loaded_values = {name: self.__dict__[name] for name in self.CANDIDATE_FIELDS if name in self.__dict__}
     
     class Meta:
         indexes = [
-            models.Index(fields=['subspecialty', 'exam_type']),
+            # Subspecialty page and mock exam: subspecialty (IN) + exam_type (= or IS NULL)
+            # + exam_year range; also serves subspecialty-only filters and counts
+            models.Index(fields=['subspecialty', 'exam_type', 'exam_year'], name='mcq_subspec_type_year_idx'),
+            # "All Types" + year range within a subspecialty
+            models.Index(fields=['subspecialty', 'exam_year'], name='mcq_subspec_year_idx'),
+            # Mock exam across all subspecialties, admin exam_type filter
+            models.Index(fields=['exam_type', 'exam_year'], name='mcq_type_year_idx'),
             models.Index(fields=['question_number']),
+            # Admin and site search use icontains on these; PostgreSQL only
+            trigram_index('question_text', name='mcq_mcq_question_text_trgm'),
+            trigram_index('question_number', name='mcq_mcq_question_number_trgm'),
+            trigram_index('source_file', name='mcq_mcq_source_file_trgm'),
         ]
         verbose_name = _("MCQ")
         verbose_name_plural = _("MCQs")
@@ -232,43 +297,47 @@ class MCQ(models.Model):
     def __str__(self):
         return f"{self.question_number or 'ID:'+str(self.id)}: {self.question_text[:50]}..."
     
+    def get_option_items(self):
+        """
+        Ordered (letter, text) pairs for this MCQ.
+
+        Uses prefetched ``option_rows`` when available (``prefetch_related('option_rows')``),
+        otherwise the canonical ``options`` dict; legacy shapes that have not been
+        migrated yet are parsed as a fallback.
+        """
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('option_rows')
+        if prefetched:
+            return [(row.letter, row.text) for row in prefetched]
+        if is_canonical(self.options):
+            return list(self.options.items())
+        return parse_options(self.options)
+
     def get_options_dict(self):
         """
-        Get options as dictionary, handling both array and dictionary formats.
-        Returns a dictionary of options with letter keys.
+        Get options as a dictionary of letter -> text, in display order.
         """
-        if isinstance(self.options, str):
-            try:
-                parsed = json.loads(self.options)
-                if isinstance(parsed, list):
-                    # Convert array to dict with letter keys
-                    return {chr(65 + i): option for i, option in enumerate(parsed)}
-                return parsed
-            except json.JSONDecodeError:
-                return {}
-        elif isinstance(self.options, list):
-            # Convert array to dict with letter keys
-            return {chr(65 + i): option for i, option in enumerate(self.options)}
-        return self.options or {}
+        return dict(self.get_option_items())
     
     def get_options_list(self):
         """
-        Get options as list, handling both array and dictionary formats.
-        Returns a list of options.
+        Get option texts as a list, in display order.
         """
-        if isinstance(self.options, str):
-            try:
-                parsed = json.loads(self.options)
-                if isinstance(parsed, dict):
-                    # Convert dict to ordered list
-                    return [parsed.get(chr(65 + i), '') for i in range(len(parsed))]
-                return parsed
-            except json.JSONDecodeError:
-                return []
-        elif isinstance(self.options, dict):
-            # Convert dict to ordered list
-            return [self.options.get(chr(65 + i), '') for i in range(len(self.options))]
-        return self.options or []
+        return [text for _, text in self.get_option_items()]
+
+    def sync_option_rows(self):
+        """
+        Rewrite this MCQ's ``MCQOption`` rows if they differ from ``options``.
+        Returns True when rows were written.
+        """
+        wanted = option_rows(self.pk, canonical_options(self.options), self.correct_answer)
+        fields = ('letter', 'text', 'is_correct', 'order')
+        existing = list(MCQOption.objects.filter(mcq_id=self.pk).values(*fields))
+        if existing == [{field: row[field] for field in fields} for row in wanted]:
+            return False
+        MCQOption.objects.filter(mcq_id=self.pk).delete()
+        MCQOption.objects.bulk_create([MCQOption(**row) for row in wanted])
+        getattr(self, '_prefetched_objects_cache', {}).pop('option_rows', None)
+        return True
     
     @property
     def has_explanation(self):
@@ -333,12 +402,8 @@ class MCQ(models.Model):
         if not self.correct_answer:
             return False
         
-        # Check if options exist
-        if not self.options:
-            return False
-        
         # Check if correct_answer is in the options
-        return self.correct_answer in self.options
+        return self.correct_answer in self.get_options_dict()
     
     def get_answer_display(self):
         """Get a display-friendly version of the correct answer."""
@@ -347,12 +412,167 @@ class MCQ(models.Model):
         
         if self.has_valid_answer() and self.options:
             # Return the answer letter with its text
-            return f"{self.correct_answer}. {self.options.get(self.correct_answer, '')}"
+            return f"{self.correct_answer}. {self.get_options_dict().get(self.correct_answer, '')}"
         else:
             # Just return the answer letter/value
             return f"{self.correct_answer} (Invalid - not in options)"
 
 
+class MCQOption(models.Model):
+    """
+    One answer option of an MCQ, in display order.
+
+    Mirrors the canonical ``MCQ.options`` dict so options can be prefetched in
+    bulk, filtered by text and joined on correctness without decoding JSON.
+    Kept in step by ``MCQ.sync_option_rows`` on save; run
+    ``sync_mcq_options`` after bulk writes that bypass ``save()``.
+    """
+    mcq = models.ForeignKey(
+        MCQ,
+        on_delete=models.CASCADE,
+        related_name='option_rows',
+        help_text=_("The MCQ this option belongs to")
+    )
+    letter = models.CharField(
+        max_length=10,
+        help_text=_("Option letter, e.g. 'A'")
+    )
+    text = models.TextField(
+        help_text=_("Option text")
+    )
+    is_correct = models.BooleanField(
+        default=False,
+        help_text=_("Whether the MCQ's correct answer names this option")
+    )
+    order = models.PositiveSmallIntegerField(
+        default=0,
+        help_text=_("Display position, starting at 0")
+    )
+
+    class Meta:
+        ordering = ['mcq', 'order']
+        constraints = [
+            models.UniqueConstraint(fields=['mcq', 'letter'], name='mcq_option_unique_letter'),
+        ]
+        indexes = [
+            # Search matches option text with icontains; PostgreSQL only
+            trigram_index('text', name='mcq_mcqoption_text_trgm'),
+        ]
+        verbose_name = _("MCQ Option")
+        verbose_name_plural = _("MCQ Options")
+
+    def __str__(self):
+        return f"{self.letter}. {self.text[:50]}"
+
+
+class MCQSignature(models.Model):
+    """
+    MinHash signature of an MCQ's normalised stem and options, used for
+    near-duplicate detection (see ``mcq.services.near_duplicates``).
+    """
+    mcq = models.OneToOneField(
+        MCQ,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        help_text=_("The MCQ this signature describes")
+    )
+    text_hash = models.CharField(
+        max_length=40,
+        help_text=_("SHA-1 of the normalised text; the signature is only recomputed when it changes")
+    )
+    minhash = models.BinaryField(
+        help_text=_("128 uint32 MinHash values")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text=_("When the signature was last computed")
+    )
+
+    class Meta:
+        verbose_name = _("MCQ Signature")
+        verbose_name_plural = _("MCQ Signatures")
+
+    def __str__(self):
+        return f"Signature for MCQ {self.mcq_id}"
+
+
+class MCQSignatureBand(models.Model):
+    """
+    One locality-sensitive-hashing bucket key per signature band. MCQs that
+    share any key are near-duplicate candidates.
+    """
+    mcq = models.ForeignKey(
+        MCQ,
+        on_delete=models.CASCADE,
+        related_name='signature_bands',
+        help_text=_("The MCQ this bucket key belongs to")
+    )
+    key = models.BigIntegerField(
+        db_index=True,  # Candidate lookups filter on key
+        help_text=_("Hash of one band of the MinHash signature (band number mixed in)")
+    )
+
+    class Meta:
+        verbose_name = _("MCQ Signature Band")
+        verbose_name_plural = _("MCQ Signature Bands")
+
+    def __str__(self):
+        return f"Band key {self.key} for MCQ {self.mcq_id}"
+
+
+class MCQEmbedding(models.Model):
+    """
+    Embedding vector for an MCQ (stem and options) or for one of its
+    explanation sections, used for related-question search and AI context
+    retrieval (see ``mcq.services.embeddings``). The database row is the
+    source of truth; the memory-mapped search index is rebuilt from it.
+    """
+    QUESTION = ''
+
+    mcq = models.ForeignKey(
+        MCQ,
+        on_delete=models.CASCADE,
+        related_name='embeddings',
+        help_text=_("The MCQ this vector describes")
+    )
+    section = models.CharField(
+        max_length=50,
+        blank=True,
+        default=QUESTION,
+        help_text=_("Explanation section key, or blank for the question itself")
+    )
+    embedder = models.CharField(
+        max_length=100,
+        help_text=_("Key of the embedder (model and dimension) that produced the vector")
+    )
+    text_hash = models.CharField(
+        max_length=40,
+        help_text=_("SHA-1 of the embedded text; the vector is only recomputed when it changes")
+    )
+    vector = models.BinaryField(
+        help_text=_("L2-normalised float32 vector")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text=_("When the vector was last computed")
+    )
+
+    class Meta:
+        verbose_name = _("MCQ Embedding")
+        verbose_name_plural = _("MCQ Embeddings")
+        constraints = [
+            models.UniqueConstraint(fields=['mcq', 'section', 'embedder'], name='unique_mcq_embedding'),
+        ]
+        indexes = [
+            # Incremental index refreshes read rows changed since the last build
+            models.Index(fields=['embedder', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"Embedding for MCQ {self.mcq_id} {self.section or 'question'}"
+
+
 class UserMCQInteraction(models.Model):
     """
     Abstract base class for user interactions with MCQs.
@@ -395,7 +615,8 @@ class Bookmark(UserMCQInteraction):
 class Flashcard(UserMCQInteraction):
     """
     Implements spaced repetition system for MCQs.
-    Includes scheduling algorithm based on SuperMemo-2.
+    Scheduling is delegated to ``mcq.services.spaced_repetition`` (SM-2 or
+    FSRS, chosen per user); every review is appended to ``FlashcardReview``.
     """
     interval = models.IntegerField(
         default=1,
@@ -416,6 +637,24 @@ class Flashcard(UserMCQInteraction):
         default=2.5,
         help_text=_("Spaced repetition ease factor (higher means easier to remember)")
     )
+    stability = models.FloatField(
+        null=True,
+        blank=True,
+        help_text=_("FSRS memory stability in days (null until the first FSRS review)")
+    )
+    difficulty = models.FloatField(
+        null=True,
+        blank=True,
+        help_text=_("FSRS difficulty between 1 and 10 (null until the first FSRS review)")
+    )
+    repetitions = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Number of completed reviews")
+    )
+    lapses = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Number of reviews that were forgotten")
+    )
     
     class Meta(UserMCQInteraction.Meta):
         verbose_name = _("Flashcard")
@@ -427,28 +666,92 @@ class Flashcard(UserMCQInteraction):
     def __str__(self):
         return f"{self.user.username} - {self.mcq.question_number or self.mcq.id}"
     
-    def schedule_next_review(self, quality):
+    def schedule_next_review(self, quality, save=True):
         """
         Schedule the next review based on performance quality (0-5).
         Implements the SuperMemo-2 algorithm for spaced repetition.
         
         Args:
             quality (int): Rating of recall quality from 0 (complete blackout) to 5 (perfect recall)
+            save (bool): Persist the scheduling fields; pass False when the
+                caller batches updates with ``bulk_update``.
         """
-        # Update ease factor based on performance
-        self.ease_factor = max(1.3, self.ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)))
-        
-        # If quality < 3 (user didn't remember), reset interval to 1
-        if quality < 3:
-            self.interval = 1
-        elif self.interval == 1:
-            self.interval = 6  # First successful review: set to 6 days
-        else:
-            self.interval = round(self.interval * self.ease_factor)
-        
-        self.last_reviewed = timezone.now()
-        self.next_review = timezone.now() + timezone.timedelta(days=self.interval)
-        self.save()
+        from .services.spaced_repetition import CardState, SM2Scheduler
+
+        state = SM2Scheduler().review_quality(CardState.from_flashcard(self), quality, timezone.now())
+        state.apply_to(self)
+        if save:
+            self.save(update_fields=list(CardState.FIELDS))
+
+
+class FlashcardReview(models.Model):
+    """
+    Append-only log of flashcard reviews.
+    One row per graded card; rows are never updated, which keeps a full
+    history for fitting per-user scheduler parameters.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='flashcard_reviews',
+        help_text=_("User who reviewed the flashcard")
+    )
+    flashcard = models.ForeignKey(
+        Flashcard,
+        on_delete=models.CASCADE,
+        related_name='reviews',
+        help_text=_("The reviewed flashcard")
+    )
+    rating = models.PositiveSmallIntegerField(
+        help_text=_("Review rating: 1 Again, 2 Hard, 3 Good, 4 Easy")
+    )
+    algorithm = models.CharField(
+        max_length=10,
+        help_text=_("Scheduler that produced the new interval")
+    )
+    reviewed_at = models.DateTimeField(
+        default=timezone.now,
+        help_text=_("When the review happened")
+    )
+    elapsed_days = models.FloatField(
+        default=0,
+        help_text=_("Days since the previous review")
+    )
+    previous_interval = models.IntegerField(
+        help_text=_("Interval in days before this review")
+    )
+    interval = models.IntegerField(
+        help_text=_("Interval in days after this review")
+    )
+    ease_factor = models.FloatField(
+        help_text=_("SM-2 ease factor after this review")
+    )
+    stability = models.FloatField(
+        null=True,
+        blank=True,
+        help_text=_("FSRS stability after this review")
+    )
+    difficulty = models.FloatField(
+        null=True,
+        blank=True,
+        help_text=_("FSRS difficulty after this review")
+    )
+
+    class Meta:
+        verbose_name = _("Flashcard Review")
+        verbose_name_plural = _("Flashcard Reviews")
+        ordering = ['-reviewed_at']
+        indexes = [
+            models.Index(fields=['user', 'reviewed_at']),  # For review history and parameter fitting
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - flashcard {self.flashcard_id} rated {self.rating}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Flashcard reviews are append-only")
+        super().save(*args, **kwargs)
 
 
 class Note(UserMCQInteraction):
@@ -579,6 +882,15 @@ class CognitiveReasoningSession(models.Model):
         (FAILED, _('Failed')),
     ]
     
+    # Which tier produced the stored guidance
+    TIER_HEURISTIC = 'heuristic'  # Instant rule-based analysis, may be upgraded
+    TIER_MODEL = 'model'  # Model analysis (fresh or from the result cache)
+    
+    TIER_CHOICES = [
+        (TIER_HEURISTIC, _('Heuristic')),
+        (TIER_MODEL, _('Model')),
+    ]
+    
     user = models.ForeignKey(
         User, 
         on_delete=models.CASCADE,
@@ -650,6 +962,13 @@ class CognitiveReasoningSession(models.Model):
         default=0,
         help_text=_("Current step in the guidance process")
     )
+    analysis_tier = models.CharField(
+        max_length=20,
+        choices=TIER_CHOICES,
+        blank=True,
+        default='',
+        help_text=_("Tier that produced the current guidance")
+    )
     
     # Session management
     status = models.CharField(
@@ -888,6 +1207,41 @@ class IncorrectAnswer(UserMCQInteraction):
         return f"{self.user.username} - {self.mcq.id} - {self.selected_answer} - {self.created_at.strftime('%Y-%m-%d')}"
 
 
+class UserMastery(models.Model):
+    """
+    Compact per-user mastery estimates used by the adaptive question selector.
+    ``vector`` holds a float32 array with one (successes, failures, last seen
+    day) row per topic key in ``topics``; see ``mcq.services.adaptive_selector``.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mastery',
+        help_text=_("User these estimates belong to")
+    )
+    topics = models.JSONField(
+        default=list,
+        blank=True,
+        help_text=_("Topic keys (sub:<subspecialty> / cat:<primary category>) in vector row order")
+    )
+    vector = models.BinaryField(
+        default=bytes,
+        blank=True,
+        help_text=_("float32 mastery rows aligned with topics")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text=_("When the estimates were last updated")
+    )
+
+    class Meta:
+        verbose_name = _("User Mastery")
+        verbose_name_plural = _("User Mastery")
+
+    def __str__(self):
+        return f"Mastery for user {self.user_id} ({len(self.topics)} topics)"
+
+
 class UserProfile(models.Model):
     """
     Extends the User model with additional fields for user management.
@@ -918,6 +1272,19 @@ class UserProfile(models.Model):
         help_text=_("Admin who created this user account")
     )
     
+    # Flashcard scheduling preferences
+    flashcard_scheduler = models.CharField(
+        max_length=10,
+        choices=ALGORITHM_CHOICES,
+        default=SM2,
+        help_text=_("Spaced repetition algorithm used for this user's flashcards")
+    )
+    flashcard_parameters = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text=_("Scheduler tuning: desired_retention, maximum_interval and FSRS weights")
+    )
+    
     class Meta:
         verbose_name = _("User Profile")
         verbose_name_plural = _("User Profiles")
@@ -1052,6 +1419,62 @@ def create_user_profile(sender, instance, created, **kwargs):
         )
 
 
+@receiver(post_save, sender=MCQ)
+@receiver(post_delete, sender=MCQ)
+def refresh_adaptive_candidates(sender, instance, created=False, update_fields=None, **kwargs):
+    """Rebuild the adaptive selector's candidate matrix after MCQ changes it uses."""
+    from .services.adaptive_selector import bump_candidate_version, candidate_fields_changed
+
+    if kwargs.get('signal') is post_save and not candidate_fields_changed(instance, created, update_fields):
+        return
+    bump_candidate_version()
+
+
+@receiver(post_save, sender=MCQ)
+@receiver(post_delete, sender=MCQ)
+def refresh_admin_filter_choices(sender, **kwargs):
+    """Drop the MCQ changelist's cached filter values after MCQ changes."""
+    from .admin_performance import invalidate_filter_choices
+
+    invalidate_filter_choices()
+
+
+@receiver(post_save, sender=MCQ)
+def refresh_mcq_option_rows(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the MCQOption rows in step with the canonical options."""
+    if raw:
+        return  # fixture loading; run `sync_mcq_options` afterwards
+    if update_fields is not None and not {'options', 'correct_answer'} & set(update_fields):
+        return
+    instance.sync_option_rows()
+
+
+@receiver(post_save, sender=MCQ)
+def refresh_mcq_embeddings(sender, instance, raw=False, **kwargs):
+    """Re-embed the MCQ (inline for local embedders, via Celery for remote ones)."""
+    if raw:
+        return  # fixture loading; run `build_embeddings --missing` afterwards
+    try:
+        from .services.embeddings import schedule_embedding_update
+
+        schedule_embedding_update(instance)
+    except Exception:
+        logger.exception("Could not update embeddings for MCQ %s", instance.pk)
+
+
+@receiver(post_save, sender=MCQ)
+def refresh_mcq_signature(sender, instance, raw=False, **kwargs):
+    """Keep the near-duplicate signature in step with the MCQ text."""
+    if raw:
+        return  # fixture loading; run `find_near_duplicates --rebuild` afterwards
+    try:
+        from .services.near_duplicates import update_signature
+
+        update_signature(instance)
+    except Exception:
+        logger.exception("Could not update signature for MCQ %s", instance.pk)
+
+
 # Case-Based Learning Models
 from django.contrib.auth.models import User
 
@@ -1121,8 +1544,10 @@ class PersistentCaseLearningSession(models.Model):
     critical_exam_missed = models.JSONField(default=list)
     missed_critical_steps = models.JSONField(default=list)
     
-    # Conversation history (limited to last 50 messages)
-    messages = models.JSONField(default=list)
+    # Conversation history lives in CaseMessage (one row per message);
+    # rolling summary of turns no longer replayed verbatim to the model
+    conversation_summary = models.TextField(blank=True, default='')
+    summarized_message_count = models.IntegerField(default=0)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -1139,7 +1564,7 @@ class PersistentCaseLearningSession(models.Model):
     detailed_exam_areas = models.JSONField(default=list)
     patient_condition = models.CharField(max_length=50, default='stable')
     
-    # Message management
+    # Message management (total messages ever exchanged, including trimmed ones)
     message_count = models.IntegerField(default=0)
     last_cleanup = models.DateTimeField(null=True, blank=True)
     
@@ -1170,3 +1595,35 @@ class PersistentCaseLearningSession(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.specialty} - {self.created_at}"
+
+
+class CaseMessage(models.Model):
+    """
+    One message of an AI case conversation.
+
+    Rows are only ever inserted, so a chat turn costs one small INSERT no
+    matter how long the case has run; recent history is read back through the
+    (session, seq) index.
+    """
+    session = models.ForeignKey(
+        PersistentCaseLearningSession, on_delete=models.CASCADE, related_name='case_messages'
+    )
+    seq = models.PositiveIntegerField(help_text=_("Position of the message within the session, from 0"))
+    role = models.CharField(max_length=16)
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['session', 'seq']
+        verbose_name = "Case Message"
+        verbose_name_plural = "Case Messages"
+        constraints = [
+            # Also the index behind "last K messages of a session" queries
+            models.UniqueConstraint(fields=['session', 'seq'], name='unique_case_message_seq'),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} #{self.seq} ({self.role})"
+
+    def as_chat(self):
+        return {"role": self.role, "content": self.content}
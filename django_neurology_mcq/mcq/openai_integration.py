@@ -12,12 +12,18 @@ import difflib
 import time
 import subprocess
 import shutil
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 from functools import lru_cache
+from types import SimpleNamespace
 from typing import Optional, Tuple, Dict, Any, Union, List, Sequence
 import time
 import re
 
+from .services import instrumentation
+from .option_utils import parse_options
+
 
 try:
     from openai.types.responses.response_create_params import ResponseCreateParamsBase as _ResponseCreateParamsBase
@@ -254,6 +260,16 @@ def _build_explanation_agent_prompt(
         f"{mode}",
     ]
 
+    guideline_context = _guideline_prompt_context(mcq)
+    if guideline_context:
+        prompt_sections.extend(
+            [
+                "",
+                "### Guideline Excerpts (verbatim, from the local guideline library)",
+                guideline_context,
+            ]
+        )
+
     if explanation_reference:
         prompt_sections.extend(
             [
@@ -281,6 +297,7 @@ def _build_explanation_agent_prompt(
             "- Use concise markdown headings (###) for major sections.",
             "- Incorporate pathophysiology, distinguishing features, and management pearls with citations.",
             "- Mention diagnostic criteria and staging when relevant, confirming the latest update if referenced.",
+            "- Quote guideline excerpts only as given above; never invent quotations.",
         ]
     )
 
@@ -803,6 +820,23 @@ def _default_tool_resources() -> Optional[Dict[str, Any]]:
     return {"file_search": {"vector_store_ids": [VECTOR_STORE_ID]}}
 
 
+def _guideline_prompt_context(mcq) -> str:
+    """
+    Exact guideline sentences for ``mcq`` from the local BM25 guideline index,
+    one "- " line each; empty when no index is built or nothing matches.
+    When this is non-empty, prompts are grounded without the remote vector store.
+    """
+    try:
+        from .guideline_context import guideline_index_quotes
+
+        options = mcq.get_options_dict() if hasattr(mcq, 'get_options_dict') else {}
+        quotes = guideline_index_quotes(getattr(mcq, 'question_text', '') or '', list(options.values()))
+    except Exception as e:
+        logger.warning(f"Guideline context retrieval failed: {e}")
+        return ""
+    return "\n".join(f"- {quote}" for quote in quotes)
+
+
 def _extract_response_text(response: Any) -> str:
     """
     Extract plain text from a Responses API call, handling both text blocks and JSON schema outputs.
@@ -1016,6 +1050,81 @@ def _select_chat_model(preferred: str) -> str:
     return DEFAULT_MODEL
 
 
+# Streaming
+# ---------
+# While a delta sink is installed with ``streaming_to``, chat_completion and
+# _responses_create request streamed responses, pass every text delta to the
+# sink and return a response object assembled from the stream. Callers keep
+# their post-processing unchanged; the sink (mcq.services.ai_stream) forwards
+# the deltas to the browser as they arrive.
+_delta_sink: ContextVar[Optional[Any]] = ContextVar("openai_delta_sink", default=None)
+
+
+@contextmanager
+def streaming_to(sink: Any):
+    """
+    Stream the completions made inside the block to ``sink``.
+
+    ``sink.begin()`` is called when a streamed call starts (a retry starts a
+    new answer) and ``sink.delta(text)`` for each text fragment.
+    """
+    token = _delta_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _delta_sink.reset(token)
+
+
+def _active_sink() -> Optional[Any]:
+    return _delta_sink.get()
+
+
+def _streamed_chat_response(model: str, text: str, finish_reason: Optional[str], usage: Any) -> Any:
+    """A ChatCompletion-shaped object for text assembled from a stream."""
+    message = SimpleNamespace(role="assistant", content=text, refusal=None)
+    choice = SimpleNamespace(index=0, message=message, finish_reason=finish_reason)
+    return SimpleNamespace(model=model, choices=[choice], usage=usage)
+
+
+def _stream_chat_completion(api_client: Any, sink: Any, model: str, messages: Sequence[Dict[str, Any]], **kwargs: Any) -> Any:
+    kwargs.setdefault("stream_options", {"include_usage": True})
+    with instrumentation.llm_call(model) as call:
+        stream = api_client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+        sink.begin()
+        parts: List[str] = []
+        finish_reason = None
+        usage = None
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            choices = getattr(chunk, "choices", None) or []
+            if not choices:
+                continue
+            finish_reason = getattr(choices[0], "finish_reason", None) or finish_reason
+            delta = getattr(getattr(choices[0], "delta", None), "content", None)
+            if delta:
+                parts.append(delta)
+                sink.delta(delta)
+        call.response = _streamed_chat_response(model, "".join(parts), finish_reason, usage)
+    return call.response
+
+
+def _stream_responses_create(sink: Any, payload: Dict[str, Any]) -> Any:
+    with instrumentation.llm_call(payload.get("model")) as call:
+        stream = client.responses.create(stream=True, **payload)
+        sink.begin()
+        for event in stream:
+            event_type = getattr(event, "type", "")
+            if event_type == "response.output_text.delta":
+                delta = getattr(event, "delta", "")
+                if delta:
+                    sink.delta(delta)
+            elif event_type == "response.completed":
+                call.response = getattr(event, "response", None)
+            elif event_type in ("response.failed", "error"):
+                raise RuntimeError(f"Responses stream failed: {getattr(event, 'message', None) or event_type}")
+    return call.response
+
+
 def _responses_create(
     model: str,
     input_items: Sequence[Dict[str, Any]],
@@ -1155,7 +1264,12 @@ def _responses_create(
             responses_payload["input"] = list(responses_payload["input"])
             responses_payload.update(responses_kwargs)
             logger.info(f"Calling Responses API with model: {model}")
-            response = client.responses.create(**responses_payload)
+            sink = _active_sink()
+            if sink is not None:
+                response = _stream_responses_create(sink, responses_payload)
+            else:
+                with instrumentation.llm_call(responses_payload.get("model", model)) as call:
+                    response = call.response = client.responses.create(**responses_payload)
             if response is None:
                 raise RuntimeError("Responses API returned None")
 
@@ -1241,11 +1355,16 @@ def _responses_create(
 
     logger.info(f"Calling chat completions API with model: {chat_model}")
     try:
-        response = client.chat.completions.create(
-            model=chat_model,
-            messages=messages,
-            **chat_kwargs
-        )
+        sink = _active_sink()
+        if sink is not None:
+            response = _stream_chat_completion(client, sink, chat_model, messages, **chat_kwargs)
+        else:
+            with instrumentation.llm_call(chat_model) as call:
+                response = call.response = client.chat.completions.create(
+                    model=chat_model,
+                    messages=messages,
+                    **chat_kwargs
+                )
         # Verify the response is valid before returning
         if response is None:
             raise RuntimeError("Chat completions API returned None")
@@ -1463,30 +1582,13 @@ def format_options_text(mcq) -> str:
     Returns:
         str: Formatted string with options in "{option}. {text}" format
     """
-    options_text = ""
-    options_dict = {}
-    
-    # Handle different MCQ object structures
-    if hasattr(mcq, 'get_options_dict') and callable(getattr(mcq, 'get_options_dict')):
-        # If the MCQ has a method to get options as a dict, use it
-        options_dict = mcq.get_options_dict()
-    elif hasattr(mcq, 'options'):
-        # Handle string-formatted options (JSON string)
-        if isinstance(mcq.options, str):
-            try:
-                options_dict = json.loads(mcq.options)
-            except json.JSONDecodeError:
-                # If parsing fails, use the string directly
-                return mcq.options
-        # Handle dictionary-formatted options (JSON field)
-        elif isinstance(mcq.options, dict):
-            options_dict = mcq.options
-    
-    # Generate formatted options text
-    for option, text in options_dict.items():
-        options_text += f"{option}. {text}\n"
-    
-    return options_text
+    if hasattr(mcq, 'get_option_items') and callable(getattr(mcq, 'get_option_items')):
+        items = mcq.get_option_items()
+    else:
+        # Duck-typed MCQ-like objects (e.g. dicts wrapped by callers)
+        items = parse_options(getattr(mcq, 'options', None))
+
+    return "".join(f"{option}. {text}\n" for option, text in items)
 
 def generate_explanation(mcq, reason: str = '') -> str:
     """
@@ -1565,6 +1667,14 @@ D. {option_d}
         prompt += f"""
 Correct answer: {getattr(mcq, 'correct_answer', '?')}
 
+"""
+
+        guideline_context = _guideline_prompt_context(mcq)
+        if guideline_context:
+            prompt += f"""## GUIDELINE EXCERPTS
+Verbatim sentences from the local guideline library. Cite them exactly when relevant; do not invent other quotations.
+{guideline_context}
+
 """
 
         # Add specific focus if reason is provided
@@ -2399,6 +2509,24 @@ Without API access, we can confirm that option {correct_answer} is marked as the
         logger.error(f"Unexpected error in verify_mcq_answer: {str(e)}")
         return f"Error verifying answer: {str(e)}"
 
+def _related_bank_context(mcq, question: str) -> str:
+    """Explanation excerpts from similar MCQs, retrieved from the local embedding index."""
+    from django.conf import settings
+
+    limit = getattr(settings, "EMBEDDING_CONTEXT_SECTIONS", 3)
+    if not limit:
+        return ""
+    try:
+        from .services.embeddings import format_context, retrieve_context
+
+        query = f"{getattr(mcq, 'question_text', '') or ''}\n{question}"
+        exclude = [mcq.id] if getattr(mcq, 'id', None) else []
+        return format_context(retrieve_context(query, k=limit, exclude_mcq_ids=exclude))
+    except Exception as e:
+        logger.warning(f"Local context retrieval failed: {e}")
+        return ""
+
+
 def answer_question_about_mcq(mcq, question: str) -> str:
     """
     Answer a specific question about an MCQ using OpenAI with educational focus.
@@ -2490,6 +2618,9 @@ Please structure your answer with clear sections and proper formatting for reada
 
 Note that my question might not be directly related to the MCQ content, but you should still answer with appropriate context.
 """
+        related_context = _related_bank_context(mcq, question)
+        if related_context:
+            user_prompt += f"\n{related_context}\n"
         
         # Define API parameters - tuned for Heroku 30s limit
         model = DEFAULT_MODEL
@@ -3572,6 +3703,14 @@ LEARNER'S REASONING: {user_reasoning}
 - Use proper spacing between sections for readability
 
 Maintain a supportive, non-judgmental tone throughout your response. Focus on building stronger clinical reasoning rather than simply correcting the error.
+"""
+
+        guideline_context = _guideline_prompt_context(mcq)
+        if guideline_context:
+            prompt += f"""
+## GUIDELINE EXCERPTS
+Verbatim sentences from the local guideline library. Quote them exactly where they support the reasoning; do not invent other quotations.
+{guideline_context}
 """
         
         # Define API parameters
@@ -4726,6 +4865,13 @@ def ai_edit_explanation_text(
         else:
             prompt_sections.append("No existing explanation is available. Craft a full explanation from scratch.")
 
+        guideline_context = _guideline_prompt_context(mcq)
+        if guideline_context:
+            prompt_sections.append(
+                "Guideline excerpts (verbatim from the local guideline library; quote exactly, never invent quotations):\n"
+                + guideline_context
+            )
+
         guidance_lines = [
             "Write a single unified explanation suitable for a physician preparing for board exams.",
             "Use short markdown headings (### Heading) to break up major ideas.",
@@ -4800,7 +4946,8 @@ def ai_edit_explanation_text(
                     max_output_tokens=1400,
                     temperature=0.35,
                     top_p=0.9,
-                    use_vector=True,
+                    # Local guideline excerpts replace the remote file_search tool when available
+                    use_vector=not guideline_context,
                 )
             except Exception as api_error:
                 should_retry, message, status = _classify_openai_error(api_error)
@@ -4894,8 +5041,13 @@ def chat_completion(api_client, model, messages, **kwargs):
     if str(model).startswith('gpt-5'):
         for noisy_param in ('temperature', 'top_p', 'frequency_penalty', 'presence_penalty'):
             kwargs.pop(noisy_param, None)
-    return api_client.chat.completions.create(
-        model=model,
-        messages=messages,
-        **kwargs,
-    )
+    sink = _active_sink()
+    if sink is not None:
+        return _stream_chat_completion(api_client, sink, model, messages, **kwargs)
+    with instrumentation.llm_call(model) as call:
+        call.response = api_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **kwargs,
+        )
+    return call.response
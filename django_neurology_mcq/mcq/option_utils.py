@@ -0,0 +1,173 @@
+"""
+Helpers for MCQ answer options.
+
+Options have arrived in several shapes over the years: JSON strings, dicts
+keyed by letter, lists of strings and lists of ``{"letter", "text"}`` objects
+(the ``consolidated_mcqs`` files). The canonical form is an ordered dict of
+letter -> text stored in ``MCQ.options``, mirrored row by row in the
+``MCQOption`` table. :func:`parse_options` is the only place that knows the
+legacy shapes; everything else reads the canonical form.
+
+The functions here take model classes as arguments where they touch the
+database so that migrations can call them with historical models.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# Matches MCQOption.letter
+MAX_LETTER_LENGTH = 10
+_LETTER_KEYS = ("letter", "label", "key", "option")
+_TEXT_KEYS = ("text", "value", "content", "option_text")
+_ANSWER_SPLIT = re.compile(r"[\s,;/&]+|\band\b", re.IGNORECASE)
+
+
+def letter_for_index(index: int) -> str:
+    """Map an index to an option letter (A, B, ...)."""
+    if index < len(LETTERS):
+        return LETTERS[index]
+    return f"Option {index + 1}"
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        for key in _TEXT_KEYS:
+            if key in value:
+                return _text(value[key])
+        return ""
+    return str(value)
+
+
+def _unique_letters(pairs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Give every option a distinct letter (at most ``MAX_LETTER_LENGTH`` long).
+
+    Imported lists sometimes repeat a letter or leave it blank; those options
+    take the next free letter instead of overwriting an earlier one.
+    """
+    used = {letter[:MAX_LETTER_LENGTH] for letter, _text in pairs if letter}
+    seen: Set[str] = set()
+    unique = []
+    for index, (letter, text) in enumerate(pairs):
+        letter = letter[:MAX_LETTER_LENGTH]
+        if not letter or letter in seen:
+            candidate = index
+            while letter_for_index(candidate) in used:
+                candidate += 1
+            letter = letter_for_index(candidate)
+            used.add(letter)
+        seen.add(letter)
+        unique.append((letter, text))
+    return unique
+
+
+def parse_options(raw: Any) -> List[Tuple[str, str]]:
+    """Ordered ``(letter, text)`` pairs with distinct letters from any stored options shape."""
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except (TypeError, ValueError):
+            return []
+        if isinstance(raw, str):
+            return []
+
+    if isinstance(raw, dict):
+        return _unique_letters([(str(letter).strip(), _text(text)) for letter, text in raw.items()])
+
+    if isinstance(raw, (list, tuple)):
+        pairs = []
+        for index, item in enumerate(raw):
+            letter = ""
+            if isinstance(item, dict):
+                for key in _LETTER_KEYS:
+                    if item.get(key) not in (None, ""):
+                        letter = str(item[key]).strip()
+                        break
+            pairs.append((letter, _text(item)))
+        return _unique_letters(pairs)
+
+    return []
+
+
+def is_canonical(raw: Any) -> bool:
+    """True for a dict of short, stripped string letters to string texts (the stored form)."""
+    return isinstance(raw, dict) and all(
+        isinstance(letter, str) and isinstance(text, str)
+        and letter and letter == letter.strip() and len(letter) <= MAX_LETTER_LENGTH
+        for letter, text in raw.items()
+    )
+
+
+def canonical_options(raw: Any) -> Dict[str, str]:
+    """The canonical letter -> text dict for ``raw`` (returned as is when already canonical)."""
+    if is_canonical(raw):
+        return raw
+    return dict(parse_options(raw))
+
+
+def correct_letters(correct_answer: str) -> Set[str]:
+    """Letters named by a correct-answer field such as ``"B"`` or ``"A, C"``."""
+    return {part.strip().upper() for part in _ANSWER_SPLIT.split(correct_answer or "") if part.strip()}
+
+
+def option_rows(mcq_id: int, options: Dict[str, str], correct_answer: str) -> List[Dict[str, Any]]:
+    """Field values for the ``MCQOption`` rows of one MCQ."""
+    correct = correct_letters(correct_answer)
+    return [
+        {
+            "mcq_id": mcq_id,
+            "letter": letter,
+            "text": text,
+            "is_correct": letter.upper() in correct,
+            "order": order,
+        }
+        for order, (letter, text) in enumerate(options.items())
+    ]
+
+
+def rebuild_option_rows(mcq_model, option_model, mcq_ids: Iterable[int] = None, batch_size: int = 500) -> Tuple[int, int]:
+    """
+    Canonicalise ``MCQ.options`` and rewrite ``MCQOption`` rows in batches.
+
+    Returns ``(mcqs_rewritten, rows_written)``; MCQs whose stored JSON is already
+    canonical are not updated.
+    """
+    queryset = mcq_model.objects.order_by("pk").only("pk", "options", "correct_answer")
+    if mcq_ids is not None:
+        queryset = queryset.filter(pk__in=list(mcq_ids))
+
+    rewritten = written = 0
+    batch = []
+
+    def flush():
+        nonlocal written
+        if not batch:
+            return
+        ids = [mcq.pk for mcq in batch]
+        option_model.objects.filter(mcq_id__in=ids).delete()
+        rows = [
+            option_model(**row)
+            for mcq in batch
+            for row in option_rows(mcq.pk, canonical_options(mcq.options), mcq.correct_answer)
+        ]
+        option_model.objects.bulk_create(rows, batch_size=batch_size)
+        written += len(rows)
+        batch.clear()
+
+    for mcq in queryset.iterator(chunk_size=batch_size):
+        if not is_canonical(mcq.options):
+            mcq_model.objects.filter(pk=mcq.pk).update(options=canonical_options(mcq.options))
+            rewritten += 1
+        batch.append(mcq)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return rewritten, written
@@ -20,6 +20,7 @@ __all__ = [
     "CaseTurnResult",
     "CaseStartResult",
     "case_learning_service",
+    "TranscriptionService",
 ]
 
 
@@ -54,6 +55,9 @@ def __getattr__(name):  # pragma: no cover - thin import shim
     if name == "CaseStartResult":
         from .case_learning_service import CaseStartResult
         return CaseStartResult
+    if name == "TranscriptionService":
+        from .transcription_service import TranscriptionService
+        return TranscriptionService
     if name == "case_learning_service":
         module = import_module('django_neurology_mcq.mcq.services.case_learning_service')
         return module.case_learning_service
@@ -0,0 +1,465 @@
+"""Adaptive question selection driven by per-user topic mastery.
+
+Every MCQ belongs to up to two *topics*: its subspecialty and, when set, its
+primary category. For each user we keep a small mastery vector – one row of
+``(successes, failures, last_seen_day)`` per topic – persisted as a float32
+array on :class:`~mcq.models.UserMastery`. Evidence decays with a half-life so
+old answers count less than recent ones.
+
+Selection works on a process-wide *candidate matrix*: the sorted MCQ ids and
+the topic index of each MCQ, built with one query. Saving an MCQ with a new
+subspecialty, category or source, or deleting one, marks every process's
+matrix stale; a stale matrix keeps serving while a background thread rebuilds
+it, so only a process's very first selection waits for the query. Choosing
+the next question is a handful of NumPy operations over that matrix:
+
+1. Thompson-sample a recall probability for every topic from
+   ``Beta(successes + 1, failures + 1)``;
+2. score each MCQ by how weak its topics are (``1 - sample``);
+3. boost unresolved incorrect answers, mask hidden/recent MCQs and take the
+   arg-max (or top-k).
+
+Sampling instead of using the mean keeps rarely-seen topics in rotation
+without a separate exploration rule. A new user's vector is seeded from the
+history the app already stores (incorrect answers, flashcard reviews and
+cognitive reasoning sessions).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_VERSION_KEY = "adaptive:candidates:version"
+DEFAULT_CANDIDATE_MAX_AGE = 600
+DEFAULT_HALF_LIFE_DAYS = 60.0
+CATEGORY_WEIGHT = 0.5
+WEAKNESS_BONUS = 0.35
+TEMP_SOURCE_PREFIX = "TEMP_WEAKNESS_TEST_"
+
+SUCCESS, FAILURE, LAST_SEEN = 0, 1, 2
+_ROW_WIDTH = 3
+
+
+def subspecialty_topic(value: Optional[str]) -> Optional[str]:
+    return f"sub:{value}" if value else None
+
+
+def category_topic(value: Optional[str]) -> Optional[str]:
+    return f"cat:{value}" if value else None
+
+
+def topic_label(key: str) -> str:
+    return key.split(":", 1)[1]
+
+
+def _today() -> float:
+    return time.time() / 86400.0
+
+
+# ---------------------------------------------------------------------------
+# Candidate matrix
+# ---------------------------------------------------------------------------
+
+@dataclass
+class CandidateMatrix:
+    """Sorted MCQ ids with the topic indices of each question.
+
+    ``topics[:, 0]`` is the subspecialty index and ``topics[:, 1]`` the primary
+    category index; a missing topic points at the sentinel slot
+    ``len(topic_keys)``.
+    """
+
+    ids: np.ndarray
+    topics: np.ndarray
+    topic_keys: List[str]
+    topic_index: Dict[str, int]
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[int, Optional[str], Optional[str]]]) -> "CandidateMatrix":
+        topic_keys: List[str] = []
+        topic_index: Dict[str, int] = {}
+        ids: List[int] = []
+        pairs: List[Tuple[Optional[str], Optional[str]]] = []
+
+        for mcq_id, subspecialty, category in rows:
+            ids.append(mcq_id)
+            pair = (subspecialty_topic(subspecialty), category_topic(category))
+            pairs.append(pair)
+            for key in pair:
+                if key and key not in topic_index:
+                    topic_index[key] = len(topic_keys)
+                    topic_keys.append(key)
+
+        missing = len(topic_keys)
+        topics = np.array(
+            [[topic_index.get(sub, missing), topic_index.get(cat, missing)] for sub, cat in pairs],
+            dtype=np.int32,
+        ).reshape(-1, 2)
+        id_array = np.array(ids, dtype=np.int64)
+        order = np.argsort(id_array, kind="stable")
+        return cls(ids=id_array[order], topics=topics[order], topic_keys=topic_keys, topic_index=topic_index)
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    def positions(self, mcq_ids: Iterable[int]) -> np.ndarray:
+        """Row positions of the given ids; ids not in the matrix are dropped."""
+        wanted = np.fromiter((int(i) for i in mcq_ids), dtype=np.int64)
+        if not wanted.size or not len(self):
+            return np.empty(0, dtype=np.int64)
+        pos = np.searchsorted(self.ids, wanted)
+        pos = np.clip(pos, 0, len(self) - 1)
+        return pos[self.ids[pos] == wanted]
+
+    def topics_for(self, mcq_id: int) -> List[str]:
+        pos = self.positions([mcq_id])
+        if not pos.size:
+            return []
+        return [self.topic_keys[i] for i in self.topics[pos[0]] if i < len(self.topic_keys)]
+
+
+_matrix_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_matrix_state: Dict[str, object] = {"version": None, "built": 0.0, "matrix": None}
+
+
+def candidate_fields_changed(mcq, created: bool = False, update_fields=None) -> bool:
+    """Whether saving ``mcq`` can change the candidate matrix."""
+    if created:
+        return True
+    if update_fields is not None and not set(mcq.CANDIDATE_FIELDS) & set(update_fields):
+        return False
+    loaded = getattr(mcq, "_loaded_values", {})
+    return any(name not in loaded or loaded[name] != getattr(mcq, name) for name in mcq.CANDIDATE_FIELDS)
+
+
+def bump_candidate_version() -> None:
+    """Invalidate every process's candidate matrix (called on MCQ save/delete)."""
+    try:
+        cache.set(CANDIDATE_VERSION_KEY, time.time_ns(), timeout=None)
+    except Exception as exc:
+        logger.warning("Could not bump adaptive candidate version: %s", exc)
+
+
+def _candidate_version():
+    try:
+        return cache.get(CANDIDATE_VERSION_KEY)
+    except Exception:
+        return None
+
+
+def _load_candidate_rows():
+    from ..models import MCQ
+
+    return (
+        MCQ.objects.exclude(source_file__startswith=TEMP_SOURCE_PREFIX)
+        .order_by("id")
+        .values_list("id", "subspecialty", "primary_category")
+        .iterator(chunk_size=5000)
+    )
+
+
+def _build_candidate_matrix(version) -> CandidateMatrix:
+    started = time.monotonic()
+    matrix = CandidateMatrix.build(_load_candidate_rows())
+    _matrix_state.update(matrix=matrix, version=version, built=time.monotonic())
+    logger.info(
+        "Built adaptive candidate matrix: %s MCQs, %s topics in %.1fms",
+        len(matrix),
+        len(matrix.topic_keys),
+        (time.monotonic() - started) * 1000,
+    )
+    return matrix
+
+
+def rebuild_candidate_matrix(version=None) -> CandidateMatrix:
+    with _matrix_lock:
+        return _build_candidate_matrix(version)
+
+
+def _refresh_in_background(version) -> None:
+    def refresh():
+        try:
+            rebuild_candidate_matrix(version)
+        except Exception:
+            logger.exception("Could not rebuild the adaptive candidate matrix")
+        finally:
+            connections.close_all()
+            _refresh_lock.release()
+
+    # One rebuild per process at a time; later staleness is caught on the next read
+    if _refresh_lock.acquire(blocking=False):
+        try:
+            threading.Thread(target=refresh, name="adaptive-candidates", daemon=True).start()
+        except RuntimeError:
+            _refresh_lock.release()
+            raise
+
+
+def get_candidate_matrix() -> CandidateMatrix:
+    max_age = getattr(settings, "ADAPTIVE_CANDIDATE_MAX_AGE", DEFAULT_CANDIDATE_MAX_AGE)
+    version = _candidate_version()
+    state = _matrix_state
+    matrix = state["matrix"]
+    if matrix is None:
+        # Nothing to serve yet, so this first read has to wait for the build
+        with _matrix_lock:
+            matrix = state["matrix"]
+            return matrix if matrix is not None else _build_candidate_matrix(version)
+    if state["version"] != version or time.monotonic() - state["built"] >= max_age:
+        # Serve the stale matrix rather than make this request wait for the query
+        _refresh_in_background(version)
+    return matrix
+
+
+def reset_candidate_matrix() -> None:
+    _matrix_state.update(version=None, built=0.0, matrix=None)
+
+
+# ---------------------------------------------------------------------------
+# Mastery vectors
+# ---------------------------------------------------------------------------
+
+@dataclass
+class MasteryVector:
+    topics: List[str]
+    values: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "MasteryVector":
+        return cls(topics=[], values=np.zeros((0, _ROW_WIDTH), dtype=np.float32))
+
+    @classmethod
+    def from_storage(cls, topics: Sequence[str], blob) -> "MasteryVector":
+        values = np.frombuffer(bytes(blob or b""), dtype=np.float32).reshape(-1, _ROW_WIDTH).copy()
+        topics = list(topics or [])
+        if values.shape[0] != len(topics):
+            logger.warning("Discarding malformed mastery vector (%s topics, %s rows)", len(topics), values.shape[0])
+            return cls.empty()
+        return cls(topics=topics, values=values)
+
+    def to_bytes(self) -> bytes:
+        return self.values.astype(np.float32).tobytes()
+
+    def _row(self, topic: str) -> int:
+        try:
+            return self.topics.index(topic)
+        except ValueError:
+            self.topics.append(topic)
+            self.values = np.vstack([self.values, np.zeros((1, _ROW_WIDTH), dtype=np.float32)])
+            return len(self.topics) - 1
+
+    def observe(self, topics: Iterable[str], correct: bool, day: Optional[float] = None,
+                half_life: float = DEFAULT_HALF_LIFE_DAYS) -> None:
+        day = _today() if day is None else day
+        for topic in topics:
+            row = self._row(topic)
+            last_seen = self.values[row, LAST_SEEN]
+            if last_seen and day > last_seen:
+                self.values[row, :LAST_SEEN] *= 0.5 ** ((day - last_seen) / half_life)
+            self.values[row, SUCCESS if correct else FAILURE] += 1.0
+            self.values[row, LAST_SEEN] = max(last_seen, day)
+
+    def beta_parameters(self, matrix: CandidateMatrix) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(alpha, beta)`` aligned with ``matrix.topic_keys`` plus the sentinel slot."""
+        size = len(matrix.topic_keys) + 1
+        alpha = np.ones(size, dtype=np.float64)
+        beta = np.ones(size, dtype=np.float64)
+        for row, topic in enumerate(self.topics):
+            index = matrix.topic_index.get(topic)
+            if index is not None:
+                alpha[index] += self.values[row, SUCCESS]
+                beta[index] += self.values[row, FAILURE]
+        return alpha, beta
+
+    def summary(self, limit: int = 5, min_attempts: float = 1.0) -> List[Dict[str, object]]:
+        """Weakest topics first, as ``{"topic", "kind", "mastery", "attempts"}`` dicts."""
+        if not self.topics:
+            return []
+        successes = self.values[:, SUCCESS]
+        attempts = successes + self.values[:, FAILURE]
+        mastery = (successes + 1.0) / (attempts + 2.0)
+        eligible = np.flatnonzero(attempts >= min_attempts)
+        ordered = eligible[np.argsort(mastery[eligible], kind="stable")][:limit]
+        return [
+            {
+                "topic": topic_label(self.topics[i]),
+                "kind": "subspecialty" if self.topics[i].startswith("sub:") else "category",
+                "mastery": round(float(mastery[i]) * 100),
+                "attempts": round(float(attempts[i]), 1),
+            }
+            for i in ordered
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Service
+# ---------------------------------------------------------------------------
+
+class AdaptiveSelector:
+    """Load, update and score against a user's mastery vector."""
+
+    @property
+    def half_life(self) -> float:
+        return float(getattr(settings, "ADAPTIVE_MASTERY_HALF_LIFE_DAYS", DEFAULT_HALF_LIFE_DAYS))
+
+    def _seed_from_history(self, user, matrix: CandidateMatrix) -> MasteryVector:
+        from ..models import CognitiveReasoningSession, FlashcardReview, IncorrectAnswer
+
+        vector = MasteryVector.empty()
+        history: List[Tuple[int, bool, object]] = []
+        history.extend(
+            (mcq_id, False, created)
+            for mcq_id, created in IncorrectAnswer.objects.filter(user=user).values_list("mcq_id", "created_at")
+        )
+        history.extend(
+            (mcq_id, rating > 1, reviewed)
+            for mcq_id, rating, reviewed in FlashcardReview.objects.filter(user=user)
+            .values_list("flashcard__mcq_id", "rating", "reviewed_at")
+        )
+        history.extend(
+            CognitiveReasoningSession.objects.filter(user=user).values_list("mcq_id", "is_correct", "created_at")
+        )
+        history.sort(key=lambda item: item[2])
+        for mcq_id, correct, when in history:
+            topics = matrix.topics_for(mcq_id)
+            if topics:
+                vector.observe(topics, bool(correct), day=when.timestamp() / 86400.0, half_life=self.half_life)
+        return vector
+
+    def load(self, user, matrix: Optional[CandidateMatrix] = None) -> Tuple[MasteryVector, bool]:
+        """Return ``(vector, stored)``; unsaved vectors are seeded from history."""
+        from ..models import UserMastery
+
+        row = UserMastery.objects.filter(user=user).values_list("topics", "vector").first()
+        if row is not None:
+            return MasteryVector.from_storage(*row), True
+        return self._seed_from_history(user, matrix or get_candidate_matrix()), False
+
+    @staticmethod
+    def save(user, vector: MasteryVector) -> None:
+        from ..models import UserMastery
+
+        UserMastery.objects.update_or_create(
+            user=user, defaults={"topics": vector.topics, "vector": vector.to_bytes()}
+        )
+
+    def record_answers(self, user, answers: Iterable[Tuple[int, bool]]) -> MasteryVector:
+        """Fold ``(mcq_id, is_correct)`` results into the user's vector and persist it.
+
+        The stored row is locked while it is updated, so answers submitted at
+        the same time (two tabs, an exam submit racing a practice answer) are
+        all kept.
+        """
+        from ..models import UserMastery
+
+        matrix = get_candidate_matrix()
+        observed = [(matrix.topics_for(mcq_id), bool(correct)) for mcq_id, correct in answers]
+        observed = [(topics, correct) for topics, correct in observed if topics]
+        if not observed:
+            return self.load(user, matrix)[0]
+
+        day = _today()
+
+        def fold(vector: MasteryVector) -> MasteryVector:
+            for topics, correct in observed:
+                vector.observe(topics, correct, day=day, half_life=self.half_life)
+            return vector
+
+        with transaction.atomic():
+            row = UserMastery.objects.select_for_update().filter(user=user).first()
+            if row is None:
+                vector = fold(self._seed_from_history(user, matrix))
+                try:
+                    with transaction.atomic():
+                        UserMastery.objects.create(user=user, topics=vector.topics, vector=vector.to_bytes())
+                    return vector
+                except IntegrityError:
+                    # Another request stored the first vector meanwhile; add to that one
+                    row = UserMastery.objects.select_for_update().get(user=user)
+            vector = fold(MasteryVector.from_storage(row.topics, row.vector))
+            row.topics, row.vector = vector.topics, vector.to_bytes()
+            row.save(update_fields=["topics", "vector", "updated_at"])
+        return vector
+
+    def record_answer(self, user, mcq_id: int, correct: bool) -> MasteryVector:
+        return self.record_answers(user, [(mcq_id, correct)])
+
+    @staticmethod
+    def score(
+        matrix: CandidateMatrix,
+        vector: MasteryVector,
+        rng: np.random.Generator,
+        boost_ids: Iterable[int] = (),
+        exclude_ids: Iterable[int] = (),
+        subspecialty: Optional[str] = None,
+    ) -> np.ndarray:
+        """Vectorised need score for every candidate; excluded rows are ``-inf``."""
+        alpha, beta = vector.beta_parameters(matrix)
+        need = 1.0 - rng.beta(alpha, beta)
+        need[-1] = 0.0  # sentinel: no category
+        scores = need[matrix.topics[:, 0]] + CATEGORY_WEIGHT * need[matrix.topics[:, 1]]
+        scores[matrix.positions(boost_ids)] += WEAKNESS_BONUS
+        if subspecialty:
+            index = matrix.topic_index.get(subspecialty_topic(subspecialty), -1)
+            scores[matrix.topics[:, 0] != index] = -np.inf
+        scores[matrix.positions(exclude_ids)] = -np.inf
+        return scores
+
+    def select(
+        self,
+        user,
+        count: int = 1,
+        exclude_ids: Iterable[int] = (),
+        subspecialty: Optional[str] = None,
+        rng: Optional[np.random.Generator] = None,
+        vector: Optional[MasteryVector] = None,
+    ) -> List[int]:
+        """Return up to ``count`` MCQ ids, best first.
+
+        Pass ``vector`` when the caller already loaded the user's mastery.
+        """
+        from ..models import IncorrectAnswer
+        from .mcq_service import MCQService
+
+        matrix = get_candidate_matrix()
+        if not len(matrix):
+            return []
+        if vector is None:
+            vector, _ = self.load(user, matrix)
+        excluded = set(exclude_ids) | set(MCQService.get_hidden_mcq_ids(user))
+        weak_ids = IncorrectAnswer.objects.filter(user=user, resolved=False).values_list("mcq_id", flat=True)
+
+        scores = self.score(
+            matrix,
+            vector,
+            rng or np.random.default_rng(),
+            boost_ids=weak_ids,
+            exclude_ids=excluded,
+            subspecialty=subspecialty,
+        )
+        count = max(1, min(count, len(matrix)))
+        if count == 1:
+            best = np.array([int(np.argmax(scores))])
+        else:
+            best = np.argpartition(-scores, count - 1)[:count]
+            best = best[np.argsort(-scores[best], kind="stable")]
+        best = best[np.isfinite(scores[best])]
+        return [int(matrix.ids[i]) for i in best]
+
+    def subspecialties(self) -> List[str]:
+        return sorted(topic_label(key) for key in get_candidate_matrix().topic_keys if key.startswith("sub:"))
+
+
+adaptive_selector = AdaptiveSelector()
@@ -0,0 +1,140 @@
+"""
+Deduplicated submission of background AI jobs.
+
+Double-clicks, page reloads and several learners asking for the same thing
+used to enqueue identical LLM work, each with a fresh job ID. ``submit``
+derives a job key from the action, the MCQ's content version and the
+normalized parameters that shape the result. While a job with that key is
+pending or running, its ID is returned instead of enqueueing another, so
+every waiter polls the same job record and receives the same result.
+
+Finished (or failed) jobs do not block a new submission, and an edit to the
+MCQ changes its content version and with it the key.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+AI_JOB_PREFIX = "ai_job:"
+DEDUP_PREFIX = "ai_job_dedup:"
+JOB_TIMEOUT = 3600
+IN_FLIGHT_STATUSES = frozenset({"pending", "queued", "processing", "running"})
+
+
+@dataclass
+class SubmittedJob:
+    job_id: str
+    created: bool
+
+    def as_response(self, **extra: Any) -> Dict[str, Any]:
+        return {"job_id": self.job_id, "status": "queued", "deduplicated": not self.created, **extra}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def job_key(action: str, mcq=None, params: Optional[Dict[str, Any]] = None) -> str:
+    """Cache key identifying equivalent submissions of ``action``."""
+    payload = json.dumps(
+        [
+            action,
+            getattr(mcq, "pk", None),
+            mcq.content_version() if mcq is not None else None,
+            _normalize(params or {}),
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return DEDUP_PREFIX + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def job_state(job_id: str, prefix: str = AI_JOB_PREFIX) -> Optional[Dict[str, Any]]:
+    return cache.get(f"{prefix}{job_id}")
+
+
+def is_in_flight(job_id: str, prefix: str = AI_JOB_PREFIX) -> bool:
+    state = job_state(job_id, prefix)
+    return bool(state) and state.get("status") in IN_FLIGHT_STATUSES
+
+
+def _claim(action: str, key: str, job_id: str, prefix: str, timeout: int) -> Optional[str]:
+    """Claim ``key`` for ``job_id``; returns the in-flight job to join instead, if any."""
+    for _ in range(3):
+        if cache.add(key, job_id, timeout=timeout):
+            return None
+        existing = cache.get(key)
+        if existing:
+            break
+        # The key expired between add() and get(); try to claim it again
+    else:
+        return None
+
+    state = job_state(existing, prefix)
+    # Submitters write the pending status before claiming the key, so a
+    # claimed key without a status is still treated as in flight
+    if state is None or state.get("status") in IN_FLIGHT_STATUSES:
+        logger.info("Coalesced %s submission onto in-flight job %s", action, existing)
+        return existing
+    # The previous job finished or failed. Only the submitter that claims its
+    # replacement with add() starts a new job; the others join the replacement.
+    replacement_key = f"{key}:after:{existing}"
+    if not cache.add(replacement_key, job_id, timeout=timeout):
+        replacement = cache.get(replacement_key)
+        if replacement:
+            logger.info("Coalesced %s resubmission onto job %s", action, replacement)
+            return replacement
+    cache.set(key, job_id, timeout=timeout)
+    return None
+
+
+def submit(
+    action: str,
+    enqueue: Callable[[str], Any],
+    mcq=None,
+    params: Optional[Dict[str, Any]] = None,
+    prefix: str = AI_JOB_PREFIX,
+) -> SubmittedJob:
+    """
+    Enqueue ``action`` unless an equivalent job is already in flight.
+
+    ``enqueue(job_id)`` starts the work (usually ``task.delay``); ``params``
+    are the inputs that determine the result, not per-request details such
+    as the user. ``prefix`` is the cache prefix of the job's status record.
+    If ``enqueue`` raises, the key is released and the error propagates.
+    """
+    key = job_key(action, mcq, params)
+    timeout = int(getattr(settings, "AI_JOB_DEDUP_TIMEOUT", 900))
+    job_id = str(uuid.uuid4())
+    status_key = f"{prefix}{job_id}"
+
+    # Written before the key is claimed, so anyone who sees the key sees the job as pending
+    cache.set(status_key, {"status": "pending"}, timeout=JOB_TIMEOUT)
+    joined = _claim(action, key, job_id, prefix, timeout)
+    if joined is not None:
+        cache.delete(status_key)
+        return SubmittedJob(joined, created=False)
+    try:
+        enqueue(job_id)
+    except Exception:
+        cache.delete(key)
+        cache.delete(status_key)
+        raise
+    return SubmittedJob(job_id, created=True)
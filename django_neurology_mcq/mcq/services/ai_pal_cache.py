@@ -0,0 +1,227 @@
+"""
+Per-MCQ answer cache for AI-Pal questions.
+
+Learners ask the same few things about a given MCQ ("why not B?", "what is
+the mechanism?"), and every one of them used to cost a model call. Answers
+are now stored per MCQ content version together with a signature of the
+question that produced them:
+
+* the option letters the question refers to, which must match exactly so
+  "why not B?" is never answered with the text written for "why not C?"
+* the set of normalised content words, compared with Jaccard similarity
+  against ``AI_PAL_CACHE_SIMILARITY``
+
+A new question that matches a stored signature gets the stored answer
+without calling the model. Editing the MCQ changes its content version and
+therefore the cache key, so stale answers are never served; ``regenerate``
+skips the lookup and replaces the matching entry.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "aipal:answers"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_OPTION_REF_RE = re.compile(r"\b(?:option|answer|choice)\s+([a-z])\b|\b([A-Z])\b", re.IGNORECASE)
+# Filler that changes between phrasings of the same question; "why", "not"
+# and the like are kept because they change what is being asked
+_STOPWORDS = frozenset(
+    "a an and are as at be been by can could do does for from has have i in is it its me my of on or please "
+    "should so that the this to was were which with would you your explain tell question mcq option answer choice".split()
+)
+# Markers of the fallback and error HTML returned by answer_question_about_mcq
+_UNCACHEABLE_MARKERS = (
+    "alert-danger",
+    "unable to answer your question right now",
+    "couldn't generate a detailed answer",
+)
+
+
+@dataclass(frozen=True)
+class QuestionSignature:
+    letters: FrozenSet[str]
+    tokens: FrozenSet[str]
+
+    def similarity(self, other: "QuestionSignature") -> float:
+        if self.letters != other.letters:
+            return 0.0
+        if not self.tokens and not other.tokens:
+            return 1.0
+        union = self.tokens | other.tokens
+        return len(self.tokens & other.tokens) / len(union)
+
+
+@dataclass
+class AIPalAnswer:
+    answer: str
+    cached: bool = False
+    # How close the stored question behind a cached answer was; the stored
+    # question itself may be another learner's and is never returned
+    similarity: float = 0.0
+
+    def as_result(self) -> Dict[str, object]:
+        return {"answer": self.answer, "cached": self.cached}
+
+
+def normalize_question(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a learner's question."""
+    return " ".join(_TOKEN_RE.findall((text or "").casefold()))
+
+
+def _fold(token: str) -> str:
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]  # crude plural folding, as in the embeddings tokenizer
+    return token
+
+
+def question_signature(question: str, option_letters: Iterable[str] = ()) -> QuestionSignature:
+    """
+    Signature used to match ``question`` against previously answered ones.
+
+    Single letters count as option references only when they are one of
+    ``option_letters``, and only when written in upper case or after
+    "option"/"answer"/"choice", so the article "a" is not mistaken for option A.
+    """
+    valid = {str(letter).upper() for letter in option_letters}
+    letters = set()
+    for match in _OPTION_REF_RE.finditer(question or ""):
+        explicit, bare = match.groups()
+        letter = (explicit or "").upper() or (bare if bare and bare.isupper() else "")
+        if letter and letter in valid:
+            letters.add(letter)
+
+    tokens = {
+        _fold(token)
+        for token in normalize_question(question).split()
+        if len(token) > 1 and token not in _STOPWORDS
+    }
+    return QuestionSignature(letters=frozenset(letters), tokens=frozenset(tokens))
+
+
+def is_cacheable(answer: str) -> bool:
+    """False for empty answers and the error/fallback HTML, which must not be replayed."""
+    if not answer or not answer.strip():
+        return False
+    lowered = answer.lower()
+    return not any(marker in lowered for marker in _UNCACHEABLE_MARKERS)
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, "AI_PAL_CACHE_ENABLED", True))
+
+
+def cache_key(mcq) -> str:
+    return f"{CACHE_KEY_PREFIX}:{mcq.pk}:{mcq.content_version()}"
+
+
+def _option_letters(mcq) -> List[str]:
+    return [str(letter) for letter in (mcq.get_options_dict() or {})]
+
+
+def _load(key: str) -> List[Dict[str, object]]:
+    try:
+        entries = cache.get(key)
+    except Exception as exc:
+        logger.warning("AI-Pal answer cache unavailable: %s", exc)
+        return []
+    return entries if isinstance(entries, list) else []
+
+
+def _signature_of(entry: Dict[str, object]) -> QuestionSignature:
+    return QuestionSignature(letters=frozenset(entry.get("letters") or ()), tokens=frozenset(entry.get("tokens") or ()))
+
+
+def _best_match(
+    entries: List[Dict[str, object]], signature: QuestionSignature
+) -> Tuple[Optional[int], float]:
+    best_index, best_score = None, 0.0
+    for index, entry in enumerate(entries):
+        score = signature.similarity(_signature_of(entry))
+        if score > best_score:
+            best_index, best_score = index, score
+    return best_index, best_score
+
+
+def lookup(mcq, question: str) -> Optional[AIPalAnswer]:
+    """Stored answer to a sufficiently similar question about ``mcq``, if any."""
+    if not _enabled():
+        return None
+    entries = _load(cache_key(mcq))
+    if not entries:
+        return None
+    signature = question_signature(question, _option_letters(mcq))
+    index, score = _best_match(entries, signature)
+    threshold = float(getattr(settings, "AI_PAL_CACHE_SIMILARITY", 0.75))
+    if index is None or score < threshold:
+        return None
+    entry = entries[index]
+    return AIPalAnswer(
+        answer=str(entry.get("answer") or ""),
+        cached=True,
+        similarity=round(score, 3),
+    )
+
+
+def store(mcq, question: str, answer: str) -> bool:
+    """
+    Remember ``answer`` for ``question``; replaces the entry of an equivalent question.
+
+    The per-MCQ list is read, modified and written back without a lock. Two
+    concurrent stores for the same MCQ can lose one of the entries, which
+    only costs a model call later.
+    """
+    if not _enabled() or not is_cacheable(answer):
+        return False
+    key = cache_key(mcq)
+    entries = _load(key)
+    signature = question_signature(question, _option_letters(mcq))
+    index, score = _best_match(entries, signature)
+    if index is not None and score >= float(getattr(settings, "AI_PAL_CACHE_SIMILARITY", 0.75)):
+        entries.pop(index)
+    entries.append({
+        "question": question.strip(),
+        "letters": sorted(signature.letters),
+        "tokens": sorted(signature.tokens),
+        "answer": answer,
+        "created": time.time(),
+    })
+    max_entries = int(getattr(settings, "AI_PAL_CACHE_MAX_ENTRIES", 50))
+    entries = entries[-max_entries:]
+    try:
+        cache.set(key, entries, int(getattr(settings, "AI_PAL_CACHE_TIMEOUT", 7 * 24 * 3600)))
+    except Exception as exc:
+        logger.warning("Could not cache AI-Pal answer for MCQ %s: %s", mcq.pk, exc)
+        return False
+    return True
+
+
+def answer_question(mcq, question: str, regenerate: bool = False) -> AIPalAnswer:
+    """
+    Answer ``question`` about ``mcq`` from the cache, or with the model and cache the result.
+
+    ``regenerate`` always calls the model and replaces the stored answer.
+    """
+    if not regenerate:
+        hit = lookup(mcq, question)
+        if hit is not None:
+            logger.info("AI-Pal cache hit for MCQ %s (similarity %.2f)", mcq.pk, hit.similarity)
+            return hit
+
+    from .. import openai_integration
+
+    answer = openai_integration.answer_question_about_mcq(mcq, question)
+    # Without a client the answer is the canned mock, which is not worth keeping
+    if openai_integration.api_key and openai_integration.client:
+        store(mcq, question, answer)
+    return AIPalAnswer(answer=answer)
@@ -0,0 +1,257 @@
+"""
+Server-sent event streams for AI actions.
+
+AI-Pal answers, reasoning coaching and explanation generation used to return
+only once the whole completion had arrived, 10 to 60 seconds after the
+request. ``stream_events`` runs one of those functions in a worker thread
+with a delta sink installed (``openai_integration.streaming_to``), so the
+completion is requested as a stream and every text fragment is forwarded to
+the browser as an SSE ``delta`` event the moment it arrives.
+
+Event sequence::
+
+    event: start   {"job_id": ...}
+    event: reset   {}                 a (re)tried completion starts over
+    event: delta   {"text": ...}      raw markdown fragment
+    event: done    {... final result ...}
+    event: error   {"error": ...}
+
+The function's return value is post-processed and persisted by
+``on_complete`` in the worker thread, so the result is kept even when the
+browser disconnects mid-stream. It is also stored as an ``ai_job`` record,
+which lets a client that lost the stream fetch it from the job status view.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+JOB_TIMEOUT = 3600
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class JsonStringField:
+    """
+    Incrementally decode one top-level string field of a streamed JSON object.
+
+    Completions that must return ``{"explanation": "..."}`` would otherwise
+    stream JSON syntax to the learner; ``feed`` returns only the decoded
+    characters of the field value that are complete so far.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._marker = f'"{name}"'
+        self._buffer = ""
+        self._position = None  # index of the next undecoded character of the value
+        self._closed = False
+
+    def reset(self) -> None:
+        self.__init__(self.name)
+
+    def _find_value_start(self) -> None:
+        index = self._buffer.find(self._marker)
+        if index < 0:
+            return
+        rest = self._buffer[index + len(self._marker):]
+        stripped = rest.lstrip()
+        if not stripped.startswith(":"):
+            return
+        after_colon = stripped[1:].lstrip()
+        if not after_colon.startswith('"'):
+            return
+        self._position = len(self._buffer) - len(after_colon) + 1
+
+    def feed(self, fragment: str) -> str:
+        if self._closed:
+            return ""
+        self._buffer += fragment
+        if self._position is None:
+            self._find_value_start()
+            if self._position is None:
+                return ""
+
+        out = []
+        buffer, position = self._buffer, self._position
+        while position < len(buffer):
+            char = buffer[position]
+            if char == '"':
+                self._closed = True
+                position += 1
+                break
+            if char != "\\":
+                out.append(char)
+                position += 1
+                continue
+            if position + 1 >= len(buffer):
+                break  # escape split across fragments
+            code = buffer[position + 1]
+            if code == "u":
+                digits = buffer[position + 2:position + 6]
+                if len(digits) < 4:
+                    break
+                try:
+                    out.append(chr(int(digits, 16)))
+                except ValueError:
+                    pass
+                position += 6
+            else:
+                out.append(_ESCAPES.get(code, code))
+                position += 2
+        self._position = position
+        return "".join(out)
+
+
+class StreamChannel:
+    """Delta sink that hands completion fragments from the worker thread to the response."""
+
+    def __init__(self, json_field: Optional[str] = None):
+        self.events: "queue.Queue[tuple]" = queue.Queue()
+        self._decoder = JsonStringField(json_field) if json_field else None
+
+    def begin(self) -> None:
+        if self._decoder is not None:
+            self._decoder.reset()
+        self.events.put(("reset", {}))
+
+    def delta(self, text: str) -> None:
+        if self._decoder is not None:
+            text = self._decoder.feed(text)
+        if text:
+            self.events.put(("delta", {"text": text}))
+
+    def finish(self, event: str, data: Dict[str, Any]) -> None:
+        self.events.put((event, data))
+
+
+def _job_key(job_id: str) -> str:
+    return f"ai_job:{job_id}"
+
+
+def _run(
+    channel: StreamChannel,
+    job_id: str,
+    func: Callable[..., Any],
+    args: tuple,
+    kwargs: Dict[str, Any],
+    on_complete: Optional[Callable[[Any], Dict[str, Any]]],
+) -> None:
+    from .. import openai_integration
+
+    try:
+        with openai_integration.streaming_to(channel):
+            value = func(*args, **kwargs)
+        result = on_complete(value) if on_complete else {"text": value}
+    except Exception as exc:
+        logger.error("Streamed AI job %s failed: %s", job_id, exc, exc_info=True)
+        cache.set(_job_key(job_id), {"status": "failed", "error": str(exc)}, timeout=JOB_TIMEOUT)
+        channel.finish("error", {"error": str(exc)})
+    else:
+        cache.set(_job_key(job_id), {"status": "ready", "result": result}, timeout=JOB_TIMEOUT)
+        channel.finish("done", result)
+    finally:
+        # The worker thread's own database connections
+        connections.close_all()
+
+
+def stream_events(
+    func: Callable[..., Any],
+    *args: Any,
+    on_complete: Optional[Callable[[Any], Dict[str, Any]]] = None,
+    json_field: Optional[str] = None,
+    job_id: Optional[str] = None,
+    **kwargs: Any,
+) -> Iterator[str]:
+    """
+    Run ``func(*args, **kwargs)`` with streaming enabled and yield SSE-formatted events.
+
+    ``on_complete`` turns the return value into the ``done`` payload and
+    persists it; ``json_field`` names the string field to decode when the
+    completion is a JSON object.
+    """
+    job_id = job_id or str(uuid.uuid4())
+    channel = StreamChannel(json_field=json_field)
+    cache.set(_job_key(job_id), {"status": "processing"}, timeout=JOB_TIMEOUT)
+    worker = threading.Thread(
+        target=_run,
+        args=(channel, job_id, func, args, kwargs, on_complete),
+        name=f"ai-stream-{job_id[:8]}",
+        daemon=True,
+    )
+    worker.start()
+
+    keepalive = float(getattr(settings, "AI_STREAM_KEEPALIVE_SECONDS", 15))
+    yield sse_event("start", {"job_id": job_id})
+    while True:
+        try:
+            event, data = channel.events.get(timeout=keepalive)
+        except queue.Empty:
+            # Comment line; keeps proxies from closing an idle connection
+            yield ": keepalive\n\n"
+            continue
+        yield sse_event(event, data)
+        if event in ("done", "error"):
+            return
+
+
+_END = object()
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    """
+    Streaming response that forwards each event as soon as it is produced under ASGI too.
+
+    Django serves a synchronous iterator to an ASGI server by reading it to
+    the end first, which would hold every event back until ``done``. Here
+    each event is pulled on a worker thread and sent on its own.
+    """
+
+    async def __aiter__(self):
+        if self.is_async:
+            async for part in super().__aiter__():
+                yield part
+            return
+        from .async_io import executor
+
+        iterator = iter(self.streaming_content)
+        # A pull can wait a whole keepalive interval, so it must not tie up
+        # the event loop's small default executor
+        pull = sync_to_async(next, thread_sensitive=False, executor=executor())
+        while True:
+            part = await pull(iterator, _END)
+            if part is _END:
+                return
+            yield part
+
+
+def sse_response(events: Iterator[str]) -> StreamingHttpResponse:
+    response = EventStreamResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx and Heroku's router buffer responses unless told otherwise
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def final_event(data: Dict[str, Any], job_id: Optional[str] = None) -> Iterator[str]:
+    """Event stream for a result that is already available (e.g. a cache hit)."""
+    job_id = job_id or str(uuid.uuid4())
+    cache.set(_job_key(job_id), {"status": "ready", "result": data}, timeout=JOB_TIMEOUT)
+    yield sse_event("start", {"job_id": job_id})
+    yield sse_event("done", data)
@@ -0,0 +1,65 @@
+"""
+Blocking I/O from async views.
+
+The OpenAI-backed services (AI-Pal, the case conversation service,
+transcription) are synchronous and shared with the Celery tasks. Async
+views await them through ``run_blocking``, which runs the call on a
+dedicated, bounded thread pool (``ASYNC_IO_THREADS``) instead of the event
+loop or Django's single per-request sync thread. A uvicorn worker can then
+hold many model calls in flight, each costing an idle thread rather than a
+whole process.
+
+Each call closes the database connections it opened on its pool thread
+(returning them to the connection pool), so idle threads do not hold
+connections.
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+T = TypeVar("T")
+
+DEFAULT_THREADS = 32
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(getattr(settings, "ASYNC_IO_THREADS", DEFAULT_THREADS)),
+                    thread_name_prefix="async-io",
+                )
+    return _executor
+
+
+def _closing_connections(func: Callable[..., T]) -> Callable[..., T]:
+    @functools.wraps(func)
+    def call(*args: Any, **kwargs: Any) -> T:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return call
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await ``func(*args, **kwargs)`` on the I/O thread pool; context variables are carried over."""
+    return await sync_to_async(
+        _closing_connections(func),
+        thread_sensitive=False,
+        executor=executor(),
+    )(*args, **kwargs)
@@ -11,13 +11,15 @@ from __future__ import annotations
 import logging
 import uuid
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
+from django.db.models.fields.json import KT
 from django.utils import timezone
 
-from ..models import PersistentCaseLearningSession
+from ..models import CaseMessage, PersistentCaseLearningSession
 from ..openai_integration import (
     DEFAULT_MODEL,
     FALLBACK_MODEL,
@@ -25,6 +27,7 @@ from ..openai_integration import (
     client,
     get_first_choice_text,
 )
+from .case_memory import ConversationMemory, ConversationWindow
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +42,16 @@ class ConversationResult:
 class CaseSessionRepository:
     """CRUD helpers for conversation persistence."""
 
+    # Sessions listed for the learner only need these columns
+    SUMMARY_FIELDS = (
+        "session_id",
+        "specialty",
+        "difficulty",
+        "state",
+        "created_at",
+        "last_activity",
+    )
+
     def create_session(
         self,
         *,
@@ -49,19 +62,21 @@ class CaseSessionRepository:
         case_data: Dict[str, Any],
         messages: List[Dict[str, str]],
     ) -> PersistentCaseLearningSession:
-        session = PersistentCaseLearningSession.objects.create(
-            session_id=session_id,
-            user_id=user_id,
-            specialty=specialty,
-            difficulty=difficulty,
-            state=0,
-            case_data=case_data,
-            messages=messages,
-            history_gathered=[],
-            examination_findings=[],
-            created_at=timezone.now(),
-            last_activity=timezone.now(),
-        )
+        with transaction.atomic():
+            session = PersistentCaseLearningSession.objects.create(
+                session_id=session_id,
+                user_id=user_id,
+                specialty=specialty,
+                difficulty=difficulty,
+                state=0,
+                case_data=case_data,
+                message_count=len(messages),
+                history_gathered=[],
+                examination_findings=[],
+                created_at=timezone.now(),
+                last_activity=timezone.now(),
+            )
+            self._insert_messages(session, messages, first_seq=0)
         return session
 
     def get_session_for_user(
@@ -75,18 +90,80 @@ class CaseSessionRepository:
             raise PermissionDenied("Session not found")
         return session
 
+    def list_sessions_for_user(self, user_id: int):
+        """Open sessions, newest first, without the JSON progress columns."""
+        return (
+            PersistentCaseLearningSession.objects.filter(
+                user_id=user_id, archived=False, completed=False
+            )
+            .order_by("-last_activity")
+            .only(*self.SUMMARY_FIELDS)
+            .annotate(phase=KT("case_data__phase"))
+        )
+
+    def recent_messages(
+        self,
+        session: PersistentCaseLearningSession,
+        *,
+        limit: int,
+        since_seq: int = 0,
+    ) -> List[Dict[str, str]]:
+        """The last ``limit`` messages from ``since_seq`` onwards, oldest first."""
+        if limit <= 0:
+            return []
+        rows = (
+            CaseMessage.objects.filter(session=session, seq__gte=since_seq)
+            .order_by("-seq")
+            .values_list("role", "content")[:limit]
+        )
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def last_assistant_message(self, session: PersistentCaseLearningSession) -> Optional[str]:
+        return (
+            CaseMessage.objects.filter(session=session, role="assistant")
+            .order_by("-seq")
+            .values_list("content", flat=True)
+            .first()
+        )
+
     def save_conversation(
         self,
         session: PersistentCaseLearningSession,
         *,
-        messages: List[Dict[str, str]],
+        new_messages: Sequence[Dict[str, str]] = (),
         case_data: Optional[Dict[str, Any]] = None,
+        window: Optional[ConversationWindow] = None,
     ) -> None:
-        session.messages = messages[-50:]  # keep the recent history bounded
+        """
+        Append ``new_messages`` and touch the session.
+
+        Earlier messages are never rewritten. The session row update is limited to
+        counters, timestamps and, when they changed, the case metadata and summary.
+        The session row is locked while appending, so overlapping saves (two tabs,
+        a retried request) take consecutive sequence numbers instead of colliding.
+        """
+        previous_total = session.message_count
+        update_fields = ["message_count", "last_activity"]
         session.last_activity = timezone.now()
         if case_data is not None:
             session.case_data = case_data
-        session.save(update_fields=["messages", "case_data", "last_activity"])
+            update_fields.append("case_data")
+        if window is not None and window.folded:
+            session.conversation_summary = window.summary
+            session.summarized_message_count = (
+                previous_total - window.history_length + window.folded
+            )
+            update_fields += ["conversation_summary", "summarized_message_count"]
+        with transaction.atomic():
+            stored_total = (
+                PersistentCaseLearningSession.objects.select_for_update()
+                .filter(pk=session.pk)
+                .values_list("message_count", flat=True)
+                .get()
+            )
+            session.message_count = stored_total + len(new_messages)
+            self._insert_messages(session, new_messages, first_seq=stored_total)
+            session.save(update_fields=update_fields)
 
     def replace_conversation(
         self,
@@ -97,7 +174,9 @@ class CaseSessionRepository:
         specialty: Optional[str] = None,
         difficulty: Optional[str] = None,
     ) -> None:
-        session.messages = messages
+        session.message_count = len(messages)
+        session.conversation_summary = ""
+        session.summarized_message_count = 0
         session.case_data = case_data
         session.last_activity = timezone.now()
         session.created_at = timezone.now()
@@ -108,17 +187,43 @@ class CaseSessionRepository:
             session.specialty = specialty
         if difficulty:
             session.difficulty = difficulty
-        session.save(
-            update_fields=[
-                "messages",
-                "case_data",
-                "last_activity",
-                "created_at",
-                "completed",
-                "completed_at",
-                "auto_delete_after",
-                "specialty",
-                "difficulty",
+        with transaction.atomic():
+            CaseMessage.objects.filter(session=session).delete()
+            self._insert_messages(session, messages, first_seq=0)
+            session.save(
+                update_fields=[
+                    "message_count",
+                    "conversation_summary",
+                    "summarized_message_count",
+                    "case_data",
+                    "last_activity",
+                    "created_at",
+                    "completed",
+                    "completed_at",
+                    "auto_delete_after",
+                    "specialty",
+                    "difficulty",
+                ]
+            )
+
+    @staticmethod
+    def _insert_messages(
+        session: PersistentCaseLearningSession,
+        messages: Sequence[Dict[str, str]],
+        *,
+        first_seq: int,
+    ) -> None:
+        if not messages:
+            return
+        CaseMessage.objects.bulk_create(
+            [
+                CaseMessage(
+                    session=session,
+                    seq=first_seq + offset,
+                    role=message.get("role", "user"),
+                    content=message.get("content") or "",
+                )
+                for offset, message in enumerate(messages)
             ]
         )
 
@@ -148,7 +253,8 @@ class CaseConversationService:
         "Context: specialty={specialty}; difficulty={difficulty}.\n"
     )
 
-    MAX_HISTORY_MESSAGES = 12
+    # Unsummarised messages read back per turn (the memory folds well before this)
+    HISTORY_FETCH_LIMIT = 50
 
     STAGE_KEYWORDS = {
         "HISTORY": [
@@ -256,12 +362,17 @@ class CaseConversationService:
         ),
     }
 
-    def __init__(self, repository: Optional[CaseSessionRepository] = None):
+    def __init__(
+        self,
+        repository: Optional[CaseSessionRepository] = None,
+        memory: Optional[ConversationMemory] = None,
+    ):
         if client is None:
             logger.warning(
                 "OpenAI client is not initialised; case-based learning responses will fail."
             )
         self.repository = repository or CaseSessionRepository()
+        self.memory = memory or ConversationMemory()
 
     # ------------------------------------------------------------------
     # Public API
@@ -341,54 +452,26 @@ class CaseConversationService:
         if not message:
             raise ValueError("Message cannot be empty")
 
+        # Stage commands keep the same prompt prefix as ordinary turns; the stage
+        # directive travels as the trailing message so provider prompt caching
+        # still covers the system prompt, summary and earlier turns.
         stage = self._detect_stage_command(message)
-        effective_system_prompt = (
-            self._augment_system_prompt(system_prompt, stage, message)
-            if stage
-            else system_prompt
+        window = self._conversation_for_session(session, system_prompt, message)
+        assistant_message, _ = self._call_model(
+            system_prompt,
+            conversation_override=window.messages,
+            force_prompt=self._build_force_prompt(message, stage=stage),
+            cache_key=session.session_id,
         )
 
-        if stage:
-            conversation = [{"role": "system", "content": effective_system_prompt}]
-        else:
-            conversation = self._conversation_for_session(session, effective_system_prompt)
-        conversation.append({"role": "user", "content": message})
-
-        force_prompt = None if stage else self._build_force_prompt(message, stage=None)
-
-        try:
-            assistant_message, _ = self._call_model(
-                effective_system_prompt,
-                conversation_override=conversation,
-                force_prompt=force_prompt,
-            )
-        except RuntimeError as exc:
-            if "empty content" in str(exc).lower():
-                logger.warning(
-                    "Primary stage-aware response returned empty content; retrying with full history."
-                )
-                fallback_system_prompt = (
-                    effective_system_prompt if stage else system_prompt
-                )
-                fallback_conversation = self._conversation_for_session(
-                    session, fallback_system_prompt
-                )
-                fallback_conversation.append({"role": "user", "content": message})
-                fallback_force_prompt = self._build_force_prompt(message, stage=stage)
-                assistant_message, _ = self._call_model(
-                    fallback_system_prompt,
-                    conversation_override=fallback_conversation,
-                    force_prompt=fallback_force_prompt,
-                )
-            else:
-                raise
-
-        session_messages = session.messages or []
-        session_messages.append({"role": "user", "content": message})
-        session_messages.append({"role": "assistant", "content": assistant_message})
-        case_data["phase"] = stage or "CONVERSATION"
         self.repository.save_conversation(
-            session, messages=session_messages, case_data=case_data
+            session,
+            new_messages=[
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": assistant_message},
+            ],
+            case_data=self._with_phase(case_data, stage or "CONVERSATION"),
+            window=window,
         )
 
         result = ConversationResult(session=session, assistant_message=assistant_message)
@@ -410,20 +493,28 @@ class CaseConversationService:
 
     def resume_session(self, *, user, session_id: str) -> Dict[str, Any]:
         session = self.repository.get_session_for_user(session_id, user.id)
-        messages = session.messages or []
+        recent = self.repository.recent_messages(
+            session, limit=getattr(settings, "CASE_RESUME_MESSAGES", 20)
+        )
         last_assistant = next(
-            (msg["content"] for msg in reversed(messages) if msg.get("role") == "assistant"),
-            "I have the case ready. How would you like to proceed?",
+            (msg["content"] for msg in reversed(recent) if msg.get("role") == "assistant"),
+            None,
+        ) or self.repository.last_assistant_message(session) or (
+            "I have the case ready. How would you like to proceed?"
+        )
+        self.repository.save_conversation(
+            session, case_data=self._with_phase(session.case_data or {}, "CONVERSATION")
         )
-        case_data = session.case_data or {}
-        case_data["phase"] = "CONVERSATION"
-        self.repository.save_conversation(session, messages=messages, case_data=case_data)
         result = ConversationResult(
             session=session,
             assistant_message=last_assistant,
             notice="Resumed your saved case."
         )
-        return self._serialize_result(result)
+        payload = self._serialize_result(result)
+        payload["recent_messages"] = [
+            msg for msg in recent if msg.get("role") in {"user", "assistant"}
+        ]
+        return payload
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -481,15 +572,43 @@ class CaseConversationService:
             directive += f" Learner request to honour:\n{snippet}"
         return directive
 
-    def _conversation_for_session(
-        self, session: PersistentCaseLearningSession, system_prompt: str
+    @staticmethod
+    def _with_phase(case_data: Dict[str, Any], phase: str) -> Optional[Dict[str, Any]]:
+        """``case_data`` with the new phase, or None when unchanged (skips rewriting the JSON)."""
+        if case_data.get("phase") == phase:
+            return None
+        case_data["phase"] = phase
+        return case_data
+
+    def _unsummarized_history(
+        self, session: PersistentCaseLearningSession
     ) -> List[Dict[str, str]]:
-        conversation: List[Dict[str, str]] = [
-            {"role": "system", "content": system_prompt}
-        ]
-        history = session.messages or []
-        conversation.extend(history[-self.MAX_HISTORY_MESSAGES :])
-        return conversation
+        return self.repository.recent_messages(
+            session,
+            limit=self.HISTORY_FETCH_LIMIT,
+            since_seq=session.summarized_message_count,
+        )
+
+    def _conversation_for_session(
+        self,
+        session: PersistentCaseLearningSession,
+        system_prompt: str,
+        message: str,
+    ) -> ConversationWindow:
+        history = self._unsummarized_history(session)
+        window = self.memory.build(
+            system_prompt=system_prompt,
+            summary=session.conversation_summary or "",
+            history=history,
+            user_message=message,
+        )
+        logger.debug(
+            "Case %s prompt: %d tokens, %d messages folded into summary",
+            session.session_id,
+            window.prompt_tokens,
+            window.folded,
+        )
+        return window
 
     def _detect_stage_command(self, message: str) -> Optional[str]:
         lowered = message.lower()
@@ -498,20 +617,13 @@ class CaseConversationService:
                 return stage
         return None
 
-    def _augment_system_prompt(
-        self, base_prompt: str, stage: Optional[str], learner_message: str
-    ) -> str:
-        if not stage:
-            return base_prompt
-        directive = self._build_force_prompt(learner_message, stage=stage)
-        return f"{base_prompt}\n\nCURRENT REQUEST:\n{directive}"
-
     def _call_model(
         self,
         system_prompt: str,
         initial_user_instruction: Optional[str] = None,
         conversation_override: Optional[List[Dict[str, str]]] = None,
         force_prompt: Optional[str] = None,
+        cache_key: Optional[str] = None,
     ) -> (str, List[Dict[str, str]]):
         if client is None:
             raise RuntimeError("OpenAI client is not configured. Set OPENAI_API_KEY.")
@@ -525,6 +637,10 @@ class CaseConversationService:
             models_to_try.append(FALLBACK_MODEL)
 
         last_error: Optional[Exception] = None
+        request_options: Dict[str, Any] = {}
+        if cache_key and getattr(settings, "CASE_PROMPT_CACHE_KEYS", True):
+            # Routes every turn of a case to the same prompt cache shard
+            request_options["extra_body"] = {"prompt_cache_key": f"case-{cache_key}"}
 
         for model_name in models_to_try:
             conversation = [msg.copy() for msg in base_conversation]
@@ -543,6 +659,7 @@ class CaseConversationService:
                         max_tokens=700,
                         temperature=0.7,
                         timeout=45,
+                        **request_options,
                     )
                     assistant_message = get_first_choice_text(response)
                 except Exception as exc:  # pragma: no cover
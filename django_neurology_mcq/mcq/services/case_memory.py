@@ -0,0 +1,209 @@
+"""
+Conversation memory for AI-generated teaching cases.
+
+Each case turn used to replay the system prompt plus the last dozen raw
+messages, so prompt size (and latency) grew with the length of the case.
+This module keeps the prompt within ``CASE_PROMPT_TOKEN_BUDGET``:
+
+* messages are counted with ``tiktoken`` when it is installed, otherwise with
+  a characters-per-token estimate
+* once the unsummarised tail of the conversation outgrows its share of the
+  budget, the oldest turns are folded into an extractive case summary stored
+  on the session; the tail is folded down to half its budget so the next few
+  turns reuse exactly the same prefix
+* the prompt is laid out as ``system prompt -> case summary -> recent turns ->
+  learner message`` with per-turn directives appended last, keeping the
+  leading messages byte-identical between turns for provider prompt caching
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Role/formatting tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+CHARS_PER_TOKEN = 4
+
+SUMMARY_HEADER = (
+    "CASE SO FAR (earlier turns, condensed; stay consistent with these details):\n"
+)
+
+_MARKDOWN = re.compile(r"[*_`#>]+")
+_WHITESPACE = re.compile(r"\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as exc:  # pragma: no cover - encoding files unavailable offline
+        logger.warning("tiktoken encoding unavailable, estimating tokens: %s", exc)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of ``text`` (exact with tiktoken, estimated otherwise)."""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def conversation_tokens(messages: Sequence[Dict[str, str]]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+
+def _condense(text: str, limit: int) -> str:
+    """First sentences of ``text`` without Markdown, cut to ``limit`` characters."""
+    plain = _WHITESPACE.sub(" ", _MARKDOWN.sub("", text or "")).strip()
+    if len(plain) <= limit:
+        return plain
+    condensed = ""
+    for sentence in _SENTENCE_END.split(plain):
+        candidate = f"{condensed} {sentence}".strip()
+        if len(candidate) > limit:
+            break
+        condensed = candidate
+    return condensed or plain[: limit - 1].rstrip() + "…"
+
+
+def summarize_turns(messages: Sequence[Dict[str, str]]) -> List[str]:
+    """One summary line per message: learner requests short, attending replies a little longer."""
+    lines = []
+    for message in messages:
+        if message.get("role") == "user":
+            lines.append(f"- Learner: {_condense(message.get('content', ''), 160)}")
+        elif message.get("role") == "assistant":
+            lines.append(f"- Attending: {_condense(message.get('content', ''), 320)}")
+    return [line for line in lines if not line.endswith(": ")]
+
+
+def merge_summary(existing: str, new_lines: Sequence[str], token_limit: int) -> str:
+    """
+    Append ``new_lines`` to ``existing`` and trim to ``token_limit``.
+
+    Everything up to the first attending reply (the case presentation) is
+    always kept; the oldest lines after it are dropped first.
+    """
+    lines = [line for line in (existing or "").splitlines() if line.strip()]
+    lines.extend(new_lines)
+    anchor = next((i for i, line in enumerate(lines) if line.startswith("- Attending")), 0)
+    while len(lines) > anchor + 2 and count_tokens("\n".join(lines)) > token_limit:
+        del lines[anchor + 1]
+    return "\n".join(lines)
+
+
+@dataclass
+class ConversationWindow:
+    """Messages to send for one turn, plus the summary state to persist afterwards."""
+
+    messages: List[Dict[str, str]]
+    summary: str
+    folded: int
+    history_length: int
+    prompt_tokens: int
+
+
+class ConversationMemory:
+    """Budgets a case prompt and folds old turns into the rolling summary."""
+
+    def __init__(
+        self,
+        *,
+        token_budget: Optional[int] = None,
+        summary_token_limit: Optional[int] = None,
+        max_history_messages: Optional[int] = None,
+        reply_reserve_tokens: Optional[int] = None,
+    ):
+        self.token_budget = token_budget or getattr(settings, "CASE_PROMPT_TOKEN_BUDGET", 6000)
+        self.summary_token_limit = summary_token_limit or getattr(settings, "CASE_SUMMARY_TOKEN_LIMIT", 800)
+        self.max_history_messages = max_history_messages or getattr(settings, "CASE_MAX_HISTORY_MESSAGES", 12)
+        # Room left for the trailing per-turn directive
+        self.reply_reserve_tokens = reply_reserve_tokens or 400
+
+    def history_budget(self, system_prompt: str, summary: str, user_message: str) -> int:
+        fixed = count_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        if summary:
+            fixed += count_tokens(SUMMARY_HEADER + summary) + MESSAGE_OVERHEAD_TOKENS
+        fixed += count_tokens(user_message) + MESSAGE_OVERHEAD_TOKENS
+        return max(self.token_budget - fixed - self.reply_reserve_tokens, 0)
+
+    def fold(
+        self, summary: str, history: Sequence[Dict[str, str]], budget: int
+    ) -> Tuple[str, int]:
+        """
+        Fold the oldest messages of ``history`` into ``summary`` when it is over budget.
+
+        Returns the new summary and how many leading messages were folded. Nothing
+        is folded while the history fits, so the prompt prefix stays unchanged.
+        """
+        if len(history) <= self.max_history_messages and conversation_tokens(history) <= budget:
+            return summary, 0
+
+        target_messages = max(self.max_history_messages // 2, 2)
+        target_tokens = budget // 2
+        remaining = conversation_tokens(history)
+        folded = 0
+        # Leave at least the latest exchange verbatim
+        while folded < len(history) - 2 and (
+            len(history) - folded > target_messages or remaining > target_tokens
+        ):
+            remaining -= message_tokens(history[folded])
+            folded += 1
+        # Fold whole learner/attending exchanges so the tail starts on a learner turn
+        while folded < len(history) - 2 and history[folded].get("role") != "user":
+            folded += 1
+        if not folded:
+            return summary, 0
+        return merge_summary(summary, summarize_turns(history[:folded]), self.summary_token_limit), folded
+
+    def build(
+        self,
+        *,
+        system_prompt: str,
+        summary: str,
+        history: Sequence[Dict[str, str]],
+        user_message: str,
+    ) -> ConversationWindow:
+        """Lay out the prompt for one turn: stable prefix first, learner message last."""
+        budget = self.history_budget(system_prompt, summary, user_message)
+        summary, folded = self.fold(summary, history, budget)
+        recent = [dict(message) for message in history[folded:]]
+
+        # A few very long replies can still overflow the budget; drop them from
+        # this request only (they are summarised on a later fold).
+        budget = self.history_budget(system_prompt, summary, user_message)
+        while recent and conversation_tokens(recent) > budget:
+            recent.pop(0)
+
+        messages: List[Dict[str, str]] = [{"role": "system", "content": system_prompt}]
+        if summary:
+            messages.append({"role": "system", "content": SUMMARY_HEADER + summary})
+        messages.extend(recent)
+        messages.append({"role": "user", "content": user_message})
+        return ConversationWindow(
+            messages=messages,
+            summary=summary,
+            folded=folded,
+            history_length=len(history),
+            prompt_tokens=conversation_tokens(messages),
+        )
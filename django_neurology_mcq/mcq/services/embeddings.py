@@ -0,0 +1,674 @@
+"""Local semantic embedding index for related-question search and AI context.
+
+Every MCQ gets one vector for its stem and options and one per non-empty
+explanation section. Vectors come from a pluggable :class:`Embedder`
+(``EMBEDDING_BACKEND``). The default :class:`HashingEmbedder` is
+deterministic and needs no network, so tests and offline installs get
+working similarity search. :class:`OpenAIEmbedder` gives better semantics
+in production.
+
+Vectors are stored on :class:`~mcq.models.MCQEmbedding` (the source of
+truth) and served from a :class:`VectorIndex`: a float32 matrix of
+L2-normalised rows plus an ID map (MCQ id, section). Search is a
+brute-force NumPy dot product with ``argpartition`` top-k: exact and well
+under a millisecond for a few thousand questions.
+
+Index layout (under ``EMBEDDING_INDEX_DIR``, one directory per index kind
+and embedder): as with the guideline index, each build is written to its
+own subdirectory (``vectors.f32`` and ``ids.npz``) and ``CURRENT`` names
+the live one. Each process builds the index it reads from the stored
+vectors, so dynos need no shared disk: :class:`IndexManager` starts a
+background build when there is no local build and re-checks the stored
+vectors every ``EMBEDDING_INDEX_CHECK_SECONDS``, rebuilding only when they
+changed. Requests never wait for a build; they serve the current build (or
+nothing) meanwhile. Builds are memory-mapped read-only, so worker processes
+on one host share the pages, and a file lock keeps them from building the
+same index twice. The ``build_embeddings`` command builds ahead of time.
+
+Saving an MCQ re-embeds only the texts whose hash changed. The new vectors
+reach the index with the next build; until then ``related_mcqs`` reads the
+MCQ's own vector from its stored row.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from . import versioned_builds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "mcq.services.embeddings.HashingEmbedder"
+DEFAULT_DIMENSIONS = 512
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.npz"
+QUESTION = ""
+KIND_QUESTION = "question"
+KIND_SECTION = "section"
+MAX_TEXT_CHARS = 4000
+DEFAULT_INDEX_CHECK_SECONDS = 300
+TEMP_SOURCE_PREFIX = "TEMP_WEAKNESS_TEST_"
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with "
+    "what who most likely following patient year old".split()
+)
+
+
+def clean_text(text: Optional[str]) -> str:
+    """Strip HTML tags and collapse whitespace."""
+    return " ".join(_TAG_RE.sub(" ", text or "").split())
+
+
+# ---------------------------------------------------------------------------
+# Embedders
+# ---------------------------------------------------------------------------
+
+class Embedder:
+    """Base class for text embedding providers.
+
+    ``embed`` returns a ``(len(texts), dimensions)`` float32 array of
+    L2-normalised rows. ``remote`` embedders are called from Celery rather
+    than inside a request.
+    """
+
+    name = "base"
+    remote = False
+
+    def __init__(self, dimensions: Optional[int] = None):
+        self.dimensions = int(dimensions or getattr(settings, "EMBEDDING_DIMENSIONS", DEFAULT_DIMENSIONS))
+
+    @property
+    def key(self) -> str:
+        """Identifies vectors produced by this embedder; changing it invalidates stored rows."""
+        return f"{self.name}-{self.dimensions}"
+
+    def is_available(self) -> bool:
+        return True
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic bag-of-words embedder (signed feature hashing).
+
+    Unigrams and bigrams are hashed into ``dimensions`` buckets with
+    sublinear term frequency. No vocabulary, no network, identical output in
+    every process, which makes it suitable for tests and offline use.
+    """
+
+    name = "hashing-v1"
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        tokens = []
+        for token in _TOKEN_RE.findall(clean_text(text).lower()):
+            if token in _STOPWORDS:
+                continue
+            if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+                token = token[:-1]  # crude plural folding: seizures -> seizure
+            tokens.append(token)
+        return tokens
+
+    def _features(self, text: str) -> Counter:
+        tokens = self._tokens(text)
+        features = Counter(tokens)
+        features.update(f"{left} {right}" for left, right in zip(tokens, tokens[1:]))
+        return features
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                matrix[row, digest % self.dimensions] += sign * (1.0 + math.log(count))
+        return normalize_rows(matrix)
+
+
+class OpenAIEmbedder(Embedder):
+    """Embeddings API through the shared OpenAI client (``EMBEDDING_MODEL``)."""
+
+    name = "openai"
+    remote = True
+    batch_size = 96
+
+    def __init__(self, dimensions: Optional[int] = None, model: Optional[str] = None):
+        super().__init__(dimensions)
+        self.model = model or getattr(settings, "EMBEDDING_MODEL", "text-embedding-3-small")
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.model}-{self.dimensions}"
+
+    @staticmethod
+    def _client():
+        from ..openai_integration import client
+
+        return client
+
+    def is_available(self) -> bool:
+        return self._client() is not None
+
+    def embed(self, texts):
+        client = self._client()
+        if client is None:
+            raise RuntimeError("OpenAI embeddings are not configured.")
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = [text[:MAX_TEXT_CHARS] or " " for text in texts[start:start + self.batch_size]]
+            response = client.embeddings.create(model=self.model, input=batch, dimensions=self.dimensions)
+            rows.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        return normalize_rows(np.array(rows, dtype=np.float32).reshape(len(texts), self.dimensions))
+
+
+@lru_cache(maxsize=None)
+def _load_embedder(path: str) -> Embedder:
+    return import_string(path)()
+
+
+def get_embedder() -> Embedder:
+    """Instantiate (once per process) the embedder named in settings."""
+    return _load_embedder(getattr(settings, "EMBEDDING_BACKEND", DEFAULT_BACKEND))
+
+
+# ---------------------------------------------------------------------------
+# Texts
+# ---------------------------------------------------------------------------
+
+def question_text_for(mcq) -> str:
+    parts = [clean_text(mcq.question_text)] + [clean_text(text) for _letter, text in mcq.get_option_items()]
+    return "\n".join(part for part in parts if part)[:MAX_TEXT_CHARS]
+
+
+def section_texts_for(mcq) -> Dict[str, str]:
+    """Non-empty explanation sections keyed by section name."""
+    sections = mcq.explanation_sections
+    if isinstance(sections, str):
+        try:
+            sections = json.loads(sections)
+        except ValueError:
+            sections = None
+    texts: Dict[str, str] = {}
+    if isinstance(sections, dict):
+        for key, value in sections.items():
+            text = clean_text(value if isinstance(value, str) else json.dumps(value))
+            if text:
+                texts[str(key)[:50]] = text[:MAX_TEXT_CHARS]
+    if not texts:
+        text = clean_text(mcq.unified_explanation or mcq.explanation)
+        if text:
+            texts["explanation"] = text[:MAX_TEXT_CHARS]
+    return texts
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------------
+
+def update_mcq_embeddings(mcq, embedder: Optional[Embedder] = None) -> int:
+    """Embed the MCQ's question and sections whose text changed; returns rows written."""
+    from ..models import MCQEmbedding
+
+    if (mcq.source_file or "").startswith(TEMP_SOURCE_PREFIX):
+        return 0
+    embedder = embedder or get_embedder()
+    texts = {QUESTION: question_text_for(mcq), **section_texts_for(mcq)}
+    texts = {section: text for section, text in texts.items() if text}
+    stored = dict(
+        MCQEmbedding.objects.filter(mcq_id=mcq.pk, embedder=embedder.key).values_list("section", "text_hash")
+    )
+    changed = {section: text for section, text in texts.items() if stored.get(section) != _digest(text)}
+    removed = set(stored) - set(texts)
+    if not changed and not removed:
+        return 0
+
+    if changed:
+        vectors = embedder.embed(list(changed.values()))
+        for section, vector in zip(changed, vectors):
+            MCQEmbedding.objects.update_or_create(
+                mcq_id=mcq.pk,
+                section=section,
+                embedder=embedder.key,
+                defaults={"text_hash": _digest(changed[section]), "vector": vector.tobytes()},
+            )
+    if removed:
+        MCQEmbedding.objects.filter(mcq_id=mcq.pk, embedder=embedder.key, section__in=removed).delete()
+    return len(changed)
+
+
+def schedule_embedding_update(mcq) -> None:
+    """Embed inline for local embedders; queue remote ones so saves stay fast."""
+    embedder = get_embedder()
+    if not embedder.remote:
+        update_mcq_embeddings(mcq, embedder)
+        return
+    try:
+        from ..tasks import refresh_mcq_embeddings
+
+        refresh_mcq_embeddings.delay(mcq.pk)
+    except Exception as exc:
+        logger.warning("Could not queue embedding update for MCQ %s: %s", mcq.pk, exc)
+
+
+def rebuild_embeddings(queryset=None, batch_size: int = 100, only_missing: bool = False) -> int:
+    """(Re)compute embeddings in batches; returns the number of rows written."""
+    from ..models import MCQ, MCQEmbedding
+
+    embedder = get_embedder()
+    queryset = queryset if queryset is not None else MCQ.objects.all()
+    queryset = queryset.exclude(source_file__startswith=TEMP_SOURCE_PREFIX)
+    if only_missing:
+        queryset = queryset.exclude(embeddings__embedder=embedder.key, embeddings__section=QUESTION)
+
+    written = 0
+    batch = []
+
+    def flush():
+        nonlocal written
+        if not batch:
+            return
+        items = [(mcq.pk, section, text) for mcq in batch for section, text in
+                 {QUESTION: question_text_for(mcq), **section_texts_for(mcq)}.items() if text]
+        vectors = embedder.embed([text for _, _, text in items])
+        ids = [mcq.pk for mcq in batch]
+        MCQEmbedding.objects.filter(mcq_id__in=ids, embedder=embedder.key).delete()
+        MCQEmbedding.objects.bulk_create(
+            MCQEmbedding(mcq_id=mcq_id, section=section, embedder=embedder.key,
+                         text_hash=_digest(text), vector=vector.tobytes())
+            for (mcq_id, section, text), vector in zip(items, vectors)
+        )
+        written += len(items)
+        batch.clear()
+
+    fields = ("id", "question_text", "options", "explanation_sections", "unified_explanation", "explanation", "source_file")
+    for mcq in queryset.order_by("id").only(*fields).iterator(chunk_size=batch_size):
+        batch.append(mcq)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return written
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+@dataclass
+class VectorIndex:
+    """Row-normalised float32 matrix plus its ID map (MCQ id, section)."""
+
+    vectors: np.ndarray
+    mcq_ids: np.ndarray
+    sections: np.ndarray
+    build_id: str = ""
+
+    def __len__(self) -> int:
+        return int(self.mcq_ids.shape[0])
+
+    @classmethod
+    def empty(cls, dimensions: int) -> "VectorIndex":
+        return cls(
+            vectors=np.zeros((0, dimensions), dtype=np.float32),
+            mcq_ids=np.zeros(0, dtype=np.int64),
+            sections=np.zeros(0, dtype="<U50"),
+        )
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 5,
+        exclude_mcq_ids: Iterable[int] = (),
+        min_score: float = -1.0,
+    ) -> List[Tuple[int, str, float]]:
+        """Top-k ``(mcq_id, section, score)`` by cosine similarity, best first."""
+        if not len(self) or k <= 0:
+            return []
+        scores = self.vectors @ np.asarray(query, dtype=np.float32)
+        excluded = list(exclude_mcq_ids)
+        if excluded:
+            scores = np.where(np.isin(self.mcq_ids, excluded), -np.inf, scores)
+        k = min(k, len(self))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (int(self.mcq_ids[i]), str(self.sections[i]), float(scores[i]))
+            for i in top
+            if scores[i] >= min_score
+        ]
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["VectorIndex"]:
+        """Memory-map the current build read-only; None when there is none or it is unreadable."""
+        target = versioned_builds.current_build(directory)
+        if target is None:
+            return None
+        build_id = target.name
+        try:
+            with np.load(target / IDS_FILE) as ids:
+                mcq_ids, sections, meta = ids["mcq_ids"], ids["sections"], ids["meta"]
+            dimensions = int(meta[0])
+            if not len(mcq_ids):
+                index = cls.empty(dimensions)
+                index.build_id = build_id
+                return index
+            vectors = np.memmap(target / VECTORS_FILE, dtype=np.float32, mode="r", shape=(len(mcq_ids), dimensions))
+        except (OSError, ValueError, KeyError) as exc:
+            logger.info("Embedding index at %s not loaded: %s", directory, exc)
+            return None
+        return cls(vectors, mcq_ids, sections, build_id)
+
+
+def index_dir() -> Path:
+    configured = getattr(settings, "EMBEDDING_INDEX_DIR", None)
+    return Path(configured) if configured else Path(settings.BASE_DIR) / "var" / "embeddings"
+
+
+def _index_path(kind: str, embedder: Embedder) -> Path:
+    """Directory holding the builds of one index and the ``CURRENT`` pointer."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", embedder.key)
+    return index_dir() / f"{kind}-{safe}"
+
+
+def _kind_filter(kind: str) -> Dict[str, object]:
+    return {"section": QUESTION} if kind == KIND_QUESTION else {"section__gt": QUESTION}
+
+
+def _stored_state(kind: str, embedder: Embedder) -> Tuple[int, float]:
+    """``(rows, newest updated_at)`` of the stored vectors an index is built from."""
+    from django.db.models import Count, Max
+
+    from ..models import MCQEmbedding
+
+    state = MCQEmbedding.objects.filter(embedder=embedder.key, **_kind_filter(kind)).aggregate(
+        rows=Count("pk"), latest=Max("updated_at")
+    )
+    return state["rows"], state["latest"].timestamp() if state["latest"] else 0.0
+
+
+def build_index(kind: str, embedder: Optional[Embedder] = None) -> VectorIndex:
+    """
+    Write a new build of one index from the stored vectors and make it current.
+
+    Runs in the ``build_embeddings`` command and in :class:`IndexManager`'s
+    background builds, never in a request. Vectors are streamed to the new build's files, so
+    memory use stays flat; ``CURRENT`` is switched only once the build is
+    complete, and running processes keep mapping the previous build until they
+    see the new pointer.
+    """
+    from ..models import MCQEmbedding
+
+    embedder = embedder or get_embedder()
+    directory = _index_path(kind, embedder)
+    rows, latest = _stored_state(kind, embedder)
+    build_id, target = versioned_builds.new_build(directory)
+    mcq_ids: List[int] = []
+    sections: List[str] = []
+    size = embedder.dimensions * np.dtype(np.float32).itemsize
+    stored = MCQEmbedding.objects.filter(embedder=embedder.key, **_kind_filter(kind)).order_by("pk")
+    try:
+        with open(target / VECTORS_FILE, "wb") as handle:
+            for mcq_id, section, blob in stored.values_list("mcq_id", "section", "vector").iterator(chunk_size=2000):
+                if len(blob) != size:
+                    continue
+                handle.write(bytes(blob))
+                mcq_ids.append(mcq_id)
+                sections.append(section)
+        np.savez(
+            target / IDS_FILE,
+            mcq_ids=np.array(mcq_ids, dtype=np.int64),
+            sections=np.array(sections, dtype="<U50"),
+            meta=np.array([embedder.dimensions, rows, latest, time.time()], dtype=np.float64),
+        )
+        versioned_builds.publish(directory, build_id)
+    except OSError:
+        versioned_builds.discard(target)
+        raise
+    index_manager.reset()
+    return VectorIndex.load(directory) or VectorIndex.empty(embedder.dimensions)
+
+
+def index_is_current(kind: str, embedder: Optional[Embedder] = None) -> bool:
+    """True when the current build was made from the vectors stored now."""
+    embedder = embedder or get_embedder()
+    target = versioned_builds.current_build(_index_path(kind, embedder))
+    if target is None:
+        return False
+    try:
+        with np.load(target / IDS_FILE) as ids:
+            meta = ids["meta"]
+    except (OSError, ValueError, KeyError):
+        return False
+    return (int(meta[1]), float(meta[2])) == _stored_state(kind, embedder)
+
+
+def refresh_indexes(force: bool = False) -> Dict[str, Optional[int]]:
+    """Rebuild the indexes whose stored vectors changed; returns vectors per rebuilt kind (None if skipped)."""
+    embedder = get_embedder()
+    built: Dict[str, Optional[int]] = {}
+    for kind in (KIND_QUESTION, KIND_SECTION):
+        if not force and index_is_current(kind, embedder):
+            built[kind] = None
+            continue
+        built[kind] = len(build_index(kind, embedder))
+    return built
+
+
+class IndexManager:
+    """
+    The current build of each index, memory-mapped once per process.
+
+    ``get`` only maps finished builds: it reloads when ``CURRENT`` names a new
+    build. When there is no build yet, or the last check of the stored vectors
+    is older than ``EMBEDDING_INDEX_CHECK_SECONDS``, it starts a background
+    build and returns what it has meanwhile (an empty index on a cold start).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict[str, Tuple[Tuple[str, float], VectorIndex]] = {}
+        self._checked: Dict[str, float] = {}
+        self._builds: Dict[str, threading.Thread] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state.clear()
+            self._checked.clear()
+
+    def get(self, kind: str) -> VectorIndex:
+        embedder = get_embedder()
+        directory = _index_path(kind, embedder)
+        key = versioned_builds.pointer_key(directory)
+        if key is None:
+            self._refresh_in_background(kind, embedder)
+            return VectorIndex.empty(embedder.dimensions)
+        state = self._state.get(kind)
+        if state is None or state[0] != key:
+            with self._lock:
+                state = self._state.get(kind)
+                if state is None or state[0] != key:
+                    index = VectorIndex.load(directory)
+                    if index is None or index.vectors.shape[1] != embedder.dimensions:
+                        index = VectorIndex.empty(embedder.dimensions)
+                    state = (key, index)
+                    self._state[kind] = state
+                    self._checked.setdefault(kind, time.monotonic())
+        interval = getattr(settings, "EMBEDDING_INDEX_CHECK_SECONDS", DEFAULT_INDEX_CHECK_SECONDS)
+        if time.monotonic() - self._checked.get(kind, 0.0) >= interval:
+            self._refresh_in_background(kind, embedder)
+        return state[1]
+
+    def _refresh_in_background(self, kind: str, embedder: Embedder) -> None:
+        def refresh():
+            try:
+                with versioned_builds.build_lock(_index_path(kind, embedder)) as held:
+                    # Another process on this host is building; its build shows up through CURRENT
+                    if held and not index_is_current(kind, embedder):
+                        build_index(kind, embedder)
+            except Exception:
+                logger.exception("Could not build the %s embedding index", kind)
+            finally:
+                connections.close_all()
+
+        # One build per index and process at a time; the next check catches later changes
+        with self._lock:
+            running = self._builds.get(kind)
+            if running is not None and running.is_alive():
+                return
+            self._checked[kind] = time.monotonic()
+            thread = threading.Thread(target=refresh, name=f"embedding-index-{kind}", daemon=True)
+            self._builds[kind] = thread
+        thread.start()
+
+
+index_manager = IndexManager()
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def _question_vector(mcq_id: int, index: VectorIndex, embedder: Embedder) -> Optional[np.ndarray]:
+    """The MCQ's question vector from the index, or from its stored row when saved after the build."""
+    from ..models import MCQEmbedding
+
+    positions = np.flatnonzero(index.mcq_ids == mcq_id)
+    if len(positions):
+        return np.asarray(index.vectors[positions[0]])
+    blob = (
+        MCQEmbedding.objects.filter(mcq_id=mcq_id, embedder=embedder.key, section=QUESTION)
+        .values_list("vector", flat=True)
+        .first()
+    )
+    if blob is None:
+        return None
+    vector = np.frombuffer(bytes(blob), dtype=np.float32)
+    return vector if vector.shape[0] == embedder.dimensions else None
+
+
+def related_mcqs(mcq, k: int = 5, min_score: Optional[float] = None) -> List[Tuple[int, float]]:
+    """MCQs most similar to ``mcq`` as ``(mcq_id, score)``, best first."""
+    min_score = getattr(settings, "RELATED_MCQ_MIN_SCORE", 0.2) if min_score is None else min_score
+    index = index_manager.get(KIND_QUESTION)
+    if not len(index):
+        return []
+    embedder = get_embedder()
+    vector = _question_vector(mcq.pk, index, embedder)
+    if vector is None:
+        if embedder.remote:
+            return []
+        vector = embedder.embed([question_text_for(mcq)])[0]
+    return [(mcq_id, score) for mcq_id, _, score in index.search(vector, k, exclude_mcq_ids=[mcq.pk], min_score=min_score)]
+
+
+def retrieve_context(
+    query: str,
+    k: int = 3,
+    exclude_mcq_ids: Iterable[int] = (),
+    min_score: float = 0.15,
+    max_chars: int = 600,
+) -> List[Dict[str, object]]:
+    """Explanation sections from other MCQs most relevant to ``query``.
+
+    Each item has ``mcq_id``, ``question_number``, ``section``, ``score`` and a
+    ``text`` excerpt. Costs one query to load the matching sections' text.
+    """
+    from ..models import MCQ
+
+    if k <= 0 or not query.strip():
+        return []
+    embedder = get_embedder()
+    if embedder.remote and not embedder.is_available():
+        return []
+    index = index_manager.get(KIND_SECTION)
+    hits = index.search(embedder.embed([query])[0], k, exclude_mcq_ids=exclude_mcq_ids, min_score=min_score)
+    if not hits:
+        return []
+    mcqs = MCQ.objects.only(
+        "id", "question_number", "explanation_sections", "unified_explanation", "explanation"
+    ).in_bulk([mcq_id for mcq_id, _, _ in hits])
+    results = []
+    for mcq_id, section, score in hits:
+        mcq = mcqs.get(mcq_id)
+        if mcq is None:
+            continue
+        text = section_texts_for(mcq).get(section, "")
+        if not text:
+            continue
+        results.append({
+            "mcq_id": mcq_id,
+            "question_number": mcq.question_number,
+            "section": section,
+            "score": round(score, 3),
+            "text": text[:max_chars],
+        })
+    return results
+
+
+def format_context(items: Sequence[Dict[str, object]]) -> str:
+    """Prompt block for :func:`retrieve_context` results."""
+    if not items:
+        return ""
+    lines = ["Related material from other questions in this question bank (use only if relevant):"]
+    for item in items:
+        title = str(item["section"]).replace("_", " ").title()
+        lines.append(f"- [{title}, question {item['question_number'] or item['mcq_id']}] {item['text']}")
+    return "\n".join(lines)
+
+
+def semantic_duplicate_clusters(threshold: float = 0.9, k: int = 5, cross_exam_only: bool = False):
+    """Clusters of MCQs whose question vectors have cosine similarity >= ``threshold``.
+
+    Complements the MinHash check in :mod:`mcq.services.near_duplicates`:
+    it catches rewordings that share meaning but few character shingles.
+    """
+    from .near_duplicates import clusters_from_pairs
+
+    index = index_manager.get(KIND_QUESTION)
+    pairs: Dict[Tuple[int, int], float] = {}
+    if len(index) < 2:
+        return []
+    k = min(k, len(index) - 1)
+    vectors = np.asarray(index.vectors)
+    for start in range(0, len(index), 512):
+        block = vectors[start:start + 512] @ vectors.T
+        for offset, scores in enumerate(block):
+            row = start + offset
+            scores[row] = -np.inf
+            top = np.argpartition(-scores, k - 1)[:k]
+            for col in top:
+                if scores[col] >= threshold:
+                    a, b = sorted((int(index.mcq_ids[row]), int(index.mcq_ids[col])))
+                    pairs[(a, b)] = max(pairs.get((a, b), 0.0), float(scores[col]))
+    return clusters_from_pairs(pairs, cross_exam_only=cross_exam_only)
@@ -0,0 +1,401 @@
+"""
+Streaming MCQ provisioning from fixtures and snapshots.
+
+``loaddata`` reads a whole fixture into memory, then deserializes and saves
+every object individually with its signals, so a fresh environment spent
+minutes loading ``all_mcqs.json`` or the ``django_fixtures`` chunks. This
+loader instead:
+
+* parses fixture arrays incrementally (``iter_json_array``), one object at a
+  time, from plain or gzip'd files;
+* validates each object and normalizes it the way ``MCQ.save`` would, dropping
+  fields the model does not have and primary keys it cannot use (the older
+  chunks carry UUIDs);
+* inserts in batches with ``bulk_create``, skipping primary keys that already
+  exist, and then rebuilds the ``MCQOption`` rows and caches the skipped
+  ``post_save`` receivers would have refreshed.
+
+A snapshot (``write_snapshot``) holds the same rows as gzip'd JSON lines: a
+header naming the columns, then one array of values per MCQ. It is a fraction
+of the fixture size and each line decodes on its own.
+
+Loading is idempotent: records whose id is already taken, or (without a
+usable id) whose question number and text are already present, are skipped.
+
+Embeddings and near-duplicate signatures are not computed here, as with
+``loaddata``; run ``build_embeddings --missing`` and
+``find_near_duplicates --missing`` afterwards.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "neurology-mcq-snapshot"
+SNAPSHOT_VERSION = 1
+MODEL_LABEL = "mcq.mcq"
+READ_SIZE = 1 << 16
+_WHITESPACE = " \t\r\n"
+# Files in the fixture directories that are not MCQ fixtures
+NON_FIXTURE_FILES = {"all_mcqs.json", "mcq_stats.json", "fixtures_manifest.json"}
+
+
+@dataclass
+class LoadStats:
+    seen: int = 0
+    inserted: int = 0
+    existing: int = 0
+    invalid: int = 0
+    renumbered: int = 0
+    dropped_fields: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.seen / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        text = (
+            f"{self.seen} records: {self.inserted} inserted, {self.existing} already present, "
+            f"{self.invalid} invalid in {self.seconds:.1f}s ({self.rate:.0f}/s)"
+        )
+        if self.renumbered:
+            text += f"; {self.renumbered} given new ids"
+        if self.dropped_fields:
+            text += "; ignored fields: " + ", ".join(sorted(self.dropped_fields))
+        return text
+
+
+# ----------------------------------------------------------------------
+# Incremental parsing
+# ----------------------------------------------------------------------
+def _open(path: str):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_json_array(stream, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    Only the element being decoded (plus one read) is held in memory, so a
+    fixture of any size is parsed in bounded space.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = stream.read(read_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        eof = not chunk
+
+    def skip(chars):
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in chars:
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            fill()
+
+    skip(_WHITESPACE)
+    if position >= len(buffer) or buffer[position] != "[":
+        raise ValueError("Fixture is not a JSON array")
+    position += 1
+    while True:
+        skip(_WHITESPACE + ",")
+        if position >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[position] == "]":
+            return
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+                # A value ending exactly at the buffer end may continue (e.g. a number)
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+        yield value
+        position = end
+
+
+def iter_fixture(path: str) -> Iterator[Dict[str, Any]]:
+    with _open(path) as stream:
+        yield from iter_json_array(stream)
+
+
+def _natural_key(path: str):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", os.path.basename(path))]
+
+
+def fixture_paths(path: str) -> List[str]:
+    """``path`` itself, or the fixture files in a directory (``mcq_fixture_2_of_31`` before ``_10_``)."""
+    if not os.path.isdir(path):
+        return [path]
+    names = [
+        name for name in os.listdir(path)
+        if name.endswith((".json", ".json.gz")) and name not in NON_FIXTURE_FILES
+    ]
+    return sorted((os.path.join(path, name) for name in names), key=_natural_key)
+
+
+def default_sources() -> Tuple[Optional[str], List[str]]:
+    """
+    What to provision from when nothing is named: ``(snapshot, fixtures)``.
+
+    The snapshot at ``MCQ_SNAPSHOT_PATH`` wins; otherwise ``all_mcqs.json``,
+    falling back to the per-subspecialty files beside it.
+    """
+    from django.conf import settings
+
+    snapshot = getattr(settings, "MCQ_SNAPSHOT_PATH", "")
+    if snapshot and os.path.exists(snapshot):
+        return snapshot, []
+    fixtures_dir = os.path.join(settings.BASE_DIR, "fixtures", "mcqs")
+    all_mcqs = os.path.join(fixtures_dir, "all_mcqs.json")
+    if os.path.exists(all_mcqs):
+        return None, [all_mcqs]
+    if os.path.isdir(fixtures_dir):
+        return None, fixture_paths(fixtures_dir)
+    return None, []
+
+
+# ----------------------------------------------------------------------
+# Validation
+# ----------------------------------------------------------------------
+def _mcq_fields():
+    from ..models import MCQ
+
+    return {f.attname: f for f in MCQ._meta.concrete_fields}
+
+
+def build_mcq(obj: Any, fields, stats: LoadStats):
+    """An unsaved MCQ for one fixture object, or None if it is not a usable MCQ record."""
+    from ..exam_utils import fold_exam_type, parse_exam_year
+    from ..models import MCQ
+    from ..option_utils import canonical_options
+
+    if not isinstance(obj, dict) or str(obj.get("model", "")).lower() != MODEL_LABEL:
+        stats.invalid += 1
+        return None
+    values = obj.get("fields")
+    if not isinstance(values, dict) or not str(values.get("question_text") or "").strip():
+        stats.invalid += 1
+        return None
+
+    kwargs = {}
+    for name, value in values.items():
+        if name in fields and name != "id":
+            kwargs[name] = value
+        else:
+            stats.dropped_fields[name] = stats.dropped_fields.get(name, 0) + 1
+    for name, value in kwargs.items():
+        max_length = getattr(fields[name], "max_length", None)
+        if max_length and isinstance(value, str) and len(value) > max_length:
+            logger.warning("Skipping fixture record %s: %s is longer than %s", obj.get("pk"), name, max_length)
+            stats.invalid += 1
+            return None
+
+    pk = obj.get("pk")
+    try:
+        kwargs["id"] = int(pk) if pk is not None else None
+    except (TypeError, ValueError):
+        kwargs["id"] = None
+        stats.renumbered += 1
+
+    # What MCQ.save normalizes
+    kwargs["options"] = canonical_options(kwargs.get("options"))
+    kwargs["exam_type"], original_exam_type = fold_exam_type(kwargs.get("exam_type"))
+    if original_exam_type is not None:
+        kwargs["exam_type_original"] = original_exam_type
+    kwargs["exam_year"] = parse_exam_year(kwargs.get("exam_year"))
+    for name, model_field in fields.items():
+        if name in kwargs and kwargs[name] is None and not model_field.null:
+            # loaddata would fail the whole fixture on these
+            if model_field.has_default():
+                kwargs[name] = model_field.get_default()
+            elif model_field.empty_strings_allowed:
+                kwargs[name] = ""
+    return MCQ(**kwargs)
+
+
+# ----------------------------------------------------------------------
+# Loading
+# ----------------------------------------------------------------------
+def _insert(batch: List, stats: LoadStats, using: str) -> List[int]:
+    from ..models import MCQ
+
+    numbered = {mcq.pk for mcq in batch if mcq.pk is not None}
+    present = set(MCQ.objects.using(using).filter(pk__in=numbered).values_list("pk", flat=True)) if numbered else set()
+    texts = [mcq.question_text for mcq in batch if mcq.pk is None]
+    known = set(
+        MCQ.objects.using(using).filter(question_text__in=texts).values_list("question_number", "question_text")
+    ) if texts else set()
+    explicit, implicit = {}, []
+    for mcq in batch:
+        if mcq.pk is None:
+            identity = (mcq.question_number, mcq.question_text)
+            if identity in known:
+                stats.existing += 1
+            else:
+                known.add(identity)
+                implicit.append(mcq)
+        elif mcq.pk in present or mcq.pk in explicit:
+            stats.existing += 1
+        else:
+            explicit[mcq.pk] = mcq
+
+    with transaction.atomic(using=using):
+        # ignore_conflicts covers rows inserted concurrently since the lookup
+        MCQ.objects.using(using).bulk_create(list(explicit.values()), ignore_conflicts=True)
+        # ... and silently skips them, so count only the rows that are ours
+        stored = MCQ.objects.using(using).filter(pk__in=list(explicit)).values_list("pk", "question_number", "question_text")
+        inserted = [
+            pk for pk, number, text in stored
+            if (number, text) == (explicit[pk].question_number, explicit[pk].question_text)
+        ]
+        created = MCQ.objects.using(using).bulk_create(implicit)
+    stats.existing += len(explicit) - len(inserted)
+    stats.inserted += len(inserted) + len(created)
+    return inserted + [mcq.pk for mcq in created if mcq.pk is not None]
+
+
+def load_objects(
+    objects: Iterable[Any],
+    batch_size: int = 500,
+    progress: Optional[Callable[[LoadStats], None]] = None,
+    using: Optional[str] = None,
+) -> LoadStats:
+    """Validate and bulk insert fixture objects; ``progress`` is called after every batch."""
+    from ..models import MCQ
+
+    using = using or router.db_for_write(MCQ)
+    stats = LoadStats()
+    fields = _mcq_fields()
+    started = time.monotonic()
+    batch: List = []
+    touched: List[int] = []
+
+    def flush():
+        if batch:
+            touched.extend(_insert(batch, stats, using))
+            batch.clear()
+        stats.seconds = time.monotonic() - started
+        if progress:
+            progress(stats)
+
+    for obj in objects:
+        stats.seen += 1
+        mcq = build_mcq(obj, fields, stats)
+        if mcq is not None:
+            batch.append(mcq)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    _after_bulk_load(touched, batch_size, using)
+    stats.seconds = time.monotonic() - started
+    return stats
+
+
+def load_fixtures(
+    paths: Sequence[str],
+    batch_size: int = 500,
+    progress: Optional[Callable[[str, LoadStats], None]] = None,
+) -> LoadStats:
+    """Stream every fixture in ``paths`` into the MCQ table as one load."""
+    current = {"path": None}
+
+    def objects():
+        for path in paths:
+            current["path"] = path
+            logger.info("Loading fixture %s", path)
+            yield from iter_fixture(path)
+
+    return load_objects(
+        objects(),
+        batch_size=batch_size,
+        progress=(lambda stats: progress(current["path"], stats)) if progress else None,
+    )
+
+
+def _after_bulk_load(mcq_ids: List[int], batch_size: int, using: str) -> None:
+    """What the skipped post_save receivers and ``loaddata`` would have done."""
+    from ..admin_performance import invalidate_filter_choices
+    from ..models import MCQ, MCQOption
+    from ..option_utils import rebuild_option_rows
+    from .adaptive_selector import bump_candidate_version
+
+    if not mcq_ids:
+        return
+    # bulk_create with explicit ids leaves PostgreSQL's sequence behind them
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(no_style(), [MCQ])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    for start in range(0, len(mcq_ids), batch_size):
+        rebuild_option_rows(MCQ, MCQOption, mcq_ids=mcq_ids[start:start + batch_size], batch_size=batch_size)
+    bump_candidate_version()
+    invalidate_filter_choices()
+
+
+# ----------------------------------------------------------------------
+# Snapshots
+# ----------------------------------------------------------------------
+def write_snapshot(path: str, queryset=None, batch_size: int = 1000) -> int:
+    """Write the MCQ table (or ``queryset``) as a gzip'd JSON-lines snapshot; returns the row count."""
+    from ..models import MCQ
+
+    queryset = (queryset if queryset is not None else MCQ.objects.all()).order_by("pk")
+    columns = list(_mcq_fields())
+    count = 0
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as out:
+        header = {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION, "model": MODEL_LABEL, "columns": columns}
+        out.write(json.dumps(header) + "\n")
+        for row in queryset.values_list(*columns).iterator(chunk_size=batch_size):
+            out.write(json.dumps(row, default=str, separators=(",", ":")) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def iter_snapshot(path: str) -> Iterator[Dict[str, Any]]:
+    """Snapshot rows as fixture-shaped objects, so they share the fixture validation."""
+    with gzip.open(path, "rt", encoding="utf-8") as stream:
+        header = json.loads(stream.readline() or "{}")
+        if header.get("format") != SNAPSHOT_FORMAT or header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} MCQ snapshot")
+        columns = header["columns"]
+        for line in stream:
+            values = dict(zip(columns, json.loads(line)))
+            yield {"model": MODEL_LABEL, "pk": values.pop("id", None), "fields": values}
+
+
+def load_snapshot(
+    path: str,
+    batch_size: int = 1000,
+    progress: Optional[Callable[[LoadStats], None]] = None,
+) -> LoadStats:
+    return load_objects(iter_snapshot(path), batch_size=batch_size, progress=progress)
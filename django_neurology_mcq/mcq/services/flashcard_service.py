@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import timedelta
-from typing import Iterable, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+from django.conf import settings
 from django.contrib import messages
+from django.db import transaction
 from django.utils import timezone
 
-from ..models import Flashcard, MCQ
+from ..models import Flashcard, FlashcardReview, MCQ, UserProfile
+from .spaced_repetition import CardState, SchedulerParameters, get_scheduler, validate_rating
+
+DEFAULT_REVIEW_QUEUE_SIZE = 50
+REVIEW_BATCH_SIZE = 500
 
 
 @dataclass
@@ -18,6 +24,29 @@ class FlashcardScheduleResult:
     created: bool
 
 
+@dataclass
+class ReviewQueue:
+    """The next due cards for a session, fetched with their MCQs in one query."""
+
+    flashcards: List[Flashcard]
+    total_due: int
+    empty_message: str
+
+    def __bool__(self) -> bool:
+        return bool(self.flashcards)
+
+    def __len__(self) -> int:
+        return len(self.flashcards)
+
+
+@dataclass
+class ReviewBatchResult:
+    reviewed: int
+    algorithm: str
+    next_review: Dict[int, str] = field(default_factory=dict)
+    skipped: List[int] = field(default_factory=list)
+
+
 class FlashcardService:
     @staticmethod
     def schedule(user, mcq: MCQ, interval_days: int) -> FlashcardScheduleResult:
@@ -42,6 +71,92 @@ class FlashcardService:
         )
         return result
 
+    @staticmethod
+    def scheduler_parameters(user) -> SchedulerParameters:
+        row = (
+            UserProfile.objects.filter(user=user)
+            .values_list("flashcard_scheduler", "flashcard_parameters")
+            .first()
+        )
+        return SchedulerParameters.from_profile_values(*(row or (None, None)))
+
+    @classmethod
+    def review_queue(
+        cls,
+        user,
+        review_type: str = "today",
+        hidden_mcq_ids: Optional[Iterable[int]] = None,
+        limit: Optional[int] = None,
+    ) -> ReviewQueue:
+        """Return up to ``limit`` due cards, ordered by due date, plus the due total.
+
+        The cards (with their MCQs) are materialised once so the review page can
+        walk through them without another query per card; the total is only
+        counted when the queue is full.
+        """
+        if limit is None:
+            limit = getattr(settings, "FLASHCARD_REVIEW_QUEUE_SIZE", DEFAULT_REVIEW_QUEUE_SIZE)
+        qs, empty_message = cls.due_flashcards(user, review_type=review_type, hidden_mcq_ids=hidden_mcq_ids)
+        flashcards = list(qs[:limit])
+        total_due = len(flashcards) if len(flashcards) < limit else qs.count()
+        return ReviewQueue(flashcards=flashcards, total_due=total_due, empty_message=empty_message)
+
+    @classmethod
+    def record_reviews(cls, user, reviews: Sequence[Tuple[int, int]]) -> ReviewBatchResult:
+        """Apply a batch of ``(flashcard_id, rating)`` grades for ``user``.
+
+        Cards are loaded in one query, rescheduled in memory with the user's
+        scheduler, then written back with ``bulk_update`` and logged with
+        ``bulk_create``. Unknown or foreign card ids are skipped. If a card
+        appears more than once its grades are applied in order.
+        """
+        graded = [(int(flashcard_id), validate_rating(rating)) for flashcard_id, rating in reviews]
+        parameters = cls.scheduler_parameters(user)
+        scheduler = get_scheduler(parameters)
+        result = ReviewBatchResult(reviewed=0, algorithm=scheduler.name)
+        if not graded:
+            return result
+
+        flashcards = Flashcard.objects.filter(user=user, id__in={fid for fid, _ in graded}).in_bulk()
+        now = timezone.now()
+        log = []
+        for flashcard_id, rating in graded:
+            flashcard = flashcards.get(flashcard_id)
+            if flashcard is None:
+                result.skipped.append(flashcard_id)
+                continue
+            previous = CardState.from_flashcard(flashcard)
+            state = scheduler.review(previous, rating, now)
+            state.apply_to(flashcard)
+            elapsed = (now - previous.last_reviewed).total_seconds() / 86400 if previous.last_reviewed else 0
+            log.append(
+                FlashcardReview(
+                    user=user,
+                    flashcard=flashcard,
+                    rating=rating,
+                    algorithm=scheduler.name,
+                    reviewed_at=now,
+                    elapsed_days=round(max(0.0, elapsed), 4),
+                    previous_interval=previous.interval,
+                    interval=state.interval,
+                    ease_factor=state.ease_factor,
+                    stability=state.stability,
+                    difficulty=state.difficulty,
+                )
+            )
+            result.next_review[flashcard_id] = state.next_review.isoformat()
+
+        if log:
+            with transaction.atomic():
+                Flashcard.objects.bulk_update(
+                    [flashcards[fid] for fid in result.next_review],
+                    list(CardState.FIELDS),
+                    batch_size=REVIEW_BATCH_SIZE,
+                )
+                FlashcardReview.objects.bulk_create(log, batch_size=REVIEW_BATCH_SIZE)
+        result.reviewed = len(log)
+        return result
+
     @staticmethod
     def _apply_review_window(queryset, review_type: str):
         now = timezone.now()
@@ -65,13 +180,3 @@ class FlashcardService:
 
         filtered_qs, empty_message = cls._apply_review_window(qs, review_type)
         return filtered_qs.order_by("next_review"), empty_message
-
-    @classmethod
-    def due_flashcards_or_redirect(cls, request, review_type: str, hidden_mcq_ids: Iterable[int]):
-        flashcards_qs, empty_message = cls.due_flashcards(
-            request.user, review_type=review_type, hidden_mcq_ids=hidden_mcq_ids
-        )
-        if not flashcards_qs.exists():
-            messages.info(request, empty_message)
-            return None
-        return flashcards_qs
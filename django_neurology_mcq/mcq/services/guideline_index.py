@@ -0,0 +1,537 @@
+"""Local BM25 retrieval over guideline documents.
+
+Guideline sources (plain text, markdown, PDF text and the curated quote JSON
+in ``mcq/guidelines``) are split into heading-aware chunks of a few sentences
+and indexed with Okapi BM25. Prompts that need grounding (clinical reasoning
+modal, ReasoningPal coach, explanation generation) ask for the best matching
+sentences here instead of attaching the remote vector store.
+
+Index layout (under ``GUIDELINE_INDEX_DIR``): each build is written to its
+own subdirectory and ``CURRENT`` names the live one, so a rebuild never
+exposes half-written files to running workers. The sources ship with the
+code, so a process that finds no build on its own disk (a fresh dyno)
+builds one in the background on first use; ``build_guideline_index``
+rebuilds after the sources change.
+
+* ``meta.json``: build parameters, average chunk length, source list
+* ``lexicon.json``: term -> ``[offset, document frequency]``
+* ``postings_ids.npy`` / ``postings_tf.npy``: chunk ids (uint32) and term
+  frequencies (uint16) of every term's posting list, concatenated
+* ``doclens.npy``: chunk lengths in tokens
+* ``chunks.bin`` / ``chunk_offsets.npy``: UTF-8 chunk texts and their offsets
+* ``chunk_meta.json``: ``[source index, heading]`` per chunk
+
+The ``.npy`` and ``.bin`` files are memory-mapped, so worker processes share
+the pages and a query touches only the posting lists of its own terms. A
+query is a handful of vectorised NumPy additions: low single-digit
+milliseconds for tens of thousands of chunks.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from . import versioned_builds
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+DEFAULT_CHUNK_WORDS = 160
+TEXT_SUFFIXES = (".txt", ".md", ".markdown")
+PDF_SUFFIX = ".pdf"
+JSON_SUFFIX = ".json"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+(.*\S)\s*#*\s*$")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"“(\[]?[A-Z0-9])")
+_STOPWORDS = frozenset(
+    "a an and are as at be been by can for from has have in into is it its may of on or should that the "
+    "their there these this those to was were which who will with what when most likely following patient "
+    "patients year old".split()
+)
+
+
+class GuidelineIndexError(Exception):
+    """A source document could not be read or the index could not be written."""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric tokens without stopwords or single letters."""
+    return [
+        token for token in _TOKEN_RE.findall((text or "").lower())
+        if token not in _STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(" ".join(text.split())) if sentence.strip()]
+
+
+# ---------------------------------------------------------------------------
+# Sources and chunking
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Chunk:
+    source: str
+    heading: str
+    text: str
+
+
+def _read_pdf(path: Path) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError as exc:
+        raise GuidelineIndexError(f"{path.name}: install pypdf to index PDF files") from exc
+    reader = PdfReader(str(path))
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _curated_quote_chunks(path: Path) -> List[Chunk]:
+    """Chunks for a ``curated_quotes.json``-style file: one per real quote."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError as exc:
+        raise GuidelineIndexError(f"{path.name}: invalid JSON ({exc})") from exc
+    chunks = []
+    for topic in (data.values() if isinstance(data, dict) else []):
+        if not isinstance(topic, dict):
+            continue
+        for item in topic.get("quotes") or []:
+            quote = (item.get("quote") or "").strip() if isinstance(item, dict) else ""
+            source = (item.get("source") or "").strip() if isinstance(item, dict) else ""
+            if not quote or source.lower() in ("", "placeholder"):
+                continue
+            year = str(item.get("year") or "").strip()
+            chunks.append(Chunk(
+                source=f"{source} ({year})" if year else source,
+                heading=str(topic.get("topic") or ""),
+                text=quote,
+            ))
+    return chunks
+
+
+def chunk_text(text: str, source: str, max_words: int = DEFAULT_CHUNK_WORDS) -> List[Chunk]:
+    """
+    Split a document into chunks of whole sentences, at most ~``max_words``
+    words each, never crossing a markdown heading. Consecutive chunks share
+    one sentence so a quote split across a boundary is still found whole.
+    """
+    chunks: List[Chunk] = []
+    heading = ""
+    sentences: List[str] = []
+    carried = 0  # sentences repeated from the previous chunk
+
+    def flush(keep_last: bool = False):
+        nonlocal sentences, carried
+        if len(sentences) > carried:
+            chunks.append(Chunk(source=source, heading=heading, text=" ".join(sentences)))
+        sentences = sentences[-1:] if keep_last and len(sentences) > 1 else []
+        carried = len(sentences)
+
+    paragraphs: List[str] = []
+    for line in text.splitlines() + [""]:
+        match = _HEADING_RE.match(line)
+        if match or not line.strip():
+            if paragraphs:
+                for sentence in split_sentences(" ".join(paragraphs)):
+                    sentences.append(sentence)
+                    if sum(len(s.split()) for s in sentences) >= max_words:
+                        flush(keep_last=True)
+                paragraphs = []
+            if match:
+                flush()
+                heading = match.group(1).strip("# ").strip()
+            continue
+        paragraphs.append(line.strip())
+    flush()
+    return chunks
+
+
+def iter_source_files(paths: Iterable[os.PathLike]) -> Iterator[Path]:
+    """Indexable files under ``paths`` (files or directories), in a stable order."""
+    suffixes = TEXT_SUFFIXES + (PDF_SUFFIX, JSON_SUFFIX)
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in suffixes)
+        elif path.is_file():
+            yield path
+        else:
+            raise GuidelineIndexError(f"No such file or directory: {path}")
+
+
+def load_chunks(path: Path, max_words: int = DEFAULT_CHUNK_WORDS) -> List[Chunk]:
+    suffix = path.suffix.lower()
+    if suffix == JSON_SUFFIX:
+        return _curated_quote_chunks(path)
+    if suffix == PDF_SUFFIX:
+        text = _read_pdf(path)
+    else:
+        text = path.read_text(encoding="utf-8", errors="replace")
+    return chunk_text(text, source=path.stem.replace("_", " "), max_words=max_words)
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Hit:
+    chunk_id: int
+    score: float
+    source: str
+    heading: str
+    text: str
+
+
+@dataclass(frozen=True)
+class Quote:
+    text: str
+    source: str
+    heading: str
+    score: float
+
+    def render(self) -> str:
+        where = f"{self.source}, {self.heading}" if self.heading else self.source
+        return f'"{self.text}" ({where})'
+
+
+class BM25Index:
+    """Okapi BM25 over chunk posting lists; see the module docstring for the file layout."""
+
+    def __init__(
+        self,
+        lexicon: Dict[str, Tuple[int, int]],
+        postings_ids: np.ndarray,
+        postings_tf: np.ndarray,
+        doclens: np.ndarray,
+        texts: "ChunkTexts",
+        chunk_meta: Sequence[Tuple[int, str]],
+        sources: Sequence[str],
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+        build_id: str = "",
+    ):
+        self.lexicon = lexicon
+        self.postings_ids = postings_ids
+        self.postings_tf = postings_tf
+        self.doclens = doclens
+        self.texts = texts
+        self.chunk_meta = chunk_meta
+        self.sources = list(sources)
+        self.k1 = k1
+        self.b = b
+        self.build_id = build_id
+        self.avgdl = float(doclens.mean()) if len(doclens) else 0.0
+        if not self.avgdl:
+            self.avgdl = 1.0
+        # Per-chunk length normalisation, computed once
+        self._norm = (k1 * (1 - b + b * np.asarray(doclens, dtype=np.float32) / self.avgdl)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.doclens)
+
+    @classmethod
+    def build(cls, chunks: Sequence[Chunk], k1: float = DEFAULT_K1, b: float = DEFAULT_B) -> "BM25Index":
+        sources: List[str] = []
+        source_ids: Dict[str, int] = {}
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        doclens = np.zeros(len(chunks), dtype=np.uint32)
+        chunk_meta = []
+        for chunk_id, chunk in enumerate(chunks):
+            if chunk.source not in source_ids:
+                source_ids[chunk.source] = len(sources)
+                sources.append(chunk.source)
+            chunk_meta.append((source_ids[chunk.source], chunk.heading))
+            tokens = tokenize(f"{chunk.heading} {chunk.text}")
+            doclens[chunk_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings[term].append((chunk_id, min(tf, 65535)))
+
+        lexicon: Dict[str, Tuple[int, int]] = {}
+        ids: List[int] = []
+        tfs: List[int] = []
+        for term in sorted(postings):
+            lexicon[term] = (len(ids), len(postings[term]))
+            for chunk_id, tf in postings[term]:
+                ids.append(chunk_id)
+                tfs.append(tf)
+        return cls(
+            lexicon,
+            np.array(ids, dtype=np.uint32),
+            np.array(tfs, dtype=np.uint16),
+            doclens,
+            ChunkTexts.from_strings([chunk.text for chunk in chunks]),
+            chunk_meta,
+            sources,
+            k1=k1,
+            b=b,
+        )
+
+    # Queries ------------------------------------------------------------------
+
+    def search(self, query: str, k: int = 5) -> List[Hit]:
+        """Best ``k`` chunks for ``query`` by BM25 score (zero-score chunks are never returned)."""
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self.lexicon]
+        if not terms or not len(self):
+            return []
+        n = len(self)
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            offset, df = self.lexicon[term]
+            ids = self.postings_ids[offset:offset + df]
+            tf = self.postings_tf[offset:offset + df].astype(np.float32)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + self._norm[ids])
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        hits = []
+        for chunk_id in top.tolist():
+            source_id, heading = self.chunk_meta[chunk_id]
+            hits.append(Hit(chunk_id, float(scores[chunk_id]), self.sources[source_id], heading, self.texts[chunk_id]))
+        return hits
+
+    def quotes(self, query: str, k: int = 4, min_score: float = 0.0, max_chars: int = 400) -> List[Quote]:
+        """
+        Exact sentences from the best chunks: for each hit, the sentence that
+        covers the most query terms. Duplicates across overlapping chunks are dropped.
+        """
+        query_terms = set(tokenize(query))
+        quotes: List[Quote] = []
+        seen = set()
+        for hit in self.search(query, k=k * 2):
+            if hit.score < min_score:
+                break
+            best, best_overlap = "", 0
+            for sentence in split_sentences(hit.text):
+                if not 40 <= len(sentence) <= max_chars:
+                    continue
+                overlap = len(query_terms.intersection(tokenize(sentence)))
+                if overlap > best_overlap:
+                    best, best_overlap = sentence, overlap
+            if best and best not in seen:
+                seen.add(best)
+                quotes.append(Quote(best, hit.source, hit.heading, round(hit.score, 3)))
+            if len(quotes) >= k:
+                break
+        return quotes
+
+    # Files --------------------------------------------------------------------
+
+    def save(self, directory: Path) -> str:
+        """Write a new build under ``directory`` and point ``CURRENT`` at it; returns the build id."""
+        build_id, target = versioned_builds.new_build(directory)
+        try:
+            np.save(target / "postings_ids.npy", self.postings_ids)
+            np.save(target / "postings_tf.npy", self.postings_tf)
+            np.save(target / "doclens.npy", self.doclens)
+            self.texts.save(target)
+            (target / "lexicon.json").write_text(json.dumps(self.lexicon), encoding="utf-8")
+            (target / "chunk_meta.json").write_text(json.dumps(list(self.chunk_meta)), encoding="utf-8")
+            (target / "meta.json").write_text(json.dumps({
+                "version": FORMAT_VERSION,
+                "k1": self.k1,
+                "b": self.b,
+                "chunks": len(self),
+                "terms": len(self.lexicon),
+                "avgdl": self.avgdl,
+                "sources": self.sources,
+                "built_at": time.time(),
+            }), encoding="utf-8")
+            versioned_builds.publish(directory, build_id)
+        except OSError as exc:
+            versioned_builds.discard(target)
+            raise GuidelineIndexError(f"Could not write guideline index: {exc}") from exc
+        self.build_id = build_id
+        return build_id
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["BM25Index"]:
+        """Memory-map the current build; None when there is none or it is unreadable."""
+        target = versioned_builds.current_build(directory)
+        if target is None:
+            return None
+        build_id = target.name
+        try:
+            meta = json.loads((target / "meta.json").read_text(encoding="utf-8"))
+            if meta.get("version") != FORMAT_VERSION:
+                logger.info("Guideline index %s has format %s; rebuild it", target, meta.get("version"))
+                return None
+            lexicon = {term: tuple(entry) for term, entry in
+                       json.loads((target / "lexicon.json").read_text(encoding="utf-8")).items()}
+            chunk_meta = [tuple(entry) for entry in json.loads((target / "chunk_meta.json").read_text(encoding="utf-8"))]
+            return cls(
+                lexicon,
+                np.load(target / "postings_ids.npy", mmap_mode="r"),
+                np.load(target / "postings_tf.npy", mmap_mode="r"),
+                np.load(target / "doclens.npy"),
+                ChunkTexts.load(target),
+                chunk_meta,
+                meta["sources"],
+                k1=meta["k1"],
+                b=meta["b"],
+                build_id=build_id,
+            )
+        except (OSError, ValueError, KeyError) as exc:
+            logger.info("Guideline index at %s not loaded: %s", directory, exc)
+            return None
+
+
+class ChunkTexts:
+    """Chunk texts as one UTF-8 blob plus offsets; the blob is memory-mapped once saved."""
+
+    def __init__(self, blob, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, texts: Sequence[str]) -> "ChunkTexts":
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        if encoded:
+            offsets[1:] = np.cumsum([len(item) for item in encoded])
+        return cls(b"".join(encoded), offsets)
+
+    def __getitem__(self, index: int) -> str:
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+    def save(self, directory: Path) -> None:
+        (directory / "chunks.bin").write_bytes(bytes(self.blob))
+        np.save(directory / "chunk_offsets.npy", self.offsets)
+
+    @classmethod
+    def load(cls, directory: Path) -> "ChunkTexts":
+        offsets = np.load(directory / "chunk_offsets.npy", mmap_mode="r")
+        path = directory / "chunks.bin"
+        if path.stat().st_size == 0:
+            return cls(b"", offsets)
+        with open(path, "rb") as handle:
+            blob = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(blob, offsets)
+
+
+# ---------------------------------------------------------------------------
+# Process-level access
+# ---------------------------------------------------------------------------
+
+def index_dir() -> Path:
+    configured = getattr(settings, "GUIDELINE_INDEX_DIR", None)
+    return Path(configured) if configured else Path(settings.BASE_DIR) / "var" / "guidelines"
+
+
+def source_dirs() -> List[Path]:
+    configured = getattr(settings, "GUIDELINE_SOURCE_DIRS", None)
+    if configured:
+        return [Path(path) for path in configured]
+    return [Path(__file__).resolve().parent.parent / "guidelines"]
+
+
+class _IndexCache:
+    """
+    The loaded index per process, reloaded when ``CURRENT`` names a new build.
+
+    With no build on disk, ``get`` starts one in the background (once per
+    process) and returns None until it is published.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[BM25Index] = None
+        self._key: Optional[Tuple[str, float]] = None
+        self._build: Optional[threading.Thread] = None
+
+    def get(self) -> Optional[BM25Index]:
+        directory = index_dir()
+        key = versioned_builds.pointer_key(directory)
+        if key is None:
+            self._build_in_background(directory)
+            return None
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    self._index = BM25Index.load(directory)
+                    self._key = key
+        return self._index
+
+    def _build_in_background(self, directory: Path) -> None:
+        def build():
+            try:
+                with versioned_builds.build_lock(directory) as held:
+                    # Another process on this host is building; its build shows up through CURRENT
+                    if held and versioned_builds.current_build(directory) is None:
+                        build_index()
+            except GuidelineIndexError as exc:
+                logger.warning("Guideline index not built: %s", exc)
+            except Exception:
+                logger.exception("Could not build the guideline index")
+
+        with self._lock:
+            if self._build is not None:
+                return
+            self._build = threading.Thread(target=build, name="guideline-index", daemon=True)
+        self._build.start()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._index = None
+            self._key = None
+            self._build = None
+
+
+_cache = _IndexCache()
+
+
+def get_index() -> Optional[BM25Index]:
+    return _cache.get()
+
+
+def build_index(
+    paths: Optional[Iterable[os.PathLike]] = None,
+    max_words: int = DEFAULT_CHUNK_WORDS,
+    k1: float = DEFAULT_K1,
+    b: float = DEFAULT_B,
+    progress=None,
+) -> BM25Index:
+    """Chunk and index every source file under ``paths`` (default ``GUIDELINE_SOURCE_DIRS``) and save it."""
+    report = progress or (lambda message: None)
+    chunks: List[Chunk] = []
+    for path in iter_source_files(paths or source_dirs()):
+        loaded = load_chunks(path, max_words=max_words)
+        report(f"{path.name}: {len(loaded)} chunks")
+        chunks.extend(loaded)
+    index = BM25Index.build(chunks, k1=k1, b=b)
+    index.save(index_dir())
+    _cache.reset()
+    return index
+
+
+def guideline_quotes(query: str, k: Optional[int] = None) -> List[Quote]:
+    """Top guideline sentences for ``query`` from the local index; empty until one is built."""
+    k = getattr(settings, "GUIDELINE_CONTEXT_QUOTES", 4) if k is None else k
+    if not k or not query.strip():
+        return []
+    index = get_index()
+    if index is None:
+        return []
+    return index.quotes(query, k=k, min_score=getattr(settings, "GUIDELINE_MIN_SCORE", 2.0))
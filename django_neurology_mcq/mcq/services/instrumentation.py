@@ -0,0 +1,675 @@
+"""
+Per-request and per-task cost accounting.
+
+Every HTTP request (``InstrumentationMiddleware``) and every Celery task (task
+signals) is measured while it runs:
+
+* database queries and their time, through a ``connection.execute_wrappers`` hook
+* hits and misses on the default cache
+* LLM calls made through ``openai_integration``: model, tokens and latency
+
+Finished measurements are added to a rolling per-minute aggregate keyed by
+route (URL name) or task name. With Redis (the production cache) the
+aggregate is a hash per minute shared by every web and worker process; other
+cache backends use an in-process window. The aggregate feeds the staff
+performance dashboard and the Prometheus text endpoint, and requests also get
+a ``Server-Timing`` header with their own numbers.
+
+Measurements nest: a task run eagerly inside a request is reported on its own
+and its costs are added to the request as well.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from mcq import db_router
+
+logger = logging.getLogger(__name__)
+
+KIND_REQUEST = "request"
+KIND_TASK = "task"
+KIND_LLM = "llm"
+
+DEFAULT_WINDOW_MINUTES = 15
+KEY_PREFIX = "instr"
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "INSTRUMENTATION_ENABLED", True))
+
+
+def window_minutes() -> int:
+    return int(getattr(settings, "INSTRUMENTATION_WINDOW_MINUTES", DEFAULT_WINDOW_MINUTES))
+
+
+def bucket_label(duration_ms: float) -> str:
+    for bound in LATENCY_BUCKETS_MS:
+        if duration_ms <= bound:
+            return f"le_{bound}"
+    return "le_inf"
+
+
+BUCKET_LABELS = tuple(f"le_{bound}" for bound in LATENCY_BUCKETS_MS) + ("le_inf",)
+
+
+# ----------------------------------------------------------------------
+# Measurements
+# ----------------------------------------------------------------------
+@dataclass
+class LLMCall:
+    model: str
+    duration_ms: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    ok: bool = True
+
+    def counters(self) -> Dict[str, float]:
+        return {
+            "count": 1,
+            "errors": 0 if self.ok else 1,
+            "duration_ms": self.duration_ms,
+            "llm_calls": 1,
+            "llm_time_ms": self.duration_ms,
+            "llm_prompt_tokens": self.prompt_tokens,
+            "llm_completion_tokens": self.completion_tokens,
+            bucket_label(self.duration_ms): 1,
+        }
+
+
+@dataclass
+class Measurement:
+    kind: str
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    duration_ms: float = 0.0
+    db_queries: int = 0
+    db_time_ms: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    llm_calls: List[LLMCall] = field(default_factory=list)
+    error: bool = False
+
+    @property
+    def llm_time_ms(self) -> float:
+        return sum(call.duration_ms for call in self.llm_calls)
+
+    def absorb(self, other: "Measurement") -> None:
+        """Add the costs of a nested measurement to this one."""
+        self.db_queries += other.db_queries
+        self.db_time_ms += other.db_time_ms
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        self.llm_calls.extend(other.llm_calls)
+
+    def counters(self) -> Dict[str, float]:
+        return {
+            "count": 1,
+            "errors": 1 if self.error else 0,
+            "duration_ms": self.duration_ms,
+            "db_queries": self.db_queries,
+            "db_time_ms": self.db_time_ms,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "llm_calls": len(self.llm_calls),
+            "llm_time_ms": self.llm_time_ms,
+            "llm_prompt_tokens": sum(call.prompt_tokens for call in self.llm_calls),
+            "llm_completion_tokens": sum(call.completion_tokens for call in self.llm_calls),
+            bucket_label(self.duration_ms): 1,
+        }
+
+    def server_timing(self) -> str:
+        entries = [
+            f'db;dur={self.db_time_ms:.1f};desc="{self.db_queries} queries"',
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses"',
+        ]
+        if self.llm_calls:
+            entries.append(f'llm;dur={self.llm_time_ms:.1f};desc="{len(self.llm_calls)} calls"')
+        entries.append(f"total;dur={self.duration_ms:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[Measurement]] = ContextVar("instrumentation_measurement", default=None)
+
+
+def current() -> Optional[Measurement]:
+    return _current.get()
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    measurement = _current.get()
+    if measurement is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        measurement.db_queries += 1
+        measurement.db_time_ms += (time.perf_counter() - started) * 1000
+
+
+def _install_query_wrapper(connection) -> None:
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_wrapper)
+
+
+def _on_connection_created(sender, connection, **kwargs) -> None:
+    _install_query_wrapper(connection)
+
+
+def install_query_hooks() -> None:
+    """
+    Count queries on every connection, in whatever thread it is used (idempotent).
+
+    Async views run their ORM calls on other threads, each with its own
+    connections; the wrapper charges whichever measurement is current in
+    the calling context and costs nothing outside one.
+    """
+    connection_created.connect(_on_connection_created, dispatch_uid="instrumentation_query_wrapper")
+    for alias in connections:
+        _install_query_wrapper(connections[alias])
+
+
+@contextmanager
+def measure(kind: str, name: str) -> Iterator[Measurement]:
+    """Measure the enclosed block and add it to the aggregate on exit.
+
+    ``name`` may be changed on the yielded measurement before the block ends
+    (the middleware only knows the route after the view has run).
+    """
+    install_cache_hooks()
+    install_query_hooks()
+    measurement = Measurement(kind=kind, name=name)
+    token = _current.set(measurement)
+    try:
+        yield measurement
+    except BaseException:
+        measurement.error = True
+        raise
+    finally:
+        measurement.duration_ms = (time.perf_counter() - measurement.started) * 1000
+        _current.reset(token)
+        parent = _current.get()
+        if parent is not None:
+            parent.absorb(measurement)
+        record(measurement.kind, measurement.name, measurement.counters())
+
+
+# ----------------------------------------------------------------------
+# LLM calls
+# ----------------------------------------------------------------------
+def _usage_tokens(response) -> Tuple[int, int]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0, 0
+    prompt = getattr(usage, "prompt_tokens", None)
+    if prompt is None:
+        prompt = getattr(usage, "input_tokens", 0)
+    completion = getattr(usage, "completion_tokens", None)
+    if completion is None:
+        completion = getattr(usage, "output_tokens", 0)
+    try:
+        return int(prompt or 0), int(completion or 0)
+    except (TypeError, ValueError):
+        return 0, 0
+
+
+class _LLMCallRecorder:
+    def __init__(self, model: str):
+        self.model = str(model or "unknown")
+        self.response = None
+
+
+@contextmanager
+def llm_call(model: str) -> Iterator[_LLMCallRecorder]:
+    """Time one LLM API call; assign the API response to ``.response`` for token counts."""
+    # Don't hold a pooled database connection while waiting on the model
+    db_router.release_pooled_connections()
+    recorder = _LLMCallRecorder(model)
+    started = time.perf_counter()
+    ok = True
+    try:
+        yield recorder
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        if enabled():
+            prompt_tokens, completion_tokens = _usage_tokens(recorder.response)
+            call = LLMCall(
+                model=recorder.model,
+                duration_ms=(time.perf_counter() - started) * 1000,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                ok=ok,
+            )
+            measurement = _current.get()
+            if measurement is not None:
+                measurement.llm_calls.append(call)
+            record(KIND_LLM, call.model, call.counters())
+
+
+# ----------------------------------------------------------------------
+# Cache hits and misses
+# ----------------------------------------------------------------------
+_MISS = object()
+_hooks_lock = threading.Lock()
+# Set while get_many runs; some backends implement it with get()
+_in_get_many: ContextVar[bool] = ContextVar("instrumentation_in_get_many", default=False)
+
+
+def _count_cache(hits: int, misses: int) -> None:
+    measurement = _current.get()
+    if measurement is not None and not _in_get_many.get():
+        measurement.cache_hits += hits
+        measurement.cache_misses += misses
+
+
+def _instrument_backend(backend):
+    """Count ``get``/``get_many`` results on one cache backend instance (idempotent)."""
+    if backend.__dict__.get("_instrumented"):
+        return backend
+    original_get = backend.get
+    original_get_many = backend.get_many
+
+    def get(key, default=None, *args, **kwargs):
+        value = original_get(key, _MISS, *args, **kwargs)
+        if value is _MISS:
+            _count_cache(0, 1)
+            return default
+        _count_cache(1, 0)
+        return value
+
+    def get_many(keys, *args, **kwargs):
+        keys = list(keys)
+        token = _in_get_many.set(True)
+        try:
+            found = original_get_many(keys, *args, **kwargs)
+        finally:
+            _in_get_many.reset(token)
+        _count_cache(len(found), len(keys) - len(found))
+        return found
+
+    backend.get = get
+    backend.get_many = get_many
+    backend._instrumented = True
+    return backend
+
+
+def install_cache_hooks() -> None:
+    """
+    Count lookups on the default cache (idempotent).
+
+    Django creates a backend instance per thread (and per async context), so
+    the cache handler wraps each default instance as it is created; the
+    backend classes themselves are left alone.
+    """
+    from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+    if not caches.__dict__.get("_instrumented"):
+        with _hooks_lock:
+            if not caches.__dict__.get("_instrumented"):
+                create_connection = caches.create_connection
+
+                def instrumented_create_connection(alias):
+                    backend = create_connection(alias)
+                    return _instrument_backend(backend) if alias == DEFAULT_CACHE_ALIAS else backend
+
+                caches.create_connection = instrumented_create_connection
+                caches._instrumented = True
+    try:
+        _instrument_backend(caches[DEFAULT_CACHE_ALIAS])
+    except Exception:  # pragma: no cover - misconfigured cache
+        return
+
+
+# ----------------------------------------------------------------------
+# Celery tasks
+# ----------------------------------------------------------------------
+_task_scopes: Dict[str, Tuple[object, Measurement]] = {}
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    if not enabled() or task_id is None:
+        return
+    scope = measure(KIND_TASK, getattr(task, "name", "unknown"))
+    _task_scopes[task_id] = (scope, scope.__enter__())
+
+
+def _task_failure(task_id=None, **kwargs):
+    entry = _task_scopes.get(task_id)
+    if entry is not None:
+        entry[1].error = True
+
+
+def _task_postrun(task_id=None, **kwargs):
+    entry = _task_scopes.pop(task_id, None)
+    if entry is not None:
+        entry[0].__exit__(None, None, None)
+
+
+def connect_task_signals() -> None:
+    try:
+        from celery import signals
+    except ImportError:  # pragma: no cover - celery is a hard dependency in production
+        return
+    signals.task_prerun.connect(_task_prerun, weak=False, dispatch_uid="instrumentation_prerun")
+    signals.task_failure.connect(_task_failure, weak=False, dispatch_uid="instrumentation_failure")
+    signals.task_postrun.connect(_task_postrun, weak=False, dispatch_uid="instrumentation_postrun")
+
+
+# ----------------------------------------------------------------------
+# Rolling aggregate
+# ----------------------------------------------------------------------
+Series = Tuple[str, str]
+
+
+def _minute(now: Optional[float] = None) -> int:
+    return int((now if now is not None else time.time()) // 60)
+
+
+class MetricsAggregate:
+    """Interface shared by the Redis and in-process aggregates."""
+
+    def add(self, kind: str, name: str, counters: Dict[str, float], now: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def snapshot(self, minutes: int, now: Optional[float] = None) -> Dict[Series, Dict[str, float]]:
+        """Summed counters per ``(kind, name)`` over the last ``minutes`` minutes."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryAggregate(MetricsAggregate):
+    """Per-process aggregate; used when the default cache is not Redis."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._minutes: Dict[int, Dict[Series, Dict[str, float]]] = {}
+
+    def add(self, kind, name, counters, now=None):
+        minute = _minute(now)
+        with self._lock:
+            series = self._minutes.setdefault(minute, {}).setdefault((kind, name), defaultdict(float))
+            for metric, value in counters.items():
+                series[metric] += value
+            horizon = minute - window_minutes() - 1
+            for stale in [m for m in self._minutes if m < horizon]:
+                del self._minutes[stale]
+
+    def snapshot(self, minutes, now=None):
+        first = _minute(now) - minutes + 1
+        totals: Dict[Series, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        with self._lock:
+            for minute, entries in self._minutes.items():
+                if minute < first:
+                    continue
+                for series, values in entries.items():
+                    for metric, value in values.items():
+                        totals[series][metric] += value
+        return {series: dict(values) for series, values in totals.items()}
+
+    def clear(self):
+        with self._lock:
+            self._minutes.clear()
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class RedisAggregate(MetricsAggregate):
+    """Aggregate shared by every process: one Redis hash per minute.
+
+    Hash fields are ``kind|name|metric``; each minute key expires once it
+    falls out of the window.
+    """
+
+    def __init__(self, client, prefix: str = KEY_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, minute: int) -> str:
+        return f"{self.prefix}:{minute}"
+
+    def add(self, kind, name, counters, now=None):
+        key = self._key(_minute(now))
+        pipe = self.client.pipeline(transaction=False)
+        for metric, value in counters.items():
+            if value:
+                pipe.hincrbyfloat(key, f"{kind}|{name}|{metric}", float(value))
+        pipe.expire(key, (window_minutes() + 2) * 60)
+        pipe.execute()
+
+    def snapshot(self, minutes, now=None):
+        last = _minute(now)
+        pipe = self.client.pipeline(transaction=False)
+        for minute in range(last - minutes + 1, last + 1):
+            pipe.hgetall(self._key(minute))
+        totals: Dict[Series, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for entries in pipe.execute():
+            for raw_field, raw_value in (entries or {}).items():
+                kind, _, rest = _decode(raw_field).partition("|")
+                name, _, metric = rest.rpartition("|")
+                totals[(kind, name)][metric] += float(_decode(raw_value))
+        return {series: dict(values) for series, values in totals.items()}
+
+    def clear(self):
+        last = _minute()
+        self.client.delete(*[self._key(m) for m in range(last - window_minutes() - 2, last + 1)])
+
+
+def _redis_client():
+    """Return the raw Redis client behind the default cache, if it has one."""
+    backend = getattr(settings, "CACHES", {}).get("default", {}).get("BACKEND", "")
+    if not backend.startswith("django_redis."):
+        return None
+    try:
+        from django_redis import get_redis_connection
+    except ImportError:  # pragma: no cover - django_redis is a hard dependency in production
+        return None
+    return get_redis_connection("default")
+
+
+_memory_aggregate = MemoryAggregate()
+
+
+def get_aggregate() -> MetricsAggregate:
+    """Pick the aggregate for the configured cache (``INSTRUMENTATION_BACKEND``)."""
+    choice = getattr(settings, "INSTRUMENTATION_BACKEND", "auto")
+    if choice in ("auto", "redis"):
+        client = _redis_client()
+        if client is not None:
+            return RedisAggregate(client)
+        if choice == "redis":
+            logger.warning("INSTRUMENTATION_BACKEND=redis but the default cache is not django_redis")
+    return _memory_aggregate
+
+
+def record(kind: str, name: str, counters: Dict[str, float]) -> None:
+    """Add one measurement to the aggregate; never raises."""
+    if not enabled():
+        return
+    try:
+        get_aggregate().add(kind, name, counters)
+    except Exception as exc:
+        logger.warning("Could not record %s metrics for %s: %s", kind, name, exc)
+
+
+# ----------------------------------------------------------------------
+# Reports
+# ----------------------------------------------------------------------
+@dataclass
+class SeriesStats:
+    kind: str
+    name: str
+    counters: Dict[str, float]
+
+    def _get(self, metric: str) -> float:
+        return self.counters.get(metric, 0.0)
+
+    def _per_call(self, metric: str) -> float:
+        count = self._get("count")
+        return self._get(metric) / count if count else 0.0
+
+    @property
+    def count(self) -> int:
+        return int(self._get("count"))
+
+    @property
+    def errors(self) -> int:
+        return int(self._get("errors"))
+
+    @property
+    def total_ms(self) -> float:
+        return self._get("duration_ms")
+
+    @property
+    def avg_ms(self) -> float:
+        return self._per_call("duration_ms")
+
+    @property
+    def avg_queries(self) -> float:
+        return self._per_call("db_queries")
+
+    @property
+    def avg_db_ms(self) -> float:
+        return self._per_call("db_time_ms")
+
+    @property
+    def avg_llm_ms(self) -> float:
+        return self._per_call("llm_time_ms")
+
+    @property
+    def llm_calls(self) -> int:
+        return int(self._get("llm_calls"))
+
+    @property
+    def tokens(self) -> int:
+        return int(self._get("llm_prompt_tokens") + self._get("llm_completion_tokens"))
+
+    @property
+    def cache_hit_ratio(self) -> Optional[float]:
+        lookups = self._get("cache_hits") + self._get("cache_misses")
+        return self._get("cache_hits") / lookups if lookups else None
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound (ms) of the histogram bucket holding the ``fraction`` quantile."""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0.0
+        for bound, label in zip(LATENCY_BUCKETS_MS + (None,), BUCKET_LABELS):
+            seen += self._get(label)
+            if seen >= target:
+                return float(bound) if bound is not None else float("inf")
+        return float("inf")
+
+    @property
+    def p50_ms(self) -> Optional[float]:
+        return self.percentile(0.5)
+
+    @property
+    def p95_ms(self) -> Optional[float]:
+        return self.percentile(0.95)
+
+    def as_dict(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.avg_ms, 1),
+            "p50_ms": self.p50_ms,
+            "p95_ms": self.p95_ms,
+            "avg_queries": round(self.avg_queries, 2),
+            "avg_db_ms": round(self.avg_db_ms, 1),
+            "cache_hit_ratio": self.cache_hit_ratio,
+            "llm_calls": self.llm_calls,
+            "avg_llm_ms": round(self.avg_llm_ms, 1),
+            "tokens": self.tokens,
+        }
+
+
+def summarize(minutes: Optional[int] = None, kind: Optional[str] = None) -> List[SeriesStats]:
+    """Stats per route, task and model over the window, most total time first."""
+    minutes = minutes or window_minutes()
+    try:
+        snapshot = get_aggregate().snapshot(minutes)
+    except Exception as exc:
+        logger.warning("Could not read instrumentation aggregate: %s", exc)
+        snapshot = {}
+    stats = [
+        SeriesStats(kind=series_kind, name=name, counters=values)
+        for (series_kind, name), values in snapshot.items()
+        if kind is None or series_kind == kind
+    ]
+    return sorted(stats, key=lambda s: s.total_ms, reverse=True)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+PROMETHEUS_SUMS = (
+    ("count", "calls", "Requests, tasks or LLM calls"),
+    ("errors", "errors", "Failed requests, tasks or LLM calls"),
+    ("duration_ms", "duration_milliseconds", "Time spent in milliseconds"),
+    ("db_queries", "db_queries", "Database queries"),
+    ("db_time_ms", "db_time_milliseconds", "Database time in milliseconds"),
+    ("cache_hits", "cache_hits", "Default cache hits"),
+    ("cache_misses", "cache_misses", "Default cache misses"),
+    ("llm_calls", "llm_calls", "LLM API calls"),
+    ("llm_time_ms", "llm_time_milliseconds", "LLM API time in milliseconds"),
+    ("llm_prompt_tokens", "llm_prompt_tokens", "LLM prompt tokens"),
+    ("llm_completion_tokens", "llm_completion_tokens", "LLM completion tokens"),
+)
+
+
+def prometheus_text(minutes: Optional[int] = None, prefix: str = "neurology_mcq") -> str:
+    """The aggregate in the Prometheus text exposition format.
+
+    Every series is a total over the rolling window, which goes down as old
+    minutes fall out of it, so all of them are gauges named ``*_window_*``
+    (latency buckets included, as ``*_window_latency_le``). Graph them
+    directly; ``rate()`` and ``histogram_quantile()`` do not apply.
+    """
+    minutes = minutes or window_minutes()
+    stats = summarize(minutes)
+    lines = [
+        f"# HELP {prefix}_window_minutes Length of the rolling window the other series cover",
+        f"# TYPE {prefix}_window_minutes gauge",
+        f"{prefix}_window_minutes {minutes}",
+        f"# HELP {prefix}_window_latency_le Calls at or under each latency bound (ms) over the rolling window",
+        f"# TYPE {prefix}_window_latency_le gauge",
+    ]
+    for s in stats:
+        labels = f'kind="{_label(s.kind)}",name="{_label(s.name)}"'
+        cumulative = 0
+        for bound, label in zip(LATENCY_BUCKETS_MS + ("+Inf",), BUCKET_LABELS):
+            cumulative += int(s.counters.get(label, 0))
+            lines.append(f'{prefix}_window_latency_le{{{labels},le="{bound}"}} {cumulative}')
+    for metric, suffix, help_text in PROMETHEUS_SUMS:
+        lines.append(f"# HELP {prefix}_window_{suffix} {help_text} over the rolling window")
+        lines.append(f"# TYPE {prefix}_window_{suffix} gauge")
+        for s in stats:
+            value = s.counters.get(metric)
+            if value:
+                labels = f'kind="{_label(s.kind)}",name="{_label(s.name)}"'
+                lines.append(f"{prefix}_window_{suffix}{{{labels}}} {value:g}")
+    return "\n".join(lines) + "\n"
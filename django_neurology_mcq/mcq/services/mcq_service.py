@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import json
 from datetime import timedelta
 from dataclasses import dataclass
 from typing import Iterable, List, Optional, Sequence, Tuple
@@ -12,6 +11,7 @@ from django.utils import timezone
 from ..models import MCQ
 from ..explanation_sections import EXPLANATION_SECTIONS
 from ..explanation_utils import merge_sections_to_text, render_explanation_as_html
+from ..option_utils import canonical_options
 
 
 EXPLANATION_PLACEHOLDER = """
@@ -59,58 +59,19 @@ class MCQService:
 
     @staticmethod
     def decode_options(options_field):
-        """Parse an options JSON string into a Python object if needed."""
-        if not options_field:
-            return options_field
-
-        if isinstance(options_field, dict):
-            return options_field
-
-        if isinstance(options_field, list):
-            return options_field
-
-        try:
-            return json.loads(options_field)
-        except (TypeError, json.JSONDecodeError):
-            return options_field
-
-    @staticmethod
-    def _ordered_option_items(options_dict):
-        """Return option items preserving insertion order and capturing letters."""
-        ordered_items = list(options_dict.items())
-        return [(str(key).strip(), value) for key, value in ordered_items]
-
-    @staticmethod
-    def _letter_for_index(index: int) -> str:
-        """Map an index to an option letter (A, B, ...)."""
-        if index < 26:
-            return chr(ord('A') + index)
-        return f"Option {index + 1}"
+        """Return options in the canonical letter -> text form."""
+        return canonical_options(options_field)
 
     @classmethod
     def ensure_options_decoded(cls, mcq: MCQ) -> MCQ:
-        """Return MCQ with options coerced to Python structures."""
-        decoded = cls.decode_options(mcq.options)
-
-        if isinstance(decoded, dict):
-            ordered_items = cls._ordered_option_items(decoded)
-            letters = [letter for letter, _ in ordered_items]
-            texts = [text for _, text in ordered_items]
-            mcq.option_letters = letters
-            mcq.option_map = {letter: text for letter, text in ordered_items}
-            mcq.options = texts
-        elif isinstance(decoded, list):
-            letters = [cls._letter_for_index(idx) for idx, _ in enumerate(decoded)]
-            mcq.option_letters = letters
-            mcq.option_map = {letter: text for letter, text in zip(letters, decoded)}
-            if decoded is not mcq.options:
-                mcq.options = decoded
-        else:
-            mcq.option_letters = []
-            mcq.option_map = {}
-            if decoded is not mcq.options:
-                mcq.options = decoded
-
+        """
+        Return MCQ with ``option_letters``, ``option_map`` and ``options`` (texts)
+        set from the canonical option items.
+        """
+        items = mcq.get_option_items()
+        mcq.option_letters = [letter for letter, _ in items]
+        mcq.option_map = dict(items)
+        mcq.options = [text for _, text in items]
         return mcq
 
     @staticmethod
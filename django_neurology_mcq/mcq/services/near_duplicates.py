@@ -0,0 +1,438 @@
+"""Near-duplicate MCQ detection with MinHash signatures and LSH banding.
+
+Each MCQ's stem and option texts are normalised and split into overlapping
+character shingles. A 128-value MinHash signature estimates the Jaccard
+similarity of two shingle sets: the fraction of equal signature positions.
+Signatures are stored on :class:`~mcq.models.MCQSignature` and refreshed when
+the MCQ is saved.
+
+To avoid comparing every pair, signatures are cut into ``BANDS`` bands of
+``ROWS`` values. Two MCQs become *candidates* when any band hashes to the same
+bucket, which happens with high probability once their similarity passes
+roughly ``(1 / BANDS) ** (1 / ROWS)`` (about 0.42 here). Candidates are then
+checked against the real threshold. Bucket keys are stored in
+:class:`~mcq.models.MCQSignatureBand`, so one indexed query finds the
+candidates for a single new question (the importer path). A corpus-wide scan
+buckets everything in memory in one pass.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.7
+TEMP_SOURCE_PREFIX = "TEMP_WEAKNESS_TEST_"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_rng = np.random.RandomState(20240601)  # fixed seed: signatures must be stable across processes
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+del _rng
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+def default_threshold() -> float:
+    return float(getattr(settings, "NEAR_DUPLICATE_THRESHOLD", DEFAULT_THRESHOLD))
+
+
+def _option_texts(options) -> List[str]:
+    if isinstance(options, str):
+        import json
+
+        try:
+            options = json.loads(options)
+        except (TypeError, ValueError):
+            return [options]
+    if isinstance(options, dict):
+        return [str(value) for value in options.values() if value]
+    if isinstance(options, list):
+        texts = []
+        for item in options:
+            if isinstance(item, dict):
+                texts.append(str(item.get("text") or item.get("option_text") or ""))
+            elif item:
+                texts.append(str(item))
+        return texts
+    return []
+
+
+def _clean(text: str) -> str:
+    return " ".join(_NON_WORD_RE.sub(" ", _TAG_RE.sub(" ", text).lower()).split())
+
+
+def normalize_text(question_text: Optional[str], options=None) -> str:
+    """Lower-cased alphanumeric text of the stem followed by the sorted options.
+
+    Options are sorted so that re-lettered answer lists still match.
+    """
+    parts = [_clean(question_text or "")] + sorted(_clean(text) for text in _option_texts(options))
+    return " ".join(part for part in parts if part)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def compute_signature(text: str) -> np.ndarray:
+    """MinHash signature (``NUM_PERM`` uint32 values) of a normalised text."""
+    grams = shingles(text)
+    if not grams:
+        return np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint32)
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    # (a * x + b) mod p for every permutation/shingle pair; a, x < 2**32 so no overflow
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def signature_from_bytes(blob) -> np.ndarray:
+    return np.frombuffer(bytes(blob), dtype=np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """One signed 63-bit bucket key per band (band number is mixed in)."""
+    keys = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(chunk, digest_size=8, person=band.to_bytes(2, "little") * 8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------------
+
+def update_signature(mcq) -> bool:
+    """Store the MCQ's signature and band keys; returns False when unchanged."""
+    from ..models import MCQSignature, MCQSignatureBand
+
+    if (mcq.source_file or "").startswith(TEMP_SOURCE_PREFIX):
+        return False
+    text = normalize_text(mcq.question_text, mcq.options)
+    digest = text_digest(text)
+    existing = MCQSignature.objects.filter(mcq_id=mcq.pk).values_list("text_hash", flat=True).first()
+    if existing == digest:
+        return False
+
+    signature = compute_signature(text)
+    with transaction.atomic():
+        MCQSignature.objects.update_or_create(
+            mcq_id=mcq.pk, defaults={"text_hash": digest, "minhash": signature.tobytes()}
+        )
+        MCQSignatureBand.objects.filter(mcq_id=mcq.pk).delete()
+        MCQSignatureBand.objects.bulk_create(
+            MCQSignatureBand(mcq_id=mcq.pk, key=key) for key in band_keys(signature)
+        )
+    return True
+
+
+def rebuild_signatures(queryset=None, batch_size: int = 500, only_missing: bool = False) -> int:
+    """(Re)compute signatures in batches; returns the number written."""
+    from ..models import MCQ, MCQSignature, MCQSignatureBand
+
+    queryset = queryset if queryset is not None else MCQ.objects.all()
+    queryset = queryset.exclude(source_file__startswith=TEMP_SOURCE_PREFIX)
+    if only_missing:
+        queryset = queryset.filter(signature__isnull=True)
+
+    written = 0
+    batch: List[Tuple[int, str, np.ndarray]] = []
+
+    def flush():
+        nonlocal written
+        if not batch:
+            return
+        ids = [mcq_id for mcq_id, _, _ in batch]
+        with transaction.atomic():
+            MCQSignatureBand.objects.filter(mcq_id__in=ids).delete()
+            MCQSignature.objects.filter(mcq_id__in=ids).delete()
+            MCQSignature.objects.bulk_create(
+                MCQSignature(mcq_id=mcq_id, text_hash=digest, minhash=sig.tobytes()) for mcq_id, digest, sig in batch
+            )
+            MCQSignatureBand.objects.bulk_create(
+                (MCQSignatureBand(mcq_id=mcq_id, key=key) for mcq_id, _, sig in batch for key in band_keys(sig)),
+                batch_size=5000,
+            )
+        written += len(batch)
+        batch.clear()
+
+    for mcq_id, question_text, options in queryset.order_by("id").values_list("id", "question_text", "options").iterator(
+        chunk_size=batch_size
+    ):
+        text = normalize_text(question_text, options)
+        batch.append((mcq_id, text_digest(text), compute_signature(text)))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return written
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def find_near_duplicates(
+    question_text: str,
+    options=None,
+    threshold: Optional[float] = None,
+    exclude_ids: Iterable[int] = (),
+) -> List[Tuple[int, float]]:
+    """Stored MCQs similar to the given content, best match first.
+
+    Costs two indexed queries (band lookup, candidate signatures).
+    """
+    threshold = default_threshold() if threshold is None else threshold
+    signature = compute_signature(normalize_text(question_text, options))
+    return _stored_matches(signature, threshold, exclude_ids)
+
+
+def _stored_matches(signature: np.ndarray, threshold: float, exclude_ids: Iterable[int] = ()) -> List[Tuple[int, float]]:
+    from ..models import MCQSignature, MCQSignatureBand
+
+    candidate_ids = set(
+        MCQSignatureBand.objects.filter(key__in=band_keys(signature)).values_list("mcq_id", flat=True)
+    ) - set(exclude_ids)
+    if not candidate_ids:
+        return []
+
+    matches = []
+    for mcq_id, blob in MCQSignature.objects.filter(mcq_id__in=candidate_ids).values_list("mcq_id", "minhash"):
+        score = similarity(signature, signature_from_bytes(blob))
+        if score >= threshold:
+            matches.append((mcq_id, score))
+    matches.sort(key=lambda item: (-item[1], item[0]))
+    return matches
+
+
+class DuplicateGuard:
+    """Importer helper that rejects near-duplicates of stored *and* already-accepted rows.
+
+    ``check`` returns the best match (``"mcq:<id>"`` for a stored MCQ or
+    ``"batch:<n>"`` for the n-th accepted row) or ``None`` when the row is new.
+    Call ``accept`` after inserting a row so later rows in the same batch are
+    compared against it.
+    """
+
+    def __init__(self, threshold: Optional[float] = None):
+        self.threshold = default_threshold() if threshold is None else threshold
+        self._buckets: Dict[int, List[int]] = {}
+        self._signatures: List[np.ndarray] = []
+        self._last: Optional[Tuple[str, np.ndarray]] = None
+        self.rejected: List[Tuple[str, float]] = []
+
+    def _signature(self, question_text: str, options) -> np.ndarray:
+        # accept() normally follows check() for the same row
+        text = normalize_text(question_text, options)
+        if self._last is None or self._last[0] != text:
+            self._last = (text, compute_signature(text))
+        return self._last[1]
+
+    def check(self, question_text: str, options=None) -> Optional[Tuple[str, float]]:
+        signature = self._signature(question_text, options)
+        stored = _stored_matches(signature, self.threshold)
+        if stored:
+            match = (f"mcq:{stored[0][0]}", stored[0][1])
+            self.rejected.append(match)
+            return match
+
+        best: Optional[Tuple[str, float]] = None
+        seen: Set[int] = set()
+        for key in band_keys(signature):
+            for index in self._buckets.get(key, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                score = similarity(signature, self._signatures[index])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (f"batch:{index}", score)
+        if best:
+            self.rejected.append(best)
+        return best
+
+    def accept(self, question_text: str, options=None) -> None:
+        signature = self._signature(question_text, options)
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for key in band_keys(signature):
+            self._buckets.setdefault(key, []).append(index)
+
+
+@dataclass
+class DuplicateCluster:
+    members: List[Dict[str, object]]
+    max_similarity: float
+    exam_types: List[str] = field(default_factory=list)
+    exam_years: List[str] = field(default_factory=list)
+
+    @property
+    def spans_exams(self) -> bool:
+        return len(self.exam_types) > 1 or len(self.exam_years) > 1
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "size": len(self.members),
+            "max_similarity": round(self.max_similarity, 3),
+            "exam_types": self.exam_types,
+            "exam_years": self.exam_years,
+            "spans_exams": self.spans_exams,
+            "members": self.members,
+        }
+
+
+def _union_find_clusters(pairs: Dict[Tuple[int, int], float]) -> List[Tuple[List[int], float]]:
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups: Dict[int, List[int]] = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+    best: Dict[int, float] = {}
+    for (a, _), score in pairs.items():
+        root = find(a)
+        best[root] = max(best.get(root, 0.0), score)
+    return [(sorted(members), best[root]) for root, members in groups.items()]
+
+
+def find_duplicate_clusters(
+    threshold: Optional[float] = None,
+    cross_exam_only: bool = False,
+    subspecialty: Optional[str] = None,
+) -> List[DuplicateCluster]:
+    """Cluster every stored signature; largest and most similar clusters first."""
+    from ..models import MCQSignature
+
+    threshold = default_threshold() if threshold is None else threshold
+    qs = MCQSignature.objects.all()
+    if subspecialty:
+        qs = qs.filter(mcq__subspecialty=subspecialty)
+    rows = list(
+        qs.values_list(
+            "mcq_id", "minhash", "mcq__question_number", "mcq__question_text",
+            "mcq__exam_type", "mcq__exam_year", "mcq__subspecialty",
+        )
+    )
+    if len(rows) < 2:
+        return []
+
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    signatures = np.vstack([signature_from_bytes(row[1]) for row in rows])
+
+    pairs: Dict[Tuple[int, int], float] = {}
+    for band in range(BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        block = np.ascontiguousarray(signatures[:, band * ROWS:(band + 1) * ROWS])
+        for index, chunk in enumerate(block):
+            buckets.setdefault(chunk.tobytes(), []).append(index)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for i, left in enumerate(members):
+                for right in members[i + 1:]:
+                    pair = (left, right)
+                    if pair in pairs:
+                        continue
+                    score = float(np.count_nonzero(signatures[left] == signatures[right])) / NUM_PERM
+                    pairs[pair] = score
+
+    confirmed = {
+        (int(ids[left]), int(ids[right])): score for (left, right), score in pairs.items() if score >= threshold
+    }
+    meta = {
+        row[0]: {
+            "id": row[0], "question_number": row[2], "question_text": row[3],
+            "exam_type": row[4], "exam_year": row[5], "subspecialty": row[6],
+        }
+        for row in rows
+    }
+    return _build_clusters(confirmed, meta, cross_exam_only)
+
+
+def clusters_from_pairs(
+    pairs: Dict[Tuple[int, int], float],
+    cross_exam_only: bool = False,
+) -> List[DuplicateCluster]:
+    """Build clusters from ``{(mcq_id, mcq_id): score}`` pairs found by another method."""
+    from ..models import MCQ
+
+    if not pairs:
+        return []
+    ids = {mcq_id for pair in pairs for mcq_id in pair}
+    meta = {
+        row["id"]: row
+        for row in MCQ.objects.filter(id__in=ids).values(
+            "id", "question_number", "question_text", "exam_type", "exam_year", "subspecialty"
+        )
+    }
+    pairs = {pair: score for pair, score in pairs.items() if pair[0] in meta and pair[1] in meta}
+    return _build_clusters(pairs, meta, cross_exam_only)
+
+
+def _build_clusters(
+    pairs: Dict[Tuple[int, int], float],
+    meta: Dict[int, Dict[str, object]],
+    cross_exam_only: bool,
+) -> List[DuplicateCluster]:
+    clusters = []
+    for members, best in _union_find_clusters(pairs):
+        details = [
+            {
+                "id": mcq_id,
+                "question_number": meta[mcq_id]["question_number"],
+                "question_text": (meta[mcq_id]["question_text"] or "")[:200],
+                "exam_type": meta[mcq_id]["exam_type"] or "",
+                "exam_year": meta[mcq_id]["exam_year"] or "",
+                "subspecialty": meta[mcq_id]["subspecialty"] or "",
+            }
+            for mcq_id in members
+        ]
+        cluster = DuplicateCluster(
+            members=details,
+            max_similarity=best,
+            exam_types=sorted({d["exam_type"] for d in details if d["exam_type"]}),
+            exam_years=sorted({str(d["exam_year"]) for d in details if d["exam_year"]}),
+        )
+        if cross_exam_only and not cluster.spans_exams:
+            continue
+        clusters.append(cluster)
+
+    clusters.sort(key=lambda c: (-len(c.members), -c.max_similarity, c.members[0]["id"]))
+    return clusters
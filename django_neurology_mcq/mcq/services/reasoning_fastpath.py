@@ -0,0 +1,200 @@
+"""
+Instant first tier for ReasoningPal.
+
+The model-backed analysis (``cognitive_analysis_openai``) takes from several
+seconds to a couple of minutes, and learners used to stare at a spinner for
+all of it. This module gives them something useful straight away:
+
+* a rule-based analysis and guide built with precompiled keyword matchers and
+  per-MCQ features cached by content version; it is returned with the first
+  response while the model analysis runs in the background and replaces it
+* a result cache of model analyses keyed by MCQ content version, selected
+  answer and normalised reasoning, so a repeated submission is answered from
+  the cache without queueing the model at all
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..cognitive_analysis import (
+    COGNITIVE_ERROR_RULES,
+    CognitiveAnalysis,
+    CognitiveAnalyzer,
+    CognitiveErrorType,
+    GuideStep,
+    ReasoningGuideGenerator,
+)
+
+logger = logging.getLogger(__name__)
+
+RESULT_KEY_PREFIX = "reasoning:result"
+# Session fields copied to and from cached results
+RESULT_FIELDS = (
+    "guidance_steps",
+    "primary_error",
+    "secondary_errors",
+    "knowledge_gaps",
+    "misconceptions",
+    "reasoning_quality",
+    "confidence_score",
+)
+FEATURE_CACHE_SIZE = 512
+
+# One alternation per rule in COGNITIVE_ERROR_RULES, matched against the
+# lowercased reasoning with the same substring semantics as the analyzer
+ERROR_MATCHERS = tuple(
+    (error, re.compile("|".join(re.escape(keyword) for keyword in keywords)), incorrect_only)
+    for error, keywords, incorrect_only in COGNITIVE_ERROR_RULES
+)
+
+_NON_WORD = re.compile(r"[^\w]+")
+_rule_analyzer = CognitiveAnalyzer()
+
+
+def normalize_reasoning(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a learner's reasoning."""
+    return _NON_WORD.sub(" ", (text or "").casefold()).strip()
+
+
+# ----------------------------------------------------------------------
+# Per-MCQ features
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class MCQFeatures:
+    version: str
+    options: Dict[str, str]
+    question_text: str
+    clinical_features: Tuple[str, ...]
+
+
+_features: "OrderedDict[Tuple[int, str], MCQFeatures]" = OrderedDict()
+_features_lock = threading.Lock()
+
+
+def mcq_features(mcq) -> MCQFeatures:
+    """Features of ``mcq`` used by the heuristic tier, computed once per content version."""
+    version = mcq.content_version()
+    key = (mcq.pk, version)
+    with _features_lock:
+        features = _features.get(key)
+        if features is not None:
+            _features.move_to_end(key)
+            return features
+
+    options = {str(letter): str(text) for letter, text in (mcq.get_options_dict() or {}).items()}
+    features = MCQFeatures(
+        version=version,
+        options=options,
+        question_text=mcq.question_text or "",
+        clinical_features=tuple(_rule_analyzer._extract_clinical_features(mcq.question_text or "")),
+    )
+    with _features_lock:
+        _features[key] = features
+        while len(_features) > FEATURE_CACHE_SIZE:
+            _features.popitem(last=False)
+    return features
+
+
+def clear_feature_cache() -> None:
+    with _features_lock:
+        _features.clear()
+
+
+# ----------------------------------------------------------------------
+# Heuristic tier
+# ----------------------------------------------------------------------
+class HeuristicReasoningAnalyzer(CognitiveAnalyzer):
+    """Rule-based analyzer that reads MCQ features from the per-version cache."""
+
+    def __init__(self, features: MCQFeatures):
+        super().__init__()
+        self.features = features
+
+    def _detect_cognitive_errors(self, reasoning: str, mcq, user_answer: str, is_correct: bool) -> List[CognitiveErrorType]:
+        text = (reasoning or "").lower()
+        return [
+            error
+            for error, matcher, incorrect_only in ERROR_MATCHERS
+            if (not incorrect_only or not is_correct) and matcher.search(text)
+        ]
+
+    def _extract_clinical_features(self, question_text: str) -> List[str]:
+        if question_text == self.features.question_text:
+            return list(self.features.clinical_features)
+        return super()._extract_clinical_features(question_text)
+
+    def _get_option_text(self, mcq, option_letter: str) -> str:
+        return self.features.options.get(option_letter, f"Option {option_letter} not found")
+
+
+class HeuristicGuideGenerator(ReasoningGuideGenerator):
+    def __init__(self, features: MCQFeatures):
+        self.cognitive_analyzer = HeuristicReasoningAnalyzer(features)
+
+
+@dataclass
+class HeuristicResult:
+    analysis: CognitiveAnalysis
+    steps: List[GuideStep]
+
+
+def heuristic_analysis(mcq, selected_answer: str, user_reasoning: str, is_correct: bool) -> HeuristicResult:
+    """Analysis and guide steps from the rule-based tier; no network calls."""
+    generator = HeuristicGuideGenerator(mcq_features(mcq))
+    analysis = generator.cognitive_analyzer.analyze_reasoning(mcq, selected_answer, user_reasoning, is_correct)
+    steps = generator.steps_for_analysis(analysis, mcq, selected_answer, user_reasoning, is_correct)
+    return HeuristicResult(analysis=analysis, steps=steps)
+
+
+# ----------------------------------------------------------------------
+# Model result cache
+# ----------------------------------------------------------------------
+def result_cache_key(mcq, selected_answer: str, user_reasoning: str) -> str:
+    digest = hashlib.sha1(normalize_reasoning(user_reasoning).encode("utf-8")).hexdigest()
+    answer = (selected_answer or "").strip().upper()
+    return f"{RESULT_KEY_PREFIX}:{mcq.pk}:{mcq_features(mcq).version}:{answer}:{digest}"
+
+
+def cached_result(mcq, selected_answer: str, user_reasoning: str) -> Optional[Dict[str, Any]]:
+    """Stored model analysis for an identical submission, if any."""
+    try:
+        result = cache.get(result_cache_key(mcq, selected_answer, user_reasoning))
+    except Exception as exc:
+        logger.warning("Reasoning result cache unavailable: %s", exc)
+        return None
+    if isinstance(result, dict) and result.get("guidance_steps"):
+        return result
+    return None
+
+
+def store_result(session) -> None:
+    """Cache the model analysis stored on ``session`` for identical future submissions."""
+    result = {field: getattr(session, field) for field in RESULT_FIELDS}
+    if not result["guidance_steps"]:
+        return
+    timeout = getattr(settings, "REASONING_RESULT_CACHE_TIMEOUT", 7 * 24 * 3600)
+    try:
+        cache.set(
+            result_cache_key(session.mcq, session.selected_answer, session.user_reasoning),
+            result,
+            timeout,
+        )
+    except Exception as exc:
+        logger.warning("Could not cache reasoning result for session %s: %s", session.pk, exc)
+
+
+def apply_result(session, result: Dict[str, Any]) -> None:
+    """Copy a cached result onto ``session`` (not saved)."""
+    for field in RESULT_FIELDS:
+        if field in result:
+            setattr(session, field, result[field])
@@ -10,9 +10,11 @@ from dataclasses import dataclass
 from datetime import timedelta
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from django.conf import settings
 from django.utils import timezone
 
 from ..models import CognitiveReasoningSession, MCQ
+from . import reasoning_fastpath
 
 logger = logging.getLogger(__name__)
 
@@ -51,11 +53,31 @@ class ReasoningService:
         )
 
         try:
+            cached = reasoning_fastpath.cached_result(mcq, selected_answer, user_reasoning)
+            if cached:
+                logger.info("Serving cached reasoning analysis for session %s", session.id)
+                reasoning_fastpath.apply_result(session, cached)
+                session.analysis_tier = CognitiveReasoningSession.TIER_MODEL
+                session.status = CognitiveReasoningSession.READY
+                session.completed_at = timezone.now()
+                session.save()
+                return ServiceResult(payload=cls._build_ready_payload(session))
+
             if cls._should_run_inline():
                 logger.info("Running cognitive reasoning inline for session %s", session.id)
                 payload = cls._run_inline(session)
                 return ServiceResult(payload=payload)
 
+            if getattr(settings, 'REASONING_FASTPATH_ENABLED', True):
+                logger.info("Serving heuristic reasoning analysis for session %s", session.id)
+                cls._run_fast_path(session)
+                try:
+                    cls._queue_background_task(session)
+                except Exception as exc:
+                    # The heuristic result stands on its own; it just won't be upgraded
+                    logger.warning("Could not queue reasoning upgrade for session %s: %s", session.id, exc)
+                return ServiceResult(payload=cls._build_ready_payload(session))
+
             logger.info("Queueing background reasoning task for session %s", session.id)
             payload = cls._queue_background_task(session)
             return ServiceResult(payload=payload)
@@ -97,6 +119,25 @@ class ReasoningService:
             'has_next_step': len(steps) > 1,
         }
 
+    @classmethod
+    def _run_fast_path(cls, session: CognitiveReasoningSession) -> None:
+        """Store the instant rule-based tier; the background task upgrades it."""
+        result = reasoning_fastpath.heuristic_analysis(
+            session.mcq,
+            session.selected_answer,
+            session.user_reasoning,
+            session.is_correct,
+        )
+        analysis = result.analysis
+        session.primary_error = analysis.primary_error.value if analysis.primary_error else None
+        session.secondary_errors = [error.value for error in analysis.secondary_errors]
+        session.knowledge_gaps = analysis.knowledge_gaps
+        session.misconceptions = analysis.misconceptions
+        session.reasoning_quality = analysis.reasoning_quality
+        session.confidence_score = int(analysis.confidence_level * 100)
+        session.analysis_tier = CognitiveReasoningSession.TIER_HEURISTIC
+        cls._store_guidance(session, cls._serialize_steps(result.steps), status=CognitiveReasoningSession.READY)
+
     @classmethod
     def _resolve_generator(cls):  # pragma: no cover - import side effects
         try:
@@ -405,8 +446,15 @@ class ReasoningService:
             'current_step': current_idx,
             'step': current_step,
             'has_next_step': current_idx < total_steps - 1 if total_steps else False,
+            'tier': session.analysis_tier or None,
+            'upgrade_pending': cls.upgrade_pending(session),
         }
 
+    @staticmethod
+    def upgrade_pending(session: CognitiveReasoningSession) -> bool:
+        """Whether a heuristic result is still waiting for the model analysis."""
+        return session.analysis_tier == CognitiveReasoningSession.TIER_HEURISTIC and bool(session.task_id)
+
     @staticmethod
     def _step_content(step: Optional[Dict[str, Any]]) -> str:
         if isinstance(step, dict):
@@ -0,0 +1,372 @@
+"""
+Retention and compaction for per-user history tables.
+
+Case sessions, reasoning sessions, MCQ-to-case conversions and incorrect
+answers are written on every study session and were never aged out. The
+engine applies one policy per (model, rule):
+
+* ``archive`` flips a flag (e.g. ``archived=True``) so the row drops out of
+  user-facing listings
+* ``compact`` replaces bulky JSON payloads with a small summary and marks the
+  row so it is not selected again
+* ``delete`` removes the row (and its cascades)
+
+Rows are processed in primary-key batches of ``RETENTION_BATCH_SIZE``. Each
+batch runs in its own short transaction, so no statement holds table locks
+for long. A run is capped at ``RETENTION_MAX_BATCHES`` batches per policy and
+resumes where it stopped on the next run. Policies can be tuned or disabled
+through ``RETENTION_POLICY_OVERRIDES`` (``{"policy name": {"max_age_days": 90}}``
+or ``{"policy name": {"enabled": False}}``).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import asdict, dataclass, field, replace
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, QuerySet
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE = "archive"
+COMPACT = "compact"
+DELETE = "delete"
+
+LAST_REPORT_KEY = "retention:last_report"
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """One retention rule: which rows of ``model`` are old enough, and what to do with them."""
+
+    name: str
+    model: str  # "app_label.ModelName"
+    action: str
+    age_field: str
+    max_age_days: float
+    filters: Dict[str, Any] = field(default_factory=dict)
+    # ARCHIVE: values written to matching rows
+    archive_values: Dict[str, Any] = field(default_factory=dict)
+    # COMPACT: rewrites one batch of rows in place and returns the rows touched
+    compactor: Optional[Callable[[QuerySet, Any], int]] = None
+    # Extra queryset restriction (e.g. "not compacted yet", "superseded")
+    refine: Optional[Callable[[QuerySet], QuerySet]] = None
+    enabled: bool = True
+    description: str = ""
+
+    def model_class(self):
+        return apps.get_model(self.model)
+
+    def queryset(self, now=None) -> QuerySet:
+        now = now or timezone.now()
+        cutoff = now - timedelta(days=self.max_age_days)
+        qs = self.model_class()._default_manager.filter(
+            **{f"{self.age_field}__lt": cutoff}, **self.filters
+        )
+        if self.refine is not None:
+            qs = self.refine(qs)
+        return qs
+
+
+@dataclass
+class PolicyResult:
+    policy: str
+    model: str
+    action: str
+    matched: int = 0
+    affected: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    complete: bool = True
+    dry_run: bool = False
+    error: str = ""
+
+
+# ----------------------------------------------------------------------
+# Compactors
+# ----------------------------------------------------------------------
+CASE_PROGRESS_FIELDS = (
+    "history_gathered",
+    "examination_findings",
+    "localization",
+    "investigations",
+    "differentials",
+    "management",
+    "critical_history_missed",
+    "critical_exam_missed",
+    "missed_critical_steps",
+    "detailed_exam_areas",
+)
+
+# Keys of a converted case kept once the conversion has been superseded
+CONVERSION_SUMMARY_KEYS = ("source_mcq_id", "specialty", "difficulty", "chief_complaint", "diagnosis")
+
+
+def compact_case_sessions(batch: QuerySet, now) -> int:
+    """Keep the rolling summary and the last few messages; drop progress lists."""
+    from ..models import CaseMessage
+
+    keep = getattr(settings, "RETENTION_CASE_MESSAGES_KEPT", 10)
+    sessions = list(batch.only("pk", "message_count"))
+    with transaction.atomic():
+        for session in sessions:
+            CaseMessage.objects.filter(
+                session_id=session.pk, seq__lt=session.message_count - keep
+            ).delete()
+        batch.model._default_manager.filter(pk__in=[s.pk for s in sessions]).update(
+            last_cleanup=now, **{name: [] for name in CASE_PROGRESS_FIELDS}
+        )
+    return len(sessions)
+
+
+def compact_conversion_sessions(batch: QuerySet, now) -> int:
+    """Replace the generated case of a superseded conversion with a few summary keys."""
+    sessions = list(batch.only("pk", "case_data"))
+    for session in sessions:
+        data = session.case_data if isinstance(session.case_data, dict) else {}
+        summary = {key: data[key] for key in CONVERSION_SUMMARY_KEYS if key in data}
+        session.case_data = {"compacted": now.isoformat(), **summary}
+    batch.model._default_manager.bulk_update(sessions, ["case_data"])
+    return len(sessions)
+
+
+def _not_cleaned(qs: QuerySet) -> QuerySet:
+    return qs.filter(last_cleanup__isnull=True)
+
+
+def _superseded_uncompacted(qs: QuerySet) -> QuerySet:
+    # Only the newest READY conversion per (user, MCQ) is ever reused
+    newer = qs.model._default_manager.filter(
+        user_id=OuterRef("user_id"),
+        mcq_id=OuterRef("mcq_id"),
+        status=qs.model.READY,
+        created_at__gt=OuterRef("created_at"),
+    )
+    return qs.filter(Exists(newer)).exclude(case_data__has_key="compacted")
+
+
+def _unfinished_conversions(qs: QuerySet) -> QuerySet:
+    return qs.filter(status__in=["pending", "processing", "failed"])
+
+
+DEFAULT_POLICIES: Sequence[RetentionPolicy] = (
+    RetentionPolicy(
+        name="case_sessions_archive",
+        model="mcq.PersistentCaseLearningSession",
+        action=ARCHIVE,
+        age_field="last_activity",
+        max_age_days=14,
+        filters={"archived": False},
+        archive_values={"archived": True},
+        description="Idle AI cases leave the resume list",
+    ),
+    RetentionPolicy(
+        name="case_sessions_compact",
+        model="mcq.PersistentCaseLearningSession",
+        action=COMPACT,
+        age_field="last_activity",
+        max_age_days=14,
+        filters={"archived": True},
+        compactor=compact_case_sessions,
+        refine=_not_cleaned,
+        description="Archived cases keep their summary and last messages",
+    ),
+    RetentionPolicy(
+        name="case_sessions_expired",
+        model="mcq.PersistentCaseLearningSession",
+        action=DELETE,
+        age_field="auto_delete_after",
+        max_age_days=0,
+        description="Completed or abandoned cases past auto_delete_after",
+    ),
+    RetentionPolicy(
+        name="case_sessions_delete",
+        model="mcq.PersistentCaseLearningSession",
+        action=DELETE,
+        age_field="last_activity",
+        max_age_days=90,
+    ),
+    RetentionPolicy(
+        name="case_conversions_compact",
+        model="mcq.MCQCaseConversionSession",
+        action=COMPACT,
+        age_field="created_at",
+        max_age_days=1,
+        filters={"status": "ready"},
+        compactor=compact_conversion_sessions,
+        refine=_superseded_uncompacted,
+        description="Superseded conversions keep only summary keys",
+    ),
+    RetentionPolicy(
+        name="case_conversions_unfinished",
+        model="mcq.MCQCaseConversionSession",
+        action=DELETE,
+        age_field="created_at",
+        max_age_days=2,
+        refine=_unfinished_conversions,
+    ),
+    RetentionPolicy(
+        name="case_conversions_delete",
+        model="mcq.MCQCaseConversionSession",
+        action=DELETE,
+        age_field="created_at",
+        max_age_days=60,
+    ),
+    RetentionPolicy(
+        name="cognitive_sessions_delete",
+        model="mcq.CognitiveReasoningSession",
+        action=DELETE,
+        age_field="created_at",
+        max_age_days=180,
+    ),
+    RetentionPolicy(
+        name="reasoning_sessions_delete",
+        model="mcq.ReasoningSession",
+        action=DELETE,
+        age_field="created_at",
+        max_age_days=365,
+    ),
+    RetentionPolicy(
+        name="incorrect_answers_resolved",
+        model="mcq.IncorrectAnswer",
+        action=DELETE,
+        age_field="created_at",
+        max_age_days=180,
+        filters={"resolved": True},
+        description="Resolved weaknesses no longer feed Test My Weakness",
+    ),
+)
+
+
+def get_policies(names: Optional[Iterable[str]] = None) -> List[RetentionPolicy]:
+    """Default policies with ``RETENTION_POLICY_OVERRIDES`` applied, optionally filtered by name."""
+    overrides = getattr(settings, "RETENTION_POLICY_OVERRIDES", {}) or {}
+    unknown = set(overrides) - {policy.name for policy in DEFAULT_POLICIES}
+    if unknown:
+        logger.warning("Ignoring overrides for unknown retention policies: %s", sorted(unknown))
+    policies = [replace(policy, **overrides.get(policy.name, {})) for policy in DEFAULT_POLICIES]
+    if names is not None:
+        wanted = set(names)
+        missing = wanted - {policy.name for policy in policies}
+        if missing:
+            raise ValueError(f"Unknown retention policies: {', '.join(sorted(missing))}")
+        policies = [policy for policy in policies if policy.name in wanted]
+    return policies
+
+
+class RetentionEngine:
+    """Applies retention policies in bounded batches."""
+
+    def __init__(
+        self,
+        *,
+        batch_size: Optional[int] = None,
+        max_batches: Optional[int] = None,
+        pause_seconds: Optional[float] = None,
+    ):
+        self.batch_size = batch_size or getattr(settings, "RETENTION_BATCH_SIZE", 500)
+        self.max_batches = max_batches or getattr(settings, "RETENTION_MAX_BATCHES", 200)
+        self.pause_seconds = (
+            pause_seconds if pause_seconds is not None
+            else getattr(settings, "RETENTION_BATCH_PAUSE_SECONDS", 0.05)
+        )
+
+    def run(
+        self,
+        policies: Optional[Sequence[RetentionPolicy]] = None,
+        *,
+        dry_run: bool = False,
+    ) -> List[PolicyResult]:
+        now = timezone.now()
+        results = []
+        for policy in policies if policies is not None else get_policies():
+            if not policy.enabled:
+                continue
+            try:
+                result = self.apply(policy, now=now, dry_run=dry_run)
+            except Exception as exc:
+                logger.exception("Retention policy %s failed", policy.name)
+                result = PolicyResult(policy.name, policy.model, policy.action, dry_run=dry_run, error=str(exc))
+            results.append(result)
+        if not dry_run:
+            self._record(results, now)
+        return results
+
+    def apply(self, policy: RetentionPolicy, *, now=None, dry_run: bool = False) -> PolicyResult:
+        now = now or timezone.now()
+        started = time.monotonic()
+        queryset = policy.queryset(now)
+        result = PolicyResult(policy.name, policy.model, policy.action, dry_run=dry_run)
+        result.matched = queryset.count()
+        if dry_run or not result.matched:
+            result.seconds = round(time.monotonic() - started, 3)
+            return result
+
+        manager = policy.model_class()._default_manager
+        last_pk = None
+        while True:
+            if result.batches >= self.max_batches:
+                result.complete = False
+                break
+            candidates = queryset.order_by("pk")
+            if last_pk is not None:
+                candidates = candidates.filter(pk__gt=last_pk)
+            pks = list(candidates.values_list("pk", flat=True)[: self.batch_size])
+            if not pks:
+                break
+            last_pk = pks[-1]
+            batch = manager.filter(pk__in=pks)
+            with transaction.atomic():
+                if policy.action == DELETE:
+                    batch.delete()
+                    affected = len(pks)
+                elif policy.action == ARCHIVE:
+                    affected = batch.update(**policy.archive_values)
+                elif policy.action == COMPACT:
+                    affected = policy.compactor(batch, now)
+                else:
+                    raise ValueError(f"Unknown retention action: {policy.action}")
+            result.affected += affected
+            result.batches += 1
+            if len(pks) < self.batch_size:
+                break
+            if self.pause_seconds:
+                time.sleep(self.pause_seconds)
+
+        result.seconds = round(time.monotonic() - started, 3)
+        logger.info(
+            "Retention %s: %s %d of %d %s rows in %d batches (%.2fs)",
+            policy.name,
+            policy.action,
+            result.affected,
+            result.matched,
+            policy.model,
+            result.batches,
+            result.seconds,
+        )
+        return result
+
+    @staticmethod
+    def _record(results: Sequence[PolicyResult], now) -> None:
+        report = {"finished_at": now.isoformat(), "results": [asdict(result) for result in results]}
+        try:
+            cache.set(LAST_REPORT_KEY, report, None)
+        except Exception as exc:
+            logger.warning("Could not store retention report: %s", exc)
+
+
+def last_report() -> Optional[Dict[str, Any]]:
+    """Metrics from the most recent non-dry run, if any."""
+    try:
+        return cache.get(LAST_REPORT_KEY)
+    except Exception as exc:
+        logger.warning("Could not read retention report: %s", exc)
+        return None
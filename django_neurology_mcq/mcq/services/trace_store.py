@@ -0,0 +1,421 @@
+"""Append-only storage for MCQ-to-case conversion traces.
+
+A trace is a small metadata record (tracking id, MCQ, user, start time,
+status) plus an ordered list of steps. Steps are only ever appended, so
+logging a step never rewrites the steps already stored.
+
+Traces are found through secondary indexes instead of scanning the keyspace:
+
+* ``start``: every trace, scored by start time
+* ``mcq:<id>`` / ``user:<id>``: traces for one MCQ or one user
+* ``status:<name>``: ``incomplete``, ``success``, ``error``, ``mismatch``
+
+With Redis (the production cache) each trace is a hash plus a list, and each
+index is a sorted set. Retention is bounded twice. Trace keys expire after
+``CONVERSION_TRACE_RETENTION_SECONDS``. Each index drops members older than
+that on every write and is capped at ``CONVERSION_TRACE_MAX_INDEXED``
+entries. Debug queries therefore touch at most a bounded number of keys and
+never issue ``KEYS``.
+
+Other cache backends (LocMem in tests and local development) use
+:class:`CacheTraceStore`. It keeps the same interface on plain cache keys,
+with one step per key and a single bounded index. The index and metadata
+records are read-modify-write values there, so their updates are serialized
+with a short ``cache.add`` lock.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_SECONDS = 7200
+DEFAULT_MAX_INDEXED = 5000
+DEFAULT_MAX_STEPS = 200
+LOCK_TIMEOUT_SECONDS = 5
+LOCK_WAIT_SECONDS = 2
+
+STATUS_INCOMPLETE = "incomplete"
+STATUS_SUCCESS = "success"
+STATUS_ERROR = "error"
+STATUS_MISMATCH = "mismatch"
+STATUSES = (STATUS_INCOMPLETE, STATUS_SUCCESS, STATUS_ERROR, STATUS_MISMATCH)
+
+KEY_PREFIX = "convtrace"
+
+
+def retention_seconds() -> int:
+    return int(getattr(settings, "CONVERSION_TRACE_RETENTION_SECONDS", DEFAULT_RETENTION_SECONDS))
+
+
+def max_indexed() -> int:
+    return int(getattr(settings, "CONVERSION_TRACE_MAX_INDEXED", DEFAULT_MAX_INDEXED))
+
+
+def max_steps() -> int:
+    return int(getattr(settings, "CONVERSION_TRACE_MAX_STEPS", DEFAULT_MAX_STEPS))
+
+
+class TraceStore:
+    """Interface shared by the Redis and cache-backed trace stores."""
+
+    def create(self, trace_id: str, meta: Dict, started_at: float) -> None:
+        raise NotImplementedError
+
+    def exists(self, trace_id: str) -> bool:
+        raise NotImplementedError
+
+    def append_step(self, trace_id: str, step: Dict) -> bool:
+        """Append ``step``; returns False when the trace does not exist."""
+        raise NotImplementedError
+
+    def update_status(self, trace_id: str, add: Sequence[str] = (), remove: Sequence[str] = ()) -> None:
+        raise NotImplementedError
+
+    def observe_mcq(self, trace_id: str, mcq_id) -> int:
+        """Record an MCQ id seen in a step; returns the number of distinct ids."""
+        raise NotImplementedError
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        traces = self.get_many([trace_id])
+        return traces[0] if traces else None
+
+    def get_many(self, trace_ids: Sequence[str]) -> List[Dict]:
+        raise NotImplementedError
+
+    def query(
+        self,
+        *,
+        mcq_id=None,
+        user_id=None,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[str]:
+        """Return trace ids matching every filter, newest first."""
+        raise NotImplementedError
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class RedisTraceStore(TraceStore):
+    """Trace store on raw Redis lists, hashes and sorted sets."""
+
+    def __init__(self, client, prefix: str = KEY_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    # Key layout -----------------------------------------------------------------
+
+    def _meta_key(self, trace_id: str) -> str:
+        return f"{self.prefix}:{trace_id}:meta"
+
+    def _steps_key(self, trace_id: str) -> str:
+        return f"{self.prefix}:{trace_id}:steps"
+
+    def _mcqs_key(self, trace_id: str) -> str:
+        return f"{self.prefix}:{trace_id}:mcqs"
+
+    def _index_key(self, name: str) -> str:
+        return f"{self.prefix}:idx:{name}"
+
+    def _indexes_for(self, meta: Dict) -> List[str]:
+        keys = [self._index_key("start")]
+        if meta.get("mcq_id") not in (None, ""):
+            keys.append(self._index_key(f"mcq:{meta['mcq_id']}"))
+        if meta.get("user_id") not in (None, ""):
+            keys.append(self._index_key(f"user:{meta['user_id']}"))
+        return keys
+
+    # Writes ---------------------------------------------------------------------
+
+    def _add_to_indexes(self, pipe, keys: Iterable[str], trace_id: str, started_at: float) -> None:
+        cutoff = time.time() - retention_seconds()
+        cap = max_indexed()
+        for key in keys:
+            pipe.zadd(key, {trace_id: started_at})
+            pipe.zremrangebyscore(key, "-inf", f"({cutoff}")
+            pipe.zremrangebyrank(key, 0, -(cap + 1))
+            pipe.expire(key, retention_seconds())
+
+    def create(self, trace_id, meta, started_at):
+        ttl = retention_seconds()
+        record = {key: json.dumps(value) for key, value in meta.items()}
+        record["started_at"] = repr(float(started_at))
+        record["status"] = json.dumps(STATUS_INCOMPLETE)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(self._steps_key(trace_id), self._mcqs_key(trace_id))
+        pipe.hset(self._meta_key(trace_id), mapping=record)
+        pipe.expire(self._meta_key(trace_id), ttl)
+        self._add_to_indexes(
+            pipe,
+            self._indexes_for(meta) + [self._index_key(f"status:{STATUS_INCOMPLETE}")],
+            trace_id,
+            started_at,
+        )
+        pipe.execute()
+
+    def exists(self, trace_id):
+        return bool(self.client.exists(self._meta_key(trace_id)))
+
+    def append_step(self, trace_id, step):
+        if not self.exists(trace_id):
+            return False
+        ttl = retention_seconds()
+        key = self._steps_key(trace_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.rpush(key, json.dumps(step, default=str))
+        pipe.ltrim(key, -max_steps(), -1)
+        pipe.expire(key, ttl)
+        pipe.execute()
+        return True
+
+    def update_status(self, trace_id, add=(), remove=()):
+        started_at = self.client.hget(self._meta_key(trace_id), "started_at")
+        if started_at is None:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for status in remove:
+            pipe.zrem(self._index_key(f"status:{status}"), trace_id)
+        if add:
+            pipe.hset(self._meta_key(trace_id), "status", json.dumps(add[-1]))
+            self._add_to_indexes(
+                pipe,
+                [self._index_key(f"status:{status}") for status in add],
+                trace_id,
+                float(_decode(started_at)),
+            )
+        pipe.execute()
+
+    def observe_mcq(self, trace_id, mcq_id):
+        key = self._mcqs_key(trace_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(key, str(mcq_id))
+        pipe.expire(key, retention_seconds())
+        pipe.scard(key)
+        return int(pipe.execute()[-1])
+
+    # Reads ----------------------------------------------------------------------
+
+    def get_many(self, trace_ids):
+        if not trace_ids:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        for trace_id in trace_ids:
+            pipe.hgetall(self._meta_key(trace_id))
+            pipe.lrange(self._steps_key(trace_id), 0, -1)
+        results = pipe.execute()
+
+        traces = []
+        for trace_id, raw_meta, raw_steps in zip(trace_ids, results[0::2], results[1::2]):
+            if not raw_meta:
+                continue
+            meta = {_decode(key): _decode(value) for key, value in raw_meta.items()}
+            meta.pop("started_at", None)
+            trace = {key: json.loads(value) for key, value in meta.items()}
+            trace["tracking_id"] = trace_id
+            trace["steps"] = [json.loads(_decode(step)) for step in raw_steps]
+            traces.append(trace)
+        return traces
+
+    def query(self, *, mcq_id=None, user_id=None, status=None, since=None, limit=100):
+        filters = []
+        if mcq_id not in (None, ""):
+            filters.append(self._index_key(f"mcq:{mcq_id}"))
+        if user_id not in (None, ""):
+            filters.append(self._index_key(f"user:{user_id}"))
+        if status:
+            filters.append(self._index_key(f"status:{status}"))
+        driver = filters.pop(0) if filters else self._index_key("start")
+
+        low = f"{since}" if since is not None else "-inf"
+        if not filters:
+            ids = self.client.zrevrangebyscore(driver, "+inf", low, start=0, num=limit)
+            return [_decode(trace_id) for trace_id in ids]
+
+        # The driving index is already bounded, so checking the remaining
+        # filters member by member stays cheap.
+        candidates = [
+            _decode(trace_id)
+            for trace_id in self.client.zrevrangebyscore(driver, "+inf", low, start=0, num=max_indexed())
+        ]
+        if not candidates:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        for trace_id in candidates:
+            for key in filters:
+                pipe.zscore(key, trace_id)
+        scores = pipe.execute()
+        width = len(filters)
+        matched = [
+            trace_id
+            for position, trace_id in enumerate(candidates)
+            if all(score is not None for score in scores[position * width:(position + 1) * width])
+        ]
+        return matched[:limit]
+
+
+class CacheTraceStore(TraceStore):
+    """Trace store on the Django cache API for backends without Redis.
+
+    Each step is its own key, numbered through an atomic ``incr`` counter, so
+    appends never rewrite earlier steps. A single bounded index of
+    ``(started_at, trace_id)`` pairs serves the queries; metadata carries the
+    fields the filters need.
+    """
+
+    INDEX_KEY = f"{KEY_PREFIX}:index"
+
+    def __init__(self, backend=None):
+        self.cache = backend or cache
+
+    def _meta_key(self, trace_id):
+        return f"{KEY_PREFIX}:{trace_id}:meta"
+
+    def _count_key(self, trace_id):
+        return f"{KEY_PREFIX}:{trace_id}:count"
+
+    def _step_key(self, trace_id, number):
+        return f"{KEY_PREFIX}:{trace_id}:step:{number}"
+
+    @contextmanager
+    def _locked(self, key):
+        lock_key = f"{key}:lock"
+        deadline = time.monotonic() + LOCK_WAIT_SECONDS
+        acquired = self.cache.add(lock_key, 1, LOCK_TIMEOUT_SECONDS)
+        while not acquired and time.monotonic() < deadline:
+            time.sleep(0.005)
+            acquired = self.cache.add(lock_key, 1, LOCK_TIMEOUT_SECONDS)
+        if not acquired:
+            # Losing a debug trace update beats stalling the conversion
+            logger.warning("Trace store lock %s not acquired; updating without it", lock_key)
+        try:
+            yield
+        finally:
+            if acquired:
+                self.cache.delete(lock_key)
+
+    def create(self, trace_id, meta, started_at):
+        ttl = retention_seconds()
+        record = dict(meta)
+        record.update({"started_at": float(started_at), "statuses": [STATUS_INCOMPLETE], "status": STATUS_INCOMPLETE, "mcqs": []})
+        self.cache.set_many({self._meta_key(trace_id): record, self._count_key(trace_id): 0}, ttl)
+
+        cutoff = time.time() - ttl
+        with self._locked(self.INDEX_KEY):
+            index = [entry for entry in self.cache.get(self.INDEX_KEY, []) if entry[0] >= cutoff and entry[1] != trace_id]
+            index.append((float(started_at), trace_id))
+            index.sort(reverse=True)
+            self.cache.set(self.INDEX_KEY, index[:max_indexed()], ttl)
+
+    def exists(self, trace_id):
+        return self.cache.get(self._meta_key(trace_id)) is not None
+
+    def append_step(self, trace_id, step):
+        try:
+            number = self.cache.incr(self._count_key(trace_id))
+        except ValueError:
+            return False
+        self.cache.set(self._step_key(trace_id, number), step, retention_seconds())
+        return True
+
+    def _update_meta(self, trace_id, update):
+        with self._locked(self._meta_key(trace_id)):
+            meta = self.cache.get(self._meta_key(trace_id))
+            if meta is None:
+                return None
+            update(meta)
+            self.cache.set(self._meta_key(trace_id), meta, retention_seconds())
+        return meta
+
+    def update_status(self, trace_id, add=(), remove=()):
+        def apply(meta):
+            statuses = [status for status in meta["statuses"] if status not in remove]
+            statuses.extend(status for status in add if status not in statuses)
+            meta["statuses"] = statuses
+            if add:
+                meta["status"] = add[-1]
+
+        self._update_meta(trace_id, apply)
+
+    def observe_mcq(self, trace_id, mcq_id):
+        def apply(meta):
+            if str(mcq_id) not in meta["mcqs"]:
+                meta["mcqs"].append(str(mcq_id))
+
+        meta = self._update_meta(trace_id, apply)
+        return len(meta["mcqs"]) if meta else 0
+
+    def get_many(self, trace_ids):
+        metas = self.cache.get_many([self._meta_key(trace_id) for trace_id in trace_ids])
+        counts = self.cache.get_many([self._count_key(trace_id) for trace_id in trace_ids])
+        traces = []
+        for trace_id in trace_ids:
+            meta = metas.get(self._meta_key(trace_id))
+            if meta is None:
+                continue
+            keys = [self._step_key(trace_id, number) for number in range(1, counts.get(self._count_key(trace_id), 0) + 1)]
+            steps = self.cache.get_many(keys)
+            trace = {key: value for key, value in meta.items() if key not in ("started_at", "statuses", "mcqs")}
+            trace["tracking_id"] = trace_id
+            trace["steps"] = [steps[key] for key in keys if key in steps][-max_steps():]
+            traces.append(trace)
+        return traces
+
+    def query(self, *, mcq_id=None, user_id=None, status=None, since=None, limit=100):
+        index = self.cache.get(self.INDEX_KEY, [])
+        if since is not None:
+            index = [entry for entry in index if entry[0] >= since]
+        if mcq_id in (None, "") and user_id in (None, "") and not status:
+            return [trace_id for _, trace_id in index[:limit]]
+
+        metas = self.cache.get_many([self._meta_key(trace_id) for _, trace_id in index])
+        matched = []
+        for _, trace_id in index:
+            meta = metas.get(self._meta_key(trace_id))
+            if meta is None:
+                continue
+            if mcq_id not in (None, "") and str(meta.get("mcq_id")) != str(mcq_id):
+                continue
+            if user_id not in (None, "") and str(meta.get("user_id")) != str(user_id):
+                continue
+            if status and status not in meta["statuses"]:
+                continue
+            matched.append(trace_id)
+            if len(matched) >= limit:
+                break
+        return matched
+
+
+def _redis_client():
+    """Return the raw Redis client behind the default cache, if it has one."""
+    backend = getattr(settings, "CACHES", {}).get("default", {}).get("BACKEND", "")
+    if not backend.startswith("django_redis."):
+        return None
+    try:
+        from django_redis import get_redis_connection
+    except ImportError:  # pragma: no cover - django_redis is a hard dependency in production
+        return None
+    return get_redis_connection("default")
+
+
+def get_trace_store() -> TraceStore:
+    """Pick the store for the configured cache (``CONVERSION_TRACE_BACKEND``)."""
+    choice = getattr(settings, "CONVERSION_TRACE_BACKEND", "auto")
+    if choice in ("auto", "redis"):
+        client = _redis_client()
+        if client is not None:
+            return RedisTraceStore(client)
+        if choice == "redis":
+            logger.warning("CONVERSION_TRACE_BACKEND=redis but the default cache is not django_redis")
+    return CacheTraceStore()
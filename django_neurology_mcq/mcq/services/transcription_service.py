@@ -0,0 +1,384 @@
+"""Audio transcription orchestration for voice answers.
+
+Uploads are copied into a spooled buffer that stays in memory until it crosses
+``TRANSCRIPTION_SPOOL_MAX_BYTES`` and is then handed straight to the configured
+backend, so the common case never touches the filesystem. Long recordings can
+be sent as a sequence of self-contained segments; each segment is transcribed
+as it arrives and the running transcript is kept in the cache so the case bot
+can show the first words while the learner is still speaking. Each segment has
+its own cache key, so segments finishing at the same time on different workers
+never overwrite each other; the transcript is assembled from those keys.
+
+The backend is pluggable through ``settings.TRANSCRIPTION_BACKEND`` (a dotted
+path), which lets tests and local development run against
+:class:`StubTranscriptionBackend` instead of the OpenAI API.
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import IO, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "mcq.services.transcription_service.OpenAITranscriptionBackend"
+DEFAULT_SPOOL_MAX_BYTES = 2 * 1024 * 1024
+DEFAULT_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+DEFAULT_ASYNC_MAX_BYTES = 8 * 1024 * 1024
+STREAM_CACHE_PREFIX = "transcription_stream:"
+STREAM_CACHE_TIMEOUT = 900
+MAX_STREAM_SEGMENTS = 512
+SEGMENT_READ_BATCH = 32
+JOB_CACHE_PREFIX = "transcription_job:"
+JOB_CACHE_TIMEOUT = 900
+
+_MIME_EXTENSIONS = (
+    ("ogg", ".ogg"),
+    ("mp4", ".m4a"),
+    ("m4a", ".m4a"),
+    ("wav", ".wav"),
+    ("mp3", ".mp3"),
+    ("mpeg", ".mp3"),
+)
+
+
+class TranscriptionError(Exception):
+    """Raised when an upload cannot be transcribed."""
+
+
+def extension_for_mime(mime_type: Optional[str]) -> str:
+    """Return the file extension the transcription API expects for a MIME type."""
+    mime_type = (mime_type or "").lower()
+    for marker, extension in _MIME_EXTENSIONS:
+        if marker in mime_type:
+            return extension
+    return ".webm"
+
+
+def spool_upload(upload, max_memory_bytes: Optional[int] = None) -> IO[bytes]:
+    """Copy an uploaded file into a rewound ``SpooledTemporaryFile``.
+
+    Django may already hold small uploads in memory and large ones on disk;
+    spooling gives the backend a single seekable stream either way and only
+    spills to disk above the configured threshold.
+    """
+    if max_memory_bytes is None:
+        max_memory_bytes = getattr(settings, "TRANSCRIPTION_SPOOL_MAX_BYTES", DEFAULT_SPOOL_MAX_BYTES)
+    buffer = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes, mode="w+b")
+    if hasattr(upload, "chunks"):
+        for chunk in upload.chunks():
+            buffer.write(chunk)
+    else:
+        buffer.write(upload.read())
+    buffer.seek(0)
+    return buffer
+
+
+class TranscriptionBackend:
+    """Base class for speech-to-text providers."""
+
+    name = "base"
+
+    def is_available(self) -> bool:
+        return True
+
+    def transcribe(self, stream: IO[bytes], filename: str, mime_type: str, language: str = "en") -> str:
+        raise NotImplementedError
+
+
+class OpenAITranscriptionBackend(TranscriptionBackend):
+    """Whisper transcription through the shared OpenAI client."""
+
+    name = "openai"
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model or getattr(settings, "TRANSCRIPTION_MODEL", "whisper-1")
+
+    @staticmethod
+    def _client():
+        from ..openai_integration import client
+
+        return client
+
+    def is_available(self) -> bool:
+        return self._client() is not None
+
+    def transcribe(self, stream: IO[bytes], filename: str, mime_type: str, language: str = "en") -> str:
+        client = self._client()
+        if client is None:
+            raise TranscriptionError("OpenAI transcription is not configured.")
+        transcription = client.audio.transcriptions.create(
+            model=self.model,
+            file=(filename, stream, mime_type),
+            response_format="text",
+            language=language,
+        )
+        if isinstance(transcription, str):
+            return transcription.strip()
+        return (getattr(transcription, "text", "") or "").strip()
+
+
+class StubTranscriptionBackend(TranscriptionBackend):
+    """Deterministic offline backend used by tests and local development.
+
+    The stream is read in full so callers exercise the same buffering path as
+    the real backend; the returned text reports the payload size.
+    """
+
+    name = "stub"
+
+    def transcribe(self, stream: IO[bytes], filename: str, mime_type: str, language: str = "en") -> str:
+        size = len(stream.read())
+        return f"stub transcript of {size} bytes"
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path: str) -> TranscriptionBackend:
+    return import_string(path)()
+
+
+def get_transcription_backend() -> TranscriptionBackend:
+    """Instantiate (once per process) the backend named in settings."""
+    return _load_backend(getattr(settings, "TRANSCRIPTION_BACKEND", DEFAULT_BACKEND))
+
+
+@dataclass
+class TranscriptionResult:
+    text: str
+    duration_ms: int
+    backend: str
+
+
+@dataclass
+class SegmentResult:
+    stream_id: str
+    sequence: int
+    text: str
+    transcript: str
+    final: bool
+    received: Dict[int, str] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "text": self.text,
+            "transcript": self.transcript,
+            "stream_id": self.stream_id,
+            "sequence": self.sequence,
+            "final": self.final,
+            "segments": len(self.received),
+        }
+
+
+class TranscriptionService:
+    """Coordinate spooling, backend calls, segment assembly and background jobs."""
+
+    def __init__(self, backend: Optional[TranscriptionBackend] = None):
+        self._backend = backend
+
+    @property
+    def backend(self) -> TranscriptionBackend:
+        return self._backend or get_transcription_backend()
+
+    @property
+    def max_upload_bytes(self) -> int:
+        return getattr(settings, "TRANSCRIPTION_MAX_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD_BYTES)
+
+    @property
+    def async_max_bytes(self) -> int:
+        return getattr(settings, "TRANSCRIPTION_ASYNC_MAX_BYTES", DEFAULT_ASYNC_MAX_BYTES)
+
+    def is_available(self) -> bool:
+        try:
+            return self.backend.is_available()
+        except Exception:  # pragma: no cover - misconfigured backend path
+            logger.exception("Transcription backend failed to load")
+            return False
+
+    # ------------------------------------------------------------------
+    # Direct transcription
+    # ------------------------------------------------------------------
+    def transcribe_stream(self, stream: IO[bytes], mime_type: str, language: str = "en") -> TranscriptionResult:
+        backend = self.backend
+        filename = f"recording{extension_for_mime(mime_type)}"
+        started = time.monotonic()
+        try:
+            text = backend.transcribe(stream, filename, mime_type, language=language)
+        finally:
+            stream.close()
+        duration_ms = int((time.monotonic() - started) * 1000)
+        logger.info("Transcribed %s via %s in %sms", filename, backend.name, duration_ms)
+        return TranscriptionResult(text=text or "", duration_ms=duration_ms, backend=backend.name)
+
+    def transcribe_upload(self, upload, mime_type: str, language: str = "en") -> TranscriptionResult:
+        if upload.size > self.max_upload_bytes:
+            raise TranscriptionError("Audio file too large (max 25MB)")
+        return self.transcribe_stream(spool_upload(upload), mime_type, language=language)
+
+    def transcribe_bytes(self, data: bytes, mime_type: str, language: str = "en") -> TranscriptionResult:
+        buffer = tempfile.SpooledTemporaryFile(
+            max_size=getattr(settings, "TRANSCRIPTION_SPOOL_MAX_BYTES", DEFAULT_SPOOL_MAX_BYTES),
+            mode="w+b",
+        )
+        buffer.write(data)
+        buffer.seek(0)
+        return self.transcribe_stream(buffer, mime_type, language=language)
+
+    # ------------------------------------------------------------------
+    # Segmented (partial) transcription
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _stream_key(user_id: int, stream_id: str) -> str:
+        return f"{STREAM_CACHE_PREFIX}{user_id}:{stream_id}"
+
+    @staticmethod
+    def check_sequence(sequence: int) -> int:
+        sequence = int(sequence)
+        if not 0 <= sequence < MAX_STREAM_SEGMENTS:
+            raise TranscriptionError("Invalid segment sequence")
+        return sequence
+
+    def record_segment(self, user_id: int, stream_id: str, sequence: int, text: str, final: bool = False) -> SegmentResult:
+        """Store one segment's text and return the transcript assembled so far.
+
+        Segments may finish out of order when they are transcribed in the
+        background, so they are keyed by sequence number and joined in order.
+        """
+        sequence = self.check_sequence(sequence)
+        stream_key = self._stream_key(user_id, stream_id)
+        text = (text or "").strip()
+        if cache.add(f"{stream_key}:{sequence}", text, timeout=STREAM_CACHE_TIMEOUT):
+            # The count tells readers how many segment keys to look for
+            count_key = f"{stream_key}:count"
+            cache.add(count_key, 0, timeout=STREAM_CACHE_TIMEOUT)
+            cache.incr(count_key)
+            cache.touch(count_key, STREAM_CACHE_TIMEOUT)
+        else:
+            # A re-sent segment replaces the earlier text
+            cache.set(f"{stream_key}:{sequence}", text, timeout=STREAM_CACHE_TIMEOUT)
+        received = self._received(stream_key)
+        received[sequence] = text
+        return SegmentResult(
+            stream_id=stream_id,
+            sequence=sequence,
+            text=text,
+            transcript=self._join(received),
+            final=final,
+            received=received,
+        )
+
+    @staticmethod
+    def _received(stream_key: str) -> Dict[int, str]:
+        count = cache.get(f"{stream_key}:count") or 0
+        received: Dict[int, str] = {}
+        for start in range(0, MAX_STREAM_SEGMENTS, SEGMENT_READ_BATCH):
+            if len(received) >= count:
+                break
+            keys = {f"{stream_key}:{seq}": seq for seq in range(start, start + SEGMENT_READ_BATCH)}
+            for key, value in cache.get_many(list(keys)).items():
+                received[keys[key]] = value
+        return received
+
+    @staticmethod
+    def _join(received: Dict[int, str]) -> str:
+        return " ".join(received[seq] for seq in sorted(received) if received[seq])
+
+    def transcript_for_stream(self, user_id: int, stream_id: str) -> str:
+        return self._join(self._received(self._stream_key(user_id, stream_id)))
+
+    def transcribe_segment(self, user_id: int, stream_id: str, sequence: int, upload, mime_type: str, final: bool = False) -> SegmentResult:
+        result = self.transcribe_upload(upload, mime_type)
+        return self.record_segment(user_id, stream_id, sequence, result.text, final=final)
+
+    # ------------------------------------------------------------------
+    # Background jobs
+    # ------------------------------------------------------------------
+    @staticmethod
+    def job_cache_key(job_id: str) -> str:
+        return f"{JOB_CACHE_PREFIX}{job_id}"
+
+    def enqueue(self, user_id: int, upload, mime_type: str, stream_id: Optional[str] = None,
+                sequence: int = 0, final: bool = False) -> str:
+        """Queue a transcription on Celery and return the job id to poll."""
+        if upload.size > self.async_max_bytes:
+            raise TranscriptionError("Audio file too large for background transcription")
+        if stream_id:
+            sequence = self.check_sequence(sequence)
+
+        buffer = spool_upload(upload)
+        try:
+            encoded = base64.b64encode(buffer.read()).decode("ascii")
+        finally:
+            buffer.close()
+
+        job_id = str(uuid.uuid4())
+        cache.set(
+            self.job_cache_key(job_id),
+            {"status": "pending", "job_id": job_id, "user_id": user_id},
+            timeout=JOB_CACHE_TIMEOUT,
+        )
+
+        from ..tasks import run_transcription_job
+
+        run_transcription_job.delay(
+            job_id,
+            {
+                "user_id": user_id,
+                "audio_b64": encoded,
+                "mime_type": mime_type,
+                "stream_id": stream_id,
+                "sequence": sequence,
+                "final": final,
+            },
+        )
+        return job_id
+
+    def run_job(self, job_id: str, payload: Dict[str, object]) -> Dict[str, object]:
+        """Execute a queued transcription; called from the Celery task."""
+        key = self.job_cache_key(job_id)
+        user_id = payload.get("user_id")
+        cache.set(key, {"status": "processing", "job_id": job_id, "user_id": user_id}, timeout=JOB_CACHE_TIMEOUT)
+        try:
+            data = base64.b64decode(payload.get("audio_b64") or "")
+            result = self.transcribe_bytes(data, payload.get("mime_type") or "audio/webm")
+            response: Dict[str, object] = {"text": result.text}
+            stream_id = payload.get("stream_id")
+            if stream_id:
+                segment = self.record_segment(
+                    user_id,
+                    stream_id,
+                    int(payload.get("sequence") or 0),
+                    result.text,
+                    final=bool(payload.get("final")),
+                )
+                response = segment.as_dict()
+            state = {"status": "ready", "job_id": job_id, "user_id": user_id, "result": response}
+        except Exception as exc:
+            logger.error("Transcription job %s failed: %s", job_id, exc, exc_info=True)
+            state = {"status": "failed", "job_id": job_id, "user_id": user_id, "error": str(exc)}
+        cache.set(key, state, timeout=JOB_CACHE_TIMEOUT)
+        return state
+
+    def job_status(self, job_id: str, user_id: int) -> Optional[Dict[str, object]]:
+        return self._visible_status(cache.get(self.job_cache_key(job_id)), user_id)
+
+    async def ajob_status(self, job_id: str, user_id: int) -> Optional[Dict[str, object]]:
+        return self._visible_status(await cache.aget(self.job_cache_key(job_id)), user_id)
+
+    @staticmethod
+    def _visible_status(data: Optional[Dict[str, object]], user_id: int) -> Optional[Dict[str, object]]:
+        if not data or data.get("user_id") != user_id:
+            return None
+        return {k: v for k, v in data.items() if k != "user_id"}
+
+
+transcription_service = TranscriptionService()
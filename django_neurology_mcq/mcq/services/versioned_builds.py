@@ -0,0 +1,97 @@
+"""
+Versioned build directories for memory-mapped indexes.
+
+An index directory holds one subdirectory per build plus a ``CURRENT`` file
+naming the live one. A build is written in full under its own id and only
+then published by atomically replacing ``CURRENT``, so readers never see
+half-written files. Superseded builds are pruned, keeping the one before the
+live build because another process may still have it mapped.
+
+Builds live on the local disk of the process that writes them, so every
+dyno (or container) builds its own; :func:`build_lock` keeps the worker
+processes sharing one disk from building the same index at once.
+
+Used by the guideline BM25 index and the embedding index.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".build.lock"
+KEEP_BUILDS = 2
+
+
+def new_build(directory: Path) -> Tuple[str, Path]:
+    """Create an empty build subdirectory; returns ``(build_id, path)``."""
+    directory.mkdir(parents=True, exist_ok=True)
+    build_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    target = directory / build_id
+    target.mkdir()
+    return build_id, target
+
+
+def publish(directory: Path, build_id: str) -> None:
+    """Point ``CURRENT`` at ``build_id`` and prune older builds."""
+    tmp = directory / f"{CURRENT_FILE}.{build_id}.tmp"
+    tmp.write_text(build_id, encoding="utf-8")
+    os.replace(tmp, directory / CURRENT_FILE)
+    prune_builds(directory, keep=build_id)
+
+
+def current_build(directory: Path) -> Optional[Path]:
+    """Directory of the live build, or None when nothing has been published."""
+    try:
+        build_id = (directory / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return directory / build_id if build_id else None
+
+
+def pointer_key(directory: Path) -> Optional[Tuple[str, float]]:
+    """Changes whenever a new build is published; None when there is none."""
+    try:
+        return str(directory), (directory / CURRENT_FILE).stat().st_mtime
+    except OSError:
+        return None
+
+
+@contextmanager
+def build_lock(directory: Path) -> Iterator[bool]:
+    """
+    Non-blocking exclusive lock on ``directory`` across processes.
+
+    Yields False when another process holds it; that process's build will be
+    picked up through ``CURRENT``.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_FILE, "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def discard(target: Path) -> None:
+    """Remove an unpublished build after a failed write."""
+    shutil.rmtree(target, ignore_errors=True)
+
+
+def prune_builds(directory: Path, keep: str) -> None:
+    builds = sorted((p for p in directory.iterdir() if p.is_dir()), key=lambda p: p.name, reverse=True)
+    # Keep the live build and the one before it; a worker may still be mapping the older files
+    for old in [p for p in builds if p.name != keep][KEEP_BUILDS - 1:]:
+        shutil.rmtree(old, ignore_errors=True)
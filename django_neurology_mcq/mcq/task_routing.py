@@ -0,0 +1,143 @@
+"""
+Celery queue topology.
+
+Tasks are routed to three lanes, each consumed by its own worker pool
+(see the Procfile and docker-compose.yml):
+
+* ``interactive``: work a learner or editor is waiting on (AI-Pal,
+  ReasoningPal analysis, MCQ-to-case conversion, transcription, option edits)
+* ``bulk``: long generations and batch work (explanation regeneration,
+  embedding refreshes) that may queue without hurting interactive latency
+* ``maintenance``: scheduled housekeeping (retention)
+
+``route_task`` is installed through ``CELERY_TASK_ROUTES`` and
+``LaneAnnotations`` through ``CELERY_TASK_ANNOTATIONS``; the per-lane time
+limits and default priorities come from ``CELERY_LANES``. An explicit
+``queue=`` or ``priority=`` passed to ``apply_async`` still wins.
+
+Priorities follow the Redis transport, where 0 is consumed first.
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+MAINTENANCE = 'maintenance'
+LANES = (INTERACTIVE, BULK, MAINTENANCE)
+# Queue used before lanes existed; the interactive pool drains it after a deploy
+LEGACY_QUEUE = 'celery'
+
+DEFAULT_LANES = {
+    INTERACTIVE: {'priority': 3, 'soft_time_limit': 240, 'time_limit': 300},
+    BULK: {'priority': 6, 'soft_time_limit': 600, 'time_limit': 660},
+    MAINTENANCE: {'priority': 9, 'soft_time_limit': 3300, 'time_limit': 3600},
+}
+
+# task name -> (lane, priority or None for the lane default)
+TASK_LANES: Dict[str, Tuple[str, Optional[int]]] = {
+    'mcq.tasks.run_ai_job': (INTERACTIVE, None),
+    'mcq.tasks.process_clinical_reasoning_analysis': (INTERACTIVE, 1),
+    'mcq.tasks.process_mcq_to_case_conversion': (INTERACTIVE, 2),
+    'mcq.tasks.run_transcription_job': (INTERACTIVE, 1),
+    'mcq.tasks.run_options_editing_job': (INTERACTIVE, None),
+    'mcq.tasks.run_bulk_ai_job': (BULK, 2),
+    'mcq.tasks.run_explanation_agent_job': (BULK, 2),
+    'mcq.tasks.refresh_mcq_embeddings': (BULK, 8),
+    'mcq.tasks.run_retention': (MAINTENANCE, None),
+}
+
+# run_ai_job serves several actions; these ones get their own priority. Time
+# limits are per task, so long actions are sent as run_bulk_ai_job instead.
+AI_JOB_ACTION_LANES: Dict[str, Tuple[str, Optional[int]]] = {
+    'ask_gpt': (INTERACTIVE, 0),
+    'analyze_test_reasoning': (INTERACTIVE, 1),
+}
+
+
+def lane_settings(lane: str) -> Dict[str, int]:
+    config = dict(DEFAULT_LANES.get(lane, DEFAULT_LANES[INTERACTIVE]))
+    config.update(getattr(settings, 'CELERY_LANES', {}).get(lane, {}))
+    return config
+
+
+def lane_for(name: str, args=(), kwargs=None) -> Tuple[str, int]:
+    """Lane and priority for a call of task ``name``."""
+    lane, priority = TASK_LANES.get(name, (INTERACTIVE, None))
+    if name == 'mcq.tasks.run_ai_job':
+        action = (kwargs or {}).get('action')
+        if action is None and args and len(args) > 1:
+            action = args[1]
+        lane, priority = AI_JOB_ACTION_LANES.get(action, (lane, priority))
+    if priority is None:
+        priority = lane_settings(lane)['priority']
+    return lane, priority
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Celery router: send each task to its lane with its priority."""
+    if not name.startswith('mcq.'):
+        return None
+    lane, priority = lane_for(name, args, kwargs)
+    return {'queue': lane, 'priority': priority}
+
+
+class LaneAnnotations:
+    """Celery task annotations applying the time limits of each task's lane."""
+
+    def annotate(self, task):
+        if task.name not in TASK_LANES:
+            return None
+        lane, _ = TASK_LANES[task.name]
+        config = lane_settings(lane)
+        return {'soft_time_limit': config['soft_time_limit'], 'time_limit': config['time_limit']}
+
+
+# ----------------------------------------------------------------------
+# Queue depth
+# ----------------------------------------------------------------------
+def queue_depths(app=None) -> Dict[str, Optional[int]]:
+    """
+    Messages waiting in each lane (and the legacy queue), read from the broker.
+
+    A queue the broker cannot report on maps to ``None``; a missing queue
+    (nothing published yet) counts as empty.
+    """
+    if app is None:
+        from neurology_mcq.celery_app import app
+
+    depths: Dict[str, Optional[int]] = {}
+    try:
+        with app.connection_for_read() as connection:
+            # A metrics scrape should not wait out the broker's retry policy
+            connection.ensure_connection(max_retries=1, interval_start=0, timeout=2)
+            channel = connection.default_channel
+            for queue in LANES + (LEGACY_QUEUE,):
+                try:
+                    depths[queue] = int(channel.queue_declare(queue=queue, passive=True).message_count)
+                except Exception as exc:
+                    if 'NOT_FOUND' in str(exc) or 'no queue' in str(exc).lower():
+                        depths[queue] = 0
+                    else:
+                        logger.warning("Could not read depth of queue %s: %s", queue, exc)
+                        depths[queue] = None
+    except Exception as exc:
+        logger.warning("Could not connect to the Celery broker for queue depths: %s", exc)
+        return {queue: None for queue in LANES + (LEGACY_QUEUE,)}
+    return depths
+
+
+def prometheus_queue_depths(depths: Optional[Dict[str, Optional[int]]] = None, prefix: str = 'neurology_mcq') -> str:
+    depths = queue_depths() if depths is None else depths
+    lines = [
+        f'# HELP {prefix}_celery_queue_depth Messages waiting in each Celery queue',
+        f'# TYPE {prefix}_celery_queue_depth gauge',
+    ]
+    for queue, depth in depths.items():
+        if depth is not None:
+            lines.append(f'{prefix}_celery_queue_depth{{queue="{queue}"}} {depth}')
+    return '\n'.join(lines) + '\n'
@@ -244,11 +244,14 @@ def process_clinical_reasoning_analysis(self, session_id, mcq_id, selected_answe
     """
     try:
         from .models import CognitiveReasoningSession, MCQ
+        from .services import reasoning_fastpath
         # Prefer OpenAI-backed generator; gracefully fall back to rule-based if unavailable
+        model_backed = False
         try:
             from .cognitive_analysis_openai import ReasoningGuideGenerator as _RG
             try:
                 guide_generator = _RG()
+                model_backed = True
             except Exception:
                 from .cognitive_analysis import ReasoningGuideGenerator as _RB
                 guide_generator = _RB()
@@ -262,9 +265,22 @@ def process_clinical_reasoning_analysis(self, session_id, mcq_id, selected_answe
         session = CognitiveReasoningSession.objects.get(id=session_id)
         mcq = MCQ.objects.get(id=mcq_id)
         
+        # A heuristic result is already on screen; keep serving it until the upgrade is stored
+        upgrading = session.analysis_tier == CognitiveReasoningSession.TIER_HEURISTIC
+        if upgrading and not model_backed:
+            session.task_id = None
+            session.save(update_fields=['task_id'])
+            logger.info(f"No model analysis available; keeping heuristic result for session {session_id}")
+            return {
+                'success': True,
+                'session_id': session_id,
+                'message': 'Heuristic analysis kept'
+            }
+        
         # Update session status to processing
-        session.status = CognitiveReasoningSession.PROCESSING
-        session.save()
+        if not upgrading:
+            session.status = CognitiveReasoningSession.PROCESSING
+            session.save()
         
         # Try OpenAI analysis path if available; otherwise generate guidance directly
         guidance_steps = []
@@ -335,7 +351,14 @@ def process_clinical_reasoning_analysis(self, session_id, mcq_id, selected_answe
             pass
         session.status = CognitiveReasoningSession.READY
         session.completed_at = timezone.now()
+        if model_backed and analysis:
+            session.analysis_tier = CognitiveReasoningSession.TIER_MODEL
+        elif upgrading:
+            # The model answered without a structured analysis; nothing better to wait for
+            session.task_id = None
         session.save()
+        if session.analysis_tier == CognitiveReasoningSession.TIER_MODEL:
+            reasoning_fastpath.store_result(session)
         
         logger.info(f"Completed background clinical reasoning analysis for session {session_id}")
         
@@ -348,20 +371,27 @@ def process_clinical_reasoning_analysis(self, session_id, mcq_id, selected_answe
     except Exception as e:
         logger.error(f"Error in background clinical reasoning analysis: {e}", exc_info=True)
         
+        retrying = self.request.retries < self.max_retries
         # Update session status to failed
         try:
             session = CognitiveReasoningSession.objects.get(id=session_id)
-            session.status = CognitiveReasoningSession.FAILED
-            try:
-                session.error_message = str(e)
-            except Exception:
-                pass
-            session.save()
+            if session.analysis_tier == CognitiveReasoningSession.TIER_HEURISTIC and session.status == CognitiveReasoningSession.READY:
+                # Failed upgrades leave the heuristic result in place
+                if not retrying:
+                    session.task_id = None
+                    session.save(update_fields=['task_id'])
+            else:
+                session.status = CognitiveReasoningSession.FAILED
+                try:
+                    session.error_message = str(e)
+                except Exception:
+                    pass
+                session.save()
         except:
             pass
         
         # Retry the task with exponential backoff
-        if self.request.retries < self.max_retries:
+        if retrying:
             logger.info(f"Retrying task, attempt {self.request.retries + 1}")
             raise self.retry(countdown=60 * (2 ** self.request.retries))
         
@@ -382,6 +412,16 @@ def run_ai_job(self, job_id: str, action: str, params: dict):
 
     Stores status and result in the Django cache under key ai_job:{job_id}.
     """
+    _run_ai_job(job_id, action, params)
+
+
+@shared_task(bind=True, max_retries=0)
+def run_bulk_ai_job(self, job_id: str, action: str, params: dict):
+    """``run_ai_job`` for long generations; runs on the bulk lane with its time limits."""
+    _run_ai_job(job_id, action, params)
+
+
+def _run_ai_job(job_id: str, action: str, params: dict):
     cache_key = _ai_job_cache_key(job_id)
 
     def update(status: str, **extra):
@@ -394,12 +434,12 @@ def run_ai_job(self, job_id: str, action: str, params: dict):
 
         if action == 'ask_gpt':
             from .models import MCQ
-            from .openai_integration import answer_question_about_mcq
+            from .services import ai_pal_cache
 
             mcq = MCQ.objects.get(id=params['mcq_id'])
             question = params.get('question', '')
-            answer = answer_question_about_mcq(mcq, question)
-            update('ready', result={'answer': answer})
+            result = ai_pal_cache.answer_question(mcq, question, regenerate=bool(params.get('regenerate')))
+            update('ready', result=result.as_result())
             return
 
         elif action == 'generate_test_question':
@@ -513,6 +553,47 @@ def run_ai_job(self, job_id: str, action: str, params: dict):
         update('failed', error=str(e))
 
 
+@shared_task(bind=True, max_retries=0)
+def run_transcription_job(self, job_id: str, payload: dict):
+    """Transcribe a queued voice recording or segment off the request cycle.
+
+    Status and result are stored under transcription_job:{job_id}.
+    """
+    from .services.transcription_service import transcription_service
+
+    state = transcription_service.run_job(job_id, payload)
+    return {'success': state.get('status') == 'ready', 'job_id': job_id}
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=30)
+def refresh_mcq_embeddings(self, mcq_id: int):
+    """Re-embed one MCQ with a remote embedder (queued from the MCQ post_save receiver)."""
+    from .models import MCQ
+    from .services.embeddings import update_mcq_embeddings
+
+    mcq = MCQ.objects.filter(pk=mcq_id).first()
+    if mcq is None:
+        return {'success': False, 'mcq_id': mcq_id, 'error': 'MCQ not found'}
+    try:
+        written = update_mcq_embeddings(mcq)
+    except Exception as exc:
+        logger.warning(f"Embedding update for MCQ {mcq_id} failed: {exc}")
+        raise self.retry(exc=exc)
+    return {'success': True, 'mcq_id': mcq_id, 'written': written}
+
+
+@shared_task(bind=True, max_retries=0, ignore_result=True)
+def run_retention(self, dry_run: bool = False, policies=None):
+    """Age out per-user history tables (scheduled nightly through CELERY_BEAT_SCHEDULE)."""
+    from .services.retention import RetentionEngine, get_policies
+
+    results = RetentionEngine().run(get_policies(policies), dry_run=dry_run)
+    return {
+        'success': not any(result.error for result in results),
+        'affected': {result.policy: result.affected for result in results},
+    }
+
+
 @shared_task(bind=True, max_retries=2)
 def process_mcq_to_case_conversion(self, mcq_id, user_id, tracking_id=None):
     """
@@ -547,27 +628,33 @@ def process_mcq_to_case_conversion(self, mcq_id, user_id, tracking_id=None):
         # Log environment info for debugging
         logger.info(f"Starting MCQ-to-Case conversion for MCQ {mcq_id} on dyno: {os.environ.get('DYNO', 'local')}")
         
-        # Implement simple distributed lock using cache
+        task_started = time.perf_counter()
+        stage_timings = []
+        converter_stages = []
+        
+        def record_stage(name, started):
+            stage_timings.append({
+                'stage': name,
+                'start_ms': round((started - task_started) * 1000, 1),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            })
+        
+        # Only one conversion per MCQ and user runs at a time. The lock lasts
+        # as long as the task may run, and a duplicate never waits for it: the
+        # running conversion updates the same session, which the browser polls.
+        from .task_routing import INTERACTIVE, lane_settings
         lock_key = f"mcq_conversion_lock_{mcq_id}_{user_id}"
-        lock_acquired = cache.add(lock_key, "locked", timeout=120)  # 2 minute lock
+        lock_acquired = cache.add(lock_key, self.request.id or "locked", timeout=lane_settings(INTERACTIVE)['time_limit'])
         
         if not lock_acquired:
-            logger.warning(f"Conversion already in progress for MCQ {mcq_id}, user {user_id}")
-            # Wait briefly and check if there's a result
-            time.sleep(2)
-            existing_session = MCQCaseConversionSession.objects.filter(
-                mcq_id=mcq_id,
-                user_id=user_id,
-                status=MCQCaseConversionSession.READY
-            ).order_by('-created_at').first()
-            if existing_session:
-                return {
-                    'success': True,
-                    'mcq_id': mcq_id,
-                    'session_id': existing_session.id,
-                    'message': 'Using existing conversion'
-                }
-            raise Exception("Another conversion is in progress")
+            logger.info(f"Conversion already in progress for MCQ {mcq_id}, user {user_id}; coalescing")
+            return {
+                'success': True,
+                'mcq_id': mcq_id,
+                'message': 'Conversion already in progress',
+                'coalesced': True,
+                'tracking_id': tracking_id
+            }
         
         try:
             # Get the MCQ and user with database lock to prevent race conditions
@@ -618,7 +705,11 @@ def process_mcq_to_case_conversion(self, mcq_id, user_id, tracking_id=None):
             # Convert MCQ to case (this includes validation and retries)
             try:
                 logger.info(f"Converting MCQ {mcq_id} to case...")
+                stage_started = time.perf_counter()
                 case_data = convert_mcq_to_case(mcq, include_debug=False)
+                record_stage('convert', stage_started)
+                # Timings go to the tracker, never into the stored case
+                converter_stages = case_data.pop('_stage_timings', None) or []
                 
                 # Log case generation
                 conversion_tracker.log_case_generation(
@@ -646,6 +737,7 @@ def process_mcq_to_case_conversion(self, mcq_id, user_id, tracking_id=None):
                 logger.warning(f"Initial conversion failed for MCQ {mcq_id}, retrying with debug mode: {e}")
                 try:
                     case_data = convert_mcq_to_case(mcq, include_debug=True)
+                    converter_stages = case_data.pop('_stage_timings', None) or []
                     
                     # Verify again
                     if case_data.get('source_mcq_id') != mcq_id:
@@ -662,7 +754,9 @@ def process_mcq_to_case_conversion(self, mcq_id, user_id, tracking_id=None):
             # Validate generated case with end-to-end integrity and Heroku-aware validation
             import os
             from .end_to_end_integrity import e2e_integrity
+            stage_started = time.perf_counter()
             validation_result = e2e_integrity.validate_generated_case(mcq, case_data, session)
+            record_stage('e2e_validation', stage_started)
             
             # Log validation result
             conversion_tracker.log_validation_result(
@@ -692,7 +786,19 @@ def process_mcq_to_case_conversion(self, mcq_id, user_id, tracking_id=None):
                     raise Exception(f"Case validation failed: {validation_result['reason']}")
             
             # Store the validated case data with integrity protection
+            stage_started = time.perf_counter()
             e2e_integrity.store_case_with_integrity(session, case_data)
+            record_stage('storage', stage_started)
+            
+            # Converter stages are nested under 'convert' (absent on converter cache hits)
+            for stage in converter_stages:
+                stage_timings.append(dict(stage, stage=f"convert.{stage['stage']}"))
+            total_ms = round((time.perf_counter() - task_started) * 1000, 1)
+            conversion_tracker.log_stage_timings(tracking_id, stage_timings, total_ms)
+            logger.info(
+                f"MCQ {mcq_id} conversion stages: "
+                + ", ".join(f"{stage['stage']}={stage['duration_ms']}ms" for stage in stage_timings)
+            )
             
             # Log database storage
             conversion_tracker.log_database_storage(
@@ -0,0 +1,166 @@
+from unittest.mock import patch
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from mcq.models import MCQ, IncorrectAnswer, UserMastery
+from mcq.services import adaptive_selector
+from mcq.services.adaptive_selector import (
+    AdaptiveSelector,
+    CandidateMatrix,
+    MasteryVector,
+    rebuild_candidate_matrix,
+    reset_candidate_matrix,
+)
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class MasteryVectorTests(SimpleTestCase):
+    def setUp(self):
+        self.matrix = CandidateMatrix.build([
+            (3, "Epilepsy", "Seizures"),
+            (1, "Epilepsy", None),
+            (2, "Stroke", "Vascular"),
+        ])
+
+    def test_matrix_is_sorted_with_sentinel_for_missing_topics(self):
+        self.assertEqual(self.matrix.ids.tolist(), [1, 2, 3])
+        self.assertEqual(self.matrix.topics_for(1), ["sub:Epilepsy"])
+        self.assertEqual(self.matrix.topics_for(3), ["sub:Epilepsy", "cat:Seizures"])
+        self.assertEqual(self.matrix.positions([3, 99, 1]).tolist(), [2, 0])
+
+    def test_observe_decays_old_evidence(self):
+        vector = MasteryVector.empty()
+        vector.observe(["sub:Stroke"], False, day=100.0, half_life=10.0)
+        vector.observe(["sub:Stroke"], True, day=110.0, half_life=10.0)
+        successes, failures, last_seen = vector.values[0]
+        self.assertAlmostEqual(failures, 0.5)
+        self.assertAlmostEqual(successes, 1.0)
+        self.assertEqual(last_seen, 110.0)
+
+    def test_round_trip_storage(self):
+        vector = MasteryVector.empty()
+        vector.observe(["sub:Stroke", "cat:Vascular"], True, day=1.0)
+        restored = MasteryVector.from_storage(vector.topics, vector.to_bytes())
+        np.testing.assert_array_equal(restored.values, vector.values)
+
+    def test_scores_prefer_weak_topics_and_respect_exclusions(self):
+        vector = MasteryVector.empty()
+        for _ in range(20):
+            vector.observe(["sub:Epilepsy"], True, day=1.0)
+            vector.observe(["sub:Stroke"], False, day=1.0)
+        scores = AdaptiveSelector.score(self.matrix, vector, np.random.default_rng(0))
+        self.assertEqual(int(self.matrix.ids[np.argmax(scores)]), 2)
+
+        scores = AdaptiveSelector.score(self.matrix, vector, np.random.default_rng(0), exclude_ids=[2])
+        self.assertEqual(scores[1], -np.inf)
+        self.assertEqual(int(self.matrix.ids[np.argmax(scores)]), 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SmartPracticeTests(TestCase):
+    def setUp(self):
+        reset_candidate_matrix()
+        self.user = User.objects.create_user(username="adaptive", password="pass1234")
+        self.client = Client()
+        assert self.client.login(username="adaptive", password="pass1234")
+        self.epilepsy = [self._mcq(f"EP-{i}", "Epilepsy") for i in range(3)]
+        self.stroke = [self._mcq(f"ST-{i}", "Stroke") for i in range(3)]
+
+    def tearDown(self):
+        reset_candidate_matrix()
+
+    def _mcq(self, number, subspecialty):
+        return MCQ.objects.create(
+            question_number=number,
+            question_text="Stem",
+            options={"A": "One", "B": "Two"},
+            correct_answer="A",
+            subspecialty=subspecialty,
+        )
+
+    def test_check_answer_updates_mastery_and_seeds_from_history(self):
+        IncorrectAnswer.objects.create(user=self.user, mcq=self.stroke[0], selected_answer="B")
+        self.client.post(reverse("check_answer", args=[self.epilepsy[0].id]), {"answer": "A"})
+
+        vector = MasteryVector.from_storage(*UserMastery.objects.values_list("topics", "vector").get(user=self.user))
+        rows = dict(zip(vector.topics, vector.values.tolist()))
+        self.assertEqual(rows["sub:Stroke"][:2], [0.0, 1.0])
+        self.assertEqual(rows["sub:Epilepsy"][:2], [1.0, 0.0])
+
+    def test_submit_exam_updates_mastery(self):
+        session = self.client.session
+        session["mock_exam"] = {
+            "exam_id": "x",
+            "mcq_ids": [mcq.id for mcq in self.stroke],
+            "start_time": "2026-01-01T00:00:00+00:00",
+            "time_limit": 60,
+        }
+        session.save()
+        answers = {f"answer-{mcq.id}": "B" for mcq in self.stroke}
+        self.client.post(reverse("submit_exam"), answers)
+
+        vector, stored = AdaptiveSelector().load(self.user)
+        self.assertTrue(stored)
+        self.assertEqual(vector.summary()[0]["topic"], "Stroke")
+        self.assertEqual(vector.summary()[0]["attempts"], 3.0)
+
+    def test_smart_practice_targets_weak_subspecialty(self):
+        selector = AdaptiveSelector()
+        selector.record_answers(
+            self.user,
+            [(mcq.id, True) for mcq in self.epilepsy] * 10 + [(mcq.id, False) for mcq in self.stroke] * 10,
+        )
+        response = self.client.get(reverse("smart_practice"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(response.context["mcq"], self.stroke)
+        self.assertEqual(response.context["weakest_topics"][0]["topic"], "Stroke")
+
+        # Recently served questions are not repeated
+        served = {response.context["mcq"].id}
+        for _ in range(2):
+            served.add(self.client.get(reverse("smart_practice")).context["mcq"].id)
+        self.assertEqual(len(served), 3)
+
+    def test_new_mcq_refreshes_candidates_off_the_request(self):
+        AdaptiveSelector().select(self.user)
+        extra = self._mcq("NEW-1", "Headache")
+        with patch.object(adaptive_selector, "_refresh_in_background", side_effect=rebuild_candidate_matrix) as refresh:
+            # The stale matrix is served while the rebuild runs
+            self.assertEqual(AdaptiveSelector().select(self.user, subspecialty="Headache"), [])
+            self.assertEqual(AdaptiveSelector().select(self.user, subspecialty="Headache"), [extra.id])
+        refresh.assert_called_once()
+
+    def test_only_selector_fields_invalidate_candidates(self):
+        mcq = MCQ.objects.get(pk=self.epilepsy[0].pk)
+        with patch.object(adaptive_selector, "bump_candidate_version") as bump:
+            mcq.question_text = "Edited stem"
+            mcq.save()
+            mcq.save(update_fields=["question_text"])
+            bump.assert_not_called()
+            mcq.subspecialty = "Stroke"
+            mcq.save()
+            bump.assert_called_once()
+
+    def test_first_vectors_stored_concurrently_are_merged(self):
+        selector = AdaptiveSelector()
+        seed = selector._seed_from_history
+
+        def seed_while_another_request_saves(user, matrix):
+            vector = seed(user, matrix)
+            # Another request stores the user's first vector in the meantime
+            other = MasteryVector.empty()
+            other.observe(["sub:Stroke"], False, day=1.0)
+            UserMastery.objects.create(user=user, topics=other.topics, vector=other.to_bytes())
+            return vector
+
+        with patch.object(selector, "_seed_from_history", side_effect=seed_while_another_request_saves):
+            selector.record_answers(self.user, [(self.epilepsy[0].id, True)])
+
+        vector, _ = selector.load(self.user)
+        rows = dict(zip(vector.topics, vector.values.tolist()))
+        self.assertEqual(rows["sub:Stroke"][:2], [0.0, 1.0])
+        self.assertEqual(rows["sub:Epilepsy"][:2], [1.0, 0.0])
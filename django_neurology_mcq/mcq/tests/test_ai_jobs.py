@@ -0,0 +1,133 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from mcq.models import MCQ
+from mcq.services import ai_jobs
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AIJobSubmissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.mcq = MCQ.objects.create(
+            question_number="Q1",
+            question_text="A patient has sudden left arm weakness.",
+            options={"A": "Stroke", "B": "Bell palsy"},
+            correct_answer="A",
+            subspecialty="Vascular Neurology",
+        )
+        self.enqueued = []
+
+    def submit(self, params):
+        return ai_jobs.submit("ask_gpt", self.enqueued.append, mcq=self.mcq, params=params)
+
+    def test_identical_submissions_join_the_in_flight_job(self):
+        first = self.submit({"question": "why not b"})
+        second = self.submit({"question": "  why not   b "})
+        other = self.submit({"question": "why a"})
+
+        self.assertTrue(first.created)
+        self.assertEqual((second.job_id, second.created), (first.job_id, False))
+        self.assertNotEqual(other.job_id, first.job_id)
+        self.assertEqual(self.enqueued, [first.job_id, other.job_id])
+        self.assertEqual(cache.get(f"ai_job:{first.job_id}"), {"status": "pending"})
+
+    def test_finished_jobs_and_content_edits_start_new_jobs(self):
+        first = self.submit({"question": "why not b"})
+        cache.set(f"ai_job:{first.job_id}", {"status": "ready", "result": {}})
+        after_finish = self.submit({"question": "why not b"})
+        self.assertTrue(after_finish.created)
+
+        self.mcq.correct_answer = "B"
+        self.mcq.save()
+        after_edit = self.submit({"question": "why not b"})
+        self.assertTrue(after_edit.created)
+        self.assertEqual(len(set(self.enqueued)), 3)
+
+    def test_concurrent_resubmissions_after_a_finished_job_start_one_job(self):
+        first = self.submit({"question": "why not b"})
+        cache.set(f"ai_job:{first.job_id}", {"status": "ready", "result": {}})
+        # Another process saw the same finished job and claimed its replacement
+        key = ai_jobs.job_key("ask_gpt", self.mcq, {"question": "why not b"})
+        cache.add(f"{key}:after:{first.job_id}", "replacement-job")
+
+        joined = self.submit({"question": "why not b"})
+        self.assertEqual((joined.job_id, joined.created), ("replacement-job", False))
+        self.assertEqual(self.enqueued, [first.job_id])
+
+    def test_submitter_right_after_a_claim_joins_the_new_job(self):
+        add = cache.add
+        joined = []
+
+        def add_then_interleave(key, *args, **kwargs):
+            added = add(key, *args, **kwargs)
+            if added and not joined:
+                # A second request arrives as soon as the first has claimed the key
+                joined.append(self.submit({"question": "why not b"}))
+            return added
+
+        with patch.object(cache, "add", side_effect=add_then_interleave):
+            first = self.submit({"question": "why not b"})
+
+        self.assertEqual((joined[0].job_id, joined[0].created), (first.job_id, False))
+        self.assertEqual(self.enqueued, [first.job_id])
+
+    def test_key_expiring_between_add_and_get_is_claimed_again(self):
+        get = cache.get
+        key = ai_jobs.job_key("ask_gpt", self.mcq, {"question": "why"})
+        cache.set(key, "expiring-job")
+        expired = []
+
+        def get_after_expiry(name, *args, **kwargs):
+            if name == key and not expired:
+                expired.append(name)
+                cache.delete(key)
+                return None
+            return get(name, *args, **kwargs)
+
+        with patch.object(cache, "get", side_effect=get_after_expiry):
+            job = self.submit({"question": "why"})
+
+        self.assertTrue(job.created)
+        self.assertEqual(cache.get(key), job.job_id)
+        self.assertFalse(any(":after:" in name for name in cache._cache))
+
+    def test_enqueue_failure_releases_the_key(self):
+        def broken(job_id):
+            raise ConnectionError("broker down")
+
+        with self.assertRaises(ConnectionError):
+            ai_jobs.submit("ask_gpt", broken, mcq=self.mcq, params={"question": "why"})
+        self.assertTrue(self.submit({"question": "why"}).created)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AskGptAsyncDedupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.mcq = MCQ.objects.create(
+            question_number="Q2",
+            question_text="Which nerve is affected?",
+            options={"A": "Facial", "B": "Trigeminal"},
+            correct_answer="A",
+            subspecialty="Neuro-ophthalmology",
+        )
+        self.client.force_login(User.objects.create_user("learner", password="pw"))
+
+    def test_double_submit_enqueues_once_and_learners_can_poll(self):
+        url = f"/mcq/{self.mcq.id}/ask_gpt_async/"
+        with patch("mcq.tasks.run_ai_job.delay") as delay:
+            first = self.client.post(url, {"question": "Why not B?"}).json()
+            second = self.client.post(url, {"question": "why not b"}).json()
+        self.assertEqual(delay.call_count, 1)
+        self.assertEqual(second["job_id"], first["job_id"])
+        self.assertTrue(second["deduplicated"])
+
+        status = self.client.get(f"/mcq/ai/jobs/{first['job_id']}/")
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual(status.json(), {"job_id": first["job_id"], "status": "pending"})
@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from mcq.models import MCQ
+from mcq.services import ai_pal_cache
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+LETTERS = ("A", "B", "C", "D")
+
+
+class QuestionSignatureTests(SimpleTestCase):
+    def test_rephrasings_match_and_option_letters_must_agree(self):
+        why_not_b = ai_pal_cache.question_signature("Why not B?", LETTERS)
+        self.assertEqual(why_not_b.letters, frozenset({"B"}))
+        self.assertEqual(why_not_b.similarity(ai_pal_cache.question_signature("why not option b", LETTERS)), 1.0)
+        self.assertEqual(why_not_b.similarity(ai_pal_cache.question_signature("Why not C?", LETTERS)), 0.0)
+
+        mechanism = ai_pal_cache.question_signature("What is the mechanism?", LETTERS)
+        self.assertEqual(mechanism.letters, frozenset())
+        self.assertEqual(mechanism.similarity(ai_pal_cache.question_signature("what's the mechanism", LETTERS)), 1.0)
+        self.assertEqual(
+            mechanism.similarity(ai_pal_cache.question_signature("Can you explain the mechanisms?", LETTERS)),
+            0.5,
+        )
+        self.assertEqual(
+            ai_pal_cache.question_signature("Explain the mechanism of action", LETTERS).similarity(
+                ai_pal_cache.question_signature("mechanism of action please", LETTERS)
+            ),
+            1.0,
+        )
+
+    def test_article_a_is_not_an_option_reference(self):
+        self.assertEqual(ai_pal_cache.question_signature("is this a stroke?", LETTERS).letters, frozenset())
+
+    def test_error_answers_are_not_cacheable(self):
+        self.assertTrue(ai_pal_cache.is_cacheable("<p>Because B describes a lower motor neuron lesion.</p>"))
+        self.assertFalse(ai_pal_cache.is_cacheable('<div class="alert alert-danger">Error answering question</div>'))
+        self.assertFalse(ai_pal_cache.is_cacheable("   "))
+
+
+@override_settings(CACHES=LOCMEM_CACHE, AI_PAL_CACHE_ENABLED=True, AI_PAL_CACHE_SIMILARITY=0.75)
+class AIPalCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for name, value in (("api_key", "test-key"), ("client", object())):
+            patcher = patch(f"mcq.openai_integration.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.mcq = MCQ.objects.create(
+            question_number="Q1",
+            question_text="A patient has sudden left arm weakness.",
+            options={"A": "Stroke", "B": "Bell palsy", "C": "Migraine"},
+            correct_answer="A",
+            subspecialty="Vascular Neurology",
+        )
+
+    @patch("mcq.openai_integration.answer_question_about_mcq")
+    def test_equivalent_questions_cost_one_model_call(self, answer):
+        answer.return_value = "<p>Bell palsy spares the arm.</p>"
+        first = ai_pal_cache.answer_question(self.mcq, "Why not B?")
+        second = ai_pal_cache.answer_question(self.mcq, "why NOT option b??")
+        other = ai_pal_cache.answer_question(self.mcq, "Why not C?")
+
+        self.assertFalse(first.cached)
+        self.assertTrue(second.cached)
+        self.assertEqual(second.answer, first.answer)
+        self.assertEqual(second.as_result(), {"answer": first.answer, "cached": True})
+        self.assertFalse(other.cached)
+        self.assertEqual(answer.call_count, 2)
+
+    @patch("mcq.openai_integration.answer_question_about_mcq")
+    def test_regenerate_replaces_and_edit_invalidates(self, answer):
+        answer.return_value = "<p>First answer.</p>"
+        ai_pal_cache.answer_question(self.mcq, "Why not B?")
+        answer.return_value = "<p>Second answer.</p>"
+        regenerated = ai_pal_cache.answer_question(self.mcq, "Why not B?", regenerate=True)
+        self.assertFalse(regenerated.cached)
+        self.assertEqual(ai_pal_cache.lookup(self.mcq, "Why not B?").answer, "<p>Second answer.</p>")
+        self.assertEqual(len(cache.get(ai_pal_cache.cache_key(self.mcq))), 1)
+
+        self.mcq.question_text = "A patient has sudden right arm weakness."
+        self.mcq.save()
+        self.assertIsNone(ai_pal_cache.lookup(self.mcq, "Why not B?"))
+
+    @patch("mcq.openai_integration.answer_question_about_mcq")
+    def test_failed_answers_are_not_stored(self, answer):
+        answer.return_value = '<div class="alert alert-danger">Error answering question</div>'
+        ai_pal_cache.answer_question(self.mcq, "Why not B?")
+        self.assertIsNone(ai_pal_cache.lookup(self.mcq, "Why not B?"))
+
+    def test_async_view_returns_cached_answer_without_queueing(self):
+        ai_pal_cache.store(self.mcq, "What is the mechanism of action?", "<p>Cached.</p>")
+        user = User.objects.create_user("learner", password="pw")
+        self.client.force_login(user)
+        with patch("mcq.tasks.run_ai_job.delay") as delay:
+            response = self.client.post(f"/mcq/{self.mcq.id}/ask_gpt_async/", {"question": "What's the mechanism of action??"})
+        data = response.json()
+        self.assertEqual(data["status"], "ready")
+        self.assertEqual(data["result"]["answer"], "<p>Cached.</p>")
+        self.assertTrue(data["result"]["cached"])
+        self.assertNotIn("What is the mechanism of action?", response.content.decode())
+        delay.assert_not_called()
+        self.assertEqual(cache.get(f"ai_job:{data['job_id']}")["status"], "ready")
+
+        with patch("mcq.tasks.run_ai_job.delay") as delay:
+            response = self.client.post(
+                f"/mcq/{self.mcq.id}/ask_gpt_async/", {"question": "What's the mechanism of action??", "regenerate": "1"}
+            )
+        self.assertEqual(response.json()["status"], "queued")
+        self.assertTrue(delay.call_args.args[2]["regenerate"])
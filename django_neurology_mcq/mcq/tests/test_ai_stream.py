@@ -0,0 +1,160 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from mcq import openai_integration
+from mcq.models import MCQ
+from mcq.services import ai_pal_cache
+from mcq.services.ai_stream import JsonStringField, stream_events
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def _chunk(text=None, usage=None):
+    choices = [] if text is None else [SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=None)]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeChatClient:
+    def __init__(self, fragments):
+        self.fragments = fragments
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        if not kwargs.get("stream"):
+            message = SimpleNamespace(content="".join(self.fragments), refusal=None)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+        usage = SimpleNamespace(prompt_tokens=12, completion_tokens=len(self.fragments))
+        return iter([_chunk(fragment) for fragment in self.fragments] + [_chunk(usage=usage)])
+
+
+class RecordingSink:
+    def __init__(self):
+        self.events = []
+
+    def begin(self):
+        self.events.append(("begin", None))
+
+    def delta(self, text):
+        self.events.append(("delta", text))
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class JsonStringFieldTests(SimpleTestCase):
+    def test_decodes_field_across_fragment_boundaries(self):
+        decoder = JsonStringField("explanation")
+        raw = '{"explanation": "### Why\\nBell\\u2019s palsy \\"spares\\" the arm."}'
+        decoded = "".join(decoder.feed(raw[i:i + 3]) for i in range(0, len(raw), 3))
+        self.assertEqual(decoded, '### Why\nBell’s palsy "spares" the arm.')
+
+
+class CompletionStreamingTests(SimpleTestCase):
+    def test_chat_completion_forwards_deltas_and_returns_assembled_response(self):
+        api_client = FakeChatClient(["Bell ", "palsy ", "spares the arm."])
+        sink = RecordingSink()
+        with openai_integration.streaming_to(sink):
+            response = openai_integration.chat_completion(api_client, "gpt-5-mini", [{"role": "user", "content": "q"}])
+
+        self.assertEqual(openai_integration.get_first_choice_text(response), "Bell palsy spares the arm.")
+        self.assertEqual(response.usage.prompt_tokens, 12)
+        self.assertEqual(sink.events[0], ("begin", None))
+        self.assertEqual([text for kind, text in sink.events if kind == "delta"], api_client.fragments)
+        self.assertTrue(api_client.calls[0]["stream"])
+
+        # Without a sink the call is unchanged
+        response = openai_integration.chat_completion(api_client, "gpt-5-mini", [{"role": "user", "content": "q"}])
+        self.assertNotIn("stream", api_client.calls[1])
+
+    def test_responses_api_stream_returns_completed_response(self):
+        completed = SimpleNamespace(output_text="Alteplase within 4.5 hours.", usage=None)
+        events = [
+            SimpleNamespace(type="response.created"),
+            SimpleNamespace(type="response.output_text.delta", delta="Alteplase "),
+            SimpleNamespace(type="response.output_text.delta", delta="within 4.5 hours."),
+            SimpleNamespace(type="response.completed", response=completed),
+        ]
+        fake = SimpleNamespace(responses=SimpleNamespace(create=lambda **kwargs: iter(events)))
+        sink = RecordingSink()
+        with patch.object(openai_integration, "client", fake), openai_integration.streaming_to(sink):
+            response = openai_integration._responses_create("gpt-5-mini", [{"role": "user", "content": "q"}])
+        self.assertIs(response, completed)
+        self.assertEqual([text for kind, text in sink.events if kind == "delta"], ["Alteplase ", "within 4.5 hours."])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class StreamEventsTests(SimpleTestCase):
+    def test_events_end_with_persisted_result(self):
+        api_client = FakeChatClient(['{"explanation": "Short', ' answer."}'])
+
+        def generate():
+            response = openai_integration.chat_completion(api_client, "gpt-5-mini", [])
+            return json.loads(openai_integration.get_first_choice_text(response))["explanation"]
+
+        body = "".join(stream_events(generate, on_complete=lambda text: {"text": text.upper()}, json_field="explanation"))
+        events = parse_events(body)
+        self.assertEqual([event for event, _ in events], ["start", "reset", "delta", "delta", "done"])
+        self.assertEqual("".join(data["text"] for event, data in events if event == "delta"), "Short answer.")
+        self.assertEqual(events[-1][1], {"text": "SHORT ANSWER."})
+        job = cache.get(f"ai_job:{events[0][1]['job_id']}")
+        self.assertEqual(job, {"status": "ready", "result": {"text": "SHORT ANSWER."}})
+
+    def test_failures_become_error_events(self):
+        def explode():
+            raise ValueError("model unavailable")
+
+        events = parse_events("".join(stream_events(explode)))
+        self.assertEqual(events[-1], ("error", {"error": "model unavailable"}))
+        self.assertEqual(cache.get(f"ai_job:{events[0][1]['job_id']}")["status"], "failed")
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AskGptStreamViewTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.mcq = MCQ.objects.create(
+            question_number="Q1",
+            question_text="A patient has sudden left arm weakness.",
+            options={"A": "Stroke", "B": "Bell palsy"},
+            correct_answer="A",
+            subspecialty="Vascular Neurology",
+        )
+        self.client.force_login(User.objects.create_user("learner", password="pw"))
+        for name, value in (("api_key", "test-key"), ("client", object())):
+            patcher = patch.object(openai_integration, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_answer_streams_then_is_served_from_the_cache(self):
+        api_client = FakeChatClient(["Bell palsy ", "spares the arm."])
+
+        def answer(mcq, question):
+            response = openai_integration.chat_completion(api_client, "gpt-5-mini", [])
+            return f"<p>{openai_integration.get_first_choice_text(response)}</p>"
+
+        url = f"/mcq/{self.mcq.id}/ask_gpt/stream/"
+        with patch.object(openai_integration, "answer_question_about_mcq", side_effect=answer):
+            response = self.client.post(url, {"question": "Why not B?"})
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            events = parse_events(b"".join(response.streaming_content).decode())
+        self.assertEqual([data["text"] for event, data in events if event == "delta"], api_client.fragments)
+        self.assertEqual(events[-1], ("done", {"answer": "<p>Bell palsy spares the arm.</p>", "cached": False}))
+
+        response = self.client.post(url, {"question": "why not option b"})
+        events = parse_events(b"".join(response.streaming_content).decode())
+        self.assertEqual([event for event, _ in events], ["start", "done"])
+        self.assertTrue(events[-1][1]["cached"])
+        self.assertIsNotNone(ai_pal_cache.lookup(self.mcq, "Why not B?"))
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.utils.module_loading import import_string
+
+from mcq import openai_integration
+from mcq.models import MCQ
+from mcq.services import ai_pal_cache
+from mcq.services.ai_stream import sse_response
+from mcq.services.async_io import run_blocking
+from mcq.services.transcription_service import transcription_service
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class AsyncServingTests(SimpleTestCase):
+    def test_middleware_chain_stays_async(self):
+        # One sync-only middleware would put every ASGI request on a blocking thread
+        for path in settings.MIDDLEWARE:
+            self.assertTrue(getattr(import_string(path), "async_capable", False), path)
+
+    async def test_run_blocking_runs_off_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        self.assertNotEqual(await run_blocking(threading.get_ident), loop_thread)
+
+    async def test_event_stream_is_not_buffered_under_asgi(self):
+        first_sent = threading.Event()
+        pulled_on = []
+
+        def events():
+            pulled_on.append(threading.current_thread().name)
+            yield "event: start\n\n"
+            # Buffering the iterator would wait here forever
+            first_sent.wait(timeout=5)
+            yield "event: done\n\n"
+
+        parts = sse_response(events()).__aiter__()
+        self.assertEqual(await parts.__anext__(), b"event: start\n\n")
+        self.assertFalse(first_sent.is_set())
+        first_sent.set()
+        self.assertEqual(await parts.__anext__(), b"event: done\n\n")
+        # Pulls run on the bounded I/O pool, not the loop's default executor
+        self.assertTrue(pulled_on[0].startswith("async-io"), pulled_on)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AsyncViewTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.mcq = MCQ.objects.create(
+            question_number="Q1",
+            question_text="A patient has sudden left arm weakness.",
+            options={"A": "Stroke", "B": "Bell palsy"},
+            correct_answer="A",
+            subspecialty="Vascular Neurology",
+        )
+        self.user = User.objects.create_user("learner", password="pw")
+        self.other = User.objects.create_user("other", password="pw")
+
+    async def test_ask_gpt_answers_through_the_async_view(self):
+        await self.async_client.aforce_login(self.user)
+        answer = SimpleNamespace(as_result=lambda: {"answer": "<p>Bell palsy spares the arm.</p>", "cached": False})
+        with patch.object(openai_integration, "api_key", "test-key"), \
+                patch.object(openai_integration, "client", object()), \
+                patch.object(ai_pal_cache, "answer_question", return_value=answer) as answer_question:
+            response = await self.async_client.post(f"/mcq/{self.mcq.id}/ask_gpt/", {"question": "Why not B?"})
+        self.assertEqual(response.json()["answer"], "<p>Bell palsy spares the arm.</p>")
+        self.assertEqual(answer_question.call_args.args[0].pk, self.mcq.pk)
+
+    async def test_job_polls_only_show_the_owners_jobs(self):
+        await cache.aset("ai_job:3f0c1a52-8f51-4a7e-9d7d-2c5b8e1f0a11", {"status": "ready", "result": {"answer": "x"}})
+        await cache.aset(
+            transcription_service.job_cache_key("9a1b7c3e-0d2f-4e5a-8b6c-7d8e9f0a1b2c"),
+            {"status": "ready", "job_id": "9a1b7c3e-0d2f-4e5a-8b6c-7d8e9f0a1b2c", "user_id": self.user.id},
+        )
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get("/mcq/ai/jobs/3f0c1a52-8f51-4a7e-9d7d-2c5b8e1f0a11/")
+        self.assertEqual(response.json()["status"], "ready")
+        response = await self.async_client.get("/api/transcribe-audio/jobs/9a1b7c3e-0d2f-4e5a-8b6c-7d8e9f0a1b2c/")
+        self.assertEqual(response.json(), {"status": "ready", "job_id": "9a1b7c3e-0d2f-4e5a-8b6c-7d8e9f0a1b2c"})
+
+        await self.async_client.aforce_login(self.other)
+        response = await self.async_client.get("/api/transcribe-audio/jobs/9a1b7c3e-0d2f-4e5a-8b6c-7d8e9f0a1b2c/")
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from mcq.benchmarks.runner import compare, percentile
+from mcq.benchmarks.scenarios import SCENARIOS
+from mcq.benchmarks.synthetic import synthetic_mcqs
+from mcq.models import MCQ
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class RunnerHelperTests(SimpleTestCase):
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([10, 20, 30, 40], 0.5), 25)
+        self.assertEqual(percentile([5], 0.95), 5)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_compare_reports_change(self):
+        baseline = {"scenarios": {"search": {"latency_ms": {"p50": 100, "p95": 200}, "queries": {"mean": 10}}}}
+        current = {"scenarios": {"search": {"latency_ms": {"p50": 50, "p95": 220}, "queries": {"mean": 10}},
+                                 "new": {"latency_ms": {"p50": 1}}}}
+        changes = compare(baseline, current)
+        self.assertEqual(changes["search"]["latency_ms.p50"]["change_pct"], -50.0)
+        self.assertEqual(changes["search"]["queries.mean"]["change_pct"], 0.0)
+        self.assertNotIn("new", changes)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_all_scenarios_run_and_synthetic_data_is_purged(self):
+        real = MCQ.objects.create(question_number="Q1", question_text="Real", options={"A": "x"}, correct_answer="A")
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            call_command(
+                "benchmark", "--force", "--mcqs", "80", "--users", "2", "--iterations", "2", "--warmup", "0",
+                "--output", output, stderr=StringIO(),
+            )
+            with open(output) as handle:
+                report = json.load(handle)
+
+        self.assertEqual(set(report["scenarios"]), set(SCENARIOS))
+        for name, stats in report["scenarios"].items():
+            self.assertEqual(stats["errors"], 0, f"{name}: {stats['error_samples']}")
+            self.assertEqual(stats["iterations"], 2)
+            self.assertIsNotNone(stats["latency_ms"]["p95"])
+        self.assertGreater(report["scenarios"]["view_mcq"]["queries"]["mean"], 0)
+        self.assertGreater(report["scenarios"]["case_conversion"]["llm_calls_per_iteration"], 0)
+        self.assertEqual(report["meta"]["bank"]["mcqs"], 80)
+
+        self.assertFalse(synthetic_mcqs().exists())
+        self.assertTrue(MCQ.objects.filter(pk=real.pk).exists())
+
+    def test_refuses_without_force_when_debug_is_off(self):
+        from django.core.management.base import CommandError
+
+        with self.assertRaises(CommandError):
+            call_command("benchmark", "--mcqs", "1")
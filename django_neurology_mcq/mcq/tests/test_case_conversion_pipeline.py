@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from mcq.case_conversion_tracker import conversion_tracker
+from mcq.case_session_validator import CaseSessionValidator
+from mcq.end_to_end_integrity import e2e_integrity
+from mcq.mcq_case_converter import CaseValidator, MCQCaseConverter, ValidationStatus
+from mcq.models import MCQ, MCQCaseConversionSession
+from mcq.tasks import process_mcq_to_case_conversion
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+SEMANTIC_PASS = {"score": 90, "issues": [], "method": "ai_validation"}
+
+
+def _case_json(mcq_id, history="A 60-year-old man developed sudden weakness of the arm over one hour today."):
+    return json.dumps({
+        "source_mcq_id": mcq_id,
+        "clinical_presentation": {
+            "chief_complaint": "Sudden arm weakness",
+            "history_present_illness": history,
+            "physical_examination": "Power 3/5 in the arm",
+        },
+        "question_prompt": "What is the most likely diagnosis?",
+        "core_concept_type": "Stroke syndromes",
+        "learning_objectives": ["Localise the lesion"],
+    })
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConversionPipelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.mcq = MCQ.objects.create(
+            question_number="Q1",
+            question_text="A 60-year-old man has sudden weakness of the arm. What is the diagnosis?",
+            options={"A": "Stroke", "B": "Migraine"},
+            correct_answer="A",
+            subspecialty="Vascular Neurology",
+        )
+        with patch("mcq.mcq_case_converter.openai_client", object()):
+            self.converter = MCQCaseConverter()
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _respond(self, responses):
+        def call(prompt):
+            with self.lock:
+                index = len(self.calls)
+                self.calls.append(prompt)
+            delay, outcome = responses[index]
+            time.sleep(delay)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return call
+
+    def test_candidates_run_concurrently_and_first_valid_wins(self):
+        responses = [(0.3, RuntimeError("timeout")), (0.3, _case_json(self.mcq.id))]
+        with patch.object(self.converter.generator, "_call_openai_api", side_effect=self._respond(responses)), \
+                patch.object(CaseValidator, "_validate_semantics", return_value=SEMANTIC_PASS):
+            started = time.perf_counter()
+            result = self.converter.convert_mcq_to_case(self.mcq)
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.calls[0], self.calls[1])
+        self.assertLess(elapsed, 0.55)
+        self.assertEqual(result["source_mcq_id"], self.mcq.id)
+        self.assertEqual(result["professional_validation"]["semantic_method"], "ai_validation")
+        stages = {entry["stage"] for entry in result["_stage_timings"]}
+        self.assertTrue({"analysis", "prompt", "validation_prep", "generation_1", "generation_2"} <= stages)
+        # Timings are per run and not cached with the case
+        self.assertNotIn("_stage_timings", self.converter.convert_mcq_to_case(self.mcq))
+
+    def test_failed_round_starts_another(self):
+        bad = _case_json(self.mcq.id, history="")
+        responses = [(0, bad), (0, bad), (0, _case_json(self.mcq.id)), (0.3, _case_json(self.mcq.id))]
+        with patch.object(self.converter.generator, "_call_openai_api", side_effect=self._respond(responses)), \
+                patch.object(CaseValidator, "_validate_semantics", return_value=SEMANTIC_PASS) as semantics:
+            result = self.converter.convert_mcq_to_case(self.mcq)
+
+        # Second round of two candidates; the slower one is abandoned
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual(result["source_mcq_id"], self.mcq.id)
+        # Candidates with missing fields never reach the semantic (API) check
+        self.assertEqual(semantics.call_count, 1)
+
+    def test_all_attempts_failing_raises(self):
+        with patch("mcq.mcq_case_converter.MAX_RETRY_ATTEMPTS", 2), \
+                patch.object(self.converter.generator, "_call_openai_api", side_effect=RuntimeError("down")):
+            with self.assertRaisesMessage(Exception, "All conversion attempts failed"):
+                self.converter.convert_mcq_to_case(self.mcq)
+
+    def test_task_keeps_stage_timings_out_of_the_stored_case(self):
+        user = User.objects.create_user("learner", password="pw")
+        case = {
+            "source_mcq_id": self.mcq.id,
+            "clinical_presentation": "A 60-year-old man with sudden arm weakness.",
+            "_stage_timings": [{"stage": "analysis", "start_ms": 0, "duration_ms": 5}],
+        }
+        with patch("mcq.mcq_case_converter.convert_mcq_to_case", return_value=case), \
+                patch.object(e2e_integrity, "validate_generated_case", return_value={"valid": True, "reason": "ok"}), \
+                patch.object(conversion_tracker, "log_stage_timings") as log_stage_timings:
+            process_mcq_to_case_conversion.apply(args=(self.mcq.id, user.id, "tracking-1"))
+
+        session = MCQCaseConversionSession.objects.get(mcq=self.mcq, user=user)
+        self.assertEqual(session.status, MCQCaseConversionSession.READY)
+        self.assertNotIn("_stage_timings", session.case_data)
+        stages = [entry["stage"] for entry in log_stage_timings.call_args.args[1]]
+        self.assertIn("convert.analysis", stages)
+
+
+class SessionValidatorReuseTests(TestCase):
+    def setUp(self):
+        self.mcq = MCQ.objects.create(
+            question_number="Q2", question_text="Stem", options={"A": "One"}, correct_answer="A"
+        )
+        self.case = {
+            "source_mcq_id": self.mcq.id,
+            "patient_demographics": "60-year-old man",
+            "clinical_presentation": "x" * 200,
+            "professional_validation": {"passed": True, "semantic_method": "ai_validation", "semantic_score": 90},
+        }
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    def test_generation_validation_is_reused(self):
+        validator = CaseSessionValidator()
+        with patch.object(validator, "_api_validate_case_session") as api:
+            result = validator.validate_case_session(self.mcq, self.case)
+        api.assert_not_called()
+        self.assertEqual((result["valid"], result["validation_method"]), (True, "generation_reuse"))
+
+        # Integrity checks still apply
+        result = validator.validate_case_session(self.mcq, dict(self.case, source_mcq_id=self.mcq.id + 1))
+        self.assertFalse(result["valid"])
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    def test_fallback_semantic_check_is_not_reused(self):
+        validator = CaseSessionValidator()
+        case = dict(self.case, professional_validation={"passed": True, "semantic_method": "fallback", "semantic_score": 75})
+        with patch.object(validator, "_api_validate_case_session", return_value={"valid": True, "reason": "ok"}) as api:
+            validator.validate_case_session(self.mcq, case)
+        api.assert_called_once()
+
+    def test_structural_failure_skips_semantic_check(self):
+        validator = CaseValidator()
+        case = self._parsed(history="")
+        with patch.object(validator, "_validate_semantics") as semantics:
+            result = validator.validate_case(self.mcq, case)
+        semantics.assert_not_called()
+        self.assertEqual(result.status, ValidationStatus.FAILED)
+
+    def _parsed(self, history):
+        with patch("mcq.mcq_case_converter.openai_client", object()):
+            converter = MCQCaseConverter()
+        analysis = converter.analyzer.analyze_mcq(self.mcq)
+        return converter.generator._parse_api_response(self.mcq, _case_json(self.mcq.id, history), analysis)
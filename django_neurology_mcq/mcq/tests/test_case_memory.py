@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from mcq.services.case_learning_service import CaseConversationService
+from mcq.services.case_memory import (
+    SUMMARY_HEADER,
+    ConversationMemory,
+    conversation_tokens,
+    merge_summary,
+)
+
+
+def _turns(count, words=40):
+    messages = []
+    for index in range(count):
+        messages.append({"role": "user", "content": f"Question {index}: " + "detail " * 5})
+        messages.append({"role": "assistant", "content": f"Answer {index}. " + "finding " * words})
+    return messages
+
+
+class ConversationMemoryTests(SimpleTestCase):
+    def setUp(self):
+        self.memory = ConversationMemory(token_budget=1500, summary_token_limit=300, max_history_messages=8)
+
+    def test_short_history_is_replayed_verbatim(self):
+        history = _turns(2)
+        window = self.memory.build(system_prompt="SYSTEM", summary="", history=history, user_message="next")
+        self.assertEqual(window.folded, 0)
+        self.assertEqual(window.messages[1:-1], history)
+        self.assertEqual(window.messages[-1], {"role": "user", "content": "next"})
+
+    def test_long_history_folds_into_summary_and_fits_budget(self):
+        history = _turns(12)
+        window = self.memory.build(system_prompt="SYSTEM", summary="", history=history, user_message="next")
+        self.assertGreater(window.folded, 0)
+        self.assertEqual(history[window.folded]["role"], "user")
+        self.assertTrue(window.messages[1]["content"].startswith(SUMMARY_HEADER))
+        self.assertIn("Learner: Question 0", window.summary)
+        self.assertLessEqual(window.prompt_tokens, self.memory.token_budget)
+
+    def test_prefix_is_stable_between_folds(self):
+        history = _turns(12)
+        first = self.memory.build(system_prompt="SYSTEM", summary="", history=history, user_message="a")
+        tail = history[first.folded:] + [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}]
+        second = self.memory.build(system_prompt="SYSTEM", summary=first.summary, history=tail, user_message="c")
+        self.assertEqual(second.folded, 0)
+        self.assertEqual(second.messages[: len(first.messages) - 1], first.messages[:-1])
+
+    def test_merge_summary_keeps_case_presentation(self):
+        lines = ["- Learner: start", "- Attending: 45-year-old with sudden diplopia."]
+        lines += [f"- Learner: question {i} " + "x" * 80 for i in range(20)]
+        summary = merge_summary("", lines, token_limit=120)
+        self.assertTrue(summary.startswith("\n".join(lines[:2])))
+        self.assertIn("question 19", summary)
+        self.assertNotIn("question 0 ", summary)
+
+
+class CaseConversationBudgetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="resident", password="pass1234")
+        self.service = CaseConversationService(
+            memory=ConversationMemory(token_budget=2000, summary_token_limit=400, max_history_messages=8)
+        )
+        self.session = self.service.repository.create_session(
+            user_id=self.user.id,
+            session_id="case-1",
+            specialty="Stroke",
+            difficulty="moderate",
+            case_data={"system_prompt": "You are an attending."},
+            messages=_turns(1),
+        )
+        self.prompts = []
+
+    def _reply(self, api_client, model, messages, **kwargs):
+        self.prompts.append((messages, kwargs))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Reply. " + "finding " * 60))]
+        )
+
+    def test_prompt_size_stays_bounded_over_long_case(self):
+        with patch("mcq.services.case_learning_service.client", object()), patch(
+            "mcq.services.case_learning_service.chat_completion", side_effect=self._reply
+        ):
+            for turn in range(30):
+                self.service.process_user_message(user=self.user, session_id="case-1", message=f"Ask {turn}")
+
+        sizes = [conversation_tokens(messages) for messages, _ in self.prompts]
+        self.assertLessEqual(max(sizes), 2000)
+        self.assertLess(max(sizes[10:]), max(sizes[:10]) * 1.5)
+
+        messages, kwargs = self.prompts[-1]
+        self.assertEqual(messages[0]["content"], "You are an attending.")
+        self.assertEqual(kwargs["extra_body"], {"prompt_cache_key": "case-case-1"})
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.message_count, 62)
+        self.assertGreater(self.session.summarized_message_count, 0)
+        self.assertIn("Learner: Ask 0", self.session.conversation_summary)
+
+    def test_stage_command_keeps_system_prompt_unchanged(self):
+        with patch("mcq.services.case_learning_service.client", object()), patch(
+            "mcq.services.case_learning_service.chat_completion", side_effect=self._reply
+        ):
+            self.service.process_user_message(user=self.user, session_id="case-1", message="Proceed to investigations")
+
+        messages, _ = self.prompts[0]
+        self.assertEqual(messages[0]["content"], "You are an attending.")
+        self.assertEqual(messages[1:3], _turns(1))
+        self.assertEqual(messages[-1]["role"], "system")
+        self.assertIn("investigations", messages[-1]["content"].lower())
@@ -0,0 +1,104 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from mcq.models import CaseMessage, PersistentCaseLearningSession
+from mcq.services.case_learning_service import CaseConversationService, CaseSessionRepository
+
+
+class CaseMessageStorageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="resident", password="pass1234")
+        self.repository = CaseSessionRepository()
+        self.session = self.repository.create_session(
+            user_id=self.user.id,
+            session_id="case-1",
+            specialty="Stroke",
+            difficulty="moderate",
+            case_data={"system_prompt": "You are an attending.", "phase": "CONVERSATION"},
+            messages=[
+                {"role": "user", "content": "Start the case."},
+                {"role": "assistant", "content": "A 60-year-old with sudden aphasia."},
+            ],
+        )
+
+    def _turn(self, index):
+        return [
+            {"role": "user", "content": f"Question {index}"},
+            {"role": "assistant", "content": f"Answer {index}"},
+        ]
+
+    def test_turn_is_one_insert_and_never_rewrites_history(self):
+        for index in range(20):
+            self.repository.save_conversation(self.session, new_messages=self._turn(index))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.repository.save_conversation(self.session, new_messages=self._turn(20))
+        statements = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(sum(sql.startswith('INSERT INTO "mcq_casemessage"') for sql in statements), 1)
+        self.assertFalse(any(sql.startswith(('UPDATE "mcq_casemessage"', 'DELETE')) for sql in statements))
+        update = next(sql for sql in statements if sql.startswith('UPDATE "mcq_persistentcaselearningsession"'))
+        self.assertNotIn('"case_data"', update)
+
+        self.assertEqual(self.session.message_count, 44)
+        self.assertEqual(
+            list(CaseMessage.objects.filter(session=self.session).values_list("seq", flat=True)),
+            list(range(44)),
+        )
+
+    def test_overlapping_saves_append_after_each_other(self):
+        # Two requests loaded the session before either saved
+        first = PersistentCaseLearningSession.objects.get(pk=self.session.pk)
+        second = PersistentCaseLearningSession.objects.get(pk=self.session.pk)
+        self.repository.save_conversation(first, new_messages=self._turn(0))
+        self.repository.save_conversation(second, new_messages=self._turn(1))
+
+        self.assertEqual(second.message_count, 6)
+        self.assertEqual(
+            list(CaseMessage.objects.filter(session=self.session).values_list("seq", "content")),
+            [
+                (0, "Start the case."), (1, "A 60-year-old with sudden aphasia."),
+                (2, "Question 0"), (3, "Answer 0"), (4, "Question 1"), (5, "Answer 1"),
+            ],
+        )
+
+    def test_recent_messages_reads_only_the_tail(self):
+        for index in range(10):
+            self.repository.save_conversation(self.session, new_messages=self._turn(index))
+        recent = self.repository.recent_messages(self.session, limit=3)
+        self.assertEqual([m["content"] for m in recent], ["Answer 8", "Question 9", "Answer 9"])
+        self.assertEqual(len(self.repository.recent_messages(self.session, limit=50, since_seq=18)), 4)
+
+    def test_replace_conversation_starts_over(self):
+        self.repository.save_conversation(self.session, new_messages=self._turn(0))
+        self.repository.replace_conversation(
+            self.session,
+            messages=[{"role": "assistant", "content": "New case."}],
+            case_data={"system_prompt": "Fresh"},
+        )
+        self.assertEqual(self.session.message_count, 1)
+        self.assertEqual(self.repository.recent_messages(self.session, limit=10), [
+            {"role": "assistant", "content": "New case."}
+        ])
+
+    def test_list_and_resume_endpoints(self):
+        client = Client()
+        assert client.login(username="resident", password="pass1234")
+        self.repository.save_conversation(self.session, new_messages=self._turn(0))
+
+        response = client.get(reverse("list_case_sessions"))
+        self.assertEqual(response.json()["sessions"][0]["state_label"], "CONVERSATION")
+
+        with patch("mcq.views.case_conversation_service", CaseConversationService()):
+            response = client.post(
+                reverse("resume_case_session"),
+                data={"session_id": "case-1"},
+                content_type="application/json",
+            )
+        payload = response.json()
+        self.assertEqual(payload["message"], "Answer 0")
+        self.assertEqual(payload["recent_messages"][-1], {"role": "assistant", "content": "Answer 0"})
@@ -0,0 +1,88 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from mcq import db_router
+from mcq.middleware.replica import STICKY_COOKIE, ReplicaReadMiddleware
+from mcq.models import MCQ
+
+
+@db_router.allows_replica_reads
+def listing_view(request):
+    return HttpResponse()
+
+
+def editing_view(request):
+    return HttpResponse()
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db_router.PrimaryReplicaRouter()
+        patcher = patch.object(db_router, "replica_configured", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_use_primary_outside_marked_scopes(self):
+        self.assertEqual(self.router.db_for_read(MCQ), "default")
+        with db_router.request_scope():
+            self.assertEqual(self.router.db_for_read(MCQ), "default")
+
+    def test_replica_reads_until_the_first_write(self):
+        with db_router.replica_reads():
+            self.assertEqual(self.router.db_for_read(MCQ), "replica")
+            # Sessions and users never come from the replica
+            self.assertEqual(self.router.db_for_read(User), "default")
+            self.assertEqual(self.router.db_for_write(MCQ), "default")
+            self.assertEqual(self.router.db_for_read(MCQ), "default")
+        self.assertFalse(self.router.allow_migrate("replica", "mcq"))
+
+
+class ReplicaReadMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        patcher = patch.object(db_router, "replica_configured", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, request, view, write=False):
+        seen = {}
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen["db"] = db_router.PrimaryReplicaRouter().db_for_read(MCQ)
+            if write:
+                db_router.PrimaryReplicaRouter().db_for_write(MCQ)
+            return view(request)
+
+        middleware = ReplicaReadMiddleware(get_response)
+        response = middleware(request)
+        return seen["db"], response
+
+    def test_marked_get_reads_from_replica(self):
+        db, response = self._run(self.factory.get("/dashboard/"), listing_view)
+        self.assertEqual(db, "replica")
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        self.assertIsNone(db_router.current_state())
+
+        db, _ = self._run(self.factory.get("/mcq/1/edit/"), editing_view)
+        self.assertEqual(db, "default")
+
+    def test_writes_keep_the_client_on_the_primary(self):
+        _, response = self._run(self.factory.post("/mcq/1/answer/"), editing_view)
+        self.assertEqual(response.cookies[STICKY_COOKIE]["max-age"], 15)
+
+        _, response = self._run(self.factory.get("/dashboard/"), listing_view, write=True)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        request = self.factory.get("/dashboard/")
+        request.COOKIES[STICKY_COOKIE] = str(int(time.time()) + 10)
+        db, _ = self._run(request, listing_view)
+        self.assertEqual(db, "default")
+
+        request.COOKIES[STICKY_COOKIE] = str(int(time.time()) - 1)
+        db, _ = self._run(request, listing_view)
+        self.assertEqual(db, "replica")
@@ -0,0 +1,188 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from mcq.models import MCQ, MCQEmbedding
+from mcq.services.embeddings import (
+    KIND_QUESTION,
+    KIND_SECTION,
+    HashingEmbedder,
+    VectorIndex,
+    build_index,
+    index_manager,
+    refresh_indexes,
+    related_mcqs,
+    retrieve_context,
+    semantic_duplicate_clusters,
+)
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class VectorIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.embedder = HashingEmbedder(dimensions=64)
+
+    def test_hashing_embedder_is_deterministic_and_normalised(self):
+        first = self.embedder.embed(["Absence seizures respond to ethosuximide"])
+        second = HashingEmbedder(dimensions=64).embed(["Absence seizures respond to ethosuximide"])
+        np.testing.assert_array_equal(first, second)
+        self.assertAlmostEqual(float(np.linalg.norm(first[0])), 1.0, places=5)
+
+    def test_search_excludes_and_ranks(self):
+        vectors = self.embedder.embed(["ethosuximide absence seizure", "stroke thrombolysis", "absence seizure"])
+        index = VectorIndex(vectors, np.array([1, 2, 3]), np.array(["", "", ""]))
+        hits = index.search(vectors[2], k=2)
+        self.assertEqual([hit[0] for hit in hits], [3, 1])
+        hits = index.search(vectors[2], k=2, exclude_mcq_ids=[3])
+        self.assertEqual(hits[0][0], 1)
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class EmbeddingIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        override = override_settings(EMBEDDING_INDEX_DIR=directory)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.directory = Path(directory)
+        index_manager.reset()
+        self.addCleanup(index_manager.reset)
+
+        self.absence = self._mcq(
+            "EP-1",
+            "A child has brief staring spells with 3 Hz spike-and-wave discharges. Best treatment?",
+            {"A": "Ethosuximide", "B": "Carbamazepine"},
+            {"pathophysiology": "T-type calcium channels in thalamic neurons drive absence seizures."},
+        )
+        self.absence_reworded = self._mcq(
+            "EP-2",
+            "Staring spells in a child with generalized 3 Hz spike-and-wave on EEG. First-line treatment?",
+            {"A": "Carbamazepine", "B": "Ethosuximide"},
+        )
+        self.stroke = self._mcq(
+            "VS-1",
+            "Acute ischemic stroke within 3 hours of onset; which thrombolytic is indicated?",
+            {"A": "Alteplase", "B": "Heparin"},
+            {"management_principles": "Alteplase within 4.5 hours improves functional outcome after stroke."},
+        )
+        refresh_indexes()
+
+    def _mcq(self, number, text, options, sections=None):
+        return MCQ.objects.create(
+            question_number=number,
+            question_text=text,
+            options=options,
+            correct_answer="A",
+            subspecialty="Epilepsy",
+            explanation_sections=sections,
+        )
+
+    def test_save_embeds_question_and_sections(self):
+        sections = set(MCQEmbedding.objects.filter(mcq=self.absence).values_list("section", flat=True))
+        self.assertEqual(sections, {"", "pathophysiology"})
+
+        # Unchanged text is not re-embedded
+        before = MCQEmbedding.objects.get(mcq=self.absence, section="").updated_at
+        self.absence.exam_year = "2024"
+        self.absence.save()
+        self.assertEqual(MCQEmbedding.objects.get(mcq=self.absence, section="").updated_at, before)
+
+    def test_saves_reach_the_index_with_the_next_build(self):
+        ranked = related_mcqs(self.absence, k=2)
+        self.assertEqual(ranked[0][0], self.absence_reworded.id)
+        served = index_manager.get(KIND_QUESTION)
+
+        new = self._mcq(
+            "EP-3",
+            "Child with staring spells and 3 Hz spike-and-wave discharges: which drug is first-line?",
+            {"A": "Ethosuximide", "B": "Phenytoin"},
+        )
+        # Requests keep the mapped build; the new MCQ is ranked from its stored vector
+        self.assertIs(index_manager.get(KIND_QUESTION), served)
+        self.assertEqual(len(served), 3)
+        self.assertIn(self.absence.id, [mcq_id for mcq_id, _ in related_mcqs(new, k=2)])
+
+        self.assertEqual(refresh_indexes(), {KIND_QUESTION: 4, KIND_SECTION: None})
+        self.assertIn(new.id, index_manager.get(KIND_QUESTION).mcq_ids.tolist())
+
+        new.delete()
+        self.assertEqual(refresh_indexes()[KIND_QUESTION], 3)
+        self.assertEqual(refresh_indexes(), {KIND_QUESTION: None, KIND_SECTION: None})
+
+    def test_builds_switch_the_current_pointer(self):
+        index = index_manager.get(KIND_QUESTION)
+        self.assertIsInstance(index.vectors, np.memmap)
+        self.assertFalse(index.vectors.flags.writeable)
+        directory = next(self.directory.glob("question-*"))
+        first = (directory / "CURRENT").read_text()
+
+        rebuilt = build_index(KIND_QUESTION)
+        self.assertNotEqual(rebuilt.build_id, first)
+        self.assertEqual((directory / "CURRENT").read_text(), rebuilt.build_id)
+        self.assertEqual(index_manager.get(KIND_QUESTION).build_id, rebuilt.build_id)
+        # The previous build stays for processes still mapping it
+        self.assertTrue((directory / first).is_dir())
+
+    def test_retrieve_context_from_other_mcqs(self):
+        items = retrieve_context("Why is alteplase given in ischemic stroke?", k=2, exclude_mcq_ids=[self.absence.id])
+        self.assertEqual(items[0]["mcq_id"], self.stroke.id)
+        self.assertEqual(items[0]["section"], "management_principles")
+        self.assertIn("Alteplase", items[0]["text"])
+
+    def test_semantic_duplicate_clusters(self):
+        clusters = semantic_duplicate_clusters(threshold=0.5)
+        self.assertEqual(
+            [member["id"] for member in clusters[0].members],
+            sorted([self.absence.id, self.absence_reworded.id]),
+        )
+
+    def test_view_mcq_shows_related_questions(self):
+        User.objects.create_user(username="reader", password="pass1234")
+        client = Client()
+        assert client.login(username="reader", password="pass1234")
+        response = client.get(reverse("view_mcq", args=[self.absence.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["related_mcqs"][0].id, self.absence_reworded.id)
+        self.assertContains(response, "Related Questions")
+
+
+class EmptyIndexDirTests(TransactionTestCase):
+    """A fresh dyno has the stored vectors but no index build on its own disk."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        override = override_settings(EMBEDDING_INDEX_DIR=directory)
+        override.enable()
+        self.addCleanup(override.disable)
+        index_manager.reset()
+        self.addCleanup(index_manager.reset)
+        self.absence = MCQ.objects.create(
+            question_number="EP-1",
+            question_text="A child has brief staring spells with 3 Hz spike-and-wave discharges. Best treatment?",
+            options={"A": "Ethosuximide", "B": "Carbamazepine"},
+            correct_answer="A",
+        )
+        self.absence_reworded = MCQ.objects.create(
+            question_number="EP-2",
+            question_text="Staring spells in a child with generalized 3 Hz spike-and-wave on EEG. First-line treatment?",
+            options={"A": "Carbamazepine", "B": "Ethosuximide"},
+            correct_answer="A",
+        )
+
+    def test_web_process_builds_the_index_in_the_background(self):
+        # The request does not wait for the build
+        self.assertEqual(related_mcqs(self.absence), [])
+        index_manager._builds[KIND_QUESTION].join(timeout=30)
+
+        ranked = related_mcqs(self.absence, k=1)
+        self.assertEqual(ranked[0][0], self.absence_reworded.id)
+        self.assertEqual(len(index_manager.get(KIND_QUESTION)), 2)
@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from mcq.exam_utils import canonical_exam_type, parse_exam_year
+from mcq.models import MCQ
+from mcq.views import get_filtered_mcqs
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class ExamUtilsTests(SimpleTestCase):
+    def test_legacy_exam_types_fold_into_canonical_names(self):
+        self.assertEqual(canonical_exam_type("Part I"), "Advanced")
+        self.assertEqual(canonical_exam_type("  part   two "), "Board-level")
+        self.assertEqual(canonical_exam_type("Promotion"), "Basic level")
+        self.assertEqual(canonical_exam_type("ABPN Board"), "Board-level")
+        self.assertEqual(canonical_exam_type("Sample"), "Other")
+        self.assertIsNone(canonical_exam_type(""))
+
+    def test_exam_year_parsing(self):
+        self.assertEqual(parse_exam_year("2022"), 2022)
+        self.assertEqual(parse_exam_year("2021-2022"), 2021)
+        self.assertEqual(parse_exam_year(2019), 2019)
+        self.assertIsNone(parse_exam_year("n/a"))
+        self.assertIsNone(parse_exam_year(None))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ExamFilterTests(TestCase):
+    def _mcq(self, number, exam_type, exam_year, subspecialty="Epilepsy"):
+        return MCQ.objects.create(
+            question_number=number,
+            question_text=f"Question {number}",
+            options={"A": "One", "B": "Two"},
+            correct_answer="A",
+            subspecialty=subspecialty,
+            exam_type=exam_type,
+            exam_year=exam_year,
+        )
+
+    def test_save_stores_typed_metadata(self):
+        mcq = self._mcq("Q1", "Part I", "2022")
+        mcq.refresh_from_db()
+        self.assertEqual((mcq.exam_type, mcq.exam_year), ("Advanced", 2022))
+        self.assertEqual(mcq.exam_type_original, "Part I")
+        # Unmappable names are kept alongside 'Other'
+        mcq = self._mcq("Q2", "Part", 2019)
+        self.assertEqual((mcq.exam_type, mcq.exam_type_original), ("Other", "Part"))
+        mcq.save()
+        self.assertEqual(MCQ.objects.get(pk=mcq.pk).exam_type_original, "Part")
+
+    def test_filtered_mcqs_use_canonical_type_and_integer_years(self):
+        advanced = self._mcq("Q1", "Advanced", 2020)
+        untyped = self._mcq("Q2", None, None)
+        self._mcq("Q3", "Board-level", 2020)
+        self._mcq("Q4", "Advanced", 2009)
+        self._mcq("Q5", "Advanced", 2020, subspecialty="Headache")
+        hidden = self._mcq("Q6", "Advanced", 2021)
+
+        mcqs = get_filtered_mcqs("Epilepsy", "Part I", "2018", "2024", hidden_mcqs=[hidden.pk])
+        self.assertEqual(list(mcqs), [advanced, untyped])
+
+        everything = get_filtered_mcqs("Epilepsy", "All Types", "2018", "2024")
+        self.assertEqual(everything.count(), 4)
+
+    def test_explain_command_prints_plans(self):
+        self._mcq("Q1", "Advanced", 2020)
+        out = StringIO()
+        call_command("explain_mcq_queries", stdout=out)
+        output = out.getvalue()
+        self.assertIn("Subspecialty page: Epilepsy, Advanced, 2018-2024", output)
+        self.assertIn("Mock exam, all subspecialties", output)
+        self.assertIn("INDEX mcq_subspec_", output)
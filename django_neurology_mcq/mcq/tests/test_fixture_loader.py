@@ -0,0 +1,122 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from mcq.models import MCQ, MCQOption
+from mcq.services import fixture_loader
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+FIXTURE = [
+    {
+        "model": "mcq.MCQ",
+        "pk": 101,
+        "fields": {
+            "question_number": "Q1",
+            "question_text": "Which artery supplies Broca's area?",
+            "options": ["Superior MCA division", "PCA"],
+            "correct_answer": "A",
+            "subspecialty": "Vascular Neurology",
+            "exam_type": "part ii",
+            "exam_year": "2021",
+        },
+    },
+    {
+        # Older chunks: UUID primary keys and timestamp fields the model lacks
+        "model": "mcq.mcq",
+        "pk": "57872d5c-8872-46bc-9f05-c30f31987fd7",
+        "fields": {
+            "question_number": "4",
+            "question_text": "Area postrema syndrome is a core feature of?",
+            "options": {"A": "NMOSD", "B": "MS"},
+            "correct_answer": "A",
+            "explanation": None,
+            "created_at": "2025-05-15T20:25:22",
+        },
+    },
+    {"model": "mcq.mcq", "pk": 102, "fields": {"question_text": "  "}},
+    {"model": "auth.user", "pk": 1, "fields": {"username": "x"}},
+]
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    def test_elements_are_decoded_across_tiny_reads(self):
+        text = json.dumps([{"a": "x" * 50, "b": [1, 2]}, 12345, "s,]"], indent=2)
+        self.assertEqual(
+            list(fixture_loader.iter_json_array(io.StringIO(text), read_size=7)),
+            [{"a": "x" * 50, "b": [1, 2]}, 12345, "s,]"],
+        )
+        self.assertEqual(list(fixture_loader.iter_json_array(io.StringIO(" [ ] "))), [])
+
+    def test_non_arrays_are_rejected(self):
+        with self.assertRaises(ValueError):
+            list(fixture_loader.iter_json_array(io.StringIO('{"model": "mcq.mcq"}')))
+
+    def test_directories_list_chunks_in_numeric_order(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("mcq_fixture_10_of_31.json", "mcq_fixture_2_of_31.json", "fixtures_manifest.json"):
+                open(os.path.join(directory, name), "w").close()
+            names = [os.path.basename(path) for path in fixture_loader.fixture_paths(directory)]
+        self.assertEqual(names, ["mcq_fixture_2_of_31.json", "mcq_fixture_10_of_31.json"])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FixtureLoadTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "mcqs.json.gz")
+        with gzip.open(self.path, "wt", encoding="utf-8") as out:
+            json.dump(FIXTURE, out)
+
+    def test_load_validates_normalizes_and_is_idempotent(self):
+        stats = fixture_loader.load_fixtures([self.path], batch_size=1)
+        self.assertEqual((stats.seen, stats.inserted, stats.invalid, stats.renumbered), (4, 2, 2, 1))
+        self.assertIn("created_at", stats.dropped_fields)
+
+        mcq = MCQ.objects.get(pk=101)
+        self.assertEqual(mcq.options, {"A": "Superior MCA division", "B": "PCA"})
+        self.assertEqual(mcq.exam_year, 2021)
+        self.assertIsInstance(MCQ.objects.get(question_number="4").pk, int)
+        self.assertEqual(MCQOption.objects.filter(mcq=mcq, is_correct=True).get().letter, "A")
+
+        again = fixture_loader.load_fixtures([self.path])
+        self.assertEqual((again.inserted, again.existing), (0, 2))
+        self.assertEqual(MCQ.objects.count(), 2)
+        # The sequence continues after the explicit ids
+        self.assertGreater(MCQ.objects.create(question_text="New", correct_answer="A").pk, 101)
+
+    def test_rows_skipped_on_conflict_are_not_counted(self):
+        real_bulk_create = QuerySet.bulk_create
+
+        def racing_bulk_create(queryset, objs, *args, **kwargs):
+            # Another loader takes id 101 between the lookup and the insert
+            if any(mcq.pk == 101 for mcq in objs):
+                real_bulk_create(queryset, [MCQ(pk=101, question_text="Inserted concurrently", correct_answer="B")])
+            return real_bulk_create(queryset, objs, *args, **kwargs)
+
+        with patch.object(QuerySet, "bulk_create", racing_bulk_create):
+            stats = fixture_loader.load_fixtures([self.path])
+        self.assertEqual((stats.inserted, stats.existing), (1, 1))
+        self.assertEqual(MCQ.objects.get(pk=101).question_text, "Inserted concurrently")
+        self.assertFalse(MCQOption.objects.filter(mcq_id=101).exists())
+
+    def test_snapshot_round_trip(self):
+        fixture_loader.load_fixtures([self.path])
+        snapshot = os.path.join(self.directory.name, "mcqs.snapshot.jsonl.gz")
+        self.assertEqual(fixture_loader.write_snapshot(snapshot), 2)
+        expected = list(MCQ.objects.order_by("pk").values("pk", "question_text", "options", "exam_year"))
+
+        MCQ.objects.all().delete()
+        out = io.StringIO()
+        call_command("provision_mcqs", snapshot=snapshot, stdout=out)
+        self.assertIn("2 inserted", out.getvalue())
+        self.assertEqual(list(MCQ.objects.order_by("pk").values("pk", "question_text", "options", "exam_year")), expected)
+        self.assertEqual(MCQOption.objects.count(), 4)
@@ -0,0 +1,134 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from mcq.guideline_context import build_guideline_context
+from mcq.services import guideline_index
+from mcq.services.guideline_index import BM25Index, chunk_text
+
+MS_GUIDELINE = """# Disease-modifying therapy
+
+## Escalation
+Patients with breakthrough disease on fingolimod should be offered a high-efficacy therapy. Natalizumab or an
+anti-CD20 antibody are reasonable options after fingolimod failure.
+
+## Pregnancy
+Women planning pregnancy should discuss washout periods before conception. Fingolimod should be stopped two months
+before conception because of teratogenic risk.
+"""
+
+STROKE_GUIDELINE = """# Acute ischaemic stroke
+Intravenous thrombolysis with alteplase is recommended within 4.5 hours of symptom onset in eligible patients.
+Mechanical thrombectomy is recommended for large vessel occlusion of the anterior circulation within 24 hours.
+"""
+
+
+class ChunkingTests(SimpleTestCase):
+    def test_chunks_follow_headings_and_overlap_one_sentence(self):
+        chunks = chunk_text(MS_GUIDELINE, source="MS guideline")
+        self.assertEqual([chunk.heading for chunk in chunks], ["Escalation", "Pregnancy"])
+
+        text = "First short sentence is here. Second short sentence is here. Third short sentence is here."
+        chunks = chunk_text(text, source="Notes", max_words=10)
+        self.assertEqual(
+            [chunk.text for chunk in chunks],
+            [
+                "First short sentence is here. Second short sentence is here.",
+                "Second short sentence is here. Third short sentence is here.",
+            ],
+        )
+
+
+class BM25IndexTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.chunks = (
+            chunk_text(MS_GUIDELINE, source="MS guideline")
+            + chunk_text(STROKE_GUIDELINE, source="Stroke guideline")
+        )
+
+    def test_search_ranks_matching_chunk_first_and_survives_reload(self):
+        index = BM25Index.build(self.chunks)
+        hits = index.search("breakthrough on fingolimod escalation", k=2)
+        self.assertEqual(hits[0].source, "MS guideline")
+        self.assertEqual(hits[0].heading, "Escalation")
+        self.assertEqual(index.search("zzz unknown", k=3), [])
+
+        directory = Path(self.tmp.name)
+        index.save(directory)
+        loaded = BM25Index.load(directory)
+        self.assertEqual(len(loaded), len(index))
+        self.assertEqual(
+            [(hit.chunk_id, round(hit.score, 4)) for hit in loaded.search("thrombectomy large vessel", k=3)],
+            [(hit.chunk_id, round(hit.score, 4)) for hit in index.search("thrombectomy large vessel", k=3)],
+        )
+
+    def test_quotes_are_exact_sentences_with_sources(self):
+        index = BM25Index.build(self.chunks)
+        quotes = index.quotes("alteplase thrombolysis hours onset", k=1)
+        self.assertEqual(len(quotes), 1)
+        self.assertIn(quotes[0].text, STROKE_GUIDELINE.replace("\n", " "))
+        self.assertTrue(quotes[0].text.startswith("Intravenous thrombolysis"))
+        self.assertIn("(Stroke guideline, Acute ischaemic stroke)", quotes[0].render())
+
+    def test_rebuild_keeps_previous_build_and_prunes_older(self):
+        directory = Path(self.tmp.name)
+        for _ in range(3):
+            BM25Index.build(self.chunks).save(directory)
+        builds = [path for path in directory.iterdir() if path.is_dir()]
+        self.assertEqual(len(builds), 2)
+        self.assertIsNotNone(BM25Index.load(directory))
+
+
+class GuidelineContextTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        sources = Path(self.tmp.name) / "sources"
+        sources.mkdir()
+        (sources / "ms_guideline.md").write_text(MS_GUIDELINE)
+        (sources / "curated_quotes.json").write_text(json.dumps({
+            "stroke": {"topic": "Stroke", "quotes": [
+                {"quote": "Placeholder text.", "source": "Placeholder"},
+                {"quote": "Aspirin should be started within 48 hours of ischaemic stroke onset.", "source": "AHA", "year": "2019"},
+            ]},
+        }))
+        self.sources = sources
+        self.settings_override = override_settings(
+            GUIDELINE_INDEX_DIR=str(Path(self.tmp.name) / "index"),
+            GUIDELINE_SOURCE_DIRS=[str(sources)],
+            GUIDELINE_MIN_SCORE=0.5,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(guideline_index._cache.reset)
+
+    def test_build_command_and_context_include_index_quotes(self):
+        out = StringIO()
+        call_command("build_guideline_index", "--query", "aspirin ischaemic stroke", stdout=out)
+        self.assertIn("Indexed", out.getvalue())
+        self.assertIn("(AHA (2019), Stroke)", out.getvalue())
+        self.assertNotIn("Placeholder", out.getvalue())
+
+        context = build_guideline_context(
+            "A patient on fingolimod has a relapse with new lesions. What is the next step?",
+            ["Natalizumab", "Continue fingolimod"],
+            explanation_text='As the guideline says, "escalate to a high-efficacy agent promptly".',
+        )
+        lines = context.splitlines()
+        self.assertEqual(lines[0], '"escalate to a high-efficacy agent promptly"')
+        self.assertTrue(any("(ms guideline, Escalation)" in line for line in lines[1:]))
+
+    def test_missing_index_is_built_on_first_use(self):
+        # A fresh process has the sources but no build; the first prompt does not wait for it
+        context = build_guideline_context("Breakthrough disease on fingolimod", [], explanation_text="")
+        self.assertEqual(context, "")
+        guideline_index._cache._build.join(timeout=30)
+
+        context = build_guideline_context("Breakthrough disease on fingolimod", [], explanation_text="")
+        self.assertIn("(ms guideline, Escalation)", context)
@@ -0,0 +1,85 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from mcq.high_yield_cache import clean_rich_text
+from mcq.high_yield_models import HighYieldSpecialty, HighYieldTopic, TopicSectionImage
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class CleanRichTextTests(TestCase):
+    def test_strips_active_content(self):
+        html = '<p onclick="x()">Hi</p><script>alert(1)</script><!--[if gte mso 9]>junk<![endif]--><a href="javascript:evil()">l</a>'
+        self.assertEqual(clean_rich_text(html), '<p>Hi</p><a rel="noopener noreferrer">l</a>')
+
+    def test_strips_evasive_markup(self):
+        self.assertEqual(clean_rich_text('<svg/onload=alert(1)><p>Text</p>'), '<p>Text</p>')
+        self.assertEqual(clean_rich_text('<p>Text</p><script>alert(1)'), '<p>Text</p>')
+        html = '<a href="&#106;avascript:alert(1)">a</a><a href="jav&#x09;ascript:alert(1)">b</a>'
+        self.assertNotIn('href', clean_rich_text(html))
+
+    def test_keeps_editor_formatting(self):
+        html = '<p style="text-align:center;position:fixed"><strong>Key</strong> <a href="https://aan.com">AAN</a></p>'
+        self.assertEqual(
+            clean_rich_text(html),
+            '<p style="text-align:center"><strong>Key</strong> <a href="https://aan.com" rel="noopener noreferrer">AAN</a></p>',
+        )
+
+    def test_collapses_whitespace_between_blocks(self):
+        html = '<ul>\n    <li>One   two</li>\n    <li>Three</li>\n</ul>\n<p>&nbsp;</p>'
+        self.assertEqual(clean_rich_text(html), '<ul><li>One two</li><li>Three</li></ul>')
+
+    def test_preformatted_content_untouched(self):
+        html = '<pre>a    b\n   c</pre>'
+        self.assertEqual(clean_rich_text(html), html)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class HighYieldPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username="reader", password="pass1234")
+        self.client = Client()
+        assert self.client.login(username="reader", password="pass1234")
+        self.specialty = HighYieldSpecialty.objects.create(
+            name="Epilepsy",
+            introduction="<p>Intro</p>",
+            historical_overview="<p>History</p>",
+            important_concepts="<p>Concepts</p>",
+            related_anatomy="<p>Anatomy</p>",
+        )
+        self.topic = HighYieldTopic.objects.create(
+            specialty=self.specialty, title="Focal seizures", epidemiology="<p>Common</p>"
+        )
+        self.url = reverse("high_yield_topic", args=[self.specialty.slug, self.topic.slug])
+
+    def test_warm_page_skips_topic_queries(self):
+        self.client.get(self.url)
+        # session, user, profile (expiration middleware) and specialty;
+        # the topic nav and body come from the cache
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertContains(response, "<p>Common</p>")
+
+    def test_image_save_invalidates_topic_fragment(self):
+        self.client.get(self.url)
+        TopicSectionImage.objects.create(
+            topic=self.topic, section="epidemiology", image_url="https://example.com/a.png", caption="Map"
+        )
+        response = self.client.get(self.url)
+        self.assertContains(response, "https://example.com/a.png")
+
+    def test_topic_edit_invalidates_fragment(self):
+        self.client.get(self.url)
+        self.topic.epidemiology = "<p>Rare</p>"
+        self.topic.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, "<p>Rare</p>")
+        self.assertNotContains(response, "<p>Common</p>")
+
+    def test_specialty_page_defaults_to_first_topic(self):
+        response = self.client.get(reverse("high_yield_specialty", args=[self.specialty.slug]))
+        self.assertContains(response, "Focal seizures")
+        self.assertContains(response, "<h3>Epidemiology</h3>")
@@ -0,0 +1,152 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from mcq.models import MCQ
+from mcq.services import instrumentation
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def _stats(kind, name):
+    return next(s for s in instrumentation.summarize() if (s.kind, s.name) == (kind, name))
+
+
+@override_settings(CACHES=LOCMEM_CACHE, INSTRUMENTATION_ENABLED=True)
+class MeasurementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.get_aggregate().clear()
+
+    def test_queries_cache_and_llm_calls_are_counted(self):
+        cache.set("present", 1)
+        response = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+        with instrumentation.measure(instrumentation.KIND_REQUEST, "view") as measurement:
+            list(MCQ.objects.all())
+            MCQ.objects.count()
+            cache.get("present")
+            cache.get("absent")
+            cache.get_many(["present", "absent", "other"])
+            with instrumentation.llm_call("gpt-5-mini") as call:
+                call.response = response
+
+        self.assertEqual(measurement.db_queries, 2)
+        self.assertEqual((measurement.cache_hits, measurement.cache_misses), (2, 3))
+        self.assertEqual(len(measurement.llm_calls), 1)
+        self.assertIn('db;dur=', measurement.server_timing())
+
+        view = _stats(instrumentation.KIND_REQUEST, "view")
+        self.assertEqual((view.count, view.avg_queries, view.tokens), (1, 2, 150))
+        model = _stats(instrumentation.KIND_LLM, "gpt-5-mini")
+        self.assertEqual((model.llm_calls, model.tokens), (1, 150))
+
+    def test_cache_hooks_wrap_instances_not_backend_classes(self):
+        from django.core.cache.backends.locmem import LocMemCache
+
+        with instrumentation.measure(instrumentation.KIND_REQUEST, "view") as measurement:
+            cache.get("absent")
+        self.assertEqual(measurement.cache_misses, 1)
+        self.assertNotIn("_instrumented", LocMemCache.__dict__)
+        self.assertEqual(LocMemCache.get.__qualname__, "LocMemCache.get")
+
+        # Other threads get their own backend instance, which is wrapped as well
+        def lookup():
+            with instrumentation.measure(instrumentation.KIND_TASK, "worker") as inner:
+                cache.get("absent")
+            return inner.cache_misses
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            self.assertEqual(pool.submit(lookup).result(), 1)
+
+    def test_nested_measurement_is_added_to_parent_and_errors_flagged(self):
+        with instrumentation.measure(instrumentation.KIND_REQUEST, "outer") as outer:
+            with self.assertRaises(RuntimeError):
+                with instrumentation.measure(instrumentation.KIND_TASK, "inner"):
+                    MCQ.objects.count()
+                    raise RuntimeError("boom")
+        self.assertEqual(outer.db_queries, 1)
+        self.assertEqual(_stats(instrumentation.KIND_TASK, "inner").errors, 1)
+        self.assertEqual(_stats(instrumentation.KIND_REQUEST, "outer").errors, 0)
+
+    def test_celery_signal_handlers_measure_tasks(self):
+        task = SimpleNamespace(name="mcq.tasks.example")
+        instrumentation._task_prerun(task_id="t1", task=task)
+        MCQ.objects.count()
+        instrumentation._task_failure(task_id="t1")
+        instrumentation._task_postrun(task_id="t1", task=task)
+
+        stats = _stats(instrumentation.KIND_TASK, "mcq.tasks.example")
+        self.assertEqual((stats.count, stats.errors, stats.avg_queries), (1, 1, 1))
+        self.assertIsNone(instrumentation.current())
+
+    def test_disabled_records_nothing(self):
+        with override_settings(INSTRUMENTATION_ENABLED=False):
+            with instrumentation.measure(instrumentation.KIND_REQUEST, "view"):
+                pass
+        self.assertEqual(instrumentation.summarize(), [])
+
+
+class PercentileTests(SimpleTestCase):
+    def test_percentiles_use_bucket_bounds(self):
+        counters = {"count": 10, "duration_ms": 1000, "le_25": 5, "le_100": 4, "le_inf": 1}
+        stats = instrumentation.SeriesStats(kind="request", name="view", counters=counters)
+        self.assertEqual(stats.p50_ms, 25.0)
+        self.assertEqual(stats.percentile(0.9), 100.0)
+        self.assertEqual(stats.p95_ms, float("inf"))
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    INSTRUMENTATION_ENABLED=True,
+    INSTRUMENTATION_SERVER_TIMING="staff",
+    INSTRUMENTATION_METRICS_TOKEN="secret-token",
+)
+class InstrumentationViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.get_aggregate().clear()
+        self.staff = User.objects.create_user(username="staff", password="pass1234", is_staff=True)
+        self.user = User.objects.create_user(username="resident", password="pass1234")
+
+    def test_server_timing_header_for_staff_only(self):
+        self.client.force_login(self.staff)
+        response = self.client.get("/healthz/")
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+        self.client.force_login(self.user)
+        self.assertNotIn("Server-Timing", self.client.get("/healthz/"))
+
+        self.assertEqual(_stats(instrumentation.KIND_REQUEST, "healthz").count, 2)
+
+    def test_dashboard_is_staff_only(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/admin/debug/performance/").status_code, 302)
+
+        self.client.force_login(self.staff)
+        self.client.get("/healthz/")
+        response = self.client.get("/admin/debug/performance/")
+        self.assertContains(response, "healthz")
+        payload = self.client.get("/admin/debug/performance/", {"format": "json"}).json()
+        self.assertIn("healthz", [series["name"] for series in payload["series"]])
+
+    def test_metrics_endpoint_accepts_token_or_staff(self):
+        self.client.get("/healthz/")
+        self.assertEqual(self.client.get("/admin/debug/metrics/").status_code, 403)
+        self.assertEqual(
+            self.client.get("/admin/debug/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403
+        )
+
+        response = self.client.get("/admin/debug/metrics/", HTTP_AUTHORIZATION="Bearer secret-token")
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('neurology_mcq_window_calls{kind="request",name="healthz"} 1', body)
+        self.assertIn('neurology_mcq_window_latency_le{kind="request",name="healthz",le="+Inf"} 1', body)
+        # Window totals can fall, so nothing claims to be a counter or histogram
+        self.assertNotIn("histogram", body)
+        self.assertNotIn("counter", body)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get("/admin/debug/metrics/").status_code, 200)
@@ -0,0 +1,113 @@
+from django.contrib import admin
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from mcq.models import MCQ, QuestionReport
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class MCQAdminSearchIndexTests(SimpleTestCase):
+    def test_every_search_field_has_a_trigram_index(self):
+        indexed = {
+            index.expressions[0].source_expressions[0].source_expressions[0].name
+            for index in MCQ._meta.indexes
+            if index.expressions
+        }
+        self.assertLessEqual(set(admin.site._registry[MCQ].search_fields), indexed)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MCQAdminChangelistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username="editor", password="pass1234", email="e@example.com")
+        self.client = Client()
+        assert self.client.login(username="editor", password="pass1234")
+        self.url = reverse("admin:mcq_mcq_changelist")
+        self.mcqs = [self._mcq(i) for i in range(6)]
+        for mcq in self.mcqs[:3]:
+            QuestionReport.objects.create(question=mcq, user=self.admin, reason="Wrong key")
+
+    def _mcq(self, number, subspecialty="Epilepsy"):
+        return MCQ.objects.create(
+            question_number=f"Q{number}",
+            question_text=f"Stem {number}",
+            options={"A": "One", "B": "Two"},
+            correct_answer="A",
+            subspecialty=subspecialty,
+            exam_type="Advanced",
+            exam_year="2023",
+        )
+
+    def _page_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self._page_queries()
+        _, before = self._page_queries()
+        for number in range(6, 16):
+            self._mcq(number)
+        self._page_queries()  # filter choices were invalidated by the saves
+        response, after = self._page_queries()
+        self.assertEqual(before, after)
+        self.assertContains(response, "1 pending", count=3)
+
+    def test_filter_choices_are_cached_until_mcq_saved(self):
+        self._page_queries()
+        response, warm = self._page_queries()
+        self.assertNotContains(response, "Stroke")
+
+        self._mcq(99, subspecialty="Stroke")
+        response, cold = self._page_queries()
+        self.assertGreater(cold, warm)
+        self.assertContains(response, "Stroke")
+
+    def test_has_reports_filter(self):
+        response = self.client.get(self.url, {"has_reports": "yes"})
+        self.assertEqual(response.context["cl"].result_count, 3)
+        response = self.client.get(self.url, {"has_reports": "no"})
+        self.assertEqual(response.context["cl"].result_count, 3)
+
+    def test_bulk_edit_metadata_runs_single_update(self):
+        selected = [mcq.pk for mcq in self.mcqs[:4]]
+        payload = {"action": "bulk_edit_metadata", ACTION_CHECKBOX_NAME: selected, "index": 0}
+
+        response = self.client.post(self.url, payload)
+        self.assertTemplateUsed(response, "admin/mcq/mcq/bulk_edit_metadata.html")
+        self.assertEqual(response.context["selected_count"], 4)
+
+        payload.update({"apply": "1", "subspecialty": "Headache", "exam_type": "", "difficulty_level": "Hard"})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, payload)
+        self.assertEqual(response.status_code, 302)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "mcq_mcq"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(MCQ.objects.filter(subspecialty="Headache", difficulty_level="Hard").count(), 4)
+        self.assertEqual(MCQ.objects.get(pk=self.mcqs[0].pk).exam_type, "Advanced")
+        self.assertContains(self.client.get(self.url), "Headache")
+
+    def test_bulk_exam_type_change_clears_the_imported_name(self):
+        mcq = self.mcqs[0]
+        MCQ.objects.filter(pk=mcq.pk).update(exam_type="Other", exam_type_original="Part")
+        payload = {
+            "action": "bulk_edit_metadata",
+            ACTION_CHECKBOX_NAME: [mcq.pk],
+            "index": 0,
+            "apply": "1",
+            "subspecialty": "",
+            "exam_type": "Board-level",
+            "difficulty_level": "",
+        }
+        self.client.post(self.url, payload)
+        mcq.refresh_from_db()
+        self.assertEqual((mcq.exam_type, mcq.exam_type_original), ("Board-level", None))
@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from mcq.models import MCQ, MCQOption
+from mcq.openai_integration import format_options_text
+from mcq.option_utils import canonical_options, correct_letters, parse_options
+from mcq.services.mcq_service import MCQService
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class ParseOptionsTests(SimpleTestCase):
+    def test_legacy_shapes_share_one_canonical_form(self):
+        expected = {"A": "Stroke", "B": "Migraine"}
+        self.assertEqual(canonical_options('{"A": "Stroke", "B": "Migraine"}'), expected)
+        self.assertEqual(canonical_options(["Stroke", "Migraine"]), expected)
+        self.assertEqual(
+            canonical_options([{"letter": "A", "text": "Stroke"}, {"letter": "B", "text": "Migraine"}]),
+            expected,
+        )
+        self.assertEqual(parse_options("not json"), [])
+
+    def test_repeated_or_blank_letters_keep_every_option(self):
+        options = [
+            {"letter": "A", "text": "Stroke"},
+            {"letter": "A", "text": "Migraine"},
+            {"text": "Seizure"},
+            {"letter": "B", "text": "Tumour"},
+        ]
+        self.assertEqual(
+            parse_options(options),
+            [("A", "Stroke"), ("C", "Migraine"), ("D", "Seizure"), ("B", "Tumour")],
+        )
+        self.assertEqual(len(canonical_options({"A": "Stroke", "A ": "Migraine"})), 2)
+
+    def test_correct_letters_splits_multi_answers(self):
+        self.assertEqual(correct_letters("b"), {"B"})
+        self.assertEqual(correct_letters("A, C and D"), {"A", "C", "D"})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MCQOptionRowTests(TestCase):
+    def _mcq(self, **overrides):
+        fields = {
+            "question_number": "Q1",
+            "question_text": "Most likely diagnosis?",
+            "options": [{"letter": "A", "text": "Stroke"}, {"letter": "B", "text": "Migraine"}],
+            "correct_answer": "B",
+        }
+        fields.update(overrides)
+        return MCQ.objects.create(**fields)
+
+    def test_save_canonicalises_options_and_writes_rows(self):
+        mcq = self._mcq()
+        mcq.refresh_from_db()
+        self.assertEqual(mcq.options, {"A": "Stroke", "B": "Migraine"})
+        rows = list(mcq.option_rows.values_list("letter", "text", "is_correct", "order"))
+        self.assertEqual(rows, [("A", "Stroke", False, 0), ("B", "Migraine", True, 1)])
+
+        mcq.options = {"A": "Stroke", "B": "Migraine", "C": "Seizure"}
+        mcq.correct_answer = "C"
+        mcq.save()
+        self.assertEqual(
+            list(mcq.option_rows.filter(is_correct=True).values_list("letter", flat=True)), ["C"]
+        )
+        self.assertEqual(mcq.option_rows.count(), 3)
+
+    def test_unchanged_save_does_not_rewrite_rows(self):
+        mcq = self._mcq()
+        row_ids = list(mcq.option_rows.values_list("pk", flat=True))
+        mcq.question_text = "Edited"
+        mcq.save()
+        self.assertEqual(list(mcq.option_rows.values_list("pk", flat=True)), row_ids)
+        self.assertFalse(mcq.sync_option_rows())
+
+    def test_accessors_use_prefetched_rows(self):
+        self._mcq()
+        mcq = MCQ.objects.prefetch_related("option_rows").get()
+        with self.assertNumQueries(0):
+            self.assertEqual(mcq.get_options_list(), ["Stroke", "Migraine"])
+            self.assertEqual(format_options_text(mcq), "A. Stroke\nB. Migraine\n")
+            self.assertEqual(mcq.get_answer_display(), "B. Migraine")
+
+    def test_decoded_options_keep_letters(self):
+        mcq = self._mcq(options={"B": "Migraine", "D": "Stroke"})
+        MCQService.ensure_options_decoded(mcq)
+        self.assertEqual(mcq.option_letters, ["B", "D"])
+        self.assertEqual(mcq.options, ["Migraine", "Stroke"])
+
+    def test_sync_command_rebuilds_rows_after_bulk_writes(self):
+        mcq = self._mcq()
+        MCQ.objects.filter(pk=mcq.pk).update(options='["Stroke", "Migraine", "Tumour"]')
+        MCQOption.objects.all().delete()
+
+        out = StringIO()
+        call_command("sync_mcq_options", stdout=out)
+        mcq.refresh_from_db()
+        self.assertEqual(mcq.options, {"A": "Stroke", "B": "Migraine", "C": "Tumour"})
+        self.assertEqual(mcq.option_rows.count(), 3)
+        self.assertIn("canonicalised options on 1 MCQs", out.getvalue())
+
+    def test_search_matches_option_text_in_the_database(self):
+        self._mcq()
+        self._mcq(question_number="Q2", options={"A": "Myasthenia", "B": "Stroke"}, correct_answer="A")
+        self.client.force_login(User.objects.create_user("searcher", password="pw"))
+
+        response = self.client.get("/search/", {"query": "migraine likely"})
+        self.assertEqual([mcq.question_number for mcq in response.context["results"]], ["Q1"])
+        response = self.client.get("/search/", {"query": "STROKE"})
+        self.assertEqual([mcq.question_number for mcq in response.context["results"]], ["Q2", "Q1"])
@@ -0,0 +1,137 @@
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from mcq.models import MCQ, MCQSignature, MCQSignatureBand
+from mcq.services import near_duplicates
+from mcq.services.near_duplicates import (
+    BANDS,
+    DuplicateGuard,
+    compute_signature,
+    find_duplicate_clusters,
+    find_near_duplicates,
+    normalize_text,
+    similarity,
+)
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+STEM = (
+    "A 34-year-old woman presents with painful loss of vision in the right eye over three days "
+    "and pain on eye movement. Fundoscopy is normal. What is the most likely diagnosis?"
+)
+REWORDED = (
+    "A 34 year old woman presents with painful visual loss in her right eye over 3 days, "
+    "with pain on eye movements. Fundoscopy is normal. Which is the most likely diagnosis?"
+)
+OPTIONS = {"A": "Optic neuritis", "B": "Central retinal artery occlusion", "C": "NAION", "D": "Glaucoma"}
+RELETTERED = {"A": "Glaucoma", "B": "NAION", "C": "Optic neuritis", "D": "Central retinal artery occlusion"}
+OTHER_STEM = "Which antiseizure medication is associated with kidney stones and weight loss?"
+OTHER_OPTIONS = {"A": "Topiramate", "B": "Valproate", "C": "Lamotrigine", "D": "Levetiracetam"}
+
+
+class SignatureTests(SimpleTestCase):
+    def test_normalisation_ignores_markup_case_and_option_order(self):
+        self.assertEqual(
+            normalize_text("<p>Hello, World</p>", OPTIONS),
+            normalize_text("hello world", RELETTERED),
+        )
+
+    def test_similarity_separates_rewording_from_different_questions(self):
+        base = compute_signature(normalize_text(STEM, OPTIONS))
+        reworded = compute_signature(normalize_text(REWORDED, RELETTERED))
+        other = compute_signature(normalize_text(OTHER_STEM, OTHER_OPTIONS))
+        self.assertGreaterEqual(similarity(base, reworded), 0.7)
+        self.assertLess(similarity(base, other), 0.2)
+
+    def test_signature_is_deterministic(self):
+        self.assertTrue((compute_signature("abcdefgh") == compute_signature("abcdefgh")).all())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class NearDuplicateStoreTests(TestCase):
+    def _mcq(self, number, text, options, exam_type="Advanced", exam_year="2022"):
+        return MCQ.objects.create(
+            question_number=number,
+            question_text=text,
+            options=options,
+            correct_answer="A",
+            subspecialty="Neuro-ophthalmology",
+            exam_type=exam_type,
+            exam_year=exam_year,
+        )
+
+    def test_signature_maintained_on_save(self):
+        mcq = self._mcq("Q1", STEM, OPTIONS)
+        self.assertTrue(MCQSignature.objects.filter(mcq=mcq).exists())
+        self.assertEqual(MCQSignatureBand.objects.filter(mcq=mcq).count(), BANDS)
+        before = bytes(MCQSignature.objects.get(mcq=mcq).minhash)
+
+        mcq.question_text = OTHER_STEM
+        mcq.save()
+        self.assertNotEqual(bytes(MCQSignature.objects.get(mcq=mcq).minhash), before)
+        self.assertEqual(MCQSignatureBand.objects.filter(mcq=mcq).count(), BANDS)
+
+    def test_lookup_and_clusters_span_exams(self):
+        first = self._mcq("Q1", STEM, OPTIONS)
+        second = self._mcq("Q7", REWORDED, RELETTERED, exam_type="Board-level", exam_year="2024")
+        self._mcq("Q9", OTHER_STEM, OTHER_OPTIONS)
+
+        matches = find_near_duplicates(REWORDED, RELETTERED, exclude_ids=[second.id])
+        self.assertEqual([mcq_id for mcq_id, _ in matches], [first.id])
+
+        clusters = find_duplicate_clusters(cross_exam_only=True)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual({m["id"] for m in clusters[0].members}, {first.id, second.id})
+        self.assertEqual(clusters[0].exam_years, ["2022", "2024"])
+
+    def test_guard_rejects_stored_and_in_batch_duplicates(self):
+        self._mcq("Q1", STEM, OPTIONS)
+        guard = DuplicateGuard()
+        self.assertIsNotNone(guard.check(REWORDED, RELETTERED))
+        with patch.object(near_duplicates, "compute_signature", wraps=compute_signature) as signing:
+            self.assertIsNone(guard.check(OTHER_STEM, OTHER_OPTIONS))
+            guard.accept(OTHER_STEM, OTHER_OPTIONS)
+        # One signature per row, shared by the stored lookup, the batch lookup and accept
+        self.assertEqual(signing.call_count, 1)
+        self.assertEqual(guard.check(OTHER_STEM + " ", OTHER_OPTIONS)[0], "batch:0")
+
+    def test_json_import_skips_near_duplicates(self):
+        self._mcq("Q1", STEM, OPTIONS)
+        User.objects.create_superuser(username="admin", password="pass1234", email="a@example.com")
+        client = Client()
+        assert client.login(username="admin", password="pass1234")
+        payload = [
+            {"question_number": "N1", "question_text": REWORDED, "options": RELETTERED, "subspecialty": "Neuro-ophthalmology"},
+            {"question_number": "N2", "question_text": OTHER_STEM, "options": OTHER_OPTIONS, "subspecialty": "Epilepsy"},
+        ]
+        upload = SimpleUploadedFile("mcqs.json", json.dumps(payload).encode(), content_type="application/json")
+        client.post(reverse("import_mcqs_form"), {"json_file": upload, "confirm_format": "on"})
+        self.assertEqual(set(MCQ.objects.values_list("question_number", flat=True)), {"Q1", "N2"})
+
+    def test_management_command_rebuilds_and_reports(self):
+        self._mcq("Q1", STEM, OPTIONS)
+        self._mcq("Q7", REWORDED, RELETTERED, exam_year="2024")
+        MCQSignature.objects.all().delete()
+        MCQSignatureBand.objects.all().delete()
+
+        out = io.StringIO()
+        call_command("find_near_duplicates", "--missing", stdout=out)
+        self.assertIn("Computed 2 signatures", out.getvalue())
+        self.assertIn("Found 1 clusters", out.getvalue())
+
+    def test_admin_report_renders(self):
+        self._mcq("Q1", STEM, OPTIONS)
+        self._mcq("Q7", REWORDED, RELETTERED, exam_year="2024")
+        User.objects.create_superuser(username="admin", password="pass1234", email="a@example.com")
+        client = Client()
+        assert client.login(username="admin", password="pass1234")
+        response = client.get(reverse("admin:mcq_mcq_near_duplicates"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cluster_count"], 1)
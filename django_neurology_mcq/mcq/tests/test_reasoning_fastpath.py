@@ -0,0 +1,116 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from mcq.cognitive_analysis import CognitiveAnalyzer
+from mcq.models import MCQ, CognitiveReasoningSession
+from mcq.services import reasoning_fastpath
+from mcq.services.reasoning_service import ReasoningService
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+REASONING = "I initially thought this was obviously a stroke; I remember seeing it before and I'm definitely sure."
+
+
+class HeuristicMatcherTests(SimpleTestCase):
+    def test_matchers_agree_with_rule_based_analyzer(self):
+        features = reasoning_fastpath.MCQFeatures(version="v", options={}, question_text="", clinical_features=())
+        analyzer = reasoning_fastpath.HeuristicReasoningAnalyzer(features)
+        samples = [REASONING, "Clearly enough, this confirms it.", "Tremor and rigidity", ""]
+        for text in samples:
+            for is_correct in (True, False):
+                self.assertEqual(
+                    analyzer._detect_cognitive_errors(text, None, "A", is_correct),
+                    CognitiveAnalyzer()._detect_cognitive_errors(text, None, "A", is_correct),
+                )
+
+    def test_normalize_reasoning(self):
+        self.assertEqual(
+            reasoning_fastpath.normalize_reasoning("  Sudden   onset, LEFT weakness!! "),
+            reasoning_fastpath.normalize_reasoning("sudden onset left weakness"),
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE, REASONING_FASTPATH_ENABLED=True)
+class ReasoningTierTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reasoning_fastpath.clear_feature_cache()
+        self.user = User.objects.create_user(username="resident", password="pass1234")
+        self.mcq = MCQ.objects.create(
+            question_number="Q1",
+            question_text="A 70-year-old man has sudden onset left weakness. What is the diagnosis?",
+            options={"A": "Ischemic stroke", "B": "Todd paralysis"},
+            correct_answer="A",
+            subspecialty="Vascular Neurology",
+        )
+        self.delay = patch(
+            "mcq.tasks.process_clinical_reasoning_analysis.delay", return_value=SimpleNamespace(id="task-1")
+        )
+        self.queued = self.delay.start()
+        self.addCleanup(self.delay.stop)
+
+    def _start(self, reasoning=REASONING, answer="B"):
+        return ReasoningService.start_analysis(self.user, self.mcq, answer, reasoning, answer == "A")
+
+    def test_first_response_is_heuristic_and_queues_upgrade(self):
+        started = time.perf_counter()
+        result = self._start()
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.1)
+        payload = result.payload
+        self.assertEqual((payload["status"], payload["tier"], payload["upgrade_pending"]), ("ready", "heuristic", True))
+        self.assertGreater(payload["analysis"]["total_steps"], 2)
+        self.assertEqual(payload["analysis"]["primary_error"], "anchoring_bias")
+        self.queued.assert_called_once()
+
+        session = CognitiveReasoningSession.objects.get(pk=payload["session_id"])
+        self.assertEqual(session.task_id, "task-1")
+        self.assertEqual(session.status, CognitiveReasoningSession.READY)
+
+    def test_model_result_upgrades_session_and_serves_repeats_from_cache(self):
+        session = CognitiveReasoningSession.objects.get(pk=self._start().payload["session_id"])
+        upgraded = [{"title": "Model step", "content": "<p>Model analysis</p>"}]
+        session.guidance_steps = upgraded
+        session.analysis_tier = CognitiveReasoningSession.TIER_MODEL
+        session.save()
+        reasoning_fastpath.store_result(session)
+
+        status = ReasoningService.check_task_status(session).payload
+        self.assertEqual((status["tier"], status["upgrade_pending"]), ("model", False))
+
+        # Same submission modulo case and punctuation: served from the cache, nothing queued
+        self.queued.reset_mock()
+        repeat = self._start(reasoning=REASONING.upper().replace(";", ",")).payload
+        self.assertEqual(repeat["tier"], "model")
+        self.assertEqual(repeat["step"], upgraded[0])
+        self.queued.assert_not_called()
+
+        # A different answer or edited MCQ content misses the cache
+        self.assertEqual(self._start(answer="A").payload["tier"], "heuristic")
+        self.mcq.correct_answer = "B"
+        self.mcq.save()
+        self.assertEqual(self._start().payload["tier"], "heuristic")
+
+    def test_queue_failure_keeps_heuristic_result(self):
+        self.queued.side_effect = RuntimeError("broker down")
+        payload = self._start().payload
+        self.assertEqual((payload["status"], payload["upgrade_pending"]), ("ready", False))
+
+    def test_failed_upgrade_keeps_heuristic_result(self):
+        from mcq.tasks import process_clinical_reasoning_analysis
+
+        session = CognitiveReasoningSession.objects.get(pk=self._start().payload["session_id"])
+        with patch("mcq.cognitive_analysis_openai.ReasoningGuideGenerator", side_effect=RuntimeError("no key")):
+            process_clinical_reasoning_analysis.apply(
+                args=(session.id, self.mcq.id, session.selected_answer, session.user_reasoning, False)
+            )
+        session.refresh_from_db()
+        self.assertEqual(session.status, CognitiveReasoningSession.READY)
+        self.assertEqual(session.analysis_tier, CognitiveReasoningSession.TIER_HEURISTIC)
+        self.assertFalse(ReasoningService.upgrade_pending(session))
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from mcq.models import (
+    MCQ,
+    CaseMessage,
+    IncorrectAnswer,
+    MCQCaseConversionSession,
+    PersistentCaseLearningSession,
+)
+from mcq.services.case_learning_service import CaseSessionRepository
+from mcq.services.retention import RetentionEngine, get_policies, last_report
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, RETENTION_POLICY_OVERRIDES={})
+class RetentionEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="resident", password="pass1234")
+        self.mcq = MCQ.objects.create(
+            question_number="Q1", question_text="Stem", options={"A": "One", "B": "Two"}, correct_answer="A"
+        )
+        self.engine = RetentionEngine(batch_size=2, pause_seconds=0)
+
+    def _age(self, queryset, days, field="created_at"):
+        queryset.update(**{field: timezone.now() - timedelta(days=days)})
+
+    def _incorrect(self, count, resolved=True):
+        rows = [
+            IncorrectAnswer.objects.create(user=self.user, mcq=self.mcq, selected_answer="B", resolved=resolved)
+            for _ in range(count)
+        ]
+        return IncorrectAnswer.objects.filter(pk__in=[row.pk for row in rows])
+
+    def test_dry_run_counts_without_changes(self):
+        self._age(self._incorrect(3), days=400)
+        [result] = self.engine.run(get_policies(["incorrect_answers_resolved"]), dry_run=True)
+        self.assertEqual((result.matched, result.affected), (3, 0))
+        self.assertEqual(IncorrectAnswer.objects.count(), 3)
+        self.assertIsNone(last_report())
+
+    def test_delete_runs_in_batches_and_keeps_recent_rows(self):
+        self._age(self._incorrect(5), days=400)
+        self._incorrect(1)
+        self._age(self._incorrect(1, resolved=False), days=400)
+
+        [result] = self.engine.run(get_policies(["incorrect_answers_resolved"]))
+        self.assertEqual((result.matched, result.affected, result.batches), (5, 5, 3))
+        self.assertEqual(IncorrectAnswer.objects.count(), 2)
+        self.assertEqual(last_report()["results"][0]["affected"], 5)
+
+    def test_batch_limit_resumes_next_run(self):
+        self._age(self._incorrect(5), days=400)
+        engine = RetentionEngine(batch_size=2, max_batches=1, pause_seconds=0)
+        [result] = engine.run(get_policies(["incorrect_answers_resolved"]))
+        self.assertFalse(result.complete)
+        self.assertEqual(IncorrectAnswer.objects.count(), 3)
+
+    def test_case_sessions_are_archived_then_compacted(self):
+        messages = [{"role": "user", "content": f"m{i}"} for i in range(30)]
+        session = CaseSessionRepository().create_session(
+            user_id=self.user.id,
+            session_id="old",
+            specialty="Stroke",
+            difficulty="hard",
+            case_data={},
+            messages=messages,
+        )
+        PersistentCaseLearningSession.objects.filter(pk=session.pk).update(
+            differentials=["stroke"], last_activity=timezone.now() - timedelta(days=20)
+        )
+
+        with override_settings(RETENTION_CASE_MESSAGES_KEPT=5):
+            results = self.engine.run(get_policies(["case_sessions_archive", "case_sessions_compact"]))
+        self.assertEqual([r.affected for r in results], [1, 1])
+
+        session.refresh_from_db()
+        self.assertTrue(session.archived)
+        self.assertIsNotNone(session.last_cleanup)
+        self.assertEqual(session.differentials, [])
+        self.assertEqual(
+            list(CaseMessage.objects.filter(session=session).values_list("seq", flat=True)), list(range(25, 30))
+        )
+        # Compacted sessions are not selected again
+        [again] = self.engine.run(get_policies(["case_sessions_compact"]))
+        self.assertEqual(again.matched, 0)
+
+    def test_superseded_conversions_are_compacted(self):
+        case = {"source_mcq_id": self.mcq.id, "diagnosis": "Stroke", "clinical_presentation": "x" * 2000}
+        older = MCQCaseConversionSession.objects.create(
+            mcq=self.mcq, user=self.user, status="ready", case_data=case
+        )
+        newer = MCQCaseConversionSession.objects.create(
+            mcq=self.mcq, user=self.user, status="ready", case_data=case
+        )
+        self._age(MCQCaseConversionSession.objects.filter(pk=older.pk), days=5)
+
+        [result] = self.engine.run(get_policies(["case_conversions_compact"]))
+        self.assertEqual(result.affected, 1)
+        older.refresh_from_db()
+        newer.refresh_from_db()
+        self.assertEqual(older.case_data["diagnosis"], "Stroke")
+        self.assertNotIn("clinical_presentation", older.case_data)
+        self.assertEqual(newer.case_data, case)
+
+    def test_overrides_and_unknown_policies(self):
+        self._age(self._incorrect(1), days=400)
+        with override_settings(RETENTION_POLICY_OVERRIDES={"incorrect_answers_resolved": {"enabled": False}}):
+            self.assertEqual(self.engine.run(get_policies(["incorrect_answers_resolved"])), [])
+        with self.assertRaises(ValueError):
+            get_policies(["no_such_policy"])
+
+    def test_cleanup_case_sessions_command(self):
+        out = StringIO()
+        call_command("cleanup_case_sessions", "--dry-run", stdout=out)
+        self.assertIn("case_sessions_expired", out.getvalue())
+        self.assertIn("Active: 0", out.getvalue())
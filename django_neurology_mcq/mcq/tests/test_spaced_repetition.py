@@ -0,0 +1,141 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from mcq.models import MCQ, Flashcard, FlashcardReview, UserProfile
+from mcq.services.flashcard_service import FlashcardService
+from mcq.services.spaced_repetition import (
+    AGAIN,
+    EASY,
+    GOOD,
+    CardState,
+    FSRSScheduler,
+    InvalidRating,
+    SchedulerParameters,
+    SM2Scheduler,
+)
+
+
+class SchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def test_sm2_matches_original_rules(self):
+        scheduler = SM2Scheduler()
+        state = scheduler.review_quality(CardState(), 5, self.now)
+        self.assertEqual(state.interval, 6)
+        self.assertAlmostEqual(state.ease_factor, 2.6)
+
+        state = scheduler.review_quality(state, 4, self.now)
+        self.assertEqual(state.interval, round(6 * 2.6))
+
+        state = scheduler.review_quality(state, 1, self.now)
+        self.assertEqual(state.interval, 1)
+        self.assertEqual(state.lapses, 1)
+        self.assertEqual(state.repetitions, 3)
+
+    def test_fsrs_intervals_grow_and_reset(self):
+        scheduler = FSRSScheduler()
+        first = scheduler.review(CardState(), GOOD, self.now)
+        self.assertEqual(first.interval, round(first.stability))  # R = 0.9 at t == S
+
+        later = self.now + timedelta(days=first.interval)
+        second = scheduler.review(first, GOOD, later)
+        self.assertGreater(second.stability, first.stability)
+        self.assertGreater(second.interval, first.interval)
+
+        forgotten = scheduler.review(second, AGAIN, later + timedelta(days=second.interval))
+        self.assertEqual(forgotten.interval, 1)
+        self.assertLess(forgotten.stability, second.stability)
+        self.assertGreater(forgotten.difficulty, second.difficulty)
+
+    def test_desired_retention_shortens_intervals(self):
+        relaxed = FSRSScheduler(SchedulerParameters(algorithm="fsrs", desired_retention=0.8))
+        strict = FSRSScheduler(SchedulerParameters(algorithm="fsrs", desired_retention=0.95))
+        state = CardState(stability=20.0, difficulty=5.0, last_reviewed=self.now - timedelta(days=20))
+        self.assertGreater(relaxed.review(state, EASY, self.now).interval, strict.review(state, EASY, self.now).interval)
+
+    def test_profile_values_are_sanitised(self):
+        params = SchedulerParameters.from_profile_values("bogus", {"desired_retention": "2", "weights": [1, 2]})
+        self.assertEqual(params.algorithm, "sm2")
+        self.assertEqual(params.desired_retention, 0.99)
+        self.assertEqual(len(params.weights), 17)
+
+    def test_invalid_rating(self):
+        with self.assertRaises(InvalidRating):
+            SM2Scheduler().review(CardState(), 7, self.now)
+
+
+class FlashcardReviewSessionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="learner", password="pass1234")
+        self.client = Client()
+        assert self.client.login(username="learner", password="pass1234")
+        past = timezone.now() - timedelta(days=1)
+        self.cards = []
+        for index in range(30):
+            mcq = MCQ.objects.create(
+                question_number=f"FC-{index}",
+                question_text="Which nerve is affected?",
+                options={"A": "Median", "B": "Ulnar"},
+                correct_answer="A",
+                subspecialty="Neuromuscular",
+            )
+            self.cards.append(
+                Flashcard.objects.create(user=self.user, mcq=mcq, next_review=past - timedelta(minutes=index))
+            )
+
+    def test_review_page_renders_whole_queue_in_constant_queries(self):
+        # session, user, profile (expiration middleware), hidden MCQs, queue
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("review_flashcards"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["flashcards"]), 30)
+        self.assertContains(response, 'class="flashcard-item', count=30)
+
+    def test_queue_counts_beyond_limit(self):
+        queue = FlashcardService.review_queue(self.user, limit=10)
+        self.assertEqual(len(queue), 10)
+        self.assertEqual(queue.total_due, 30)
+        self.assertEqual(queue.flashcards[0].pk, self.cards[-1].pk)
+
+    def test_batch_submit_updates_and_logs(self):
+        payload = [{"flashcard_id": card.pk, "rating": GOOD} for card in self.cards]
+        payload.append({"flashcard_id": 999999, "rating": GOOD})
+        # session, user, profile (middleware), scheduler profile, cards,
+        # savepoint + bulk update + bulk insert + release
+        with self.assertNumQueries(9):
+            response = self.client.post(reverse("submit_flashcard_reviews"), {"reviews": json.dumps(payload)})
+        data = response.json()
+        self.assertEqual(data["reviewed"], 30)
+        self.assertEqual(data["skipped"], [999999])
+        self.assertEqual(FlashcardReview.objects.filter(user=self.user).count(), 30)
+        card = Flashcard.objects.get(pk=self.cards[0].pk)
+        self.assertEqual((card.interval, card.repetitions), (6, 1))
+        self.assertGreater(card.next_review, timezone.now())
+
+    def test_fsrs_preference_is_used(self):
+        UserProfile.objects.filter(user=self.user).update(flashcard_scheduler="fsrs")
+        result = FlashcardService.record_reviews(self.user, [(self.cards[0].pk, EASY)])
+        self.assertEqual(result.algorithm, "fsrs")
+        review = FlashcardReview.objects.get(flashcard=self.cards[0])
+        self.assertIsNotNone(review.stability)
+
+    def test_invalid_payload_rejected(self):
+        response = self.client.post(
+            reverse("submit_flashcard_reviews"),
+            {"reviews": json.dumps([{"flashcard_id": self.cards[0].pk, "rating": 9}])},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FlashcardReview.objects.exists())
+
+    def test_reviews_are_append_only(self):
+        FlashcardService.record_reviews(self.user, [(self.cards[0].pk, AGAIN)])
+        review = FlashcardReview.objects.get()
+        review.rating = EASY
+        with self.assertRaises(ValueError):
+            review.save()
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+
+from mcq import task_routing
+
+
+class FakeChannel:
+    def __init__(self, sizes):
+        self.sizes = sizes
+
+    def queue_declare(self, queue, passive=False):
+        if queue not in self.sizes:
+            raise Exception(f"NOT_FOUND - no queue '{queue}' in vhost '/'")
+        return SimpleNamespace(message_count=self.sizes[queue])
+
+
+class FakeConnection:
+    def __init__(self, sizes):
+        self.default_channel = FakeChannel(sizes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def ensure_connection(self, **kwargs):
+        return self
+
+
+class TaskRoutingTests(SimpleTestCase):
+    def route(self, name, args=(), kwargs=None):
+        return task_routing.route_task(name, args, kwargs or {}, {})
+
+    def test_tasks_are_routed_to_their_lane(self):
+        self.assertEqual(self.route("mcq.tasks.process_clinical_reasoning_analysis")["queue"], "interactive")
+        self.assertEqual(self.route("mcq.tasks.run_explanation_agent_job")["queue"], "bulk")
+        self.assertEqual(self.route("mcq.tasks.refresh_mcq_embeddings")["queue"], "bulk")
+        self.assertEqual(self.route("mcq.tasks.run_retention")["queue"], "maintenance")
+        self.assertIsNone(self.route("celery.chord_unlock"))
+
+    def test_ai_jobs_are_routed_by_action(self):
+        ask = self.route("mcq.tasks.run_ai_job", ("job", "ask_gpt", {}))
+        explain = self.route("mcq.tasks.run_bulk_ai_job", (), {"job_id": "job", "action": "generate_explanation"})
+        self.assertEqual(ask, {"queue": "interactive", "priority": 0})
+        self.assertEqual(explain["queue"], "bulk")
+
+    def test_bulk_ai_jobs_get_bulk_time_limits(self):
+        annotations = task_routing.LaneAnnotations()
+        limits = annotations.annotate(SimpleNamespace(name="mcq.tasks.run_bulk_ai_job"))
+        self.assertEqual(limits["time_limit"], task_routing.DEFAULT_LANES["bulk"]["time_limit"])
+        self.assertEqual(annotations.annotate(SimpleNamespace(name="mcq.tasks.run_ai_job"))["time_limit"], 300)
+
+    @override_settings(CELERY_LANES={"bulk": {"priority": 7, "soft_time_limit": 100, "time_limit": 120}})
+    def test_lane_settings_supply_priorities_and_time_limits(self):
+        self.assertEqual(self.route("mcq.tasks.run_ai_job", ("job", "unknown", {}))["priority"], 3)
+        annotations = task_routing.LaneAnnotations()
+        self.assertEqual(
+            annotations.annotate(SimpleNamespace(name="mcq.tasks.refresh_mcq_embeddings")),
+            {"soft_time_limit": 100, "time_limit": 120},
+        )
+        self.assertIsNone(annotations.annotate(SimpleNamespace(name="celery.backend_cleanup")))
+
+    def test_queue_depths_are_exposed_as_prometheus_gauges(self):
+        app = SimpleNamespace(connection_for_read=lambda: FakeConnection({"interactive": 4, "bulk": 120}))
+        depths = task_routing.queue_depths(app)
+        self.assertEqual(depths, {"interactive": 4, "bulk": 120, "maintenance": 0, "celery": 0})
+
+        text = task_routing.prometheus_queue_depths(depths)
+        self.assertIn('neurology_mcq_celery_queue_depth{queue="bulk"} 120', text)
+        self.assertIn("# TYPE neurology_mcq_celery_queue_depth gauge", text)
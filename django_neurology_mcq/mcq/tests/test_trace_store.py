@@ -0,0 +1,145 @@
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+
+import redis
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from mcq.case_conversion_tracker import CaseConversionTracker
+from mcq.services.trace_store import CacheTraceStore, RedisTraceStore, get_trace_store
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TraceStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tracker = CaseConversionTracker()
+
+    def _successful_trace(self, mcq_id, user_id, trace_id):
+        self.tracker._create_trace(trace_id, mcq_id, user_id, "button_click")
+        self.tracker.log_case_generation(trace_id, {"source_mcq_id": mcq_id, "patient_demographics": "45M"})
+        self.tracker.log_case_bot_response(trace_id, "Welcome", True, mcq_id)
+        return trace_id
+
+    def test_falls_back_to_cache_store_without_redis(self):
+        self.assertIsInstance(get_trace_store(), CacheTraceStore)
+
+    def test_steps_are_appended_in_order(self):
+        trace_id = self.tracker.start_conversion_tracking(7, 3)
+        self.tracker.log_background_task_start(trace_id, "task-1", 7, 3)
+        self.tracker.log_error(trace_id, "GENERATION", "timeout")
+
+        report = self.tracker.get_tracking_report(trace_id)
+        steps = [step["step_type"] for step in report["detailed_steps"]]
+        self.assertEqual(steps, ["TRACKING_START", "BACKGROUND_TASK_START", "ERROR_GENERATION"])
+        self.assertEqual(report["tracking_summary"]["mcq_id"], 7)
+        self.assertEqual(self.tracker.find_tracking_data(status="error")[0]["tracking_id"], trace_id)
+        self.assertEqual(self.tracker.find_tracking_data(status="incomplete"), [])
+
+    def test_steps_for_unknown_trace_are_ignored(self):
+        self.tracker.log_background_task_start("track_missing", "task-1", 7, 3)
+        self.assertIsNone(self.tracker.get_tracking_report("track_missing"))
+
+    def test_status_and_owner_indexes(self):
+        self._successful_trace(1, 10, "track_a")
+        self._successful_trace(2, 10, "track_b")
+        self.tracker._create_trace("track_c", 1, 11, "button_click")
+        self.tracker.log_case_generation("track_c", {"source_mcq_id": 1, "patient_demographics": ""})
+        self.tracker.log_case_bot_response("track_c", "Welcome", True, 2)
+
+        found = lambda **filters: sorted(t["tracking_id"] for t in self.tracker.find_tracking_data(**filters))
+        self.assertEqual(found(mcq_id=1), ["track_a", "track_c"])
+        self.assertEqual(found(user_id=10), ["track_a", "track_b"])
+        self.assertEqual(found(mcq_id=1, user_id=11), ["track_c"])
+        self.assertEqual(found(status="success"), ["track_a", "track_b", "track_c"])
+        self.assertEqual(found(status="mismatch"), ["track_c"])
+
+    @override_settings(CONVERSION_TRACE_MAX_INDEXED=2)
+    def test_index_is_bounded(self):
+        for number in range(4):
+            self.tracker._create_trace(f"track_{number}", number, 1, "button_click")
+        self.assertEqual(len(self.tracker.find_tracking_data(limit=10)), 2)
+
+    def test_concurrent_creates_are_all_indexed(self):
+        store = CacheTraceStore()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda n: store.create(f"track_{n}", {"mcq_id": n}, time.time()), range(40)))
+        self.assertEqual(len(store.query(limit=100)), 40)
+
+
+def _redis_client():
+    try:
+        client = redis.Redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/0"))
+        client.ping()
+    except redis.RedisError:
+        return None
+    return client
+
+
+@skipUnless(_redis_client(), "needs a Redis server at REDIS_URL")
+class RedisTraceStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.client = _redis_client()
+        self.prefix = f"convtrace-test-{uuid.uuid4().hex}"
+        self.store = RedisTraceStore(self.client, prefix=self.prefix)
+        self.addCleanup(lambda: [self.client.delete(key) for key in self.client.scan_iter(f"{self.prefix}:*")])
+
+    def test_steps_statuses_and_indexes(self):
+        now = time.time()
+        self.store.create("track_a", {"mcq_id": 1, "user_id": 10}, now - 1)
+        self.store.create("track_b", {"mcq_id": 2, "user_id": 10}, now)
+        self.assertTrue(self.store.append_step("track_a", {"step_type": "TRACKING_START"}))
+        self.assertFalse(self.store.append_step("track_missing", {"step_type": "TRACKING_START"}))
+        self.store.update_status("track_a", add=["error"], remove=["incomplete"])
+        self.assertEqual(self.store.observe_mcq("track_a", 1), 1)
+        self.assertEqual(self.store.observe_mcq("track_a", 2), 2)
+
+        self.assertEqual(self.store.query(), ["track_b", "track_a"])
+        self.assertEqual(self.store.query(user_id=10, status="error"), ["track_a"])
+        self.assertEqual(self.store.query(status="incomplete"), ["track_b"])
+        trace = self.store.get("track_a")
+        self.assertEqual((trace["mcq_id"], trace["status"]), (1, "error"))
+        self.assertEqual(trace["steps"], [{"step_type": "TRACKING_START"}])
+
+    @override_settings(CONVERSION_TRACE_MAX_INDEXED=2)
+    def test_index_is_bounded(self):
+        for number in range(4):
+            self.store.create(f"track_{number}", {"mcq_id": number}, time.time() + number)
+        self.assertEqual(self.store.query(limit=10), ["track_3", "track_2"])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TrackingDebugViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username="staff", password="pass1234", is_staff=True)
+        self.client = Client()
+        assert self.client.login(username="staff", password="pass1234")
+        self.tracker = CaseConversionTracker()
+
+    def test_search_and_recent_use_indexes(self):
+        first = self.tracker.start_conversion_tracking(5, self.staff.id)
+        self.tracker.log_error(first, "GENERATION", "boom")
+        self.tracker._create_trace("track_other", 6, self.staff.id, "button_click")
+
+        # LocMemCache has no keys(): these only work when served from the indexes
+        response = self.client.get(reverse("search_tracking_data"), {"mcq_id": 5, "status": "error"})
+        recent = self.client.get(reverse("recent_tracking_data"))
+        live = self.client.get(reverse("live_tracking_data", args=[6]))
+
+        tracking = response.json()["tracking_data"]
+        self.assertEqual([t["tracking_id"] for t in tracking], [first])
+        self.assertIn("potential_issues", tracking[0])
+        self.assertEqual(len(recent.json()["tracking_data"]), 2)
+        self.assertEqual(live.json()["active_tracking"]["tracking_id"], "track_other")
+
+    def test_search_rejects_unknown_status(self):
+        response = self.client.get(reverse("search_tracking_data"), {"status": "bogus"})
+        self.assertEqual(response.status_code, 400)
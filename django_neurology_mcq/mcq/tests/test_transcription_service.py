@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from mcq.services.transcription_service import (
+    MAX_STREAM_SEGMENTS,
+    StubTranscriptionBackend,
+    TranscriptionError,
+    TranscriptionService,
+    extension_for_mime,
+    spool_upload,
+)
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+STUB_BACKEND = "mcq.services.transcription_service.StubTranscriptionBackend"
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TRANSCRIPTION_BACKEND=STUB_BACKEND)
+class TranscriptionServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.service = TranscriptionService(backend=StubTranscriptionBackend())
+
+    def test_extension_for_mime(self):
+        self.assertEqual(extension_for_mime("audio/ogg;codecs=opus"), ".ogg")
+        self.assertEqual(extension_for_mime("audio/mp4"), ".m4a")
+        self.assertEqual(extension_for_mime(None), ".webm")
+
+    def test_spool_stays_in_memory_below_threshold(self):
+        upload = SimpleUploadedFile("clip.webm", b"x" * 1024, content_type="audio/webm")
+        buffer = spool_upload(upload, max_memory_bytes=4096)
+        self.assertFalse(buffer._rolled)
+        self.assertEqual(len(buffer.read()), 1024)
+
+    def test_segments_assemble_in_sequence_order(self):
+        self.service.record_segment(1, "abc", 1, "second part")
+        result = self.service.record_segment(1, "abc", 0, "first part")
+        self.assertEqual(result.transcript, "first part second part")
+        self.assertEqual(self.service.transcript_for_stream(1, "abc"), "first part second part")
+        self.assertEqual(self.service.transcript_for_stream(2, "abc"), "")
+
+    def test_concurrent_segments_are_all_kept(self):
+        sequences = range(40)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda seq: self.service.record_segment(1, "abc", seq, f"part{seq}"), sequences))
+        self.assertEqual(self.service.transcript_for_stream(1, "abc"), " ".join(f"part{seq}" for seq in sequences))
+        with self.assertRaises(TranscriptionError):
+            self.service.record_segment(1, "abc", MAX_STREAM_SEGMENTS, "too far")
+
+    def test_run_job_records_segment_and_status(self):
+        state = self.service.run_job(
+            "job-1",
+            {"user_id": 7, "audio_b64": "aGVsbG8=", "mime_type": "audio/webm", "stream_id": "s", "sequence": 0},
+        )
+        self.assertEqual(state["status"], "ready")
+        self.assertEqual(state["result"]["transcript"], "stub transcript of 5 bytes")
+        self.assertIsNone(self.service.job_status("job-1", user_id=8))
+        self.assertEqual(self.service.job_status("job-1", user_id=7)["status"], "ready")
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TRANSCRIPTION_BACKEND=STUB_BACKEND)
+class TranscribeAudioViewTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username="learner", password="pass1234")
+        self.client = Client()
+        assert self.client.login(username="learner", password="pass1234")
+        self.url = reverse("transcribe_audio_enhanced")
+
+    def _audio(self, size=32):
+        return SimpleUploadedFile("recording.webm", b"a" * size, content_type="audio/webm")
+
+    def test_whole_recording(self):
+        response = self.client.post(self.url, {"audio": self._audio()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["text"], "stub transcript of 32 bytes")
+
+    def test_segment_returns_running_transcript(self):
+        self.client.post(self.url, {"audio": self._audio(4), "stream_id": "rec-1", "sequence": 0})
+        response = self.client.post(
+            self.url, {"audio": self._audio(6), "stream_id": "rec-1", "sequence": 1, "final": "1"}
+        )
+        body = response.json()
+        self.assertEqual(body["text"], "stub transcript of 6 bytes")
+        self.assertEqual(body["transcript"], "stub transcript of 4 bytes stub transcript of 6 bytes")
+        self.assertTrue(body["final"])
+
+    def test_async_mode_queues_job(self):
+        with patch("mcq.tasks.run_transcription_job.delay") as delay:
+            response = self.client.post(self.url, {"audio": self._audio(), "async": "1"})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        delay.assert_called_once()
+        status = self.client.get(reverse("transcription_job_status", args=[job_id]))
+        self.assertEqual(status.json()["status"], "pending")
@@ -1,10 +1,11 @@
 from django.urls import path
-from . import views
+from . import views, ai_stream_views
 # Import enhanced version from case_bot_enhanced
 from .case_bot_enhanced import (
     case_based_learning_enhanced as case_based_learning, 
     neurology_bot_enhanced as neurology_bot, 
-    transcribe_audio_enhanced as transcribe_audio
+    transcribe_audio_enhanced as transcribe_audio,
+    transcription_job_status,
 )
 from .high_yield_views import high_yield_home, high_yield_specialty, high_yield_topic
 from django.contrib.admin.views.decorators import staff_member_required
@@ -34,7 +35,14 @@ urlpatterns = [
     path('mcq/<int:mcq_id>/ask_gpt/', views.ask_gpt, name='ask_gpt'),
     path('mcq/<int:mcq_id>/ask_gpt_async/', views.ask_gpt_async, name='ask_gpt_async'),
     path('mcq/ai/jobs/<uuid:job_id>/', views.ai_job_status, name='ai_job_status'),
+    # Server-sent event streams of AI output
+    path('mcq/<int:mcq_id>/ask_gpt/stream/', ai_stream_views.ask_gpt_stream, name='ask_gpt_stream'),
+    path('mcq/<int:mcq_id>/reasoning_coach/stream/', ai_stream_views.reasoning_coach_stream, name='reasoning_coach_stream'),
+    path('mcq/<int:mcq_id>/explanation/stream/', ai_stream_views.explanation_stream, name='explanation_stream'),
+    path('mcq/<int:mcq_id>/ai/edit/explanation/stream/', ai_stream_views.ai_edit_explanation_stream, name='ai_edit_explanation_stream'),
+    path('smart_practice/', views.smart_practice, name='smart_practice'),
     path('review_flashcards/', views.review_flashcards, name='review_flashcards'),
+    path('review_flashcards/submit/', views.submit_flashcard_reviews, name='submit_flashcard_reviews'),
     path('review_bookmarked/', views.review_bookmarked, name='review_bookmarked'),
     path('diagnostics/', views.diagnostics_view, name='diagnostics'),
     path('import/', views.import_mcqs_form, name='import_mcqs_form'),
@@ -78,6 +86,7 @@ urlpatterns = [
     path('api/neurology-bot-enhanced/', neurology_bot, name='neurology_bot_enhanced'),
     path('api/transcribe-audio/', transcribe_audio, name='transcribe_audio'),
     path('api/transcribe-audio-enhanced/', transcribe_audio, name='transcribe_audio_enhanced'),
+    path('api/transcribe-audio/jobs/<uuid:job_id>/', transcription_job_status, name='transcription_job_status'),
     
     # Case Session Management URLs
     path('api/case-sessions/', views.list_case_sessions, name='list_case_sessions'),
@@ -121,6 +130,8 @@ urlpatterns = [
     
     # Admin Debug Console URLs (Staff only)
     path('admin/debug/', views.admin_debug_console, name='admin_debug_console'),
+    path('admin/debug/performance/', views.admin_performance_dashboard, name='admin_performance_dashboard'),
+    path('admin/debug/metrics/', views.performance_metrics, name='performance_metrics'),
     path('admin/debug/session-integrity/', views.debug_session_integrity, name='debug_session_integrity'),
     path('admin/debug/clear-cache/', views.debug_clear_session_cache, name='debug_clear_session_cache'),
     path('admin/debug/trace-mcq/<int:mcq_id>/', views.debug_trace_mcq_conversion, name='debug_trace_mcq_conversion'),
@@ -4,6 +4,7 @@ from .case_bot_enhanced import (
     case_based_learning_enhanced,
     neurology_bot_enhanced,
     transcribe_audio_enhanced,
+    transcription_job_status,
 )
 
 case_based_learning = case_based_learning_enhanced
@@ -33,7 +34,9 @@ urlpatterns = [
     path('mcq/<int:mcq_id>/new_options/', views.new_options_view, name='new_options'),
     # Removed verify_answer endpoint
     path('mcq/<int:mcq_id>/ask_gpt/', views.ask_gpt, name='ask_gpt'),
+    path('smart_practice/', views.smart_practice, name='smart_practice'),
     path('review_flashcards/', views.review_flashcards, name='review_flashcards'),
+    path('review_flashcards/submit/', views.submit_flashcard_reviews, name='submit_flashcard_reviews'),
     path('review_bookmarked/', views.review_bookmarked, name='review_bookmarked'),
     path('diagnostics/', views.diagnostics_view, name='diagnostics'),
     path('import/', views.import_mcqs_form, name='import_mcqs_form'),
@@ -71,6 +74,7 @@ urlpatterns = [
     path('case-based-learning-enhanced/', case_based_learning_enhanced, name='case_based_learning_enhanced'),
     path('api/neurology-bot-enhanced/', neurology_bot_enhanced, name='neurology_bot_enhanced'),
     path('api/transcribe-audio-enhanced/', transcribe_audio_enhanced, name='transcribe_audio_enhanced'),
+    path('api/transcribe-audio/jobs/<uuid:job_id>/', transcription_job_status, name='transcription_job_status'),
     
     # High-Yield Reviews URLs
     path('high-yield/', high_yield_home, name='high_yield_home'),
@@ -3,12 +3,14 @@ Views for the MCQ application.
 Optimized views for better performance and maintainability.
 """
 
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.http import JsonResponse, HttpResponse, Http404
 from django.contrib import messages
 import csv
+from typing import Any, Dict
 from django.contrib.auth import login, logout, authenticate
 from django.db.models import Count, Q
 from django.utils import timezone
@@ -20,6 +22,8 @@ from django.core.exceptions import PermissionDenied
 from .forms import CaseInsensitiveUserCreationForm, CaseInsensitiveAuthenticationForm, QuestionReportForm
 from .services import MCQService, BookmarkService, NoteService, FlashcardService, ReasoningService
 from .services.case_learning_service import case_conversation_service
+from .db_router import allows_replica_reads
+from .exam_utils import canonical_exam_type, parse_exam_year
 
 from datetime import timedelta
 import json
@@ -28,6 +32,7 @@ import logging
 
 from .models import (
     MCQ,
+    MCQOption,
     Bookmark,
     Flashcard,
     Note,
@@ -66,25 +71,46 @@ def staff_required_json(view_func):
     """
     from functools import wraps
 
-    @wraps(view_func)
-    def wrapped_view(request, *args, **kwargs):
+    def denied(user):
         # Check authentication first
-        if not request.user.is_authenticated:
+        if not user.is_authenticated:
             logger.warning(f"Unauthenticated request to {view_func.__name__}")
             return JsonResponse({'error': 'Authentication required. Please log in.'}, status=401)
-        if not request.user.is_staff:
-            logger.warning(f"Non-staff user {request.user.username} attempted to access {view_func.__name__}")
+        if not user.is_staff:
+            logger.warning(f"Non-staff user {user.username} attempted to access {view_func.__name__}")
             return JsonResponse({'error': 'Staff permissions required.'}, status=403)
+        return None
+
+    def server_error(e):
+        logger.error(f"Error in {view_func.__name__}: {str(e)}", exc_info=True)
+        return JsonResponse({
+            'error': f'Server error: {str(e)}',
+            'success': False
+        }, status=500)
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapped_view(request, *args, **kwargs):
+            response = denied(await request.auser())
+            if response is not None:
+                return response
+            try:
+                return await view_func(request, *args, **kwargs)
+            except Exception as e:
+                return server_error(e)
+        return async_wrapped_view
+
+    @wraps(view_func)
+    def wrapped_view(request, *args, **kwargs):
+        response = denied(request.user)
+        if response is not None:
+            return response
 
         # Wrap the view execution in try-except to catch all errors
         try:
             return view_func(request, *args, **kwargs)
         except Exception as e:
-            logger.error(f"Error in {view_func.__name__}: {str(e)}", exc_info=True)
-            return JsonResponse({
-                'error': f'Server error: {str(e)}',
-                'success': False
-            }, status=500)
+            return server_error(e)
     return wrapped_view
 
 # Subspecialty definitions
@@ -231,6 +257,7 @@ def logout_view(request):
     return redirect('login')
 
 @login_required
+@allows_replica_reads
 def dashboard(request):
     """
     User dashboard showing MCQ statistics, flashcards due, and bookmarks.
@@ -257,31 +284,13 @@ def dashboard(request):
         hidden_mcqs = get_hidden_mcqs(request.user)
         
         # Get MCQs for the selected subspecialties, excluding hidden ones
-        from django.db.models import Q
         query = MCQ.objects.filter(subspecialty__in=subspecialties).exclude(id__in=hidden_mcqs)
         
         # If no subspecialties selected, use all
         if not subspecialties:
             query = MCQ.objects.all().exclude(id__in=hidden_mcqs)
         
-        # Filter by exam type if not 'mixed'
-        if exam_type != 'mixed':
-            query = query.filter(Q(exam_type=exam_type) | Q(exam_type__isnull=True))
-
-        # Apply year range filter if provided
-        if start_year and end_year:
-            try:
-                year_filter = Q(
-                    # Include MCQs where year is in range
-                    Q(exam_year__gte=int(start_year), exam_year__lte=int(end_year)) |
-                    # OR include MCQs where year is NULL
-                    Q(exam_year__isnull=True)
-                )
-                query = query.filter(year_filter)
-                logger.info(f"Filtering MCQs by year range: {start_year}-{end_year}")
-            except (ValueError, TypeError):
-                # Handle case where start_year or end_year cannot be converted to int
-                logger.warning(f"Invalid year range: {start_year}-{end_year}")
+        query = apply_exam_filters(query, exam_type, start_year, end_year)
         
         # Randomly select MCQs up to the requested count
         import random
@@ -301,15 +310,9 @@ def dashboard(request):
                 # Randomly select MCQs up to the requested count
                 selected_mcqs = random.sample(all_mcqs, mcq_count)
         
-        # Process MCQ options for each selected MCQ
+        # Templates iterate options.items; stored options are canonical dicts
         for mcq in selected_mcqs:
-            if mcq.options and isinstance(mcq.options, str):
-                try:
-                    import json
-                    mcq.options = json.loads(mcq.options)
-                except json.JSONDecodeError:
-                    # If options can't be parsed as JSON, keep as is
-                    pass
+            mcq.options = mcq.get_options_dict()
         
         # Save exam configuration in session
         request.session['mock_exam'] = {
@@ -395,7 +398,8 @@ def dashboard(request):
             archived=False,
             completed=False,
         )
-        .order_by('-last_activity')[:5]
+        .order_by('-last_activity')
+        .only('session_id', 'specialty', 'difficulty', 'state', 'last_activity', 'case_data')[:5]
     )
 
     recent_case_sessions = []
@@ -729,12 +733,11 @@ def submit_exam(request):
     time_limit = exam_config.get('time_limit', 60)
     
     # Calculate elapsed time
-    from datetime import datetime
-    import pytz
+    from datetime import datetime, timezone as dt_timezone
     
     start_datetime = datetime.fromisoformat(start_time)
     if start_datetime.tzinfo is None:
-        start_datetime = pytz.UTC.localize(start_datetime)
+        start_datetime = start_datetime.replace(tzinfo=dt_timezone.utc)
     
     end_datetime = timezone.now()
     elapsed_time = (end_datetime - start_datetime).total_seconds() / 60  # minutes
@@ -770,6 +773,11 @@ def submit_exam(request):
             'is_answered': bool(user_answer)
         })
     
+    _record_mastery(
+        request.user,
+        [(result['mcq'].id, result['is_correct']) for result in results if result['is_answered']],
+    )
+
     # Calculate percentage score
     score_percentage = round((correct_count / len(mcqs)) * 100, 1) if mcqs else 0
     
@@ -970,7 +978,21 @@ def debug_reasoning_session(request, session_id):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+def _search_word_filter(word):
+    """Match ``word`` in question text, metadata, explanation or option values (not keys)."""
+    return (
+        Q(question_text__icontains=word)
+        | Q(question_number__icontains=word)
+        | Q(exam_year__icontains=word)
+        | Q(exam_type__icontains=word)
+        | Q(subspecialty__icontains=word)
+        | Q(source_file__icontains=word)
+        | Q(explanation__icontains=word)
+        | Q(id__in=MCQOption.objects.filter(text__icontains=word).values('mcq_id'))
+    )
+
 @login_required
+@allows_replica_reads
 def search(request):
     """
     Search MCQs by query string with improved accuracy.
@@ -1000,67 +1022,14 @@ def search(request):
 
     logger.info(f"Performing search for '{query}' with words: {search_words}")
 
-    # Get all MCQs excluding hidden ones (limited to 1000 for performance)
-    all_mcqs = MCQ.objects.all().exclude(id__in=hidden_mcqs).order_by('-id')[:1000]
-
-    # Perform a more accurate search
-    matching_mcqs = []
-
-    for mcq in all_mcqs:
-        # Create searchable text from question and explanation
-        searchable_parts = [mcq.question_text.lower()]
-
-        # Include metadata fields so users can search by question number, exam year, etc.
-        if mcq.question_number:
-            searchable_parts.append(str(mcq.question_number).lower())
-        if mcq.exam_year:
-            searchable_parts.append(str(mcq.exam_year).lower())
-        if mcq.exam_type:
-            searchable_parts.append(str(mcq.exam_type).lower())
-        if mcq.subspecialty:
-            searchable_parts.append(str(mcq.subspecialty).lower())
-        if mcq.source_file:
-            searchable_parts.append(str(mcq.source_file).lower())
-
-        # Process options - get the option values (not keys)
-        if mcq.options:
-            # Handle both dict and string JSON formats
-            options_dict = {}
-            if isinstance(mcq.options, dict):
-                options_dict = mcq.options
-            elif isinstance(mcq.options, str):
-                try:
-                    import json
-                    options_dict = json.loads(mcq.options)
-                except:
-                    # If parsing fails, try using the raw string
-                    searchable_parts.append(mcq.options.lower())
-                    options_dict = {}
-
-            # Add each option value to searchable parts
-            for option_value in options_dict.values():
-                if isinstance(option_value, str):
-                    searchable_parts.append(option_value.lower())
+    # Every word must match at least one field; the database does the matching
+    # (trigram indexes cover question and option text on PostgreSQL)
+    matching_mcqs = MCQ.objects.exclude(id__in=hidden_mcqs)
+    for word in search_words:
+        matching_mcqs = matching_mcqs.filter(_search_word_filter(word))
 
-        # Add explanation if it exists
-        if mcq.explanation:
-            searchable_parts.append(mcq.explanation.lower())
-
-        # Combine all parts for searching
-        searchable_text = " ".join(searchable_parts)
-
-        # Check if all search words are in the searchable text
-        all_words_found = True
-        for word in search_words:
-            if word.lower() not in searchable_text:
-                all_words_found = False
-                break
-
-        if all_words_found:
-            matching_mcqs.append(mcq)
-
-    # Sort results by ID (newest first) and limit to 100
-    results = matching_mcqs[:100]
+    # Newest first, limited to 100
+    results = list(matching_mcqs.order_by('-id')[:100])
 
     result_count = len(results)
     logger.info(f"Search query '{query}' by {request.user.username} returned {result_count} results")
@@ -1072,6 +1041,7 @@ def search(request):
     })
 
 @login_required
+@allows_replica_reads
 def subspecialty_view(request, subspecialty):
     """
     Display MCQs for a specific subspecialty with optional filtering.
@@ -1151,58 +1121,34 @@ def get_filtered_mcqs(subspecialty, exam_type=None, start_year=None, end_year=No
     if hidden_mcqs is not None:
         query = query.exclude(id__in=hidden_mcqs)
     
-    # Apply exam type filter if provided
-    if exam_type and exam_type != 'All Types':
-        # Map old exam types to new ones
-        exam_type_mapping = {
-            'Promotion': 'Basic level',
-            'Part I': 'Advanced', 
-            'Part II': 'Board-level',
-            'Basic level': 'Basic level',
-            'Advanced': 'Advanced',
-            'Board-level': 'Board-level'
-        }
-        
-        # Get the standardized exam type
-        standardized_type = exam_type_mapping.get(exam_type, exam_type)
-        
-        # Get old name for backward compatibility
-        reverse_mapping = {
-            'Basic level': 'Promotion',
-            'Advanced': 'Part I',
-            'Board-level': 'Part II'
-        }
-        old_type = reverse_mapping.get(standardized_type, '')
-        
-        # For exam_type, include matching values (both old and new names) and NULL values
-        from django.db.models import Q
-        if old_type:
-            query = query.filter(
-                Q(exam_type=standardized_type) | 
-                Q(exam_type=old_type) | 
-                Q(exam_type__isnull=True)
-            )
-        else:
-            query = query.filter(Q(exam_type=exam_type) | Q(exam_type__isnull=True))
-    
-    # Apply year range filter if provided, but include NULL values
-    if start_year and end_year:
-        try:
-            from django.db.models import Q
-            year_filter = Q(
-                # Include MCQs where year is in range
-                Q(exam_year__gte=int(start_year), exam_year__lte=int(end_year)) |
-                # OR include MCQs where year is NULL
-                Q(exam_year__isnull=True)
-            )
-            query = query.filter(year_filter)
-        except (ValueError, TypeError):
-            # Handle case where start_year or end_year cannot be converted to int
-            logger.warning(f"Invalid year range: {start_year}-{end_year}")
+    query = apply_exam_filters(query, exam_type, start_year, end_year)
     
     # Order by ID for consistent ordering
     return query.order_by('id')
 
+def apply_exam_filters(query, exam_type=None, start_year=None, end_year=None):
+    """
+    Filter an MCQ queryset by exam type and year range.
+
+    Legacy exam type names are mapped to the canonical one (stored values are
+    canonical since migration 0029). MCQs without a type or year are kept, as
+    before. 'All Types' and 'mixed' mean no type filter; an unparseable year
+    range is ignored.
+    """
+    from django.db.models import Q
+
+    if exam_type and exam_type not in ('All Types', 'mixed'):
+        query = query.filter(Q(exam_type=canonical_exam_type(exam_type)) | Q(exam_type__isnull=True))
+
+    if start_year and end_year:
+        start, end = parse_exam_year(start_year), parse_exam_year(end_year)
+        if start is None or end is None:
+            logger.warning(f"Invalid year range: {start_year}-{end_year}")
+        else:
+            query = query.filter(Q(exam_year__range=(start, end)) | Q(exam_year__isnull=True))
+
+    return query
+
 @login_required
 def view_mcq(request, mcq_id):
     """
@@ -1303,19 +1249,8 @@ def view_mcq(request, mcq_id):
     except AttributeError:
         initial_explanation_text = getattr(mcq, "unified_explanation", "") or getattr(mcq, "explanation", "") or ""
 
-    # Normalize MCQ options for template rendering (support dict and list formats)
-    option_pairs = []
-    raw_options = getattr(mcq, 'options', None)
-    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-
-    if isinstance(raw_options, dict):
-        for idx, (key, value) in enumerate(raw_options.items()):
-            letter = str(key).strip() or (letters[idx] if idx < len(letters) else f"Option {idx + 1}")
-            option_pairs.append((letter, value))
-    elif isinstance(raw_options, list):
-        for idx, value in enumerate(raw_options):
-            letter = letters[idx] if idx < len(letters) else f"Option {idx + 1}"
-            option_pairs.append((letter, value))
+    # (letter, text) pairs in display order, set by ensure_options_decoded
+    option_pairs = list(mcq.option_map.items())
 
     context = {
         'mcq': mcq,
@@ -1331,10 +1266,33 @@ def view_mcq(request, mcq_id):
         'SUBSPECIALTIES': SUBSPECIALTIES,  # Add the subspecialties list to the context
         'is_hidden': is_hidden,  # Add is_hidden to indicate if the MCQ is hidden for this user
         'option_pairs': option_pairs,
+        'related_mcqs': _related_questions(mcq),
     }
     
     return render(request, 'mcq/mcq_detail.html', context)
 
+
+def _related_questions(mcq, limit=5):
+    """Most similar MCQs from the local embedding index (empty on any index failure)."""
+    try:
+        from .services.embeddings import related_mcqs
+
+        ranked = related_mcqs(mcq, k=limit)
+        if not ranked:
+            return []
+        found = MCQ.objects.only('id', 'question_number', 'question_text', 'subspecialty').in_bulk(
+            [mcq_id for mcq_id, _ in ranked]
+        )
+        related = []
+        for mcq_id, score in ranked:
+            if mcq_id in found:
+                found[mcq_id].similarity = round(score * 100)
+                related.append(found[mcq_id])
+        return related
+    except Exception as exc:
+        logger.warning(f"Related questions unavailable for MCQ {mcq.id}: {exc}")
+        return []
+
 @login_required
 def test_image_display(request, mcq_id):
     """Test view to debug image display issues"""
@@ -1349,6 +1307,11 @@ def check_answer(request, mcq_id):
     mcq = get_object_or_404(MCQ, id=mcq_id)
     selected_answer = request.POST.get('answer')
     is_correct = selected_answer == mcq.correct_answer
+
+    # Update mastery before logging the incorrect answer so a first-time
+    # seed from history does not count this attempt twice
+    if selected_answer:
+        _record_mastery(request.user, [(mcq.id, is_correct)])
     
     # If the answer is incorrect, store it in the database for "Test My Weakness" feature
     if not is_correct and selected_answer:
@@ -1389,32 +1352,93 @@ def check_answer(request, mcq_id):
         'correct_answer': mcq.correct_answer
     })
 
+def _record_mastery(user, answers):
+    """Feed answers to the adaptive selector; never fails the calling view."""
+    if not answers:
+        return
+    try:
+        from .services.adaptive_selector import adaptive_selector
+        adaptive_selector.record_answers(user, answers)
+    except Exception as e:
+        logger.error(f"Could not update mastery for user {user.pk}: {e}", exc_info=True)
+
+SMART_PRACTICE_RECENT_LIMIT = 50
+
+@login_required
+def smart_practice(request):
+    """
+    Adaptive practice: serve the MCQ that best targets the user's weakest
+    topics, using the mastery estimates kept by the adaptive selector.
+    """
+    from .services.adaptive_selector import adaptive_selector
+
+    subspecialty = request.GET.get('subspecialty') or None
+    recent = request.session.get('smart_practice_recent', [])
+
+    vector, _ = adaptive_selector.load(request.user)
+    mcq_ids = adaptive_selector.select(request.user, exclude_ids=recent, subspecialty=subspecialty, vector=vector)
+    if not mcq_ids and recent:
+        # Everything eligible was seen recently; start the rotation again
+        recent = []
+        mcq_ids = adaptive_selector.select(request.user, subspecialty=subspecialty, vector=vector)
+    if not mcq_ids:
+        messages.info(request, "No questions are available for smart practice.")
+        return redirect('dashboard')
+
+    mcq = get_object_or_404(MCQ, id=mcq_ids[0])
+    request.session['smart_practice_recent'] = (recent + [mcq.id])[-SMART_PRACTICE_RECENT_LIMIT:]
+
+    context = {
+        'mcq': mcq,
+        'options': mcq.get_options_dict(),
+        'weakest_topics': vector.summary(),
+        'subspecialties': adaptive_selector.subspecialties(),
+        'current_subspecialty': subspecialty,
+    }
+    return render(request, 'mcq/smart_practice.html', context)
+
 @login_required
 def review_flashcards(request):
     # Get review type from query params
     review_type = request.GET.get('type', 'today')
     hidden_mcqs = MCQService.get_hidden_mcq_ids(request.user)
-    due_flashcards = FlashcardService.due_flashcards_or_redirect(
-        request, review_type, hidden_mcqs
-    )
-    if due_flashcards is None:
-        return redirect('dashboard')
-
-    flashcard = due_flashcards.first()
-    mcq = flashcard.mcq if flashcard else None
-    if mcq is None:
-        messages.info(request, "No flashcards available for review.")
+    queue = FlashcardService.review_queue(request.user, review_type, hidden_mcqs)
+    if not queue:
+        messages.info(request, queue.empty_message)
         return redirect('dashboard')
 
     context = {
-        'mcq': mcq,
-        'flashcard': flashcard,
-        'flashcards_count': due_flashcards.count(),
+        'flashcards': queue.flashcards,
+        'flashcards_count': queue.total_due,
+        'queue_size': len(queue),
         'review_type': review_type
     }
     
     return render(request, 'mcq/flashcard_review.html', context)
 
+@login_required
+@require_POST
+def submit_flashcard_reviews(request):
+    """Apply a batch of flashcard grades posted by the review page."""
+    try:
+        if request.content_type == 'application/json':
+            payload = json.loads(request.body or '[]')
+        else:
+            payload = json.loads(request.POST.get('reviews') or '[]')
+        if isinstance(payload, dict):
+            payload = payload.get('reviews', [])
+        reviews = [(item['flashcard_id'], item['rating']) for item in payload]
+        result = FlashcardService.record_reviews(request.user, reviews)
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Invalid review payload'}, status=400)
+
+    return JsonResponse({
+        'reviewed': result.reviewed,
+        'algorithm': result.algorithm,
+        'next_review': result.next_review,
+        'skipped': result.skipped,
+    })
+
 @login_required
 def review_bookmarked(request):
     # Check if we're filtering by subspecialty
@@ -1632,16 +1656,18 @@ def create_explanation(request, mcq_id):
         
         # Enqueue Celery task instead of local thread to avoid web dyno time limits
         try:
-            from .tasks import run_ai_job
-            import uuid as _uuid
-            job_id = str(_uuid.uuid4())
-            cache.set(f"ai_job:{job_id}", {'status': 'queued'}, timeout=3600)
-            run_ai_job.delay(job_id, 'generate_explanation', {
-                'mcq_id': mcq_id,
-                'reason': reason,
-                'user_id': request.user.id,
-            })
-            logger.info(f"Queued explanation generation job {job_id} for MCQ #{mcq_id}")
+            from .tasks import run_bulk_ai_job
+            from .services import ai_jobs
+            job = ai_jobs.submit(
+                'generate_explanation',
+                lambda job_id: run_bulk_ai_job.delay(job_id, 'generate_explanation', {
+                    'mcq_id': mcq_id,
+                    'reason': reason,
+                    'user_id': request.user.id,
+                }),
+                params={'mcq_id': mcq_id, 'reason': reason},
+            )
+            logger.info(f"Queued explanation generation job {job.job_id} for MCQ #{mcq_id}")
         except Exception as e:
             logger.error(f"Failed to enqueue explanation generation job: {e}")
         
@@ -2330,7 +2356,7 @@ def new_options_view(request, mcq_id):
 # verify_answer view has been removed
 
 @login_required
-def ask_gpt(request, mcq_id):
+async def ask_gpt(request, mcq_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Only POST requests allowed'})
     
@@ -2339,8 +2365,17 @@ def ask_gpt(request, mcq_id):
     if not question:
         return JsonResponse({'error': 'Question is required'})
     
-    mcq = get_object_or_404(MCQ, id=mcq_id)
-    
+    mcq = await aget_object_or_404(MCQ, id=mcq_id)
+    regenerate = request.POST.get('regenerate') in ('1', 'true')
+
+    # Answers to equivalent questions about this MCQ are served from the cache
+    from .services import ai_pal_cache
+    from .services.async_io import run_blocking
+    if not regenerate:
+        hit = await run_blocking(ai_pal_cache.lookup, mcq, question)
+        if hit is not None:
+            return JsonResponse(hit.as_result())
+
     # Check if OpenAI integration is available
     from .openai_integration import api_key, client
     if not api_key or not client:
@@ -2348,12 +2383,10 @@ def ask_gpt(request, mcq_id):
             'answer': "<div class='alert alert-warning'><h4><i class='bi bi-exclamation-triangle'></i> AI Features Unavailable</h4><p>AI-Pal requires OpenAI API access, which is not currently configured.</p><p>Please contact the administrator to set up the OpenAI API key.</p></div>"
         })
     
-    # Get answer from OpenAI
-    answer = answer_question_about_mcq(mcq, question)
+    # Get answer from OpenAI; the event loop serves other requests meanwhile
+    result = await run_blocking(ai_pal_cache.answer_question, mcq, question, regenerate=True)
     
-    return JsonResponse({
-        'answer': answer
-    })
+    return JsonResponse(result.as_result())
 
 @login_required
 def ask_gpt_async(request, mcq_id):
@@ -2363,24 +2396,53 @@ def ask_gpt_async(request, mcq_id):
     question = request.POST.get('question', '').strip()
     if not question:
         return JsonResponse({'error': 'Question is required'}, status=400)
-    # Create job
-    job_id = str(uuid.uuid4())
-    cache.set(f"ai_job:{job_id}", {'status': 'pending'}, timeout=3600)
-    # Enqueue task
+    regenerate = request.POST.get('regenerate') in ('1', 'true')
+    from .services import ai_jobs, ai_pal_cache
+    mcq = get_object_or_404(MCQ, id=mcq_id)
+
+    # A cached answer is returned with the submission; the job record is
+    # still written so clients that always poll get it too
+    if not regenerate:
+        hit = ai_pal_cache.lookup(mcq, question)
+        if hit is not None:
+            job_id = str(uuid.uuid4())
+            payload = {'status': 'ready', 'result': hit.as_result()}
+            cache.set(f"ai_job:{job_id}", payload, timeout=3600)
+            return JsonResponse({'job_id': job_id, **payload})
+
+    # Enqueue task; an identical question already in flight is joined instead
     try:
         from .tasks import run_ai_job
-        run_ai_job.delay(job_id, 'ask_gpt', {'mcq_id': mcq_id, 'question': question, 'user_id': request.user.id})
+        job = ai_jobs.submit(
+            'ask_gpt',
+            lambda job_id: run_ai_job.delay(job_id, 'ask_gpt', {
+                'mcq_id': mcq_id, 'question': question, 'user_id': request.user.id, 'regenerate': regenerate,
+            }),
+            mcq=mcq,
+            params={'question': ai_pal_cache.normalize_question(question), 'regenerate': regenerate},
+        )
     except Exception as e:
         return JsonResponse({'error': f'Failed to enqueue job: {str(e)}'}, status=500)
-    return JsonResponse({'job_id': job_id, 'status': 'queued'})
+    return JsonResponse(job.as_response())
 
 @login_required
-def ai_job_status(request, job_id):
-    """Return status and result for a background AI job."""
-    data = cache.get(f"ai_job:{job_id}")
+async def ai_job_status(request, job_id):
+    """
+    Return status and result for a background AI job.
+
+    Learner jobs live under ``ai_job:``; staff editor jobs (options editing,
+    agent explanation rewrites) under the tasks' ``ai_agent_job:`` prefix.
+    """
+    from .tasks import _job_cache_key
+
+    data = await cache.aget(f"ai_job:{job_id}")
+    if not data and (await request.auser()).is_staff:
+        data = await cache.aget(_job_cache_key(str(job_id)))
     if not data:
         return JsonResponse({'error': 'Job not found'}, status=404)
-    return JsonResponse(data)
+    response_payload = {'job_id': str(job_id)}
+    response_payload.update(data)
+    return JsonResponse(response_payload)
 
 @login_required
 def diagnostics_view(request):
@@ -2402,6 +2464,11 @@ def diagnostics_view(request):
     
     return render(request, 'mcq/diagnostics.html', context)
 
+def _near_duplicate_note(duplicate_guard):
+    if not duplicate_guard or not duplicate_guard.rejected:
+        return ''
+    return f' {len(duplicate_guard.rejected)} were skipped as near-duplicates.'
+
 # Import form route
 @login_required
 def import_mcqs_form(request):
@@ -2410,6 +2477,12 @@ def import_mcqs_form(request):
         messages.error(request, "You don't have permission to access this page.")
         return redirect('dashboard')
     if request.method == 'POST':
+        # Skip reworded copies of questions already in the bank unless asked not to
+        duplicate_guard = None
+        if not request.POST.get('allow_near_duplicates'):
+            from .services.near_duplicates import DuplicateGuard
+            duplicate_guard = DuplicateGuard()
+
         # Handle JSON file import
         if request.FILES.get('json_file'):
             json_file = request.FILES['json_file']
@@ -2429,6 +2502,11 @@ def import_mcqs_form(request):
                     ).exists():
                         existing_count += 1
                         continue
+
+                    if duplicate_guard and duplicate_guard.check(
+                        mcq_data.get('question_text', ''), mcq_data.get('options')
+                    ):
+                        continue
                     
                     # Create the MCQ
                     MCQ.objects.create(
@@ -2442,9 +2520,11 @@ def import_mcqs_form(request):
                         exam_year=mcq_data.get('exam_year'),
                         explanation=mcq_data.get('explanation')
                     )
+                    if duplicate_guard:
+                        duplicate_guard.accept(mcq_data.get('question_text', ''), mcq_data.get('options'))
                     imported_count += 1
                 
-                messages.success(request, f'Successfully imported {imported_count} MCQs. {existing_count} were already in the database.')
+                messages.success(request, f'Successfully imported {imported_count} MCQs. {existing_count} were already in the database.{_near_duplicate_note(duplicate_guard)}')
                 return redirect('dashboard')
                 
             except Exception as e:
@@ -2654,6 +2734,9 @@ def import_mcqs_form(request):
                     if MCQ.objects.filter(question_number=question_number, question_text=question_text).exists():
                         existing_count += 1
                         continue
+
+                    if duplicate_guard and duplicate_guard.check(question_text, options):
+                        continue
                     
                     # Convert options to JSON
                     options_json = json.dumps(options)
@@ -2671,9 +2754,11 @@ def import_mcqs_form(request):
                         exam_year=exam_year,
                         explanation="" # No classification reason saved
                     )
+                    if duplicate_guard:
+                        duplicate_guard.accept(question_text, options)
                     imported_count += 1
                 
-                messages.success(request, f'Successfully imported {imported_count} MCQs. {existing_count} were already in the database.')
+                messages.success(request, f'Successfully imported {imported_count} MCQs. {existing_count} were already in the database.{_near_duplicate_note(duplicate_guard)}')
                 return redirect('dashboard')
                 
             except Exception as e:
@@ -3061,16 +3146,19 @@ def generate_test_question_async(request, mcq_id):
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     guidance_content = request.POST.get('guidance_content', '')
-    job_id = str(uuid.uuid4())
-    cache.set(f"ai_job:{job_id}", {'status': 'pending'}, timeout=3600)
+    from .services import ai_jobs
     try:
         from .tasks import run_ai_job
-        run_ai_job.delay(job_id, 'generate_test_question', {
-            'mcq_id': mcq_id,
-            'guidance_content': guidance_content,
-            'user_id': request.user.id,
-        })
-        return JsonResponse({'job_id': job_id, 'status': 'queued'})
+        job = ai_jobs.submit(
+            'generate_test_question',
+            lambda job_id: run_ai_job.delay(job_id, 'generate_test_question', {
+                'mcq_id': mcq_id,
+                'guidance_content': guidance_content,
+                'user_id': request.user.id,
+            }),
+            params={'mcq_id': mcq_id, 'guidance_content': guidance_content},
+        )
+        return JsonResponse(job.as_response())
     except Exception as e:
         return JsonResponse({'error': f'Failed to enqueue: {str(e)}'}, status=500)
 
@@ -3088,20 +3176,28 @@ def analyze_test_reasoning_async(request, mcq_id):
     options_dict = mcq.get_options_dict()
     options_text = "\n".join(f"{k}. {v}" for k, v in options_dict.items())
 
-    job_id = str(uuid.uuid4())
-    cache.set(f"ai_job:{job_id}", {'status': 'pending'}, timeout=3600)
+    from .services import ai_jobs
     try:
         from .tasks import run_ai_job
-        run_ai_job.delay(job_id, 'analyze_test_reasoning', {
-            'mcq_id': mcq_id,
-            'question_text': mcq.question_text,
-            'options_text': options_text,
-            'correct_answer': correct_answer or mcq.correct_answer,
-            'user_reasoning': user_reasoning,
-            'selected_answer': selected_answer,
-            'user_id': request.user.id,
-        })
-        return JsonResponse({'job_id': job_id, 'status': 'queued'})
+        job = ai_jobs.submit(
+            'analyze_test_reasoning',
+            lambda job_id: run_ai_job.delay(job_id, 'analyze_test_reasoning', {
+                'mcq_id': mcq_id,
+                'question_text': mcq.question_text,
+                'options_text': options_text,
+                'correct_answer': correct_answer or mcq.correct_answer,
+                'user_reasoning': user_reasoning,
+                'selected_answer': selected_answer,
+                'user_id': request.user.id,
+            }),
+            mcq=mcq,
+            params={
+                'correct_answer': correct_answer,
+                'user_reasoning': user_reasoning,
+                'selected_answer': selected_answer,
+            },
+        )
+        return JsonResponse(job.as_response())
     except Exception as e:
         return JsonResponse({'error': f'Failed to enqueue: {str(e)}'}, status=500)
     
@@ -3604,20 +3700,14 @@ def import_mcqs_batch(request):
 def list_case_sessions(request):
     """List all active AI-driven case sessions for the current user."""
 
-    sessions = (
-        PersistentCaseLearningSession.objects.filter(
-            user=request.user, archived=False, completed=False
-        )
-        .order_by("-last_activity")
-    )
+    sessions = case_conversation_service.repository.list_sessions_for_user(request.user.id)
 
     def _serialize(session: PersistentCaseLearningSession) -> Dict[str, Any]:
-        meta = session.case_data or {}
         return {
             "session_id": session.session_id,
             "specialty": session.specialty,
             "difficulty": session.difficulty,
-            "state_label": meta.get("phase", "CONVERSATION"),
+            "state_label": session.phase or "CONVERSATION",
             "last_activity": session.last_activity.isoformat(),
             "created_at": session.created_at.isoformat(),
         }
@@ -4093,7 +4183,6 @@ def ai_edit_mcq_options(request, mcq_id):
     Supports both async mode (for existing frontend) and direct mode.
     """
     import logging
-    import uuid
     from django.core.cache import cache
 
     logger = logging.getLogger(__name__)
@@ -4132,68 +4221,71 @@ def ai_edit_mcq_options(request, mcq_id):
 
         # If frontend expects async behavior, simulate it
         if use_async:
-            # Generate a job ID
-            job_id = str(uuid.uuid4())
+            from .services import ai_jobs
 
-            # Do the work synchronously but store result in cache
-            try:
-                # Get AI-improved options (direct call)
-                improved_options = ai_edit_options_direct(mcq, mode, custom_instructions)
-
-                # Check for auto-regenerate explanations
-                auto_regenerate = data.get('auto_regenerate_explanations', True)
-                improved_explanations = None
+            auto_regenerate = data.get('auto_regenerate_explanations', True)
 
-                if auto_regenerate:
-                    from .openai_integration import regenerate_unified_explanation
-                    try:
-                        # Update MCQ options temporarily for explanation generation
-                        original_options = mcq.options
-                        mcq.options = json.dumps(improved_options)
-
-                        improved_explanations = regenerate_unified_explanation(mcq)
-
-                        # Restore original options
-                        mcq.options = original_options
-
-                        logger.info(f"Regenerated explanations for MCQ #{mcq_id}")
-                    except Exception as e:
-                        logger.warning(f"Failed to regenerate explanations: {e}")
-
-                # Store the result in cache for the job endpoint to retrieve
-                result = {
-                    'status': 'completed',
-                    'result': {
-                        'improved_options': improved_options,
-                        'improved_explanations': improved_explanations,
-                        'message': f'AI has improved options using mode: {mode}'
+            # Do the work synchronously but store result in cache
+            def run(job_id):
+                try:
+                    # Get AI-improved options (direct call)
+                    improved_options = ai_edit_options_direct(mcq, mode, custom_instructions)
+
+                    # Check for auto-regenerate explanations
+                    improved_explanations = None
+
+                    if auto_regenerate:
+                        from .openai_integration import regenerate_unified_explanation
+                        try:
+                            # Update MCQ options temporarily for explanation generation
+                            original_options = mcq.options
+                            mcq.options = json.dumps(improved_options)
+
+                            improved_explanations = regenerate_unified_explanation(mcq)
+
+                            # Restore original options
+                            mcq.options = original_options
+
+                            logger.info(f"Regenerated explanations for MCQ #{mcq_id}")
+                        except Exception as e:
+                            logger.warning(f"Failed to regenerate explanations: {e}")
+
+                    # Store the result in cache for the job endpoint to retrieve
+                    result = {
+                        'status': 'completed',
+                        'result': {
+                            'improved_options': improved_options,
+                            'improved_explanations': improved_explanations,
+                            'message': f'AI has improved options using mode: {mode}'
+                        }
                     }
-                }
-                cache.set(f'ai_job:{job_id}', result, timeout=300)  # Cache for 5 minutes
-
-                logger.info(f"AI edit options successful for MCQ #{mcq_id}, job_id: {job_id}")
+                    cache.set(f'ai_job:{job_id}', result, timeout=300)  # Cache for 5 minutes
 
-                # Return job_id for frontend to poll
-                return JsonResponse({
-                    'success': True,
-                    'job_id': job_id,
-                    'message': 'Options editing job queued'
-                })
+                    logger.info(f"AI edit options successful for MCQ #{mcq_id}, job_id: {job_id}")
 
-            except Exception as e:
-                logger.error(f"Error processing options for MCQ #{mcq_id}: {str(e)}", exc_info=True)
-                # Store error in cache
-                error_result = {
-                    'status': 'failed',
-                    'error': str(e)
-                }
-                cache.set(f'ai_job:{job_id}', error_result, timeout=300)
+                except Exception as e:
+                    logger.error(f"Error processing options for MCQ #{mcq_id}: {str(e)}", exc_info=True)
+                    # Store error in cache
+                    error_result = {
+                        'status': 'failed',
+                        'error': str(e)
+                    }
+                    cache.set(f'ai_job:{job_id}', error_result, timeout=300)
+
+            # A repeated click while the first request is still working joins it
+            job = ai_jobs.submit(
+                'ai_edit_mcq_options',
+                run,
+                mcq=mcq,
+                params={'mode': mode, 'custom_instructions': custom_instructions, 'auto_regenerate': auto_regenerate},
+            )
 
-                return JsonResponse({
-                    'success': True,
-                    'job_id': job_id,
-                    'message': 'Options editing job queued'
-                })
+            # Return job_id for frontend to poll
+            return JsonResponse({
+                'success': True,
+                'job_id': job.job_id,
+                'message': 'Options editing job queued'
+            })
 
         else:
             # Direct mode (not used by current frontend but available)
@@ -4391,10 +4483,8 @@ def regenerate_all_explanations(request, mcq_id):
         # Use async mode if agent SDK is enabled and requested
         if AGENT_ENABLED_DEFAULT and use_async:
             # Queue the task asynchronously
-            import uuid
-            from .tasks import run_explanation_agent_job
-
-            job_id = str(uuid.uuid4())
+            from .services import ai_jobs
+            from .tasks import JOB_CACHE_PREFIX, run_explanation_agent_job
 
             # Get current explanation for passing to task
             current_content = (
@@ -4411,20 +4501,21 @@ def regenerate_all_explanations(request, mcq_id):
                 "mode": "rewrite",
             }
 
-            # Queue the background task
-            run_explanation_agent_job.apply_async(
-                args=[job_id, task_payload],
-                queue='celery',
+            # Queue the background task unless the same rewrite is already running
+            job = ai_jobs.submit(
+                'regenerate_all_explanations',
+                lambda job_id: run_explanation_agent_job.apply_async(args=[job_id, task_payload]),
+                mcq=mcq,
+                params={'custom_instructions': custom_instructions},
+                prefix=JOB_CACHE_PREFIX,
             )
 
-            logger.info(f"Queued async explanation regeneration job {job_id} for MCQ #{mcq_id}")
+            logger.info(f"Queued async explanation regeneration job {job.job_id} for MCQ #{mcq_id}")
 
-            return JsonResponse({
-                'success': True,
-                'job_id': job_id,
-                'status': 'queued',
-                'message': 'Explanation regeneration queued for background processing',
-            })
+            return JsonResponse(job.as_response(
+                success=True,
+                message='Explanation regeneration queued for background processing',
+            ))
         else:
             # Synchronous mode - original behavior
             from .openai_integration import regenerate_unified_explanation
@@ -4466,21 +4557,8 @@ def regenerate_all_explanations(request, mcq_id):
         }, status=500)
 
 
-@login_required
-@staff_member_required
-def ai_job_status(request, job_id):
-    from .tasks import _job_cache_key
-
-    data = cache.get(_job_cache_key(str(job_id)))
-    if not data:
-        return JsonResponse({'error': 'Job not found'}, status=404)
-    response_payload = {'job_id': str(job_id)}
-    response_payload.update(data)
-    return JsonResponse(response_payload)
-
-
 @staff_required_json
-def check_explanation_job_status(request, job_id):
+async def check_explanation_job_status(request, job_id):
     """Check status of background explanation job and save result if complete"""
     from .models import MCQ
     from .tasks import _job_cache_key
@@ -4489,7 +4567,7 @@ def check_explanation_job_status(request, job_id):
     cache_key = _job_cache_key(str(job_id))
     logger.info(f"Checking job status for job_id={job_id}, cache_key={cache_key}")
 
-    data = cache.get(cache_key)
+    data = await cache.aget(cache_key)
     logger.info(f"Cache data for job {job_id}: {data}")
 
     if not data:
@@ -4508,11 +4586,11 @@ def check_explanation_job_status(request, job_id):
             mcq_id = request.GET.get('mcq_id')
             if mcq_id:
                 try:
-                    mcq = MCQ.objects.get(id=mcq_id)
+                    mcq = await MCQ.objects.aget(id=mcq_id)
                     mcq.unified_explanation = enhanced_content
                     mcq.explanation = enhanced_content
                     mcq.explanation_sections = None
-                    mcq.save(update_fields=["unified_explanation", "explanation", "explanation_sections"])
+                    await mcq.asave(update_fields=["unified_explanation", "explanation", "explanation_sections"])
 
                     response_payload.update({
                         'success': True,
@@ -4535,89 +4613,147 @@ def check_explanation_job_status(request, job_id):
     return JsonResponse(response_payload)
 
 
+def _reuse_case_conversion(request, existing_session, tracking_id):
+    """Hand a ready conversion to the learner's Django session."""
+    from .case_conversion_tracker import conversion_tracker
+    from .end_to_end_integrity import e2e_integrity
+
+    # Log existing session usage
+    conversion_tracker.log_django_session_transfer(
+        tracking_id=tracking_id,
+        django_session_key="existing_session_reused",
+        transfer_checksum="reused",
+        case_data_summary={
+            'source_mcq_id': existing_session.case_data.get('source_mcq_id'),
+            'has_clinical_presentation': bool(existing_session.case_data.get('clinical_presentation'))
+        }
+    )
+    
+    # Transfer case data to Django session with integrity protection
+    success, case_session_id, error = e2e_integrity.transfer_to_django_session(request, existing_session)
+    
+    if not success:
+        conversion_tracker.log_error(tracking_id, "EXISTING_SESSION_TRANSFER", error)
+        return JsonResponse({
+            'success': False,
+            'error': f'Session transfer failed: {error}'
+        }, status=500)
+    
+    # Log successful transfer
+    conversion_tracker.log_django_session_transfer(
+        tracking_id=tracking_id,
+        django_session_key=case_session_id,
+        transfer_checksum="existing_session",
+        case_data_summary={
+            'source_mcq_id': existing_session.case_data.get('source_mcq_id'),
+            'has_clinical_presentation': bool(existing_session.case_data.get('clinical_presentation'))
+        }
+    )
+    
+    # Prepare response
+    response_data = {
+        'success': True,
+        'status': 'ready',
+        'session_id': existing_session.id,
+        'session_key': case_session_id,
+        'case_data': existing_session.case_data,
+        'message': 'Using existing case conversion',
+        'tracking_id': tracking_id  # Include tracking ID for debugging
+    }
+    
+    # Log frontend response
+    conversion_tracker.log_frontend_response(tracking_id, response_data)
+    
+    # Use the existing conversion
+    return JsonResponse(response_data)
+
+
+def _launch_case_conversion(mcq, user, tracking_id):
+    """Create the conversion session and start the background task."""
+    from .models import MCQCaseConversionSession
+    from .tasks import process_mcq_to_case_conversion
+    from .case_conversion_tracker import conversion_tracker
+    from .end_to_end_integrity import e2e_integrity
+
+    # Create new conversion session with end-to-end integrity
+    session = e2e_integrity.create_secure_conversion_session(mcq, user)
+    
+    # Log session creation
+    conversion_tracker.log_conversion_session_creation(
+        tracking_id=tracking_id,
+        session_id=session.id,
+        session_fingerprint=session.case_data.get('_integrity_metadata', {}).get('session_fingerprint', 'unknown'),
+        mcq_content_hash=session.case_data.get('_integrity_metadata', {}).get('mcq_content_hash', 'unknown')
+    )
+    
+    # Launch background task
+    task = process_mcq_to_case_conversion.delay(mcq.id, user.id, tracking_id)
+    
+    # Log background task start
+    conversion_tracker.log_background_task_start(
+        tracking_id=tracking_id,
+        task_id=task.id,
+        mcq_id=mcq.id,
+        user_id=user.id
+    )
+    
+    # Update session with task ID
+    session.task_id = task.id
+    session.status = MCQCaseConversionSession.PROCESSING
+    session.save()
+    
+    # Prepare response
+    response_data = {
+        'success': True,
+        'status': 'processing',
+        'session_id': session.id,
+        'task_id': task.id,
+        'message': 'Case conversion started. Please wait...',
+        'tracking_id': tracking_id  # Include tracking ID for debugging
+    }
+    
+    # Log frontend response
+    conversion_tracker.log_frontend_response(tracking_id, response_data)
+    
+    return JsonResponse(response_data)
+
+
 @login_required
 @require_POST
 @csrf_exempt
-def mcq_to_case_learning(request, mcq_id):
+async def mcq_to_case_learning(request, mcq_id):
     """Convert MCQ to interactive case-based learning session using background task"""
     from .models import MCQCaseConversionSession
-    from .tasks import process_mcq_to_case_conversion
     from .case_conversion_tracker import conversion_tracker
     
-    mcq = get_object_or_404(MCQ, id=mcq_id)
+    mcq = await aget_object_or_404(MCQ, id=mcq_id)
+    user = await request.auser()
     
     # Start comprehensive tracking
-    tracking_id = conversion_tracker.start_conversion_tracking(
+    tracking_id = await sync_to_async(conversion_tracker.start_conversion_tracking)(
         mcq_id=mcq_id, 
-        user_id=request.user.id, 
+        user_id=user.id, 
         request_source="frontend_button_click"
     )
     
     try:
         # Check if there's an existing ready conversion for this user and MCQ
-        existing_session = MCQCaseConversionSession.objects.filter(
+        existing_session = await MCQCaseConversionSession.objects.filter(
             mcq=mcq,
-            user=request.user,
+            user=user,
             status=MCQCaseConversionSession.READY
-        ).order_by('-created_at').first()
+        ).order_by('-created_at').afirst()
         
         if existing_session:
-            # Log existing session usage
-            conversion_tracker.log_django_session_transfer(
-                tracking_id=tracking_id,
-                django_session_key="existing_session_reused",
-                transfer_checksum="reused",
-                case_data_summary={
-                    'source_mcq_id': existing_session.case_data.get('source_mcq_id'),
-                    'has_clinical_presentation': bool(existing_session.case_data.get('clinical_presentation'))
-                }
-            )
-            
-            # Transfer case data to Django session with integrity protection
-            from .end_to_end_integrity import e2e_integrity
-            success, case_session_id, error = e2e_integrity.transfer_to_django_session(request, existing_session)
-            
-            if not success:
-                conversion_tracker.log_error(tracking_id, "EXISTING_SESSION_TRANSFER", error)
-                return JsonResponse({
-                    'success': False,
-                    'error': f'Session transfer failed: {error}'
-                }, status=500)
-            
-            # Log successful transfer
-            conversion_tracker.log_django_session_transfer(
-                tracking_id=tracking_id,
-                django_session_key=case_session_id,
-                transfer_checksum="existing_session",
-                case_data_summary={
-                    'source_mcq_id': existing_session.case_data.get('source_mcq_id'),
-                    'has_clinical_presentation': bool(existing_session.case_data.get('clinical_presentation'))
-                }
-            )
-            
-            # Prepare response
-            response_data = {
-                'success': True,
-                'status': 'ready',
-                'session_id': existing_session.id,
-                'session_key': case_session_id,
-                'case_data': existing_session.case_data,
-                'message': 'Using existing case conversion',
-                'tracking_id': tracking_id  # Include tracking ID for debugging
-            }
-            
-            # Log frontend response
-            conversion_tracker.log_frontend_response(tracking_id, response_data)
-            
-            # Use the existing conversion
-            return JsonResponse(response_data)
+            # Touches the Django session, so it runs on this request's sync thread
+            return await sync_to_async(_reuse_case_conversion)(request, existing_session, tracking_id)
         
         # Check if there's a processing session
-        processing_session = MCQCaseConversionSession.objects.filter(
+        processing_session = await MCQCaseConversionSession.objects.filter(
             mcq=mcq,
-            user=request.user,
+            user=user,
             status=MCQCaseConversionSession.PROCESSING
-        ).first()
+        ).afirst()
         
         if processing_session:
             # Return processing status
@@ -4628,48 +4764,7 @@ def mcq_to_case_learning(request, mcq_id):
                 'message': 'Case conversion is already in progress'
             })
         
-        # Create new conversion session with end-to-end integrity
-        from .end_to_end_integrity import e2e_integrity
-        session = e2e_integrity.create_secure_conversion_session(mcq, request.user)
-        
-        # Log session creation
-        conversion_tracker.log_conversion_session_creation(
-            tracking_id=tracking_id,
-            session_id=session.id,
-            session_fingerprint=session.case_data.get('_integrity_metadata', {}).get('session_fingerprint', 'unknown'),
-            mcq_content_hash=session.case_data.get('_integrity_metadata', {}).get('mcq_content_hash', 'unknown')
-        )
-        
-        # Launch background task
-        task = process_mcq_to_case_conversion.delay(mcq_id, request.user.id, tracking_id)
-        
-        # Log background task start
-        conversion_tracker.log_background_task_start(
-            tracking_id=tracking_id,
-            task_id=task.id,
-            mcq_id=mcq_id,
-            user_id=request.user.id
-        )
-        
-        # Update session with task ID
-        session.task_id = task.id
-        session.status = MCQCaseConversionSession.PROCESSING
-        session.save()
-        
-        # Prepare response
-        response_data = {
-            'success': True,
-            'status': 'processing',
-            'session_id': session.id,
-            'task_id': task.id,
-            'message': 'Case conversion started. Please wait...',
-            'tracking_id': tracking_id  # Include tracking ID for debugging
-        }
-        
-        # Log frontend response
-        conversion_tracker.log_frontend_response(tracking_id, response_data)
-        
-        return JsonResponse(response_data)
+        return await sync_to_async(_launch_case_conversion)(mcq, user, tracking_id)
         
     except Exception as e:
         print(f'Error initiating MCQ {mcq_id} conversion: {e}')
@@ -4833,6 +4928,61 @@ def admin_debug_console(request):
     return render(request, 'mcq/admin_debug_console.html', context)
 
 
+@staff_member_required
+def admin_performance_dashboard(request):
+    """
+    Per-route, per-task and per-model costs over the rolling instrumentation window.
+    Add ?format=json for the raw numbers.
+    """
+    from .services import instrumentation
+
+    try:
+        minutes = max(1, min(int(request.GET.get('minutes', '')), instrumentation.window_minutes()))
+    except ValueError:
+        minutes = instrumentation.window_minutes()
+    stats = instrumentation.summarize(minutes)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'minutes': minutes,
+            'series': [entry.as_dict() for entry in stats],
+        })
+
+    context = {
+        'minutes': minutes,
+        'window_minutes': instrumentation.window_minutes(),
+        'requests': [s for s in stats if s.kind == instrumentation.KIND_REQUEST],
+        'tasks': [s for s in stats if s.kind == instrumentation.KIND_TASK],
+        'models': [s for s in stats if s.kind == instrumentation.KIND_LLM],
+        'instrumentation_enabled': instrumentation.enabled(),
+        'debug_timestamp': timezone.now(),
+    }
+    return render(request, 'mcq/admin_performance_dashboard.html', context)
+
+
+def performance_metrics(request):
+    """
+    Prometheus text endpoint for the instrumentation aggregate.
+    Auth: staff user OR "Authorization: Bearer <INSTRUMENTATION_METRICS_TOKEN>".
+    """
+    import hmac
+    from django.conf import settings
+    from .services import instrumentation
+    from .task_routing import prometheus_queue_depths
+
+    expected = getattr(settings, 'INSTRUMENTATION_METRICS_TOKEN', '')
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    token = header[7:].strip() if header.startswith('Bearer ') else ''
+    token_ok = bool(expected and token and hmac.compare_digest(token, expected))
+    if not (token_ok or getattr(request.user, 'is_staff', False)):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+
+    return HttpResponse(
+        instrumentation.prometheus_text() + prometheus_queue_depths(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
 @staff_member_required
 @csrf_exempt
 def debug_session_integrity(request):
@@ -5373,20 +5523,10 @@ def live_tracking_data(request, mcq_id):
     """Get live tracking data for a specific MCQ"""
     try:
         from .case_conversion_tracker import conversion_tracker
-        from django.core.cache import cache
         
-        # Look for any active tracking for this MCQ
-        tracking_keys = cache.keys(f"conversion_tracking_track_{mcq_id}_*")
-        
-        if not tracking_keys:
-            return JsonResponse({
-                'success': True,
-                'active_tracking': None
-            })
-        
-        # Get the most recent tracking
-        latest_key = sorted(tracking_keys)[-1]
-        tracking_data = cache.get(latest_key)
+        # Most recent trace for this MCQ, straight from the per-MCQ index
+        traces = conversion_tracker.find_tracking_data(mcq_id=mcq_id, limit=1)
+        tracking_data = traces[0] if traces else None
         
         if tracking_data:
             # Add potential issues analysis
@@ -5406,22 +5546,13 @@ def live_tracking_data(request, mcq_id):
 
 @staff_member_required
 def export_tracking_data(request):
-    """Export all tracking data as JSON"""
+    """Export retained tracking data as JSON (newest first, bounded by the trace index size)"""
     try:
-        from django.core.cache import cache
         import json
+        from .case_conversion_tracker import conversion_tracker
+        from .services.trace_store import max_indexed
         
-        # Get all tracking keys
-        tracking_keys = cache.keys("conversion_tracking_*")
-        all_tracking = []
-        
-        for key in tracking_keys:
-            tracking_data = cache.get(key)
-            if tracking_data:
-                all_tracking.append(tracking_data)
-        
-        # Sort by start time
-        all_tracking.sort(key=lambda x: x.get('start_time', ''), reverse=True)
+        all_tracking = conversion_tracker.find_tracking_data(limit=max_indexed())
         
         # Create JSON response
         response = HttpResponse(
@@ -5443,28 +5574,15 @@ def export_tracking_data(request):
 def recent_tracking_data(request):
     """Get recent tracking data (last 24 hours)"""
     try:
-        from django.core.cache import cache
-        from datetime import timedelta, datetime
-        
-        # Get all tracking keys
-        tracking_keys = cache.keys("conversion_tracking_*")
-        recent_tracking = []
+        from datetime import timedelta
+        from .case_conversion_tracker import conversion_tracker
         
         cutoff_time = timezone.now() - timedelta(hours=24)
-        
-        for key in tracking_keys:
-            tracking_data = cache.get(key)
-            if tracking_data:
-                start_time = datetime.fromisoformat(tracking_data.get('start_time', '').replace('Z', '+00:00'))
-                if start_time >= cutoff_time:
-                    recent_tracking.append(tracking_data)
-        
-        # Sort by start time
-        recent_tracking.sort(key=lambda x: x.get('start_time', ''), reverse=True)
+        recent_tracking = conversion_tracker.find_tracking_data(since=cutoff_time, limit=100)
         
         return JsonResponse({
             'success': True,
-            'tracking_data': recent_tracking[:100]  # Limit to 100 most recent
+            'tracking_data': recent_tracking  # Limited to 100 most recent
         })
         
     except Exception as e:
@@ -5474,58 +5592,38 @@ def recent_tracking_data(request):
         }, status=500)
 
 
-@staff_member_required  
+@staff_member_required
 def search_tracking_data(request):
     """Search tracking data by criteria"""
     try:
-        from django.core.cache import cache
         from .case_conversion_tracker import conversion_tracker
+        from .services.trace_store import STATUSES
         
         # Get search parameters
         mcq_id = request.GET.get('mcq_id')
         user_id = request.GET.get('user_id')
-        status_filter = request.GET.get('status')
+        status_filter = request.GET.get('status') or None
         
-        # Get all tracking keys
-        tracking_keys = cache.keys("conversion_tracking_*")
-        filtered_tracking = []
+        if status_filter and status_filter not in STATUSES:
+            return JsonResponse({
+                'success': False,
+                'error': f'Unknown status: {status_filter}'
+            }, status=400)
         
-        for key in tracking_keys:
-            tracking_data = cache.get(key)
-            if not tracking_data:
-                continue
-                
-            # Apply filters
-            if mcq_id and str(tracking_data.get('mcq_id')) != mcq_id:
-                continue
-            if user_id and str(tracking_data.get('user_id')) != user_id:
-                continue
-                
-            # Determine status
-            if status_filter:
-                steps = tracking_data.get('steps', [])
-                step_types = [s['step_type'] for s in steps]
-                potential_issues = conversion_tracker._analyze_potential_issues(tracking_data)
-                
-                if status_filter == 'error' and not any(t.startswith('ERROR_') for t in step_types):
-                    continue
-                elif status_filter == 'mismatch' and not any('MCQ ID mismatch' in issue for issue in potential_issues):
-                    continue
-                elif status_filter == 'success' and 'CASE_BOT_RESPONSE' not in step_types:
-                    continue
-                elif status_filter == 'incomplete' and ('CASE_BOT_RESPONSE' in step_types or any(t.startswith('ERROR_') for t in step_types)):
-                    continue
-            
-            # Add potential issues to tracking data
-            tracking_data['potential_issues'] = conversion_tracker._analyze_potential_issues(tracking_data)
-            filtered_tracking.append(tracking_data)
+        # Filters are answered by the trace store's mcq/user/status indexes
+        filtered_tracking = conversion_tracker.find_tracking_data(
+            mcq_id=mcq_id,
+            user_id=user_id,
+            status=status_filter,
+            limit=200,
+        )
         
-        # Sort by start time
-        filtered_tracking.sort(key=lambda x: x.get('start_time', ''), reverse=True)
+        for tracking_data in filtered_tracking:
+            tracking_data['potential_issues'] = conversion_tracker._analyze_potential_issues(tracking_data)
         
         return JsonResponse({
             'success': True,
-            'tracking_data': filtered_tracking[:200]  # Limit to 200 results
+            'tracking_data': filtered_tracking  # Limited to 200 results
         })
         
     except Exception as e:
@@ -2,6 +2,7 @@
 ASGI config for neurology_mcq project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Served by gunicorn with uvicorn workers when WEB_SERVER_MODE=asgi (scripts/web.sh).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +12,10 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'neurology_mcq.settings')
+# Check if we're running on Railway
+if 'RAILWAY_ENVIRONMENT' in os.environ:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'neurology_mcq.settings_railway')
+else:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'neurology_mcq.settings')
 
 application = get_asgi_application()
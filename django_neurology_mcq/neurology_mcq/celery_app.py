@@ -42,10 +42,7 @@ app.conf.update(
     # Allow forcing eager execution via env for environments without a worker
     task_always_eager=_eager,
     task_eager_propagates=True,
-    # Remove custom routing - use default queue for all tasks
-    task_default_queue='celery',
-    task_default_exchange_type='direct',
-    task_default_routing_key='celery',
+    # Queues, routes and lane limits come from the CELERY_TASK_* settings
     # Ignore results we don't need
     task_ignore_result=True,
     # Store task results even when ignored (for our custom cache storage)
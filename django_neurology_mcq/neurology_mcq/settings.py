@@ -2,11 +2,15 @@
 Django settings for neurology_mcq project.
 """
 
+import importlib.util
+import json
 import os
 import dj_database_url
 from pathlib import Path
 from dotenv import load_dotenv
 import ssl
+from celery.schedules import crontab
+from kombu import Exchange, Queue
 
 # Load environment variables from .env file
 load_dotenv(os.path.join(Path(__file__).resolve().parent.parent.parent, '.env'))
@@ -49,7 +53,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add whitenoise for static files
+    'mcq.middleware.static_files.WhiteNoiseMiddleware',  # WhiteNoise static files (sync and async)
+    'mcq.middleware.instrumentation.InstrumentationMiddleware',  # Per-request query/cache/LLM accounting
+    'mcq.middleware.replica.ReplicaReadMiddleware',  # Replica reads for marked views, primary after writes
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,6 +86,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'neurology_mcq.wsgi.application'
+ASGI_APPLICATION = 'neurology_mcq.asgi.application'
 
 
 # Database
@@ -94,12 +101,59 @@ DATABASES = {
 
 # Use PostgreSQL on Heroku
 DATABASE_URL = os.environ.get('DATABASE_URL')
-if DATABASE_URL:
-    DATABASES['default'] = dj_database_url.config(
-        default=DATABASE_URL,
-        conn_max_age=600,
-        ssl_require=True
+# Read-only listing/search/dashboard/high-yield views read from this replica when set (mcq.db_router)
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+DATABASE_SSL_REQUIRE = os.environ.get('DATABASE_SSL_REQUIRE', 'True').lower() == 'true'
+# psycopg 3 connection pool per process (Django 5.1+); without psycopg_pool installed,
+# persistent connections with health checks are used instead
+DATABASE_POOL = (
+    os.environ.get('DATABASE_POOL', 'True').lower() == 'true'
+    and importlib.util.find_spec('psycopg_pool') is not None
+)
+# gunicorn worker class chosen by scripts/web.sh: wsgi (sync workers) or asgi (uvicorn workers)
+WEB_SERVER_MODE = os.environ.get('WEB_SERVER_MODE', 'wsgi').lower()
+# Async views (WEB_SERVER_MODE=asgi): threads per process for the blocking model,
+# transcription and cache calls awaited through mcq.services.async_io and for SSE pulls.
+# These threads share the process's connection pool. Model calls hand their connection
+# back first, so only threads doing ORM work at the same moment need one; a burst above
+# DATABASE_POOL_MAX_SIZE waits up to DATABASE_POOL_TIMEOUT and then raises PoolTimeout.
+# Raise both together, keeping web processes x DATABASE_POOL_MAX_SIZE (plus Celery
+# workers) under the Postgres connection limit.
+ASYNC_IO_THREADS = int(os.environ.get('ASYNC_IO_THREADS', 32))
+DATABASE_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 1)),
+    # A sync worker serves one request at a time; an ASGI worker runs up to ASYNC_IO_THREADS
+    'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 8 if WEB_SERVER_MODE == 'asgi' else 4)),
+    # Seconds a request waits for a free connection before failing
+    'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+    # Idle connections above min_size are closed after this many seconds
+    'max_idle': float(os.environ.get('DATABASE_POOL_MAX_IDLE', 300)),
+}
+
+
+def _postgres_database(url):
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=0 if DATABASE_POOL else 600,
+        conn_health_checks=not DATABASE_POOL,
+        ssl_require=DATABASE_SSL_REQUIRE,
     )
+    if DATABASE_POOL and config['ENGINE'] == 'django.db.backends.postgresql':
+        config.setdefault('OPTIONS', {})['pool'] = dict(DATABASE_POOL_OPTIONS)
+    return config
+
+
+if DATABASE_URL:
+    DATABASES['default'] = _postgres_database(DATABASE_URL)
+    if DATABASE_REPLICA_URL:
+        DATABASES['replica'] = _postgres_database(DATABASE_REPLICA_URL)
+        DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['mcq.db_router.PrimaryReplicaRouter']
+# Apps whose reads may be served by the replica; sessions and auth always use the primary
+DATABASE_REPLICA_APPS = ['mcq']
+# After a write, the client reads from the primary for this many seconds (read-your-writes)
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', 15))
 
 
 # Password validation
@@ -312,12 +366,186 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_ENABLE_UTC = True
 
-# Queue configuration - simplified for Heroku
-CELERY_TASK_DEFAULT_QUEUE = 'celery'
+# Queue topology (see mcq/task_routing.py): interactive AI work, bulk
+# generation and maintenance each have a queue and a worker pool of their own.
+# 'celery' is the pre-lane queue, still drained by the interactive pool.
+CELERY_TASK_QUEUES = tuple(
+    Queue(name, Exchange(name), routing_key=name) for name in ('interactive', 'bulk', 'maintenance', 'celery')
+)
+CELERY_TASK_DEFAULT_QUEUE = 'interactive'
 CELERY_TASK_DEFAULT_EXCHANGE_TYPE = 'direct'
-CELERY_TASK_DEFAULT_ROUTING_KEY = 'celery'
+CELERY_TASK_DEFAULT_ROUTING_KEY = 'interactive'
+CELERY_TASK_ROUTES = ('mcq.task_routing.route_task',)
+CELERY_TASK_ANNOTATIONS = ('mcq.task_routing.LaneAnnotations',)
+# Priority within a queue; with Redis 0 is consumed first
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+# Per-lane default priority and time limits (seconds). Worker concurrency is
+# set per pool with CELERY_<LANE>_CONCURRENCY (Procfile / docker-compose.yml).
+CELERY_LANES = {
+    'interactive': {
+        'priority': 3,
+        'soft_time_limit': int(os.environ.get('CELERY_INTERACTIVE_SOFT_TIME_LIMIT', 240)),
+        'time_limit': int(os.environ.get('CELERY_INTERACTIVE_TIME_LIMIT', 300)),
+    },
+    'bulk': {
+        'priority': 6,
+        'soft_time_limit': int(os.environ.get('CELERY_BULK_SOFT_TIME_LIMIT', 600)),
+        'time_limit': int(os.environ.get('CELERY_BULK_TIME_LIMIT', 660)),
+    },
+    'maintenance': {
+        'priority': 9,
+        'soft_time_limit': int(os.environ.get('CELERY_MAINTENANCE_SOFT_TIME_LIMIT', 3300)),
+        'time_limit': int(os.environ.get('CELERY_MAINTENANCE_TIME_LIMIT', 3600)),
+    },
+}
 
 # Worker configuration for Heroku
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_TASK_ACKS_LATE = True
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
+
+# Periodic tasks (run by a `celery beat` process; see Procfile / docker-compose.yml)
+CELERY_BEAT_SCHEDULE = {
+    'retention-nightly': {
+        'task': 'mcq.tasks.run_retention',
+        'schedule': crontab(
+            hour=int(os.environ.get('RETENTION_SCHEDULE_HOUR', 3)),
+            minute=int(os.environ.get('RETENTION_SCHEDULE_MINUTE', 30)),
+        ),
+    },
+}
+
+# Voice transcription
+# Dotted path to a mcq.services.transcription_service.TranscriptionBackend subclass.
+TRANSCRIPTION_BACKEND = os.environ.get(
+    'TRANSCRIPTION_BACKEND',
+    'mcq.services.transcription_service.OpenAITranscriptionBackend',
+)
+TRANSCRIPTION_MODEL = os.environ.get('TRANSCRIPTION_MODEL', 'whisper-1')
+# Uploads stay in memory up to this size before the spool spills to disk
+TRANSCRIPTION_SPOOL_MAX_BYTES = int(os.environ.get('TRANSCRIPTION_SPOOL_MAX_BYTES', 2 * 1024 * 1024))
+TRANSCRIPTION_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+# Largest upload that may be shipped to a Celery worker for background transcription
+TRANSCRIPTION_ASYNC_MAX_BYTES = int(os.environ.get('TRANSCRIPTION_ASYNC_MAX_BYTES', 8 * 1024 * 1024))
+
+# Flashcards
+# Number of due cards loaded (with their MCQs) for one review session page
+FLASHCARD_REVIEW_QUEUE_SIZE = int(os.environ.get('FLASHCARD_REVIEW_QUEUE_SIZE', 50))
+
+# Adaptive question selection
+# Seconds a process may reuse its in-memory MCQ candidate matrix (MCQ saves also invalidate it)
+ADAPTIVE_CANDIDATE_MAX_AGE = int(os.environ.get('ADAPTIVE_CANDIDATE_MAX_AGE', 600))
+# Half-life, in days, of answer evidence in the per-user mastery estimates
+ADAPTIVE_MASTERY_HALF_LIFE_DAYS = float(os.environ.get('ADAPTIVE_MASTERY_HALF_LIFE_DAYS', 60))
+
+# Near-duplicate MCQ detection
+# Minimum MinHash similarity (estimated Jaccard of 5-character shingles) treated as a duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.7))
+
+# MCQ-to-case conversion traces
+# 'auto' uses Redis lists/sorted sets when the default cache is django_redis, else plain cache keys
+CONVERSION_TRACE_BACKEND = os.environ.get('CONVERSION_TRACE_BACKEND', 'auto')
+# Traces and their index entries are dropped after this many seconds
+CONVERSION_TRACE_RETENTION_SECONDS = int(os.environ.get('CONVERSION_TRACE_RETENTION_SECONDS', 7200))
+# Upper bound on entries per trace index (start time, MCQ, user, status)
+CONVERSION_TRACE_MAX_INDEXED = int(os.environ.get('CONVERSION_TRACE_MAX_INDEXED', 5000))
+# Oldest steps beyond this count are trimmed from a single trace
+CONVERSION_TRACE_MAX_STEPS = int(os.environ.get('CONVERSION_TRACE_MAX_STEPS', 200))
+
+# MCQ admin changelist
+# Seconds the distinct subspecialty/exam type/year filter values are cached (MCQ saves also clear them)
+ADMIN_FILTER_CHOICES_TIMEOUT = int(os.environ.get('ADMIN_FILTER_CHOICES_TIMEOUT', 3600))
+# Unfiltered PostgreSQL listings above this planner estimate skip the exact COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.environ.get('ADMIN_ESTIMATED_COUNT_THRESHOLD', 50000))
+
+# Local semantic embeddings (related questions, AI-Pal context)
+# Dotted path to a mcq.services.embeddings.Embedder subclass; HashingEmbedder needs no network
+EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'mcq.services.embeddings.HashingEmbedder')
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'text-embedding-3-small')
+EMBEDDING_DIMENSIONS = int(os.environ.get('EMBEDDING_DIMENSIONS', 512))
+# Memory-mapped index builds on local disk; each process builds its own in the background
+# from the stored vectors (`build_embeddings` builds ahead of time)
+EMBEDDING_INDEX_DIR = os.environ.get('EMBEDDING_INDEX_DIR', str(BASE_DIR / 'var' / 'embeddings'))
+# Seconds between checks for stored vectors newer than a process's index build
+EMBEDDING_INDEX_CHECK_SECONDS = int(os.environ.get('EMBEDDING_INDEX_CHECK_SECONDS', 300))
+# Explanation excerpts from similar MCQs added to AI-Pal prompts (0 disables)
+EMBEDDING_CONTEXT_SECTIONS = int(os.environ.get('EMBEDDING_CONTEXT_SECTIONS', 3))
+# Minimum cosine similarity for the related-questions panel
+RELATED_MCQ_MIN_SCORE = float(os.environ.get('RELATED_MCQ_MIN_SCORE', 0.2))
+
+# Case-based learning conversations
+# Upper bound on prompt tokens per case turn (system prompt, summary, recent turns, learner message)
+CASE_PROMPT_TOKEN_BUDGET = int(os.environ.get('CASE_PROMPT_TOKEN_BUDGET', 6000))
+# Older turns are folded into a rolling case summary capped at this many tokens
+CASE_SUMMARY_TOKEN_LIMIT = int(os.environ.get('CASE_SUMMARY_TOKEN_LIMIT', 800))
+# Recent messages replayed verbatim before folding kicks in
+CASE_MAX_HISTORY_MESSAGES = int(os.environ.get('CASE_MAX_HISTORY_MESSAGES', 12))
+# Send a per-case prompt_cache_key so every turn of a case hits the same provider cache
+CASE_PROMPT_CACHE_KEYS = os.environ.get('CASE_PROMPT_CACHE_KEYS', 'True').lower() == 'true'
+# Messages returned when a saved case is resumed
+CASE_RESUME_MESSAGES = int(os.environ.get('CASE_RESUME_MESSAGES', 20))
+
+# Retention of per-user history (mcq.services.retention, run nightly by Celery beat)
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 500))
+# Batches per policy per run; remaining rows are handled on the next run
+RETENTION_MAX_BATCHES = int(os.environ.get('RETENTION_MAX_BATCHES', 200))
+# Pause between batches so deletes don't monopolise the database
+RETENTION_BATCH_PAUSE_SECONDS = float(os.environ.get('RETENTION_BATCH_PAUSE_SECONDS', 0.05))
+# Messages kept verbatim when an archived case session is compacted
+RETENTION_CASE_MESSAGES_KEPT = int(os.environ.get('RETENTION_CASE_MESSAGES_KEPT', 10))
+# Per-policy overrides, e.g. {"reasoning_sessions_delete": {"max_age_days": 730}, "incorrect_answers_resolved": {"enabled": false}}
+RETENTION_POLICY_OVERRIDES = json.loads(os.environ.get('RETENTION_POLICY_OVERRIDES', '{}'))
+
+# ReasoningPal tiers
+# Return an instant rule-based analysis and let the model analysis replace it when the worker finishes
+REASONING_FASTPATH_ENABLED = os.environ.get('REASONING_FASTPATH_ENABLED', 'True').lower() == 'true'
+# Seconds model analyses are reused for identical (MCQ version, answer, normalised reasoning) submissions
+REASONING_RESULT_CACHE_TIMEOUT = int(os.environ.get('REASONING_RESULT_CACHE_TIMEOUT', 7 * 24 * 3600))
+
+# AI-Pal answer cache (mcq.services.ai_pal_cache), keyed by MCQ content version
+AI_PAL_CACHE_ENABLED = os.environ.get('AI_PAL_CACHE_ENABLED', 'True').lower() == 'true'
+# Minimum word-set (Jaccard) similarity for a new question to reuse a stored answer
+AI_PAL_CACHE_SIMILARITY = float(os.environ.get('AI_PAL_CACHE_SIMILARITY', 0.75))
+# Answered questions kept per MCQ, and for how many seconds
+AI_PAL_CACHE_MAX_ENTRIES = int(os.environ.get('AI_PAL_CACHE_MAX_ENTRIES', 50))
+AI_PAL_CACHE_TIMEOUT = int(os.environ.get('AI_PAL_CACHE_TIMEOUT', 7 * 24 * 3600))
+
+# Server-sent event streams of AI output (mcq.services.ai_stream)
+# Seconds between keepalive comments while a completion is silent
+AI_STREAM_KEEPALIVE_SECONDS = float(os.environ.get('AI_STREAM_KEEPALIVE_SECONDS', 15))
+
+# Deduplicated AI job submission (mcq.services.ai_jobs): seconds an identical
+# submission is joined to the first while that job is still pending or running
+AI_JOB_DEDUP_TIMEOUT = int(os.environ.get('AI_JOB_DEDUP_TIMEOUT', 900))
+
+# MCQ provisioning (mcq.services.fixture_loader / `provision_mcqs`): a snapshot
+# written with `provision_mcqs --write-snapshot`, preferred over the fixtures
+MCQ_SNAPSHOT_PATH = os.environ.get('MCQ_SNAPSHOT_PATH', str(BASE_DIR / 'fixtures' / 'mcqs.snapshot.jsonl.gz'))
+
+# Request and task instrumentation (mcq.services.instrumentation)
+INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', 'True').lower() == 'true'
+# Minutes covered by the rolling aggregate behind the performance dashboard and /admin/debug/metrics/
+INSTRUMENTATION_WINDOW_MINUTES = int(os.environ.get('INSTRUMENTATION_WINDOW_MINUTES', 15))
+# auto (Redis when the default cache is django_redis, else per-process), redis, or memory
+INSTRUMENTATION_BACKEND = os.environ.get('INSTRUMENTATION_BACKEND', 'auto')
+# Who gets Server-Timing response headers: staff, all, or off
+INSTRUMENTATION_SERVER_TIMING = os.environ.get('INSTRUMENTATION_SERVER_TIMING', 'staff')
+# Bearer token accepted by the Prometheus endpoint in addition to staff sessions
+INSTRUMENTATION_METRICS_TOKEN = os.environ.get('INSTRUMENTATION_METRICS_TOKEN', '')
+
+# Local guideline retrieval (mcq.services.guideline_index; rebuild with `manage.py build_guideline_index`)
+# Memory-mapped BM25 index files on local disk; a process without a build makes one on first use
+GUIDELINE_INDEX_DIR = os.environ.get('GUIDELINE_INDEX_DIR', str(BASE_DIR / 'var' / 'guidelines'))
+# Directories of guideline documents (.txt, .md, .pdf, curated quote .json), separated by os.pathsep
+GUIDELINE_SOURCE_DIRS = [
+    path for path in os.environ.get('GUIDELINE_SOURCE_DIRS', str(BASE_DIR / 'mcq' / 'guidelines')).split(os.pathsep) if path
+]
+# Guideline sentences added to reasoning and explanation prompts (0 disables)
+GUIDELINE_CONTEXT_QUOTES = int(os.environ.get('GUIDELINE_CONTEXT_QUOTES', 4))
+# Minimum BM25 score of the chunk a quote comes from
+GUIDELINE_MIN_SCORE = float(os.environ.get('GUIDELINE_MIN_SCORE', 2.0))
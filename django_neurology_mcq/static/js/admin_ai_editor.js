@@ -1240,6 +1240,26 @@
         current_content: originalValue,
         custom_instructions: instructions || ''
       };
+
+      // Stream the draft into the editor as it is written
+      if (state.endpoints.explanationStream && window.AIStream && window.AIStream.supported()) {
+        await new Promise((resolve, reject) => {
+          window.AIStream.post(state.endpoints.explanationStream, payload, {
+            onStart: (jobId) => adminDebugLog(`🌀 [Explanation AI] Streaming job ${jobId}...`),
+            onDelta: (_, text) => {
+              textarea.value = text;
+              textarea.scrollTop = textarea.scrollHeight;
+            },
+            onDone: (result) => {
+              applyExplanationEnhancement(result, textarea, originalValue);
+              resolve();
+            },
+            onError: (message) => reject(new Error(message))
+          }).catch(reject);
+        });
+        return;
+      }
+
       const data = await postJson(
         ensureEndpoint('explanation'),
         payload,
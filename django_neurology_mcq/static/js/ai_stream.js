@@ -0,0 +1,170 @@
+'use strict';
+
+/*
+ * Client for the server-sent event endpoints in mcq/ai_stream_views.py.
+ *
+ * AIStream.post(url, body, handlers) POSTs a FormData or JSON body, reads the
+ * event stream with fetch and calls handlers.onStart(jobId), onDelta(text,
+ * fullText), onDone(result) and onError(message). AIStream.renderMarkdown
+ * turns the partial markdown received so far into HTML; call it on every
+ * delta (it is cheap for answer-sized texts) and replace the result with the
+ * server-rendered HTML from onDone.
+ */
+(function (window) {
+  function getCookie(name) {
+    const cookies = document.cookie ? document.cookie.split(';') : [];
+    for (let i = 0; i < cookies.length; i += 1) {
+      const cookie = cookies[i].trim();
+      if (cookie.substring(0, name.length + 1) === `${name}=`) {
+        return decodeURIComponent(cookie.substring(name.length + 1));
+      }
+    }
+    return null;
+  }
+
+  function supported() {
+    return Boolean(window.fetch && window.ReadableStream && window.TextDecoder);
+  }
+
+  function parseEvent(block) {
+    let event = 'message';
+    const data = [];
+    block.split('\n').forEach((line) => {
+      if (line.startsWith('event:')) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith('data:')) {
+        data.push(line.slice(5).trim());
+      }
+    });
+    if (!data.length) {
+      return null; // keepalive comment
+    }
+    try {
+      return { event, data: JSON.parse(data.join('\n')) };
+    } catch (err) {
+      return null;
+    }
+  }
+
+  async function post(url, body, handlers) {
+    const on = handlers || {};
+    const headers = { Accept: 'text/event-stream', 'X-CSRFToken': getCookie('csrftoken') || '' };
+    let payload = body;
+    if (!(body instanceof FormData)) {
+      headers['Content-Type'] = 'application/json';
+      payload = JSON.stringify(body || {});
+    }
+
+    const response = await fetch(url, { method: 'POST', body: payload, headers, credentials: 'same-origin' });
+    const contentType = response.headers.get('Content-Type') || '';
+    if (!response.ok || !contentType.startsWith('text/event-stream')) {
+      let message = `HTTP ${response.status}`;
+      try {
+        const data = await response.json();
+        message = data.error || message;
+      } catch (err) { /* not JSON */ }
+      if (on.onError) on.onError(message);
+      return;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let finished = false;
+    while (!finished) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary >= 0) {
+        const parsed = parseEvent(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+        if (!parsed) continue;
+        if (parsed.event === 'start') {
+          if (on.onStart) on.onStart(parsed.data.job_id);
+        } else if (parsed.event === 'reset') {
+          text = '';
+          if (on.onDelta) on.onDelta('', text);
+        } else if (parsed.event === 'delta') {
+          text += parsed.data.text || '';
+          if (on.onDelta) on.onDelta(parsed.data.text || '', text);
+        } else if (parsed.event === 'done') {
+          finished = true;
+          if (on.onDone) on.onDone(parsed.data);
+        } else if (parsed.event === 'error') {
+          finished = true;
+          if (on.onError) on.onError(parsed.data.error || 'AI request failed');
+        }
+      }
+    }
+    if (!finished && on.onError) {
+      on.onError('The connection closed before the answer was complete.');
+    }
+  }
+
+  function escapeHtml(text) {
+    return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+  }
+
+  function inline(text) {
+    return escapeHtml(text)
+      .replace(/\*\*(.+?)\*\*/g, '<strong>$1</strong>')
+      .replace(/\*(.+?)\*/g, '<em>$1</em>')
+      .replace(/`([^`]+)`/g, '<code>$1</code>');
+  }
+
+  function renderMarkdown(markdown) {
+    const html = [];
+    let list = null;
+    let paragraph = [];
+    const closeParagraph = () => {
+      if (paragraph.length) html.push(`<p>${paragraph.map(inline).join('<br>')}</p>`);
+      paragraph = [];
+    };
+    const closeList = () => {
+      if (list) html.push(`</${list}>`);
+      list = null;
+    };
+    const openList = (tag) => {
+      if (list !== tag) {
+        closeList();
+        html.push(`<${tag}>`);
+        list = tag;
+      }
+    };
+
+    (markdown || '').split('\n').forEach((raw) => {
+      const line = raw.trimEnd();
+      const heading = line.match(/^(#{1,4})\s+(.*)$/);
+      const bullet = line.match(/^\s*[-*]\s+(.*)$/);
+      const numbered = line.match(/^\s*\d+[.)]\s+(.*)$/);
+      if (!line.trim()) {
+        closeParagraph();
+        closeList();
+      } else if (heading) {
+        closeParagraph();
+        closeList();
+        const level = Math.min(heading[1].length + 2, 6);
+        html.push(`<h${level}>${inline(heading[2])}</h${level}>`);
+      } else if (bullet) {
+        closeParagraph();
+        openList('ul');
+        html.push(`<li>${inline(bullet[1])}</li>`);
+      } else if (numbered) {
+        closeParagraph();
+        openList('ol');
+        html.push(`<li>${inline(numbered[1])}</li>`);
+      } else {
+        closeList();
+        paragraph.push(line);
+      }
+    });
+    closeParagraph();
+    closeList();
+    return html.join('');
+  }
+
+  window.AIStream = { supported, post, renderMarkdown };
+})(window);
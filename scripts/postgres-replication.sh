@@ -0,0 +1,6 @@
+#!/bin/bash
+# Runs once when the local `db` volume is initialised: lets the `db-replica`
+# service (docker compose --profile replica) stream WAL from the primary.
+set -euo pipefail
+
+echo "host replication ${POSTGRES_USER} all scram-sha-256" >> "$PGDATA/pg_hba.conf"
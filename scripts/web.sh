@@ -0,0 +1,27 @@
+#!/usr/bin/env bash
+# Start the web process with gunicorn.
+#   WEB_SERVER_MODE=wsgi (default): sync workers serving neurology_mcq.wsgi
+#   WEB_SERVER_MODE=asgi: uvicorn workers serving neurology_mcq.asgi; async views
+#     (AI-Pal, case bot, transcription, job polls) then wait on the model without
+#     occupying a worker, so keep WEB_WORKERS low and raise ASYNC_IO_THREADS.
+#     Those threads share each process's database pool: raise DATABASE_POOL_MAX_SIZE
+#     with them, keeping WEB_WORKERS x DATABASE_POOL_MAX_SIZE under the Postgres
+#     connection limit, or ORM bursts will fail with PoolTimeout (see settings.py).
+set -euo pipefail
+
+cd "$(dirname "$0")/../django_neurology_mcq"
+
+if [ "${WEB_SERVER_MODE:-wsgi}" = "asgi" ]; then
+  exec python -m gunicorn neurology_mcq.asgi:application \
+    --worker-class uvicorn_worker.UvicornWorker \
+    --workers "${WEB_WORKERS:-2}" \
+    --timeout "${WEB_TIMEOUT:-120}" \
+    --bind "0.0.0.0:${PORT:-8000}" \
+    --log-file -
+fi
+
+exec python -m gunicorn neurology_mcq.wsgi:application \
+  --workers "${WEB_WORKERS:-3}" \
+  --timeout "${WEB_TIMEOUT:-120}" \
+  --bind "0.0.0.0:${PORT:-8000}" \
+  --log-file -